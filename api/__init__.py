@@ -0,0 +1,5 @@
+"""
+HTTP/JSON-сервис над слоем данных для киосков самообслуживания и веб-каталога.
+
+Запуск: python -m api.server --help (нужен пакет aiohttp).
+"""
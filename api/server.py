@@ -0,0 +1,434 @@
+"""
+REST/JSON-сервис над DatabaseManager: CRUD основных таблиц, поиск книг,
+выдача и возврат. Запросы обслуживает пул из нескольких DatabaseManager
+(по соединению на каждый), вызовы выполняются в потоках, чтобы не
+блокировать цикл событий. С --backend asyncpg запросы идут через
+AsyncDatabaseManager без потоков.
+
+Примеры:
+    python -m api.server --dsn "dbname=test1 user=postgres password=..." --port 8080 --pool 8
+    python -m api.server --dsn "dbname=test1 user=postgres password=..." --backend asyncpg --pool 20
+    curl "http://localhost:8080/api/books?limit=20"
+    curl "http://localhost:8080/api/books?limit=20&after=20"
+    curl "http://localhost:8080/api/search?q=толстой"
+    curl -X POST -d '{"book_id": 1, "reader_id": 2}' http://localhost:8080/api/checkout
+    curl -X POST http://localhost:8080/api/issues/15/return
+    curl "http://localhost:8080/api/overdue?limit=100&as_of=2024-06-01"
+    curl "http://localhost:8080/api/readers/7/profile"
+    curl "http://localhost:8080/api/readers/7/history?limit=50&before=2024-05-01,1234"
+    curl "http://localhost:8080/api/books/12/recommendations"
+
+Списки отдаются страницами по первичному ключу (параметры limit и after,
+ключ следующей страницы — поле next). Ответы GET содержат ETag: повторный
+запрос с If-None-Match получает 304 без тела. ETag строки — её версия,
+его можно передать в If-Match при PUT, чтобы не перезаписать чужое изменение.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+import psycopg2.extensions
+from aiohttp import web
+
+from core.data import VERSION_CONFLICT_MESSAGE
+from core.logger import Logger
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_POOL_SIZE = 8
+
+# Ресурс -> таблица, ключ, методы DatabaseManager и поля в порядке их аргументов
+RESOURCES = {
+    "books": {
+        "key": "book_id", "add": "add_book", "update": "update_book", "delete": "delete_book",
+        "fields": ("title", "publication_year", "genre", "isbn", "available_copies"),
+    },
+    "readers": {
+        "key": "reader_id", "add": "add_reader", "update": "update_reader", "delete": "delete_reader",
+        "fields": ("last_name", "first_name", "patronymic", "ticket_number", "registration_date"),
+    },
+    "authors": {
+        "key": "author_id", "add": "add_author", "update": "update_author", "delete": "delete_author",
+        "fields": ("last_name", "first_name", "patronymic", "birth_year", "country"),
+    },
+    "issues": {
+        "key": "issue_id", "add": "add_issue", "update": "update_issue", "delete": "delete_issue",
+        "fields": ("book_id", "reader_id", "issue_date", "return_date"),
+    },
+}
+
+POOL_KEY = web.AppKey("pool", object)
+
+
+class ManagerPool:
+    """
+    Пул подключённых DatabaseManager. Каждый менеджер в любой момент
+    используется одним запросом: у него одно соединение и один курсор.
+    """
+
+    def __init__(self, connection_params, size=DEFAULT_POOL_SIZE):
+        self.connection_params = connection_params
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="library-api")
+        self.idle = None
+        self.managers = []
+
+    async def open(self):
+        from core.data import DatabaseManager
+        loop = asyncio.get_running_loop()
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            db = DatabaseManager()
+            db.set_connection_params(*self.connection_params)
+            if not await loop.run_in_executor(self.executor, db.connect):
+                await self.close()
+                raise RuntimeError("Не удалось подключиться к базе данных")
+            self.managers.append(db)
+            self.idle.put_nowait(db)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        for db in self.managers:
+            await loop.run_in_executor(self.executor, db.disconnect)
+        self.managers.clear()
+        self.executor.shutdown(wait=False)
+
+    async def call(self, method, *args, **kwargs):
+        """Вызов метода DatabaseManager на свободном соединении пула."""
+        db = await self.idle.get()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, lambda: getattr(db, method)(*args, **kwargs))
+        finally:
+            self.idle.put_nowait(db)
+
+
+class AsyncManagerPool:
+    """
+    Тот же интерфейс call() поверх AsyncDatabaseManager (asyncpg):
+    запросы выполняются в цикле событий без потоков, соединения
+    выдаются пулом asyncpg на время одного вызова.
+    """
+
+    def __init__(self, connection_params, size=DEFAULT_POOL_SIZE):
+        self.connection_params = connection_params
+        self.size = size
+        self.db = None
+
+    async def open(self):
+        from core.async_data import AsyncDatabaseManager
+        self.db = AsyncDatabaseManager(min_size=min(2, self.size), max_size=self.size)
+        self.db.set_connection_params(*self.connection_params)
+        if not await self.db.connect():
+            raise RuntimeError("Не удалось подключиться к базе данных")
+
+    async def close(self):
+        await self.db.disconnect()
+
+    async def call(self, method, *args, **kwargs):
+        return await getattr(self.db, method)(*args, **kwargs)
+
+
+BACKENDS = {"threads": ManagerPool, "asyncpg": AsyncManagerPool}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_json_default)
+
+
+def error(status, message):
+    return web.json_response({"error": message}, status=status, dumps=_dumps)
+
+
+def cached_response(request, payload, etag=None):
+    """
+    Ответ GET с ETag. Без явного etag используется слабый ETag по хешу тела;
+    при совпадении с If-None-Match возвращается 304.
+    """
+    body = _dumps(payload)
+    if etag is None:
+        etag = 'W/"' + hashlib.sha1(body.encode("utf-8")).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+        return web.Response(status=304, headers=headers)
+    return web.Response(text=body, content_type="application/json", headers=headers)
+
+
+def row_etag(row):
+    """ETag строки: её версия (см. миграцию версий строк), иначе — хеш тела."""
+    return f'"{row["version"]}"' if row.get("version") is not None else None
+
+
+def row_response(row, status=200):
+    etag = row_etag(row)
+    return web.json_response(row, status=status, dumps=_dumps, headers={"ETag": etag} if etag else None)
+
+
+def _int_param(request, name, default=None, minimum=None, maximum=None):
+    text = request.query.get(name)
+    if text is None or text == "":
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise web.HTTPBadRequest(text=_dumps({"error": f"Параметр {name} должен быть целым"}),
+                                 content_type="application/json")
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+def _path_id(request):
+    try:
+        return int(request.match_info["id"])
+    except ValueError:
+        raise web.HTTPNotFound(text=_dumps({"error": "Некорректный идентификатор"}),
+                               content_type="application/json")
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=_dumps({"error": "Тело запроса должно быть JSON-объектом"}),
+                                 content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=_dumps({"error": "Тело запроса должно быть JSON-объектом"}),
+                                 content_type="application/json")
+    return body
+
+
+def _resource(request):
+    name = request.match_info["resource"]
+    if name not in RESOURCES:
+        raise web.HTTPNotFound(text=_dumps({"error": f"Ресурс {name} не найден"}),
+                               content_type="application/json")
+    return name, RESOURCES[name]
+
+
+async def list_rows(request):
+    table, resource = _resource(request)
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    after = _int_param(request, "after")
+    # Лишняя строка показывает, есть ли следующая страница
+    try:
+        rows = await request.app[POOL_KEY].call("get_table_page", table, limit + 1,
+                                                after=(after,) if after is not None else None)
+    except ValueError as e:
+        return error(404, str(e))
+    next_key = rows[limit - 1][resource["key"]] if len(rows) > limit else None
+    return cached_response(request, {"items": rows[:limit], "next": next_key})
+
+
+async def get_one(request):
+    table, _ = _resource(request)
+    try:
+        row = await request.app[POOL_KEY].call("get_row", table, _path_id(request))
+    except ValueError as e:
+        return error(404, str(e))
+    if row is None:
+        return error(404, "Запись не найдена")
+    return cached_response(request, row, row_etag(row))
+
+
+async def create_row(request):
+    table, resource = _resource(request)
+    body = await _json_body(request)
+    missing = [field for field in resource["fields"] if field not in body]
+    if missing:
+        return error(400, f"Не заданы поля: {', '.join(missing)}")
+    row = await request.app[POOL_KEY].call(resource["add"], *(body[field] for field in resource["fields"]))
+    if row is None:
+        return error(400, "Запись не добавлена (подробности в журнале сервера)")
+    return row_response(row, status=201)
+
+
+async def update_row(request):
+    table, resource = _resource(request)
+    key = _path_id(request)
+    body = await _json_body(request)
+    missing = [field for field in resource["fields"] if field not in body]
+    if missing:
+        return error(400, f"Не заданы поля: {', '.join(missing)}")
+    expected_version = body.get("version")
+    if_match = request.headers.get("If-Match", "").strip()
+    if if_match and if_match != "*":
+        try:
+            expected_version = int(if_match.strip('"'))
+        except ValueError:
+            return error(400, "If-Match должен содержать ETag строки")
+    success, result = await request.app[POOL_KEY].call(
+        resource["update"], key, *(body[field] for field in resource["fields"]),
+        expected_version=expected_version)
+    if success:
+        return row_response(result)
+    if result == VERSION_CONFLICT_MESSAGE:
+        return error(412, result)
+    if "не найден" in result:
+        return error(404, result)
+    return error(400, result)
+
+
+async def delete_row(request):
+    table, resource = _resource(request)
+    success, result = await request.app[POOL_KEY].call(resource["delete"], _path_id(request))
+    if not success:
+        return error(400, result)
+    if result is None:
+        return error(404, "Запись не найдена")
+    return web.json_response(result, dumps=_dumps)
+
+
+async def search(request):
+    text = request.query.get("q", "").strip()
+    if not text:
+        return error(400, "Не задан параметр q")
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    after = _int_param(request, "after")
+    rows = await request.app[POOL_KEY].call("search_books", text, limit + 1, after)
+    next_key = rows[limit - 1]["book_id"] if len(rows) > limit else None
+    return cached_response(request, {"items": rows[:limit], "next": next_key})
+
+
+async def checkout(request):
+    body = await _json_body(request)
+    if "book_id" not in body or "reader_id" not in body:
+        return error(400, "Не заданы поля: book_id, reader_id")
+    success, result = await request.app[POOL_KEY].call(
+        "checkout_book", body["book_id"], body["reader_id"], body.get("issue_date"))
+    if success:
+        return web.json_response(result, status=201, dumps=_dumps)
+    return error(404 if "не найден" in result else 409, result)
+
+
+async def return_issue(request):
+    body = await _json_body(request) if request.can_read_body else {}
+    success, result = await request.app[POOL_KEY].call("return_book", _path_id(request), body.get("return_date"))
+    if success:
+        return web.json_response(result, dumps=_dumps)
+    return error(404 if "не найден" in result else 409, result)
+
+
+async def overdue(request):
+    """Просроченные выдачи; ключ страницы — "due_date,issue_id" последней строки."""
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    as_of = request.query.get("as_of") or None
+    after = None
+    try:
+        if as_of is not None:
+            date.fromisoformat(as_of)
+        if request.query.get("after"):
+            due_date, _, issue_id = request.query["after"].partition(",")
+            after = (date.fromisoformat(due_date).isoformat(), int(issue_id))
+    except ValueError:
+        return error(400, "Даты задаются как YYYY-MM-DD, параметр after — как YYYY-MM-DD,issue_id")
+    rows = await request.app[POOL_KEY].call("get_overdue_issues", as_of, limit + 1, after)
+    next_key = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_key = f"{last['due_date'].isoformat()},{last['issue_id']}"
+    return cached_response(request, {"items": rows[:limit], "next": next_key})
+
+
+async def reader_profile(request):
+    profile = await request.app[POOL_KEY].call("get_reader_profile", _path_id(request))
+    if profile is None:
+        return error(404, "Читатель не найден")
+    return cached_response(request, profile)
+
+
+async def reader_history(request):
+    """История выдач читателя; ключ страницы — "issue_date,issue_id" последней строки."""
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    before = None
+    if request.query.get("before"):
+        issue_date, _, issue_id = request.query["before"].partition(",")
+        try:
+            before = (date.fromisoformat(issue_date).isoformat(), int(issue_id))
+        except ValueError:
+            return error(400, "Параметр before должен иметь вид YYYY-MM-DD,issue_id")
+    rows = await request.app[POOL_KEY].call("get_reader_history", _path_id(request), limit + 1, before)
+    next_key = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_key = f"{last['issue_date'].isoformat()},{last['issue_id']}"
+    return cached_response(request, {"items": rows[:limit], "next": next_key})
+
+
+async def book_recommendations(request):
+    limit = _int_param(request, "limit", 10, 1, MAX_PAGE_SIZE)
+    rows = await request.app[POOL_KEY].call("get_book_recommendations", _path_id(request), limit)
+    return cached_response(request, {"items": rows})
+
+
+def create_app(connection_params, pool_size=DEFAULT_POOL_SIZE, backend="threads"):
+    """
+    Приложение aiohttp; пул соединений открывается при старте и закрывается при остановке.
+
+    Args:
+        connection_params: (dbname, user, password, host, port) как для set_connection_params
+        pool_size: Число соединений (и потоков) пула
+        backend: "threads" — DatabaseManager в потоках, "asyncpg" — AsyncDatabaseManager
+    """
+    app = web.Application()
+
+    async def pool_context(app):
+        pool = BACKENDS[backend](connection_params, pool_size)
+        await pool.open()
+        app[POOL_KEY] = pool
+        Logger().info(f"REST-сервис: открыт пул из {pool_size} соединений ({backend})")
+        yield
+        await pool.close()
+
+    app.cleanup_ctx.append(pool_context)
+    app.router.add_get("/api/search", search)
+    app.router.add_post("/api/checkout", checkout)
+    app.router.add_post("/api/issues/{id}/return", return_issue)
+    app.router.add_get("/api/overdue", overdue)
+    app.router.add_get("/api/readers/{id}/profile", reader_profile)
+    app.router.add_get("/api/readers/{id}/history", reader_history)
+    app.router.add_get("/api/books/{id}/recommendations", book_recommendations)
+    app.router.add_get("/api/{resource}", list_rows)
+    app.router.add_post("/api/{resource}", create_row)
+    app.router.add_get("/api/{resource}/{id}", get_one)
+    app.router.add_put("/api/{resource}/{id}", update_row)
+    app.router.add_delete("/api/{resource}/{id}", delete_row)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="REST/JSON-сервис библиотеки")
+    parser.add_argument("--dsn", required=True, help="Строка подключения к PostgreSQL")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool", type=int, default=DEFAULT_POOL_SIZE, help="Число соединений с БД")
+    parser.add_argument("--backend", default="threads", choices=sorted(BACKENDS),
+                        help="threads — DatabaseManager (psycopg2) в потоках, asyncpg — асинхронный менеджер")
+    parser.add_argument("--log", default="api.log", help="Файл журнала сервиса")
+    args = parser.parse_args(argv)
+
+    Logger(args.log)
+    params = psycopg2.extensions.parse_dsn(args.dsn)
+    connection_params = (params.get("dbname"), params.get("user"), params.get("password"),
+                         params.get("host"), params.get("port"))
+    web.run_app(create_app(connection_params, args.pool, args.backend), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Нагрузочный тест REST-сервиса (api/server.py): параллельные клиенты
+выполняют смесь запросов каталога, замеряются задержки каждого типа.
+
+Примеры:
+    python -m api.server --dsn "dbname=test1 user=postgres" --pool 8
+    python -m benchmarks.bench_api --url http://127.0.0.1:8080 --clients 50 --requests 200
+    python -m benchmarks.bench_api --clients 200 --requests 100 --checkout --output reports/api.json
+
+С --checkout часть клиентов выдаёт и сразу возвращает книги (пишущая нагрузка).
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import aiohttp
+
+from benchmarks.common import BenchmarkReport
+
+SEARCH_TERMS = ["мир", "война", "сад", "берег", "ночь", "979", "ов", "ин"]
+
+
+class ApiClient:
+    """Клиент, который запоминает ETag и повторяет запросы с If-None-Match."""
+
+    def __init__(self, session, url):
+        self.session = session
+        self.url = url.rstrip("/")
+        self.etags = {}
+
+    async def get(self, path, conditional=False):
+        headers = {}
+        if conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        async with self.session.get(self.url + path, headers=headers) as response:
+            body = await response.json() if response.status == 200 else None
+            if "ETag" in response.headers:
+                self.etags[path] = response.headers["ETag"]
+            return response.status, body
+
+    async def post(self, path, payload=None):
+        async with self.session.post(self.url + path, json=payload) as response:
+            return response.status, await response.json()
+
+
+async def run_client(client, rnd, requests, samples, statuses, checkout, books_max, readers_max):
+    for _ in range(requests):
+        choice = rnd.random()
+        started = time.perf_counter()
+        if choice < 0.3:
+            name = "list_books_page"
+            after = rnd.randrange(0, books_max, 50)
+            status, _ = await client.get(f"/api/books?limit=50&after={after}")
+        elif choice < 0.5:
+            name = "list_books_conditional"
+            status, _ = await client.get("/api/books?limit=50", conditional=True)
+        elif choice < 0.7:
+            name = "get_book"
+            status, _ = await client.get(f"/api/books/{rnd.randint(1, books_max)}", conditional=True)
+        elif choice < 0.9 or not checkout:
+            name = "search_books"
+            status, _ = await client.get(f"/api/search?q={rnd.choice(SEARCH_TERMS)}&limit=20")
+        else:
+            name = "checkout_return"
+            status, issue = await client.post("/api/checkout", {"book_id": rnd.randint(1, books_max),
+                                                                "reader_id": rnd.randint(1, readers_max)})
+            if status == 201:
+                status, _ = await client.post(f"/api/issues/{issue['issue_id']}/return")
+        samples.setdefault(name, []).append((time.perf_counter() - started) * 1000.0)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(args):
+    samples, statuses = {}, {}
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        probe = ApiClient(session, args.url)
+        _, first = await probe.get("/api/books?limit=1")
+        if not first or not first["items"]:
+            raise SystemExit("В базе нет книг: заполните её (python -m core.generator ...)")
+        rnd = random.Random(args.seed)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(ApiClient(session, args.url), random.Random(rnd.random()), args.requests,
+                       samples, statuses, args.checkout, args.books, args.readers)
+            for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+    return samples, statuses, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест REST-сервиса")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=50, help="Число параллельных клиентов")
+    parser.add_argument("--requests", type=int, default=100, help="Запросов на клиента")
+    parser.add_argument("--books", type=int, default=1000, help="Диапазон book_id для запросов")
+    parser.add_argument("--readers", type=int, default=1000, help="Диапазон reader_id для выдач")
+    parser.add_argument("--checkout", action="store_true", help="Добавить выдачу и возврат книг")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/reports/api.json")
+    args = parser.parse_args(argv)
+
+    report = BenchmarkReport("api", vars(args))
+    samples, statuses, elapsed = asyncio.run(run(args))
+    for name in sorted(samples):
+        report.add(name, samples[name])
+    total = sum(len(values) for values in samples.values())
+    report.meta["throughput_rps"] = round(total / elapsed, 1)
+    report.meta["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+    print(f"Всего запросов: {total} за {elapsed:.1f} с ({total / elapsed:.1f} запр/с), коды ответов: "
+          + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    report.save(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Бенчмарк слоя данных (DatabaseManager) на локальном PostgreSQL.
+
+Примеры:
+    python -m benchmarks.bench_data_layer --issues 10000
+    python -m benchmarks.bench_data_layer --dsn "dbname=bench user=postgres" --issues 1000000 --force
+    python -m benchmarks.bench_data_layer --issues 100000 --output reports/data_layer.json
+
+Без --dsn поднимается временный кластер (нужны initdb/pg_ctl).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import date
+
+import psycopg2.extensions
+
+from benchmarks.common import BenchmarkReport, measure
+from benchmarks.postgres import LocalPostgres
+from core.logger import Logger
+
+# Запросы в стиле мастера соединений (JoinWizardDialog.build_query)
+JOIN_QUERIES = {
+    "join_issues_books": (
+        "SELECT issues.issue_id, issues.issue_date, books.title, books.genre "
+        "FROM issues INNER JOIN books ON issues.book_id = books.book_id "
+        "WHERE books.publication_year > 2000"
+    ),
+    "join_readers_issues_open": (
+        "SELECT readers.last_name, readers.ticket_number, issues.issue_date "
+        "FROM readers INNER JOIN issues ON readers.reader_id = issues.reader_id "
+        "WHERE issues.return_date IS NULL"
+    ),
+    "join_books_book_authors": (
+        "SELECT books.title, book_authors.author_id "
+        "FROM books LEFT JOIN book_authors ON books.book_id = book_authors.book_id"
+    ),
+}
+
+# Поиск в стиле SearchableDialogMixin (LIKE и POSIX-регулярные выражения)
+SEARCH_QUERIES = {
+    "search_books_title_like": "SELECT * FROM books WHERE title LIKE '%берег%'",
+    "search_readers_regex_ci": "SELECT * FROM readers WHERE last_name ~* '^кузнецова?$'",
+    "search_authors_not_regex": "SELECT * FROM authors WHERE country !~ '^Росс'",
+}
+
+# Запрос конструктора с параметром: одинаковый текст для всех читателей
+PARAMETERISED_QUERY = (
+    "SELECT issues.issue_id, issues.issue_date, books.title "
+    "FROM issues INNER JOIN books ON issues.book_id = books.book_id "
+    "WHERE issues.reader_id = %s"
+)
+
+DATASET_END_DATE = date(2025, 6, 30)
+
+GETTERS = ["get_authors", "get_books", "get_readers", "get_book_authors", "get_issues"]
+
+
+def connect(dsn):
+    """Создание DatabaseManager по строке подключения."""
+    from core.data import DatabaseManager
+    params = psycopg2.extensions.parse_dsn(dsn)
+    db = DatabaseManager()
+    db.set_connection_params(params.get("dbname"), params.get("user"), params.get("password"),
+                             params.get("host"), params.get("port"))
+    if not db.connect():
+        raise RuntimeError(f"Не удалось подключиться: {dsn}")
+    return db
+
+
+def prepare_database(db, issues, force, seed=42):
+    """Пересоздание схемы и загрузка синтетического каталога."""
+    db.cursor.execute("SELECT to_regclass('public.books') IS NOT NULL AS exists")
+    if db.cursor.fetchone()["exists"]:
+        db.cursor.execute("SELECT EXISTS (SELECT 1 FROM books) AS has_rows")
+        if db.cursor.fetchone()["has_rows"] and not force:
+            raise RuntimeError("База не пуста; используйте --force, чтобы пересоздать схему")
+    if not db.reset_schema():
+        raise RuntimeError("Не удалось пересоздать схему")
+    started = time.perf_counter()
+    # Фиксированная конечная дата делает каталог одинаковым между запусками
+    sizes = db.init_synthetic_data(issues, seed=seed, end_date=DATASET_END_DATE)
+    if sizes is None:
+        raise RuntimeError("Не удалось загрузить синтетические данные")
+    return sizes, (time.perf_counter() - started) * 1000.0
+
+
+def bench_getters(db, report, repeat, skip):
+    for name in GETTERS:
+        if name in skip:
+            continue
+        samples, rows = measure(getattr(db, name), repeat=repeat)
+        report.add(name, samples, rows=len(rows))
+
+
+def bench_writes(db, report, ops, sizes):
+    rnd = random.Random(1)
+    suffix = int(time.time())
+
+    samples = []
+    author_ids = []
+    for i in range(ops):
+        started = time.perf_counter()
+        author_ids.append(db.add_author(f"Бенч{suffix}", f"Автор{i}", "", 1900, "Россия")["author_id"])
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("add_author", samples)
+
+    samples = []
+    book_ids = []
+    for i in range(ops):
+        started = time.perf_counter()
+        book_ids.append(db.add_book(f"Бенч-книга {i}", 2000, "Роман", f"B-{suffix}-{i}", 3)["book_id"])
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("add_book", samples)
+
+    samples = []
+    for i in range(ops):
+        started = time.perf_counter()
+        db.add_reader(f"Бенч{suffix}", f"Читатель{i}", "", f"R{suffix}{i}", "2024-01-01")
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("add_reader", samples)
+
+    samples = []
+    for _ in range(ops):
+        started = time.perf_counter()
+        db.add_issue(rnd.randint(1, sizes["books"]), rnd.randint(1, sizes["readers"]), "2024-06-01", None)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("add_issue", samples)
+
+    samples = []
+    for i, book_id in enumerate(book_ids):
+        started = time.perf_counter()
+        db.update_book(book_id, f"Бенч-книга {i} (изм.)", 2001, "Роман", f"B-{suffix}-{i}", 4)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("update_book", samples)
+
+    samples = []
+    for _ in range(ops):
+        reader_id = rnd.randint(1, sizes["readers"])
+        started = time.perf_counter()
+        db.update_reader(reader_id, f"Читатель{reader_id}", "Имя", "Отчество", f"T{reader_id}", "2020-01-01")
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("update_reader", samples)
+
+    samples = []
+    for _ in range(ops):
+        issue_id = rnd.randint(1, sizes["issues"])
+        started = time.perf_counter()
+        db.update_issue(issue_id, rnd.randint(1, sizes["books"]), rnd.randint(1, sizes["readers"]),
+                        "2024-06-01", "2024-06-15")
+        samples.append((time.perf_counter() - started) * 1000.0)
+    report.add("update_issue", samples)
+
+
+def bench_queries(db, report, queries, repeat):
+    for name, query in queries.items():
+        samples, rows = measure(lambda: db.execute_custom_request(query), repeat=repeat)
+        report.add(name, samples, rows=len(rows))
+
+
+def bench_parameterised(db, report, ops, sizes):
+    """Один и тот же текст с разными значениями: обычное выполнение и PREPARE/EXECUTE."""
+    for name, prepare in (("reader_issues_param", False), ("reader_issues_prepared", True)):
+        rnd = random.Random(2)
+        samples = []
+        for _ in range(ops):
+            reader_id = rnd.randint(1, sizes["readers"])
+            started = time.perf_counter()
+            db.execute_custom_request(PARAMETERISED_QUERY, (reader_id,), prepare=prepare)
+            samples.append((time.perf_counter() - started) * 1000.0)
+        report.add(name, samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк слоя данных")
+    parser.add_argument("--dsn", help="Строка подключения к существующему серверу")
+    parser.add_argument("--issues", type=int, default=10000, help="Число выдач (10k-10M)")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов для чтения")
+    parser.add_argument("--ops", type=int, default=200, help="Операций для записи")
+    parser.add_argument("--skip", nargs="*", default=[], help="Пропустить замеры по имени")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора данных")
+    parser.add_argument("--force", action="store_true", help="Пересоздать схему в непустой базе")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "reports", "data_layer.json"))
+    args = parser.parse_args(argv)
+
+    # Лог бенчмарка не должен засорять app.log приложения
+    Logger(os.path.join(tempfile.gettempdir(), "library_bench.log"))
+
+    server = nullcontext(args.dsn) if args.dsn else LocalPostgres()
+    with server as dsn:
+        db = connect(dsn)
+        try:
+            report = BenchmarkReport("data_layer", {"issues": args.issues, "repeat": args.repeat,
+                                                    "ops": args.ops, "seed": args.seed,
+                                                    "local_server": not args.dsn})
+            db.cursor.execute("SHOW server_version")
+            report.meta["server_version"] = db.cursor.fetchone()[0]
+
+            sizes, load_ms = prepare_database(db, args.issues, args.force, args.seed)
+            total_rows = sum(sizes.values())
+            report.meta["sizes"] = sizes
+            report.add("import_catalogue", [load_ms], ops_per_sample=total_rows, rows=total_rows)
+
+            bench_getters(db, report, args.repeat, args.skip)
+            bench_queries(db, report, {k: v for k, v in JOIN_QUERIES.items() if k not in args.skip}, args.repeat)
+            bench_queries(db, report, {k: v for k, v in SEARCH_QUERIES.items() if k not in args.skip}, args.repeat)
+            if "reader_issues" not in args.skip:
+                bench_parameterised(db, report, args.ops, sizes)
+            bench_writes(db, report, args.ops, sizes)
+            report.save(args.output)
+        finally:
+            db.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Бенчмарк памяти результата запроса: список словарей против core.rows.ResultSet.
+
+Прежний путь: строки DictCursor (DictRow) -> копии dict(r) в execute_custom_request
+-> QTableWidgetItem на каждую ячейку. Новый путь: кортежи обычного курсора в
+ResultSet -> QTableView с ResultTableModel (текст ячейки строится при отрисовке).
+
+Значения (числа, строки, даты) в обоих путях одни и те же объекты, поэтому
+замер показывает накладные расходы контейнеров строк и элементов таблицы:
+retained — сколько памяти Python удерживает готовый результат, peak — пик во
+время построения (tracemalloc), rss_growth — прирост RSS процесса (учитывает
+память Qt, невидимую для tracemalloc).
+
+Пример:
+    python -m benchmarks.bench_rows --rows 10000 100000 --repeat 3
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from psycopg2.extras import DictRow  # noqa: E402
+
+from benchmarks.bench_ui import rss_mb  # noqa: E402
+from benchmarks.common import BenchmarkReport  # noqa: E402
+from core.logger import Logger  # noqa: E402
+from core.rows import ResultSet  # noqa: E402
+
+# Столбцы как у запроса мастера соединений issues JOIN books
+COLUMNS = ["issue_id", "issue_date", "return_date", "book_id", "title", "genre", "reader_id"]
+GENRES = ["Роман", "Поэзия", "Детектив", "Фантастика"]
+
+
+class CursorDescription:
+    """Минимум курсора, нужный DictRow: index и description."""
+
+    def __init__(self, columns):
+        self.description = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+
+
+def wire_rows(count):
+    """Значения строк в том виде, в каком их разбирает курсор (списки общих объектов-значений)."""
+    start = date(2020, 1, 1)
+    return [[i, start + timedelta(days=i % 1500), None if i % 3 else start + timedelta(days=i % 1500 + 14),
+             i % 5000 + 1, f"Книга номер {i % 5000 + 1}", GENRES[i % len(GENRES)], i % 800 + 1]
+            for i in range(1, count + 1)]
+
+
+def dict_path(wire):
+    """DictCursor.fetchall() и [dict(r) for r in rows], как в execute_custom_request."""
+    cursor = CursorDescription(COLUMNS)
+    fetched = []
+    for values in wire:
+        row = DictRow(cursor)
+        row[:] = values
+        fetched.append(row)
+    return [dict(r) for r in fetched]
+
+
+def compact_path(wire):
+    """Кортежи обычного курсора в ResultSet."""
+    return ResultSet(COLUMNS, [tuple(values) for values in wire])
+
+
+def measure_memory(build, wire, repeat):
+    """
+    Returns:
+        tuple: (замеры времени в мс, пик и удерживаемый объём в МБ, результат)
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = build(wire)
+        samples.append((time.perf_counter() - started) * 1000.0)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(wire)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, round(peak / (1024 * 1024), 2), round(retained / (1024 * 1024), 2), result
+
+
+def fill_widget(rows):
+    """Прежнее отображение: QTableWidgetItem на каждую ячейку."""
+    from PySide6.QtWidgets import QTableWidget, QTableWidgetItem
+    table = QTableWidget()
+    columns = list(rows[0].keys())
+    table.setColumnCount(len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.setRowCount(len(rows))
+    for i, row in enumerate(rows):
+        for j, column in enumerate(columns):
+            value = row.get(column)
+            table.setItem(i, j, QTableWidgetItem("" if value is None else str(value)))
+    return table
+
+
+def fill_model(result):
+    """Новое отображение: QTableView с моделью поверх ResultSet."""
+    from PySide6.QtWidgets import QTableView
+    from ui.widgets import ResultTableModel
+    table = QTableView()
+    model = ResultTableModel(table)
+    model.set_result(result)
+    table.setModel(model)
+    return table
+
+
+def measure_view(fill, rows, repeat):
+    samples = []
+    rss_before = rss_mb()
+    tables = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tables.append(fill(rows))
+        samples.append((time.perf_counter() - started) * 1000.0)
+    # Прирост на одну таблицу, пока все построенные таблицы живы
+    rss_growth = (rss_mb() - rss_before) / repeat
+    for table in tables:
+        table.deleteLater()
+    return samples, round(rss_growth, 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память результата: список словарей против ResultSet")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-ui", action="store_true", help="Без замера таблиц Qt")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "reports", "rows.json"))
+    args = parser.parse_args(argv)
+
+    Logger(os.path.join(tempfile.gettempdir(), "library_bench.log"))
+    app = None
+    if not args.no_ui:
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+    report = BenchmarkReport("rows", {"rows": args.rows, "repeat": args.repeat, "columns": len(COLUMNS)})
+
+    for count in args.rows:
+        wire = wire_rows(count)
+        dict_samples, dict_peak, dict_retained, dicts = measure_memory(dict_path, wire, args.repeat)
+        compact_samples, compact_peak, compact_retained, compact = measure_memory(compact_path, wire, args.repeat)
+        report.add(f"dict_rows[{count}]", dict_samples, rows=count, peak_python_mb=dict_peak,
+                   retained_python_mb=dict_retained)
+        report.add(f"compact_rows[{count}]", compact_samples, rows=count, peak_python_mb=compact_peak,
+                   retained_python_mb=compact_retained,
+                   retained_ratio=round(compact_retained / dict_retained, 3) if dict_retained else None)
+        print(f"  удерживается: словари {dict_retained} МБ, ResultSet {compact_retained} МБ; "
+              f"пик: {dict_peak} МБ против {compact_peak} МБ")
+        if app is not None:
+            widget_samples, widget_rss = measure_view(fill_widget, dicts, args.repeat)
+            app.processEvents()
+            model_samples, model_rss = measure_view(fill_model, compact, args.repeat)
+            app.processEvents()
+            report.add(f"table_widget[{count}]", widget_samples, rows=count, rss_growth_mb=widget_rss)
+            report.add(f"table_model[{count}]", model_samples, rows=count, rss_growth_mb=model_rss)
+        del dicts, compact, wire
+        gc.collect()
+    report.save(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Бенчмарк отрисовки табличных диалогов в offscreen-режиме Qt.
+
+Для каждого диалога с N строками от заглушки контроллера замеряются:
+время заполнения таблицы, время до первой отрисовки (time-to-first-paint),
+пиковое выделение памяти Python (tracemalloc) и прирост RSS процесса.
+
+Пример:
+    python -m benchmarks.bench_ui --rows 1000 10000 50000 --repeat 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QEvent, QObject  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from benchmarks.common import BenchmarkReport  # noqa: E402
+from core.catalog import Catalog  # noqa: E402
+from core.logger import Logger  # noqa: E402
+from core.rows import ResultSet  # noqa: E402
+
+
+class StubController:
+    """Заглушка DatabaseManager: отдаёт N синтетических строк без обращения к БД."""
+
+    COLUMNS = ["book_id", "title", "publication_year", "genre", "isbn", "available_copies"]
+
+    def __init__(self, rows):
+        self.logger = Logger()
+        self.rows = rows
+        self._books = [
+            {
+                "book_id": i,
+                "title": f"Книга номер {i}",
+                "publication_year": 1900 + i % 125,
+                "genre": "Роман",
+                "isbn": f"978-5-{i:08d}",
+                "available_copies": i % 10,
+            }
+            for i in range(1, rows + 1)
+        ]
+
+    def get_books(self):
+        return self._books
+
+    def get_tables(self):
+        return ["books"]
+
+    def get_table_columns(self, table_name):
+        return list(self.COLUMNS)
+
+    def get_numeric_columns(self, table_name):
+        return ["book_id", "publication_year", "available_copies"]
+
+    def execute_custom_request(self, sql_query, *args, **kwargs):
+        # Конструктор запросов получает компактный результат (см. QueryWorker)
+        return ResultSet(self.COLUMNS, [tuple(row[c] for c in self.COLUMNS) for row in self._books])
+
+    def get_catalog(self):
+        numeric = set(self.get_numeric_columns("books"))
+        columns = [(c, "integer" if c in numeric else "text") for c in self.COLUMNS]
+        return Catalog({"books": columns}, {"books": ["book_id"]}, [])
+
+    def invalidate_catalog(self):
+        pass
+
+    def get_sync_watermark(self):
+        return 0
+
+    def get_changes(self, table, since):
+        return {"rows": [], "deleted": [], "watermark": since}
+
+    def get_table_page(self, table, limit, after=None, offset=0):
+        start = after[0] if after is not None else 0
+        return [dict(row) for row in self._books[start:start + limit]]
+
+
+class PaintProbe(QObject):
+    """Фильтр событий, запоминающий момент первой отрисовки виджета."""
+
+    def __init__(self):
+        super().__init__()
+        self.painted_at = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.painted_at is None:
+            self.painted_at = time.perf_counter()
+        return False
+
+
+def rss_mb():
+    """Текущий RSS процесса в МБ (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def open_books_dialog(controller):
+    from ui.dialogs.books import BooksDialog
+    dialog = BooksDialog(controller)
+    return dialog, dialog.books_table
+
+
+def open_table_viewer(controller):
+    from ui.dialogs.table_viewer import TableViewerDialog
+    dialog = TableViewerDialog(controller)
+    return dialog, dialog.table_widget
+
+
+def open_request_builder(controller):
+    from ui.dialogs.request_builder import RequestBuilderDialog
+    dialog = RequestBuilderDialog(controller)
+    dialog.display_results(controller.execute_custom_request(""))
+    return dialog, dialog.results_table
+
+
+CASES = {
+    "books_dialog": open_books_dialog,
+    "table_viewer": open_table_viewer,
+    "request_builder_display": open_request_builder,
+}
+
+
+def run_case(app, opener, controller, timeout=30.0):
+    """
+    Открытие диалога и ожидание первой отрисовки таблицы.
+
+    Returns:
+        tuple: (время заполнения, время до первой отрисовки) в мс
+    """
+    started = time.perf_counter()
+    dialog, table = opener(controller)
+    populated = time.perf_counter()
+
+    probe = PaintProbe()
+    table.viewport().installEventFilter(probe)
+    dialog.show()
+    deadline = populated + timeout
+    while probe.painted_at is None and time.perf_counter() < deadline:
+        app.processEvents()
+    painted = probe.painted_at or time.perf_counter()
+
+    table.viewport().removeEventFilter(probe)
+    dialog.close()
+    dialog.deleteLater()
+    app.processEvents()
+    return (populated - started) * 1000.0, (painted - started) * 1000.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки табличных диалогов")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", nargs="*", default=list(CASES))
+    parser.add_argument("--output", default=os.path.join("benchmarks", "reports", "ui.json"))
+    args = parser.parse_args(argv)
+
+    Logger(os.path.join(tempfile.gettempdir(), "library_bench.log"))
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    report = BenchmarkReport("ui", {"rows": args.rows, "repeat": args.repeat,
+                                    "platform": os.environ.get("QT_QPA_PLATFORM")})
+
+    for rows in args.rows:
+        controller = StubController(rows)
+        for name in args.cases:
+            opener = CASES[name]
+            run_case(app, opener, controller)  # прогрев
+
+            populate_samples, paint_samples = [], []
+            rss_before = rss_mb()
+            for _ in range(args.repeat):
+                populate_ms, paint_ms = run_case(app, opener, controller)
+                populate_samples.append(populate_ms)
+                paint_samples.append(paint_ms)
+            rss_growth = rss_mb() - rss_before
+
+            # Отдельный прогон под tracemalloc, чтобы не искажать время
+            tracemalloc.start()
+            run_case(app, opener, controller)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            report.add(f"{name}[{rows}]", populate_samples, rows=rows,
+                       first_paint_median_ms=round(sorted(paint_samples)[len(paint_samples) // 2], 3),
+                       first_paint_max_ms=round(max(paint_samples), 3),
+                       peak_python_mb=round(peak / (1024 * 1024), 2),
+                       rss_growth_mb=round(rss_growth, 2))
+    report.save(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
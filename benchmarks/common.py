@@ -0,0 +1,104 @@
+"""
+Общие утилиты бенчмарков: замер времени, статистика и JSON-отчёты.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPORT_VERSION = 1
+
+
+def percentile(values, p):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms, ops_per_sample=1):
+    """Сводная статистика по списку замеров (в миллисекундах)."""
+    total_ms = sum(samples_ms)
+    return {
+        "n": len(samples_ms),
+        "min_ms": round(min(samples_ms), 3),
+        "median_ms": round(statistics.median(samples_ms), 3),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "max_ms": round(max(samples_ms), 3),
+        "ops_per_s": round(len(samples_ms) * ops_per_sample / (total_ms / 1000.0), 2) if total_ms else None,
+    }
+
+
+def measure(func, repeat=5, warmup=1):
+    """
+    Многократный вызов func с замером времени.
+
+    Returns:
+        tuple: (список замеров в мс, результат последнего вызова)
+    """
+    result = None
+    for _ in range(warmup):
+        result = func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples, result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkReport:
+    """Накопитель результатов с сохранением в сравнимый JSON-отчёт."""
+
+    def __init__(self, suite, params=None):
+        self.suite = suite
+        self.meta = {
+            "suite": suite,
+            "version": REPORT_VERSION,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": params or {},
+        }
+        self.results = {}
+
+    def add(self, name, samples_ms, ops_per_sample=1, **extra):
+        entry = summarize(samples_ms, ops_per_sample)
+        entry.update(extra)
+        self.results[name] = entry
+        print(f"{name:<45} median {entry['median_ms']:>10.3f} ms   p95 {entry['p95_ms']:>10.3f} ms"
+              + (f"   {entry['ops_per_s']:>10.1f} ops/s" if entry["ops_per_s"] else ""))
+        return entry
+
+    def to_dict(self):
+        return {"meta": self.meta, "results": self.results}
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"Отчёт сохранён: {path}")
+        return path
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
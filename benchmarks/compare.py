@@ -0,0 +1,57 @@
+"""
+Сравнение двух JSON-отчётов бенчмарков.
+
+Пример:
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+Код возврата 1, если медиана какого-либо замера ухудшилась больше порога (в процентах).
+"""
+import argparse
+import sys
+
+from benchmarks.common import load_report
+
+
+def compare_reports(baseline, current, metric="median_ms", threshold=10.0):
+    """
+    Returns:
+        tuple: (строки таблицы сравнения, список регрессировавших замеров)
+    """
+    rows = []
+    regressions = []
+    names = sorted(set(baseline["results"]) | set(current["results"]))
+    for name in names:
+        old = baseline["results"].get(name, {}).get(metric)
+        new = current["results"].get(name, {}).get(metric)
+        if old is None or new is None:
+            rows.append((name, old, new, None))
+            continue
+        delta = (new - old) / old * 100.0 if old else 0.0
+        rows.append((name, old, new, delta))
+        if delta > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение отчётов бенчмарков")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="median_ms")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Допустимое ухудшение в процентах")
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare_reports(load_report(args.baseline), load_report(args.current),
+                                        args.metric, args.threshold)
+    print(f"{'Замер':<45} {'было':>12} {'стало':>12} {'изм.':>9}")
+    for name, old, new, delta in rows:
+        old_text = "-" if old is None else f"{old:.3f}"
+        new_text = "-" if new is None else f"{new:.3f}"
+        delta_text = "-" if delta is None else f"{delta:+.1f}%"
+        marker = "  <-- регрессия" if name in regressions else ""
+        print(f"{name:<45} {old_text:>12} {new_text:>12} {delta_text:>9}{marker}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
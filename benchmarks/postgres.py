@@ -0,0 +1,77 @@
+"""
+Временный локальный экземпляр PostgreSQL для бенчмарков.
+Использует initdb/pg_ctl из PATH или из `pg_config --bindir`.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+
+def find_pg_binary(name):
+    path = shutil.which(name)
+    if path:
+        return path
+    try:
+        bindir = subprocess.check_output(["pg_config", "--bindir"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    candidate = os.path.join(bindir, name)
+    return candidate if os.path.exists(candidate) else None
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalPostgres:
+    """
+    Контекстный менеджер: поднимает кластер во временном каталоге,
+    возвращает DSN и удаляет кластер при выходе.
+    """
+
+    def __init__(self, dbname="library_bench", user="postgres"):
+        self.dbname = dbname
+        self.user = user
+        self.port = None
+        self.datadir = None
+        self.initdb = find_pg_binary("initdb")
+        self.pg_ctl = find_pg_binary("pg_ctl")
+
+    @property
+    def dsn(self):
+        return f"dbname={self.dbname} user={self.user} host=127.0.0.1 port={self.port}"
+
+    def start(self):
+        if not self.initdb or not self.pg_ctl:
+            raise RuntimeError("initdb/pg_ctl не найдены; укажите --dsn существующего сервера")
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            raise RuntimeError("PostgreSQL нельзя запускать от root; укажите --dsn существующего сервера")
+        self.datadir = tempfile.mkdtemp(prefix="library_bench_pg_")
+        self.port = free_port()
+        subprocess.run([self.initdb, "-D", self.datadir, "-U", self.user, "-A", "trust", "-E", "UTF8"],
+                       check=True, stdout=subprocess.DEVNULL)
+        options = f"-p {self.port} -k {self.datadir} -c fsync=off -c synchronous_commit=off"
+        subprocess.run([self.pg_ctl, "-D", self.datadir, "-o", options, "-w", "-l",
+                        os.path.join(self.datadir, "server.log"), "start"],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([find_pg_binary("createdb") or "createdb", "-h", "127.0.0.1", "-p", str(self.port),
+                        "-U", self.user, self.dbname], check=True)
+        return self.dsn
+
+    def stop(self):
+        if self.datadir:
+            subprocess.run([self.pg_ctl, "-D", self.datadir, "-m", "fast", "-w", "stop"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            shutil.rmtree(self.datadir, ignore_errors=True)
+            self.datadir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
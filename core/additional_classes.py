@@ -1,50 +1,7 @@
 import re
-from PySide6.QtWidgets import QTableWidgetItem, QLineEdit
-
-
-class NumericTableItem(QTableWidgetItem):
-    """
-    Элемент таблицы для числовых значений с правильной сортировкой.
-    """
-
-    def __init__(self, text, value):
-        super().__init__(text)
-        self.value = value
-
-    def __lt__(self, other):
-        """Сравнение по числовому значению, а не по тексту."""
-        if hasattr(other, 'value'):
-            return self.value < other.value
-        return super().__lt__(other)
-
-class ValidatedLineEdit(QLineEdit):
-    """
-    Поле ввода с валидацией текста.
-    Разрешает только определенные символы, заданные в контроллере.
-    """
-
-    def __init__(self, controller, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def keyPressEvent(self, event):
-        """Обработка нажатия клавиш с валидацией."""
-        # Сохраняем текущий текст и позицию курсора
-        old_text = self.text()
-        cursor_pos = self.cursorPosition()
-
-        # Вызываем стандартную обработку нажатия клавиш
-        super().keyPressEvent(event)
-
-        # Проверяем валидность нового текста
-        new_text = self.text()
-
-        # Если текст пустой, разрешаем его
-        if not new_text or TextValidator.is_valid_text_input(new_text):
-            return
-
-        # Если текст не валиден, восстанавливаем старый текст
-        self.setText(old_text)
-        self.setCursorPosition(cursor_pos)
+from psycopg2 import sql
+from core.query_ast import (Node, Column, Star, Param, Aggregate, Alias, Grouping, And, Or,
+                            Comparison, IsNull, Raw, RowComparison, ORDER_DIRECTIONS, parse_condition)
 
 
 class TextValidator:
@@ -65,24 +22,47 @@ class TextValidator:
         return bool(re.match(r'^[а-яА-Яa-zA-Z0-9\s]*$', text))
 
 class RequestBuilder: #Класс для построения SQL-запросов (запросов к БД)
+    """
+    Собирает SELECT из узлов core.query_ast.
+    build() возвращает (sql.Composed, кортеж параметров): литералы из условий
+    передаются параметрами, поэтому текст запроса повторяется и кэшируется сервером.
+
+    Постраничная выборка: limit()/offset() или keyset через after() —
+    следующая страница начинается после значений столбцов ORDER BY
+    последней полученной строки. Порядок NULL задаётся явно (ASC NULLS LAST,
+    DESC NULLS FIRST) и учитывается в keyset-условии; для столбцов из not_null()
+    (первичный ключ) условие — сравнение кортежей, которое использует индекс.
+
+    Группировка: несколько столбцов group_by() и несколько aggregate()
+    за один проход; rollup()/cube()/grouping_sets() добавляют строки
+    промежуточных итогов и столбец GROUPING_COLUMN с маской свёрнутых столбцов.
+    """
+    
+    GROUPING_COLUMN = "grouping_level"
+    GROUPING_MODES = ("ROLLUP", "CUBE", "GROUPING SETS")
     
     def __init__(self):
         self.reset()
     
     def reset(self):
         self._select = []
-        self._from = ""
+        self._from = None
         self._where = []
         self._order_by = []
         self._group_by = []
         self._having = []
-        self._aggregate = None
+        self._aggregates = []
+        self._grouping = None
+        self._grouping_sets = []
+        self._limit = None
+        self._offset = None
+        self._after = None
+        self._not_null = set()
     
     def select(self, columns):
-        if isinstance(columns, str):
-            self._select = [columns]
-        else:
-            self._select = columns
+        if isinstance(columns, (str, Node)):
+            columns = [columns]
+        self._select = [c if isinstance(c, Node) else Column.parse(c) for c in columns]
         return self
     
     def from_table(self, table):
@@ -90,52 +70,161 @@ class RequestBuilder: #Класс для построения SQL-запросо
         return self
     
     def where(self, condition):
-        self._where.append(condition)
+        """Условие: узел query_ast или текст (разбирается в узлы)."""
+        self._where.append(parse_condition(condition))
         return self
     
     def order_by(self, column, direction="ASC"):
-        self._order_by.append(f"{column} {direction}")
+        direction = direction.upper()
+        if direction not in ORDER_DIRECTIONS:
+            raise ValueError(f"Недопустимое направление сортировки: {direction}")
+        self._order_by.append((Column.parse(column), direction))
         return self
     
     def group_by(self, column):
-        self._group_by.append(column)
+        self._group_by.append(Column.parse(column))
         return self
     
     def having(self, condition):
-        self._having.append(condition)
+        self._having.append(parse_condition(condition))
+        return self
+    
+    def aggregate(self, function, column="*", alias=None):
+        """Добавление агрегата в список SELECT; alias по умолчанию — sum_<столбец> и т.п."""
+        node = Aggregate(function, column)
+        alias = alias or node.label()
+        taken = {name for _, name in self._aggregates}
+        if alias in taken:
+            alias = next(f"{alias}_{i}" for i in range(2, len(taken) + 3) if f"{alias}_{i}" not in taken)
+        self._aggregates.append((node, alias))
+        return self
+    
+    def rollup(self):
+        """GROUP BY ROLLUP (столбцы group_by): итоги по иерархии столбцов и общий итог."""
+        self._grouping = "ROLLUP"
+        return self
+    
+    def cube(self):
+        """GROUP BY CUBE (столбцы group_by): итоги по всем комбинациям столбцов."""
+        self._grouping = "CUBE"
         return self
     
-    def aggregate(self, function, column):
-        self._aggregate = f"{function}({column})"
+    def grouping_sets(self, sets):
+        """GROUP BY GROUPING SETS: sets — список наборов столбцов, [] означает общий итог."""
+        self._grouping = "GROUPING SETS"
+        self._grouping_sets = [[Column.parse(c) for c in group] for group in sets]
+        return self
+    
+    def supports_keyset(self):
+        """Keyset-условие в WHERE исказило бы строки итогов ROLLUP/CUBE."""
+        return self._grouping is None
+    
+    def limit(self, count):
+        """Ограничение числа строк (None — без ограничения)."""
+        self._limit = count
         return self
     
-    def build(self):
-        if self._group_by and not self._aggregate:
-            self._aggregate = "COUNT(*)"
-        if not self._select and not self._aggregate:
-            self._select = ["*"]
+    def offset(self, count):
+        self._offset = count
+        return self
+    
+    def after(self, values):
+        """
+        Keyset-пагинация: строки строго после values по столбцам ORDER BY.
+        Все столбцы сортировки должны иметь одно направление.
+        """
+        self._after = list(values) if values is not None else None
+        return self
+    
+    def not_null(self, columns):
+        """Столбцы, в которых нет NULL (например, первичный ключ)."""
+        self._not_null.update(columns)
+        return self
+    
+    def order_columns(self):
+        """Имена столбцов ORDER BY (ключи строк результата для after())."""
+        return [column.name for column, _ in self._order_by]
+    
+    def _keyset_condition(self):
+        directions = {direction for _, direction in self._order_by}
+        if not self._order_by or len(directions) != 1:
+            raise ValueError("Keyset-пагинация требует ORDER BY с одним направлением")
+        ascending = directions.pop() == "ASC"
+        operator = ">" if ascending else "<"
+        columns = [column for column, _ in self._order_by]
+        if all(column.name in self._not_null for column in columns):
+            return RowComparison(columns, operator, self._after)
+        # Лексикографическое сравнение с учётом NULL: при ASC NULL идут после всех
+        # значений, при DESC — перед ними; (c1, c2) > (v1, v2) не выбрал бы строки с NULL
+        branches = []
+        for i, (column, value) in enumerate(zip(columns, self._after)):
+            if value is None:
+                after = None if ascending else IsNull(column, negate=True)
+            elif ascending and column.name not in self._not_null:
+                after = Or(Comparison(column, operator, value), IsNull(column))
+            else:
+                after = Comparison(column, operator, value)
+            if after is not None:
+                equal = [IsNull(c) if v is None else Comparison(c, "=", v)
+                         for c, v in zip(columns[:i], self._after[:i])]
+                branches.append(And(*equal, after) if equal else after)
+        if not branches:
+            return Raw("FALSE")
+        return branches[0] if len(branches) == 1 else Or(*branches)
+    
+    def build(self, paging=True):
+        """
+        Args:
+            paging: Учитывать LIMIT/OFFSET/keyset; False — полный запрос
+                (например, для оценки общего числа строк)
+        """
+        if self._group_by and not self._aggregates:
+            self.aggregate("COUNT", "*")
         
-        sql = "SELECT "
+        select_nodes = self._select + [Alias(node, alias) for node, alias in self._aggregates]
+        if self._grouping and self._group_by:
+            select_nodes.append(Alias(Grouping(self._group_by), self.GROUPING_COLUMN))
+        if not select_nodes:
+            select_nodes = [Star()]
         
-        if self._aggregate:
-            sql += self._aggregate
-            if self._select:
-                sql += ", " + ", ".join(self._select)
-        else:
-            sql += ", ".join(self._select) if self._select else "*"
+        params = []
         
-        sql += f" FROM {self._from}"
+        def compile_node(node):
+            part, node_params = node.compile()
+            params.extend(node_params)
+            return part
         
-        if self._where:
-            sql += " WHERE " + " AND ".join(self._where)
+        query = [sql.SQL("SELECT "), sql.SQL(", ").join([compile_node(n) for n in select_nodes]),
+                 sql.SQL(" FROM "), sql.Identifier(self._from)]
+        
+        where = list(self._where)
+        if paging and self._after is not None:
+            where.append(self._keyset_condition())
+        if where:
+            query += [sql.SQL(" WHERE "), compile_node(And(*where))]
         
         if self._group_by:
-            sql += " GROUP BY " + ", ".join(self._group_by)
+            columns = sql.SQL(", ").join([compile_node(n) for n in self._group_by])
+            if self._grouping == "GROUPING SETS":
+                sets = [sql.SQL("({})").format(sql.SQL(", ").join([compile_node(n) for n in group]))
+                        for group in self._grouping_sets]
+                columns = sql.SQL("GROUPING SETS ({})").format(sql.SQL(", ").join(sets))
+            elif self._grouping:
+                columns = sql.SQL("{} ({})").format(sql.SQL(self._grouping), columns)
+            query += [sql.SQL(" GROUP BY "), columns]
         
         if self._having:
-            sql += " HAVING " + " AND ".join(self._having)
+            query += [sql.SQL(" HAVING "), compile_node(And(*self._having))]
         
         if self._order_by:
-            sql += " ORDER BY " + ", ".join(self._order_by)
+            nulls = {"ASC": "NULLS LAST", "DESC": "NULLS FIRST"}
+            order = [sql.SQL("{} {} {}").format(compile_node(column), sql.SQL(direction), sql.SQL(nulls[direction]))
+                     for column, direction in self._order_by]
+            query += [sql.SQL(" ORDER BY "), sql.SQL(", ").join(order)]
+        
+        if paging and self._limit is not None:
+            query += [sql.SQL(" LIMIT "), compile_node(Param(self._limit))]
+        if paging and self._offset:
+            query += [sql.SQL(" OFFSET "), compile_node(Param(self._offset))]
         
-        return sql
+        return sql.Composed(query), tuple(params)
@@ -1,6 +1,6 @@
 import psycopg2
 from typing import Tuple, List, Optional
-from PySide6.QtWidgets import QMessageBox
+from core.instrumentation import InstrumentedCursor
 
 
 class AlterTableManager:
@@ -17,7 +17,7 @@ class AlterTableManager:
         Безопасное выполнение SQL-запроса с обработкой ошибок и транзакционностью.
         """
         try:
-            with self.conn.cursor() as cursor:
+            with self.conn.cursor(cursor_factory=InstrumentedCursor) as cursor:
                 if params:
                     cursor.execute(sql, params)
                 else:
@@ -0,0 +1,377 @@
+"""
+Колоночный снимок выдач для отчётов по обороту фонда.
+
+Снимок хранит issues в виде отдельных массивов NumPy (позиция = issue_id),
+отображённых в память из файлов .npy, и справочные массивы по книгам:
+код жанра и код страны первого автора (категории закодированы целыми,
+названия — в meta.json). Группировки по месяцу, году, жанру и стране
+считаются векторно (np.bincount по составному коду), без SQL.
+
+Обновление инкрементное, по журналу изменений row_changes, как и
+DatabaseManager.get_changes: ключи выдач, изменённых транзакциями начиная
+с прошлого водяного знака, берутся из журнала по индексу (table_name, txid)
+и соединяются с issues; ключ без строки в issues означает удаление. Если
+журнал уже очищен дальше прошлого знака (row_changes_horizon) или в нём есть
+отметка массового изменения или TRUNCATE, снимок перестраивается целиком.
+Справочники книг невелики и перечитываются целиком. Всё читается в одной
+транзакции REPEATABLE READ.
+
+Примеры:
+    python -m core.analytics --dsn "dbname=test1 user=postgres password=..." refresh
+    python -m core.analytics report --by month genre --since 2024-01-01
+    python -m core.analytics report --by country --open
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+SNAPSHOT_DIR = "analytics_snapshot"
+# Сколько строк читать одним FETCH
+FETCH_ROWS = 100000
+# Во сколько раз увеличивать ёмкость массивов, когда issue_id выходит за неё
+GROWTH_FACTOR = 1.5
+# Отсутствующая дата (return_date IS NULL)
+NO_DAY = np.iinfo(np.int32).min
+# Код категории для NULL (жанр или страна не указаны)
+UNKNOWN = "—"
+
+# Столбцы выдач: тип и значение для пустых позиций
+ISSUE_COLUMNS = {
+    "present": (np.bool_, False),
+    "book_id": (np.int32, 0),
+    "reader_id": (np.int32, 0),
+    "issue_day": (np.int32, NO_DAY),
+    "due_day": (np.int32, NO_DAY),
+    "return_day": (np.int32, NO_DAY),
+}
+
+# Даты передаются сервером числом дней от 1970-01-01 (как datetime64[D]);
+# у удалённой выдачи (нет строки i) значения пустые, а present = 0
+ISSUE_VALUES_SQL = f"""
+           COALESCE(i.book_id, 0) AS book_id, COALESCE(i.reader_id, 0) AS reader_id,
+           COALESCE(i.issue_date - DATE '1970-01-01', {NO_DAY}) AS issue_day,
+           COALESCE(i.due_date - DATE '1970-01-01', {NO_DAY}) AS due_day,
+           COALESCE(i.return_date - DATE '1970-01-01', {NO_DAY}) AS return_day,
+           (i.issue_id IS NOT NULL)::int AS present
+"""
+
+ISSUES_SQL = f"SELECT i.issue_id, {ISSUE_VALUES_SQL} FROM issues i"
+
+# Выдачи, изменённые транзакциями с txid >= %s (ключ в журнале хранится текстом)
+CHANGED_ISSUES_SQL = f"""
+    WITH c AS (SELECT DISTINCT row_key[1]::integer AS issue_id
+               FROM row_changes
+               WHERE table_name = 'issues' AND txid >= %s)
+    SELECT c.issue_id, {ISSUE_VALUES_SQL}
+    FROM c LEFT JOIN issues i ON i.issue_id = c.issue_id
+"""
+
+# Журнал не покрывает изменения с since: очищен дальше или есть отметка «перезагрузить»
+CHANGE_LOG_GAP_SQL = """
+    SELECT EXISTS (SELECT 1 FROM row_changes_horizon
+                   WHERE table_name = 'issues' AND pruned_below > %s)
+        OR EXISTS (SELECT 1 FROM row_changes
+                   WHERE table_name = 'issues' AND txid >= %s AND row_key IS NULL)
+"""
+
+BOOK_DIMENSIONS_SQL = """
+    SELECT b.book_id, b.genre::text AS genre, a.country::text AS country
+    FROM books b
+    LEFT JOIN LATERAL (SELECT au.country
+                       FROM book_authors ba
+                       JOIN authors au ON au.author_id = ba.author_id
+                       WHERE ba.book_id = b.book_id
+                       ORDER BY ba.author_id
+                       LIMIT 1) a ON TRUE
+"""
+
+GROUP_KEYS = ("year", "month", "genre", "country")
+
+
+def to_day(value):
+    """Дата (date или строка YYYY-MM-DD) в число дней от 1970-01-01."""
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+class AnalyticsSnapshot:
+    """
+    Снимок в каталоге path: файлы issues_<столбец>.npy, books_genre.npy,
+    books_country.npy и meta.json (водяной знак, ёмкость, словари категорий).
+    """
+
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+        self.meta = None
+        self.columns = {}
+        self.book_genre = None
+        self.book_country = None
+
+    # ==== Файлы ====
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, "meta.json"))
+
+    def open(self):
+        """Открытие снимка с диска (массивы выдач отображаются в память)."""
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.columns = {name: np.load(self._file(f"issues_{name}"), mmap_mode="r+") for name in ISSUE_COLUMNS}
+        self.book_genre = np.load(self._file("books_genre"))
+        self.book_country = np.load(self._file("books_country"))
+        return self
+
+    def close(self):
+        for column in self.columns.values():
+            column.flush()
+        self.columns = {}
+
+    def _create_columns(self, capacity):
+        os.makedirs(self.path, exist_ok=True)
+        self.close()
+        for name, (dtype, empty) in ISSUE_COLUMNS.items():
+            column = np.lib.format.open_memmap(self._file(f"issues_{name}"), mode="w+", dtype=dtype,
+                                               shape=(capacity,))
+            column[:] = empty
+            self.columns[name] = column
+
+    def _grow(self, capacity):
+        """Увеличение ёмкости: новые файлы заполняются старыми значениями и заменяют прежние."""
+        old_capacity = len(self.columns["present"])
+        for name, (dtype, empty) in ISSUE_COLUMNS.items():
+            old = self.columns.pop(name)
+            temp = self._file(f"issues_{name}.tmp")
+            column = np.lib.format.open_memmap(temp, mode="w+", dtype=dtype, shape=(capacity,))
+            column[:old_capacity] = old
+            column[old_capacity:] = empty
+            column.flush()
+            del old, column
+            os.replace(temp, self._file(f"issues_{name}"))
+            self.columns[name] = np.load(self._file(f"issues_{name}"), mmap_mode="r+")
+
+    def _save_meta(self):
+        temp = os.path.join(self.path, "meta.json.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(temp, os.path.join(self.path, "meta.json"))
+
+    # ==== Обновление ====
+
+    def refresh(self, connection, full=False):
+        """
+        Обновление снимка по соединению psycopg2 (транзакция откатывается в конце).
+
+        Args:
+            full: Перестроить снимок целиком
+
+        Returns:
+            dict: Сводка: режим, прочитано строк, строк в снимке, длительность
+        """
+        started = time.perf_counter()
+        if not full and self.exists() and not self.columns:
+            self.open()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+                watermark = cursor.fetchone()[0]
+                since = self.meta["watermark"] if self.meta and not full else None
+                incremental = since is not None
+                if incremental:
+                    cursor.execute(CHANGE_LOG_GAP_SQL, (since, since))
+                    incremental = not cursor.fetchone()[0]
+                if not incremental:
+                    self._create_columns(1)
+                    self.meta = {"rows": 0}
+                changed = self._load_issues(connection, since if incremental else None)
+                self._load_books(cursor)
+        finally:
+            connection.rollback()
+        for column in self.columns.values():
+            column.flush()
+        self.meta.update(watermark=watermark, capacity=len(self.columns["present"]),
+                         rows=int(np.count_nonzero(self.columns["present"])),
+                         refreshed_at=datetime.now().isoformat(timespec="seconds"))
+        self._save_meta()
+        return {"mode": "incremental" if incremental else "full", "changed": changed, "rows": self.meta["rows"],
+                "duration_ms": round((time.perf_counter() - started) * 1000.0, 1)}
+
+    def _load_issues(self, connection, since):
+        """
+        Строки issues (все или изменённые с since по журналу row_changes)
+        порциями через серверный курсор; удалённые выдачи снимаются с present.
+        """
+        query, params = (ISSUES_SQL, None) if since is None else (CHANGED_ISSUES_SQL, (since,))
+        loaded = 0
+        with connection.cursor(name="library_analytics_issues") as cursor:
+            cursor.itersize = FETCH_ROWS
+            cursor.execute(query, params)
+            while True:
+                chunk = cursor.fetchmany(FETCH_ROWS)
+                if not chunk:
+                    break
+                rows = np.array(chunk, dtype=np.int64)
+                ids = rows[:, 0]
+                self._ensure_capacity(int(ids.max()) + 1)
+                for position, name in enumerate(("book_id", "reader_id", "issue_day", "due_day", "return_day",
+                                                  "present"), 1):
+                    self.columns[name][ids] = rows[:, position]
+                loaded += len(rows)
+        return loaded
+
+    def _ensure_capacity(self, size):
+        capacity = len(self.columns["present"])
+        if size > capacity:
+            self._grow(max(size, int(capacity * GROWTH_FACTOR) + 1))
+
+    def _load_books(self, cursor):
+        """Справочники книг: код жанра и страны первого автора по book_id."""
+        cursor.execute(BOOK_DIMENSIONS_SQL)
+        books = cursor.fetchall()
+        genres = [UNKNOWN] + sorted({genre for _, genre, _ in books if genre})
+        countries = [UNKNOWN] + sorted({country for _, _, country in books if country})
+        genre_codes = {name: code for code, name in enumerate(genres)}
+        country_codes = {name: code for code, name in enumerate(countries)}
+        size = max((book_id for book_id, _, _ in books), default=0) + 1
+        self.book_genre = np.zeros(size, dtype=np.int16)
+        self.book_country = np.zeros(size, dtype=np.int16)
+        for book_id, genre, country in books:
+            self.book_genre[book_id] = genre_codes.get(genre, 0)
+            self.book_country[book_id] = country_codes.get(country, 0)
+        np.save(self._file("books_genre"), self.book_genre)
+        np.save(self._file("books_country"), self.book_country)
+        self.meta["genres"] = genres
+        self.meta["countries"] = countries
+
+    # ==== Отчёты ====
+
+    def _selection(self, since=None, until=None, open_only=False):
+        """Позиции выдач, попадающих в период [since, until] и (при open_only) не возвращённых."""
+        mask = np.array(self.columns["present"], dtype=bool)
+        issue_day = self.columns["issue_day"]
+        if since is not None:
+            mask &= issue_day >= to_day(since)
+        if until is not None:
+            mask &= issue_day <= to_day(until)
+        if open_only:
+            mask &= self.columns["return_day"] == NO_DAY
+        return np.flatnonzero(mask)
+
+    def _codes(self, key, positions):
+        """Целочисленные коды ключа группировки, их число и функция подписи кода."""
+        if key in ("month", "year"):
+            days = self.columns["issue_day"][positions].astype("datetime64[D]")
+            units = days.astype("datetime64[M]" if key == "month" else "datetime64[Y]").astype(np.int64)
+            first = int(units.min()) if len(units) else 0
+            unit = "M" if key == "month" else "Y"
+            return units - first, int(units.max()) - first + 1 if len(units) else 0, \
+                lambda code: str(np.datetime64(first + code, unit))
+        book_ids = self.columns["book_id"][positions]
+        if key == "genre":
+            names, dimension = self.meta["genres"], self.book_genre
+        elif key == "country":
+            names, dimension = self.meta["countries"], self.book_country
+        else:
+            raise ValueError(f"Неизвестный ключ группировки: {key} (допустимы: {', '.join(GROUP_KEYS)})")
+        # Книги, добавленные после обновления справочников, попадают в категорию UNKNOWN
+        codes = np.where(book_ids < len(dimension), dimension[np.minimum(book_ids, len(dimension) - 1)], 0)
+        return codes.astype(np.int64), len(names), lambda code: names[code]
+
+    def group_by(self, keys, since=None, until=None, open_only=False):
+        """
+        Число выдач и средний срок чтения (по возвращённым) в разрезе ключей.
+
+        Args:
+            keys: Ключи из GROUP_KEYS, например ("month", "genre")
+            since, until: Период по дате выдачи (включительно)
+            open_only: Только не возвращённые выдачи
+
+        Returns:
+            list: Словари {ключ: подпись, ..., "loans": n, "avg_loan_days": x или None}
+        """
+        positions = self._selection(since, until, open_only)
+        if not keys or not len(positions):
+            return [{"loans": int(len(positions))}] if not keys else []
+        codes, sizes, labels = zip(*(self._codes(key, positions) for key in keys))
+        combined = np.ravel_multi_index(codes, sizes)
+        cells = int(np.prod(sizes))
+        loans = np.bincount(combined, minlength=cells)
+        issue_day = self.columns["issue_day"][positions]
+        return_day = self.columns["return_day"][positions]
+        returned = return_day != NO_DAY
+        returned_count = np.bincount(combined[returned], minlength=cells)
+        loan_days = np.bincount(combined[returned], weights=(return_day - issue_day)[returned], minlength=cells)
+        result = []
+        for cell in np.flatnonzero(loans):
+            row = {key: label(int(code)) for key, label, code in zip(keys, labels, np.unravel_index(cell, sizes))}
+            row["loans"] = int(loans[cell])
+            row["avg_loan_days"] = round(float(loan_days[cell] / returned_count[cell]), 1) \
+                if returned_count[cell] else None
+            result.append(row)
+        return result
+
+    def monthly_series(self, key=None, since=None, until=None):
+        """
+        Помесячный ряд числа выдач без пропусков месяцев, целиком или по категориям ключа.
+
+        Returns:
+            dict: {"months": [...], "series": {подпись: [число по месяцам]}}
+        """
+        positions = self._selection(since, until)
+        if not len(positions):
+            return {"months": [], "series": {}}
+        months, month_count, month_label = self._codes("month", positions)
+        if key is None:
+            series = {"Все": np.bincount(months, minlength=month_count)}
+        else:
+            codes, size, label = self._codes(key, positions)
+            table = np.bincount(codes * month_count + months, minlength=size * month_count).reshape(size, month_count)
+            series = {label(code): table[code] for code in np.flatnonzero(table.sum(axis=1))}
+        return {"months": [month_label(code) for code in range(month_count)],
+                "series": {name: values.tolist() for name, values in series.items()}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Колоночный снимок выдач и отчёты по нему")
+    parser.add_argument("--dsn", help="Строка подключения psycopg2 (нужна для refresh)")
+    parser.add_argument("--path", default=SNAPSHOT_DIR, help="Каталог снимка")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh = commands.add_parser("refresh", help="Обновить снимок (инкрементно)")
+    refresh.add_argument("--full", action="store_true", help="Перестроить снимок целиком")
+    report = commands.add_parser("report", help="Группировка выдач")
+    report.add_argument("--by", nargs="*", default=["month"], choices=GROUP_KEYS)
+    report.add_argument("--since", type=date.fromisoformat)
+    report.add_argument("--until", type=date.fromisoformat)
+    report.add_argument("--open", action="store_true", help="Только не возвращённые")
+    args = parser.parse_args(argv)
+
+    snapshot = AnalyticsSnapshot(args.path)
+    if args.command == "refresh":
+        if not args.dsn:
+            parser.error("для refresh укажите --dsn")
+        import psycopg2
+        connection = psycopg2.connect(args.dsn, application_name="library_analytics")
+        try:
+            summary = snapshot.refresh(connection, full=args.full)
+        finally:
+            connection.close()
+        print(f"Снимок обновлён ({summary['mode']}): прочитано {summary['changed']} строк, "
+              f"в снимке {summary['rows']}, {summary['duration_ms']:.0f} мс")
+        return 0
+    if not snapshot.exists():
+        parser.error(f"снимок в {args.path} не найден: выполните refresh")
+    snapshot.open()
+    for row in snapshot.group_by(args.by, args.since, args.until, args.open):
+        print("  ".join(f"{value}" for value in row.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+Асинхронный менеджер базы данных на asyncpg для сервисов, которым нужно
+обслуживать много параллельных запросов (каталог, киоски, REST API).
+
+Методы повторяют DatabaseManager (те же имена, аргументы и возвращаемые
+значения), тексты запросов общие — core.queries. Соединения берутся из
+пула asyncpg на время одного вызова, поэтому независимые вызовы можно
+выполнять одновременно через asyncio.gather. asyncpg сам готовит и кэширует
+операторы на каждом соединении; execute_many и get_rows отправляют пакет
+одним обменом с сервером вместо запроса на каждую строку.
+
+Пример:
+    db = AsyncDatabaseManager()
+    db.set_connection_params("test1", "postgres", "...", "localhost", 5432)
+    await db.connect()
+    books, readers = await asyncio.gather(db.get_books(), db.get_readers())
+    await db.disconnect()
+"""
+import asyncio
+from datetime import date
+
+import asyncpg
+
+from core import queries
+from core.data import CONNECT_TIMEOUT, HOLD_PICKUP_DAYS, TABLE_PAGE_SIZE, VERSION_CONFLICT_MESSAGE
+from core.logger import Logger
+
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 20
+
+
+async def _init_connection(connection):
+    # Даты принимаются и строками YYYY-MM-DD, как в DatabaseManager (psycopg2)
+    await connection.set_type_codec(
+        "date", schema="pg_catalog", format="text",
+        encoder=lambda value: value if isinstance(value, str) else value.isoformat(),
+        decoder=date.fromisoformat)
+
+
+def _row(record):
+    return dict(record) if record is not None else None
+
+
+class AsyncDatabaseManager:
+    """
+    Асинхронный менеджер базы данных с пулом соединений asyncpg.
+
+    Args:
+        min_size: Число соединений, открываемых сразу
+        max_size: Предельное число соединений пула
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE):
+        self.logger = Logger()
+        self.connection_params = None
+        self.connect_timeout = CONNECT_TIMEOUT
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    def set_connection_params(self, dbname, user, password, host, port):
+        """Установка параметров подключения (как у DatabaseManager)."""
+        self.connection_params = {
+            "database": dbname,
+            "user": user,
+            "password": password,
+            "host": host,
+            "port": port,
+        }
+
+    async def connect(self):
+        """
+        Открытие пула соединений.
+
+        Returns:
+            bool: Успешность подключения
+        """
+        if self.connection_params is None:
+            self.logger.error("Параметры подключения не установлены")
+            return False
+        try:
+            self.pool = await asyncpg.create_pool(
+                **self.connection_params, min_size=self.min_size, max_size=self.max_size,
+                timeout=self.connect_timeout, init=_init_connection)
+            self.logger.info(f"Пул asyncpg к БД {self.connection_params['database']} открыт "
+                             f"({self.min_size}–{self.max_size} соединений)")
+            return True
+        except (OSError, asyncpg.PostgresError) as e:
+            self.logger.error(f"Ошибка подключения к БД: {str(e)}")
+            return False
+
+    async def disconnect(self):
+        """Закрытие пула соединений."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            self.logger.info("Пул соединений asyncpg закрыт")
+
+    async def table_exists(self, table_name: str) -> bool:
+        """Проверяет наличие таблицы в схеме public."""
+        try:
+            return await self.pool.fetchval(queries.numbered(queries.TABLE_EXISTS), table_name) is not None
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка проверки существования таблицы {table_name}: {e}")
+            return False
+
+    # ==== Чтение ====
+
+    async def _get_all(self, table, what):
+        try:
+            if not await self.table_exists(table):
+                self.logger.warning(f"Таблица {table} не найдена (возможно, была переименована)")
+                return []
+            return [dict(r) for r in await self.pool.fetch(queries.numbered(queries.SELECT_ALL[table]))]
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка получения {what}: {str(e)}")
+            return []
+
+    async def get_readers(self):
+        return await self._get_all("readers", "списка читателей")
+
+    async def get_books(self):
+        return await self._get_all("books", "списка книг")
+
+    async def get_issues(self):
+        return await self._get_all("issues", "списка заказов")
+
+    async def get_book_authors(self):
+        return await self._get_all("book_authors", "списка связей книга–автор")
+
+    async def get_authors(self, year=None):
+        return await self._get_all("authors", "авторов")
+
+    async def get_row(self, table, key):
+        """Строка основной таблицы по значению первичного ключа (или кортежу значений) либо None."""
+        if table not in queries.SELECT_ROW:
+            raise ValueError(f"Таблица {table} не поддерживается")
+        values = key if isinstance(key, (tuple, list)) else (key,)
+        return _row(await self.pool.fetchrow(queries.numbered(queries.SELECT_ROW[table]), *values))
+
+    async def get_rows(self, table, keys):
+        """Строки таблицы с одностолбцовым ключом по списку значений ключа одним запросом."""
+        if table not in queries.SELECT_ROWS:
+            raise ValueError(f"Пакетная выборка для таблицы {table} не поддерживается")
+        return [dict(r) for r in await self.pool.fetch(queries.numbered(queries.SELECT_ROWS[table]), list(keys))]
+
+    async def get_table_page(self, table, limit=TABLE_PAGE_SIZE, after=None):
+        """
+        Страница строк основной таблицы в порядке ключа.
+
+        Args:
+            after: Значения ключа последней строки предыдущей страницы (кортеж из одного значения)
+        """
+        if table not in queries.SELECT_FIRST_PAGE:
+            raise ValueError(f"Постраничный просмотр таблицы {table} не поддерживается")
+        if after is None:
+            rows = await self.pool.fetch(queries.numbered(queries.SELECT_FIRST_PAGE[table]), limit)
+        else:
+            rows = await self.pool.fetch(queries.numbered(queries.SELECT_NEXT_PAGE[table]), after[0], limit)
+        return [dict(r) for r in rows]
+
+    async def search_books(self, text, limit=50, after=None):
+        """Поиск книг по подстроке названия, ISBN или фамилии автора (как DatabaseManager.search_books)."""
+        pattern = queries.like_pattern(text)
+        rows = await self.pool.fetch(queries.numbered(queries.SEARCH_BOOKS),
+                                     after if after is not None else 0, pattern, pattern, pattern, limit)
+        return [dict(r) for r in rows]
+
+    async def get_overdue_issues(self, as_of=None, limit=TABLE_PAGE_SIZE, after=None):
+        """Страница просроченных выдач (как DatabaseManager.get_overdue_issues)."""
+        if after is None:
+            rows = await self.pool.fetch(queries.numbered(queries.OVERDUE_FIRST_PAGE), as_of, as_of, limit)
+        else:
+            rows = await self.pool.fetch(queries.numbered(queries.OVERDUE_NEXT_PAGE),
+                                         as_of, as_of, after[0], after[1], limit)
+        return [dict(r) for r in rows]
+
+    async def count_overdue_issues(self, as_of=None):
+        """Число просроченных выдач на дату as_of (None — сегодня) либо None при ошибке."""
+        try:
+            return await self.pool.fetchval(queries.numbered(queries.COUNT_OVERDUE), as_of)
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка подсчёта просроченных выдач: {str(e)}")
+            return None
+
+    async def get_reader_history(self, reader_id, limit=TABLE_PAGE_SIZE, before=None):
+        """Страница истории выдач читателя, новые сначала (как DatabaseManager.get_reader_history)."""
+        if before is None:
+            rows = await self.pool.fetch(queries.numbered(queries.READER_HISTORY_FIRST_PAGE), reader_id, limit)
+        else:
+            rows = await self.pool.fetch(queries.numbered(queries.READER_HISTORY_NEXT_PAGE),
+                                         reader_id, before[0], before[1], limit)
+        return [dict(r) for r in rows]
+
+    async def get_reader_profile(self, reader_id, history_limit=20, recommendations_limit=10):
+        """Профиль читателя (как DatabaseManager.get_reader_profile); части читаются параллельно."""
+        reader, stats, history, recommendations = await asyncio.gather(
+            self.get_row("readers", reader_id),
+            self.pool.fetchrow(queries.numbered(queries.READER_STATS), reader_id),
+            self.get_reader_history(reader_id, history_limit),
+            self.get_reader_recommendations(reader_id, recommendations_limit))
+        if reader is None:
+            return None
+        return {"reader": reader, "stats": dict(stats), "history": history, "recommendations": recommendations}
+
+    async def get_book_recommendations(self, book_id, limit=10):
+        rows = await self.pool.fetch(queries.numbered(queries.BOOK_RECOMMENDATIONS), book_id, limit)
+        return [dict(r) for r in rows]
+
+    async def get_reader_recommendations(self, reader_id, limit=10):
+        rows = await self.pool.fetch(queries.numbered(queries.READER_RECOMMENDATIONS), reader_id, limit)
+        return [dict(r) for r in rows]
+
+    async def execute_custom_request(self, sql_query, params=None, prepare=False):
+        """
+        Выполнить произвольный запрос с плейсхолдерами %s и вернуть список словарей.
+        prepare оставлен для совместимости: asyncpg всегда выполняет запросы
+        через кэшируемые подготовленные операторы.
+        """
+        if not isinstance(sql_query, str):
+            raise TypeError("AsyncDatabaseManager принимает только текст запроса (без psycopg2.sql)")
+        try:
+            return [dict(r) for r in await self.pool.fetch(queries.numbered(sql_query), *(params or ()))]
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка выполнения запроса: {e}")
+            raise
+
+    async def execute_many(self, sql_query, params_seq):
+        """Выполнение запроса для каждого набора параметров одним пакетом (executemany)."""
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.transaction():
+                    await connection.executemany(queries.numbered(sql_query), [tuple(p) for p in params_seq])
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка пакетного выполнения запроса: {e}")
+            raise
+
+    # ==== Добавление ====
+
+    async def _insert(self, query, params, what):
+        try:
+            return _row(await self.pool.fetchrow(queries.numbered(query), *params))
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка добавления {what}: {str(e)}")
+            return None
+
+    async def add_book_author(self, book_id, author_id):
+        row = await self._insert(queries.INSERT_BOOK_AUTHOR, (book_id, author_id), "связи книга–автор")
+        if row is None:
+            # ON CONFLICT DO NOTHING не возвращает строку: связь уже есть или произошла ошибка
+            return await self.get_row("book_authors", (book_id, author_id))
+        self.logger.info(f"Добавлена связь: книга {book_id} — автор {author_id}")
+        return row
+
+    async def add_author(self, last_name, first_name, patronymic, birth_year, country):
+        row = await self._insert(queries.INSERT_AUTHOR, (last_name, first_name, patronymic, birth_year, country),
+                                 "автора")
+        if row:
+            self.logger.info(f"Добавлен автор с ID {row['author_id']}")
+        return row
+
+    async def add_reader(self, last_name, first_name, patronymic, ticket_number, registration_date):
+        row = await self._insert(queries.INSERT_READER,
+                                 (last_name, first_name, patronymic, ticket_number, registration_date), "читателя")
+        if row:
+            self.logger.info(f"Добавлен читатель с ID {row['reader_id']}")
+        return row
+
+    async def add_book(self, title, publication_year, genre, isbn, available_copies):
+        row = await self._insert(queries.INSERT_BOOK, (title, publication_year, genre, isbn, available_copies),
+                                 "книги")
+        if row:
+            self.logger.info(f"Добавлена книга с ID {row['book_id']}")
+        return row
+
+    async def add_issue(self, book_id, reader_id, issue_date, return_date, due_date=None):
+        row = await self._insert(queries.INSERT_ISSUE, (book_id, reader_id, issue_date, return_date, due_date),
+                                 "заказа")
+        if row:
+            self.logger.info(f"Добавлен заказ (выдача) с ID {row['issue_id']}")
+        return row
+
+    # ==== Изменение и удаление ====
+
+    async def _update(self, table, query, fields, key_value, expected_version, not_found):
+        text, key_params = queries.versioned_update(query, key_value, expected_version)
+        try:
+            async with self.pool.acquire() as connection:
+                row = await connection.fetchrow(queries.numbered(text), *fields, *key_params)
+                if row is None:
+                    if expected_version is not None:
+                        version = await connection.fetchval(queries.numbered(queries.SELECT_VERSION[table]),
+                                                            key_value)
+                        if version is not None:
+                            self.logger.warning(f"Конфликт версий: {table} {key_value} изменена "
+                                                f"(версия {version}, ожидалась {expected_version})")
+                            return False, VERSION_CONFLICT_MESSAGE
+                    self.logger.error(f"{not_found} (ID {key_value})")
+                    return False, not_found
+            self.logger.info(f"Обновлена строка {table} с ID {key_value}")
+            return True, dict(row)
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка обновления {table}: {str(e)}")
+            return False, str(e)
+
+    async def update_issue(self, issue_id, book_id, reader_id, issue_date, return_date, expected_version=None):
+        return await self._update("issues", queries.UPDATE_ISSUE, (book_id, reader_id, issue_date, return_date),
+                                  issue_id, expected_version, "Заказ не найден")
+
+    async def update_reader(self, reader_id, last_name, first_name, patronymic, ticket_number, registration_date,
+                            expected_version=None):
+        return await self._update("readers", queries.UPDATE_READER,
+                                  (last_name, first_name, patronymic, ticket_number, registration_date),
+                                  reader_id, expected_version, "Читатель не найден")
+
+    async def update_book(self, book_id, title, publication_year, genre, isbn, available_copies,
+                          expected_version=None):
+        return await self._update("books", queries.UPDATE_BOOK,
+                                  (title, publication_year, genre, isbn, available_copies),
+                                  book_id, expected_version, "Книга не найдена")
+
+    async def update_author(self, author_id, last_name, first_name, patronymic, birth_year, country,
+                            expected_version=None):
+        return await self._update("authors", queries.UPDATE_AUTHOR,
+                                  (last_name, first_name, patronymic, birth_year, country),
+                                  author_id, expected_version, "Автор не найден")
+
+    async def update_book_author(self, old_book_id, old_author_id, new_book_id, new_author_id):
+        try:
+            row = await self.pool.fetchrow(queries.numbered(queries.UPDATE_BOOK_AUTHOR),
+                                           new_book_id, new_author_id, old_book_id, old_author_id)
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка обновления связи книга–автор: {str(e)}")
+            return False, str(e)
+        if row is None:
+            return False, "Связь не найдена"
+        self.logger.info(f"Обновлена связь: {old_book_id}-{old_author_id} -> {new_book_id}-{new_author_id}")
+        return True, dict(row)
+
+    async def _delete(self, table, *key):
+        try:
+            row = await self.pool.fetchrow(queries.numbered(queries.DELETE_ROW[table]), *key)
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка удаления из {table}: {str(e)}")
+            return False, str(e)
+        self.logger.info(f"Удалена строка {table} с ключом {key}")
+        return True, _row(row)
+
+    async def delete_reader(self, reader_id):
+        return await self._delete("readers", reader_id)
+
+    async def delete_book_author(self, book_id, author_id):
+        return await self._delete("book_authors", book_id, author_id)
+
+    async def delete_issue(self, issue_id):
+        return await self._delete("issues", issue_id)
+
+    async def delete_book(self, book_id):
+        return await self._delete("books", book_id)
+
+    async def delete_author(self, author_id):
+        return await self._delete("authors", author_id)
+
+    # ==== Выдача и возврат ====
+
+    async def checkout_book(self, book_id, reader_id, issue_date=None):
+        """Выдача книги в одной транзакции (как DatabaseManager.checkout_book)."""
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.transaction():
+                    held = await connection.fetchval(queries.numbered(queries.CHECKOUT_FULFIL_HOLD), book_id, reader_id)
+                    if held is None and await connection.fetchval(queries.numbered(queries.CHECKOUT_TAKE_COPY),
+                                                                  book_id) is None:
+                        exists = await connection.fetchrow(queries.numbered(queries.SELECT_ROW["books"]), book_id)
+                        return False, "Нет свободных экземпляров" if exists else "Книга не найдена"
+                    row = dict(await connection.fetchrow(queries.numbered(queries.CHECKOUT_ADD_ISSUE),
+                                                         book_id, reader_id, issue_date))
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка выдачи книги: {str(e)}")
+            return False, str(e)
+        self.logger.info(f"Книга {book_id} выдана читателю {reader_id}, заказ {row['issue_id']}")
+        return True, row
+
+    async def return_book(self, issue_id, return_date=None):
+        """Возврат книги в одной транзакции (как DatabaseManager.return_book)."""
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.transaction():
+                    row = await connection.fetchrow(queries.numbered(queries.RETURN_CLOSE_ISSUE),
+                                                    return_date, issue_id)
+                    if row is None:
+                        exists = await connection.fetchrow(queries.numbered(queries.SELECT_ROW["issues"]), issue_id)
+                        return False, "Книга по заказу уже возвращена" if exists else "Заказ не найден"
+                    # Экземпляр получает первая бронь в очереди, иначе он возвращается в available_copies
+                    await connection.execute(queries.numbered(queries.RELEASE_COPY),
+                                             row["book_id"], HOLD_PICKUP_DAYS, row["book_id"])
+        except asyncpg.PostgresError as e:
+            self.logger.error(f"Ошибка возврата книги: {str(e)}")
+            return False, str(e)
+        self.logger.info(f"Возвращена книга {row['book_id']} по заказу {issue_id}")
+        return True, dict(row)
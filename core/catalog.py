@@ -0,0 +1,114 @@
+"""
+Каталог схемы public: таблицы, столбцы с типами, первичные и внешние ключи.
+
+Загружается тремя запросами вместо отдельного обращения к information_schema
+на каждую таблицу и кэшируется в DatabaseManager до изменения структуры.
+"""
+from core.additional_classes import RequestBuilder
+
+NUMERIC_TYPES = {
+    'smallint', 'integer', 'bigint',
+    'decimal', 'numeric', 'real', 'double precision'
+}
+
+COLUMNS_SQL = """
+    SELECT c.table_name, c.column_name, c.data_type
+    FROM information_schema.columns c
+    JOIN information_schema.tables t
+      ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+    ORDER BY c.table_name, c.ordinal_position
+"""
+
+PRIMARY_KEYS_SQL = """
+    SELECT cls.relname AS table_name,
+           array_agg(a.attname::text ORDER BY k.ord) AS columns
+    FROM pg_constraint con
+    JOIN pg_namespace n ON n.oid = con.connamespace
+    JOIN pg_class cls ON cls.oid = con.conrelid
+    CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    WHERE con.contype = 'p' AND n.nspname = 'public'
+    GROUP BY cls.relname
+"""
+
+FOREIGN_KEYS_SQL = """
+    SELECT con.conname AS name,
+           src.relname AS table,
+           array_agg(sa.attname::text ORDER BY k.ord) AS columns,
+           tgt.relname AS ref_table,
+           array_agg(ta.attname::text ORDER BY k.ord) AS ref_columns
+    FROM pg_constraint con
+    JOIN pg_namespace n ON n.oid = con.connamespace
+    JOIN pg_class src ON src.oid = con.conrelid
+    JOIN pg_class tgt ON tgt.oid = con.confrelid
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, ref_attnum, ord)
+    JOIN pg_attribute sa ON sa.attrelid = con.conrelid AND sa.attnum = k.attnum
+    JOIN pg_attribute ta ON ta.attrelid = con.confrelid AND ta.attnum = k.ref_attnum
+    WHERE con.contype = 'f' AND n.nspname = 'public'
+    GROUP BY con.conname, src.relname, tgt.relname
+    ORDER BY src.relname, con.conname
+"""
+
+# Снимок транзакций: пока он не изменился, ни одна транзакция не начала
+# запись и ни одна из выполнявшихся не зафиксирована
+SNAPSHOT_SQL = "SELECT txid_current_snapshot()::text AS snapshot"
+
+
+class Catalog:
+    """Снимок структуры схемы public."""
+
+    def __init__(self, columns, primary_keys, foreign_keys):
+        self.columns = columns              # {таблица: [(столбец, тип), ...]}
+        self.primary_keys = primary_keys    # {таблица: [столбец, ...]}
+        self.foreign_keys = foreign_keys    # [{name, table, columns, ref_table, ref_columns}]
+
+    @classmethod
+    def fetch(cls, cursor):
+        """Загрузка каталога через курсор, возвращающий строки-словари."""
+        cursor.execute(COLUMNS_SQL)
+        columns = {}
+        for row in cursor.fetchall():
+            columns.setdefault(row["table_name"], []).append((row["column_name"], row["data_type"]))
+        cursor.execute(PRIMARY_KEYS_SQL)
+        primary_keys = {row["table_name"]: list(row["columns"]) for row in cursor.fetchall()}
+        cursor.execute(FOREIGN_KEYS_SQL)
+        foreign_keys = [dict(row) for row in cursor.fetchall()]
+        return cls(columns, primary_keys, foreign_keys)
+
+    @property
+    def tables(self):
+        return sorted(self.columns)
+
+    def column_names(self, table):
+        return [name for name, _ in self.columns.get(table, [])]
+
+    def numeric_columns(self, table):
+        return [name for name, data_type in self.columns.get(table, []) if data_type in NUMERIC_TYPES]
+
+    def page_key(self, table):
+        """Столбцы сортировки страниц: первичный ключ или первый столбец."""
+        if table in self.primary_keys:
+            return self.primary_keys[table]
+        return self.column_names(table)[:1]
+
+
+def table_page_query(catalog, table, limit, after=None, offset=0):
+    """
+    Запрос страницы таблицы в порядке catalog.page_key(table).
+    При первичном ключе следующая страница выбирается по ключу
+    последней строки (after), иначе — через OFFSET.
+
+    Returns:
+        tuple: (sql.Composed, кортеж параметров)
+    """
+    key = catalog.page_key(table)
+    builder = RequestBuilder().from_table(table)
+    for column in key:
+        builder.order_by(column)
+    builder.limit(limit)
+    if after is not None and table in catalog.primary_keys:
+        builder.not_null(key).after(after)
+    elif offset:
+        builder.offset(offset)
+    return builder.build()
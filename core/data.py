@@ -1,7 +1,78 @@
+import itertools
+import json
+import threading
+from datetime import date, datetime, time
+from decimal import Decimal
+
 import psycopg2
-from psycopg2 import sql
-from psycopg2.extras import DictCursor
+import psycopg2.errors
+from psycopg2 import pool, sql
+from psycopg2.extras import Json
 from core.logger import Logger
+from core.instrumentation import QueryProfiler, InstrumentedCursor, InstrumentedDictCursor
+from core.explain import PlanAnalysis
+from core import queries
+from core.catalog import Catalog, SNAPSHOT_SQL, table_page_query
+from core.guards import QueryGuard, QueryCancelled
+from core.rows import ResultSet
+from core.replicas import LsnTrackingConnection, ReplicaRouter, REPLICA_MAX_LAG_SECONDS, parse_lsn, query_text
+from core.generator import SyntheticDataGenerator, sizes_for_issues, load as load_synthetic_data
+
+# Сколько подготовленных операторов держать на одном соединении
+PREPARED_CACHE_SIZE = 64
+# Сколько секунд ждать установки соединения
+CONNECT_TIMEOUT = 5
+# Размер страницы при постраничном просмотре таблиц
+TABLE_PAGE_SIZE = 500
+# Таблицы с версией строки (оптимистическая блокировка) и временем изменения
+VERSIONED_TABLES = ("readers", "authors", "books", "issues")
+# Таблицы с журналом изменений row_changes (синхронизация открытых диалогов)
+SYNCED_TABLES = ("readers", "authors", "books", "book_authors", "issues")
+# Оператор, изменивший больше строк, записывается в журнал одной отметкой «перезагрузить»
+CHANGE_LOG_BULK_ROWS = 10000
+# Сколько часов хранить журнал изменений
+CHANGE_LOG_RETENTION_HOURS = 24
+VERSION_CONFLICT_MESSAGE = "Запись изменена другим пользователем"
+# Срок выдачи по умолчанию, дней (due_date = issue_date + LOAN_PERIOD_DAYS)
+LOAN_PERIOD_DAYS = 14
+# Сколько просроченных выдач обрабатывать за одну транзакцию при создании уведомлений
+OVERDUE_CHUNK_SIZE = 10000
+# Сколько дней отложенный по брони экземпляр ждёт читателя
+HOLD_PICKUP_DAYS = 3
+# Сколько просроченных броней снимать за одну транзакцию
+HOLD_EXPIRE_CHUNK_SIZE = 500
+_statement_ids = itertools.count(1)
+
+# Типы значений, которые JSON-снимок результата хранит строками и восстанавливает при чтении
+SNAPSHOT_TYPES = (("timestamp", datetime, datetime.fromisoformat), ("date", date, date.fromisoformat),
+                  ("time", time, time.fromisoformat), ("numeric", Decimal, Decimal))
+
+
+def dump_snapshot(rows):
+    """Снимок результата для saved_queries.snapshot: строки и типы столбцов, которые JSON не сохраняет."""
+    types = {}
+    for row in rows:
+        for column, value in row.items():
+            if column in types or value is None:
+                continue
+            types[column] = next((tag for tag, kind, _ in SNAPSHOT_TYPES if isinstance(value, kind)), None)
+    types = {column: tag for column, tag in types.items() if tag is not None}
+    return json.dumps({"types": types, "rows": rows}, default=str)
+
+
+def load_snapshot(snapshot):
+    """Строки снимка с восстановленными типами (как у результата нового выполнения); None — снимка нет."""
+    if not isinstance(snapshot, dict):
+        # Снимок старого формата (список строк) не содержит типов
+        return None
+    parsers = {tag: parse for tag, _, parse in SNAPSHOT_TYPES}
+    columns = {column: parsers[tag] for column, tag in snapshot["types"].items()}
+    rows = snapshot["rows"]
+    for row in rows:
+        for column, parse in columns.items():
+            if row.get(column) is not None:
+                row[column] = parse(row[column])
+    return rows
 
 
 class DatabaseManager:
@@ -14,9 +85,28 @@ class DatabaseManager:
     def __init__(self):
         """Инициализация менеджера БД"""
         self.logger = Logger()
+        self.profiler = QueryProfiler()
         self.connection_params = None
         self.connection = None
         self.cursor = None
+        self._prepared = {}  # текст запроса -> имя подготовленного оператора
+        self.connect_timeout = CONNECT_TIMEOUT
+        self.catalog = None  # Catalog, загружается при первом обращении или предзагрузкой
+        self._prefetched_pages = {}  # таблица -> (размер страницы, строки, снимок транзакций)
+        self.replicas = None  # ReplicaRouter, если заданы реплики для чтения
+        # Произвольные запросы с ограничениями выполняются в рабочем потоке интерфейса
+        # на отдельных соединениях, чтобы их можно было отменить, не трогая основное
+        self.query_guard = QueryGuard()
+        self._guarded_connection = None
+        self._guarded_replicas = None
+        self._guarded_lock = threading.Lock()
+        # Отдельное соединение для get_changes: синхронизация диалогов идёт в рабочем потоке
+        self._sync_connection = None
+        self._sync_keys = {}
+        self._sync_lock = threading.Lock()
+        # Пул прогретых соединений предзагрузки (core.prefetch): из него берутся
+        # отдельные соединения для запросов с ограничениями и синхронизации
+        self._pool = None
 
     def set_connection_params(self, dbname, user, password, host, port):
         """Установка параметров подключения к базе данных."""
@@ -41,9 +131,15 @@ class DatabaseManager:
             return False
 
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
-            self.cursor = self.connection.cursor(cursor_factory=DictCursor)
+            self.connection = psycopg2.connect(**self.connection_params, connect_timeout=self.connect_timeout,
+                                               connection_factory=LsnTrackingConnection,
+                                               cursor_factory=InstrumentedCursor)
+            self.connection.track_lsn = self.replicas is not None
+            self.cursor = self.connection.cursor(cursor_factory=InstrumentedDictCursor)
+            self._prepared = {}
+            self.invalidate_catalog()
             self.logger.info(f"Подключение к БД {self.connection_params['dbname']} успешно")
+            self.prepare_saved_queries()
             return True
         except Exception as e:
             self.logger.error(f"Ошибка подключения к БД: {str(e)}")
@@ -59,7 +155,8 @@ class DatabaseManager:
             postgres_params = self.connection_params.copy()
             postgres_params["dbname"] = "postgres"
 
-            conn = psycopg2.connect(**postgres_params)
+            conn = psycopg2.connect(**postgres_params, connect_timeout=self.connect_timeout,
+                                    cursor_factory=InstrumentedCursor)
             conn.autocommit = True
             cursor = conn.cursor()
             self.logger.info(f"Подключение к системной БД postgres успешно")
@@ -68,6 +165,41 @@ class DatabaseManager:
             self.logger.error(f"Ошибка подключения к системной БД postgres: {str(e)}")
             return None, None
 
+    def set_replicas(self, dsns, max_lag=REPLICA_MAX_LAG_SECONDS):
+        """
+        Реплики для чтения: списки таблиц и отчёты (execute_custom_request
+        с replica=True) выполняются на реплике, если она отстаёт не больше
+        max_lag секунд и уже получила последние записи этого сеанса.
+        Пустой список отключает маршрутизацию.
+
+        Args:
+            dsns: Строки подключения к репликам
+            max_lag: Допустимое отставание, секунд
+        """
+        if self.replicas is not None:
+            self.replicas.close()
+        dsns = [dsn for dsn in dsns if dsn.strip()]
+        self.replicas = ReplicaRouter(dsns, self.connect_timeout, max_lag) if dsns else None
+        with self._guarded_lock:
+            if self._guarded_replicas is not None:
+                self._guarded_replicas.close()
+            self._guarded_replicas = ReplicaRouter(dsns, self.connect_timeout, max_lag) if dsns else None
+        if self.connection is not None:
+            self.connection.track_lsn = self.replicas is not None
+        if dsns:
+            self.logger.info(f"Чтение направляется на реплики: {len(dsns)}, допустимое отставание {max_lag} с")
+
+    def _read_rows(self, query, params=None):
+        """
+        Чтение на реплике, если она подходит (см. core.replicas), иначе на основном сервере.
+        """
+        if self.replicas is not None:
+            rows = self.replicas.fetch(query_text(query, self.connection), params, self.connection.last_lsn)
+            if rows is not None:
+                return rows
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
     def create_database(self):
         """
         Создание новой базы данных если она не существует
@@ -106,6 +238,24 @@ class DatabaseManager:
         if self.connection:
             self.connection.close()
             self.logger.info("Соединение с БД закрыто")
+        if self.replicas is not None:
+            self.replicas.close()
+        self.query_guard.cancel()
+        with self._guarded_lock:
+            if self._guarded_connection is not None:
+                self._close_connection(self._guarded_connection)
+                self._guarded_connection = None
+            if self._guarded_replicas is not None:
+                self._guarded_replicas.close()
+        with self._sync_lock:
+            if self._sync_connection is not None:
+                self._close_connection(self._sync_connection)
+                self._sync_connection = None
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+        self._prepared = {}
+        self.invalidate_catalog()
 
     def create_schema(self):
         """
@@ -170,14 +320,254 @@ class DatabaseManager:
                 );
             """)
 
+            self._create_saved_queries_table()
+
             self.connection.commit()
+            self.invalidate_catalog()
             self.logger.info("Схема БД успешно создана")
-            return True
+            return self.apply_migrations()
         except psycopg2.Error as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка создания схемы БД: {str(e)}")
             return False
 
+    # ==== Миграции схемы ====
+
+    def apply_migrations(self):
+        """
+        Применение ещё не выполненных миграций (номера хранятся в schema_migrations).
+        Вызывается после создания схемы и при подключении к существующей БД.
+
+        Returns:
+            bool: Успешность применения
+        """
+        migrations = [
+            (1, "Версия строки и время изменения", self._migrate_row_versions),
+            (2, "Срок возврата выдач и уведомления о просрочке", self._migrate_due_dates),
+            (3, "Очередь бронирований книг", self._migrate_holds),
+            (4, "История читателя и рекомендации", self._migrate_reader_history),
+            (5, "Журнал изменений для синхронизации таблиц", self._migrate_change_log),
+        ]
+        try:
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            self.cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row["version"] for row in self.cursor.fetchall()}
+            for version, description, migrate in migrations:
+                if version in applied:
+                    continue
+                migrate()
+                self.cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                                    (version, description))
+                self.connection.commit()
+                self.logger.info(f"Применена миграция {version}: {description}")
+            self.connection.commit()
+            self.invalidate_catalog()
+            return True
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка применения миграций: {str(e)}")
+            return False
+
+    def _migrate_row_versions(self):
+        """
+        Столбцы version и updated_at с триггером: любое UPDATE увеличивает
+        версию строки, что позволяет обновлять с проверкой версии
+        (update_* с expected_version) и выбирать изменения по updated_at.
+        Переименованные через ALTER таблицы пропускаются.
+        """
+        self.cursor.execute("""
+            CREATE OR REPLACE FUNCTION library_touch_row() RETURNS trigger AS $$
+            BEGIN
+                NEW.version := OLD.version + 1;
+                NEW.updated_at := now();
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        for table in VERSIONED_TABLES:
+            if not self.table_exists(table):
+                self.logger.warning(f"Таблица {table} не найдена, версия строк не добавлена")
+                continue
+            self.cursor.execute(sql.SQL("""
+                ALTER TABLE {table}
+                    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1,
+                    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+                CREATE INDEX IF NOT EXISTS {index} ON {table} (updated_at);
+                DROP TRIGGER IF EXISTS {trigger} ON {table};
+                CREATE TRIGGER {trigger} BEFORE UPDATE ON {table}
+                    FOR EACH ROW EXECUTE PROCEDURE library_touch_row();
+            """).format(table=sql.Identifier(table), index=sql.Identifier(f"{table}_updated_at_idx"),
+                        trigger=sql.Identifier(f"{table}_touch_row")))
+
+    def _migrate_due_dates(self):
+        """
+        Столбец issues.due_date (срок возврата) с триггером, который заполняет
+        его при добавлении выдачи без срока, частичный индекс по открытым
+        выдачам для поиска просроченных и таблица уведомлений о просрочке.
+        """
+        self.cursor.execute(sql.SQL("""
+            CREATE OR REPLACE FUNCTION library_issue_due_date() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.due_date IS NULL THEN
+                    NEW.due_date := NEW.issue_date + {days};
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            ALTER TABLE issues ADD COLUMN IF NOT EXISTS due_date DATE;
+            UPDATE issues SET due_date = issue_date + {days} WHERE due_date IS NULL;
+            ALTER TABLE issues ALTER COLUMN due_date SET NOT NULL;
+            DROP TRIGGER IF EXISTS issues_due_date ON issues;
+            CREATE TRIGGER issues_due_date BEFORE INSERT ON issues
+                FOR EACH ROW EXECUTE PROCEDURE library_issue_due_date();
+            CREATE INDEX IF NOT EXISTS issues_open_due_date_idx ON issues (due_date, issue_id)
+                WHERE return_date IS NULL;
+
+            CREATE TABLE IF NOT EXISTS overdue_notifications (
+                notification_id BIGSERIAL PRIMARY KEY,
+                issue_id INTEGER NOT NULL REFERENCES issues(issue_id) ON DELETE CASCADE,
+                reader_id INTEGER NOT NULL,
+                book_id INTEGER NOT NULL,
+                due_date DATE NOT NULL,
+                days_overdue INTEGER NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                sent_at TIMESTAMPTZ,
+                UNIQUE (issue_id, due_date)
+            );
+            CREATE INDEX IF NOT EXISTS overdue_notifications_unsent_idx
+                ON overdue_notifications (notification_id) WHERE sent_at IS NULL;
+        """).format(days=sql.Literal(LOAN_PERIOD_DAYS)))
+
+    def _migrate_holds(self):
+        """
+        Таблица броней: у читателя не больше одной активной брони на книгу,
+        частичные индексы — очередь ожидающих по книге и отложенные экземпляры
+        по сроку получения.
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS holds (
+                hold_id SERIAL PRIMARY KEY,
+                book_id INTEGER NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+                reader_id INTEGER NOT NULL REFERENCES readers(reader_id) ON DELETE CASCADE,
+                status VARCHAR(10) NOT NULL DEFAULT 'waiting'
+                    CHECK (status IN ('waiting', 'ready', 'fulfilled', 'cancelled', 'expired')),
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                ready_at TIMESTAMPTZ,
+                pickup_until DATE,
+                closed_at TIMESTAMPTZ
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS holds_active_reader_book_idx ON holds (book_id, reader_id)
+                WHERE status IN ('waiting', 'ready');
+            CREATE INDEX IF NOT EXISTS holds_queue_idx ON holds (book_id, created_at, hold_id)
+                WHERE status = 'waiting';
+            CREATE INDEX IF NOT EXISTS holds_pickup_idx ON holds (pickup_until)
+                WHERE status = 'ready';
+        """)
+
+    def _migrate_reader_history(self):
+        """
+        Индекс истории выдач читателя (новые сначала) и таблица рекомендаций,
+        которую заполняет core.recommendations.
+        """
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS issues_reader_history_idx
+                ON issues (reader_id, issue_date DESC, issue_id DESC);
+            CREATE TABLE IF NOT EXISTS book_recommendations (
+                book_id INTEGER NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+                rank SMALLINT NOT NULL,
+                recommended_book_id INTEGER NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+                co_readers INTEGER NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (book_id, rank)
+            );
+        """)
+
+    def _migrate_change_log(self):
+        """
+        Журнал изменений row_changes для get_changes: триггеры уровня оператора
+        (с таблицами переходов) записывают ключи вставленных, изменённых и
+        удалённых строк вместе с txid транзакции. Выборка изменений идёт по
+        индексу (table_name, txid), а не полным просмотром таблицы по xmin.
+        Строка с row_key IS NULL означает, что ключи не записаны (TRUNCATE или
+        массовое изменение больше CHANGE_LOG_BULK_ROWS строк) — читателям нужна
+        полная перезагрузка, как и при since ниже границы очистки журнала.
+        """
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS row_changes (
+                change_id BIGSERIAL PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                txid BIGINT NOT NULL DEFAULT txid_current(),
+                row_key TEXT[],
+                changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            CREATE INDEX IF NOT EXISTS row_changes_table_txid_idx ON row_changes (table_name, txid);
+            CREATE INDEX IF NOT EXISTS row_changes_changed_at_idx ON row_changes (changed_at);
+            -- Граница очистки журнала: изменения с txid < pruned_below удалены
+            CREATE TABLE IF NOT EXISTS row_changes_horizon (
+                table_name TEXT PRIMARY KEY,
+                pruned_below BIGINT NOT NULL
+            );
+
+            CREATE OR REPLACE FUNCTION library_log_changes() RETURNS trigger AS $$
+            DECLARE
+                key_expr TEXT;
+                changed BIGINT := 0;
+                transition TEXT;
+            BEGIN
+                -- Первичный ключ читается из каталога: переименование столбцов не ломает триггер
+                SELECT string_agg(format('%I::text', a.attname), ', ' ORDER BY k.ord) INTO key_expr
+                FROM pg_index i
+                CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                WHERE i.indrelid = TG_RELID AND i.indisprimary;
+                IF TG_OP <> 'TRUNCATE' THEN
+                    EXECUTE 'SELECT count(*) FROM ' || CASE WHEN TG_OP = 'DELETE' THEN 'old_rows' ELSE 'new_rows' END
+                        INTO changed;
+                END IF;
+                IF TG_OP = 'TRUNCATE' OR key_expr IS NULL OR changed > {CHANGE_LOG_BULK_ROWS} THEN
+                    INSERT INTO row_changes (table_name) VALUES (TG_TABLE_NAME);
+                    RETURN NULL;
+                END IF;
+                transition := CASE TG_OP
+                    WHEN 'INSERT' THEN 'SELECT %2$s FROM new_rows'
+                    WHEN 'DELETE' THEN 'SELECT %2$s FROM old_rows'
+                    -- При изменении ключа прежний ключ тоже попадает в журнал (как удалённый)
+                    ELSE 'SELECT %2$s FROM new_rows UNION SELECT %2$s FROM old_rows' END;
+                EXECUTE format('INSERT INTO row_changes (table_name, row_key) SELECT %1$L, k FROM ('
+                               || transition || ') AS changed(k)', TG_TABLE_NAME, 'ARRAY[' || key_expr || ']');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        for table in SYNCED_TABLES:
+            if not self.table_exists(table):
+                self.logger.warning(f"Таблица {table} не найдена, журнал изменений для неё не ведётся")
+                continue
+            self.cursor.execute(sql.SQL("""
+                DROP TRIGGER IF EXISTS {insert} ON {table};
+                CREATE TRIGGER {insert} AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE library_log_changes();
+                DROP TRIGGER IF EXISTS {update} ON {table};
+                CREATE TRIGGER {update} AFTER UPDATE ON {table}
+                    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE library_log_changes();
+                DROP TRIGGER IF EXISTS {delete} ON {table};
+                CREATE TRIGGER {delete} AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE PROCEDURE library_log_changes();
+                DROP TRIGGER IF EXISTS {truncate} ON {table};
+                CREATE TRIGGER {truncate} AFTER TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE PROCEDURE library_log_changes();
+            """).format(table=sql.Identifier(table),
+                        **{operation: sql.Identifier(f"{table}_log_{operation}")
+                           for operation in ("insert", "update", "delete", "truncate")}))
+
     def initialize_database(self):
         """
         Инициализация схемы БД и заполнение тестовыми данными.
@@ -276,6 +666,27 @@ class DatabaseManager:
             self.logger.error(f"Ошибка добавления тестовых данных: {str(e)}")
             return False
 
+    def init_synthetic_data(self, issues=100000, seed=42, truncate=False, end_date=None, **sizes):
+        """
+        Заполнение БД синтетическими данными для нагрузочного тестирования.
+        Размеры авторов/книг/читателей по умолчанию выводятся из числа выдач.
+
+        Returns:
+            dict or None: Число загруженных строк по таблицам или None при ошибке
+        """
+        params = sizes_for_issues(issues)
+        params.update({key: value for key, value in sizes.items() if value})
+        generator = SyntheticDataGenerator(**params, seed=seed, end_date=end_date)
+        try:
+            counts = load_synthetic_data(self.connection, generator, truncate=truncate)
+            self.logger.info("Синтетические данные загружены: "
+                             + ", ".join(f"{table}={rows}" for table, rows in counts.items()))
+            return counts
+        except (psycopg2.Error, ValueError) as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка загрузки синтетических данных: {str(e)}")
+            return None
+
     def reset_database(self):
         """
         Сброс всей базы данных к начальному состоянию.
@@ -317,15 +728,29 @@ class DatabaseManager:
             bool: Успешность сброса
         """
         try:
-            # Удаление всех таблиц и типов
+            # Удаление всех таблиц и типов. Служебные таблицы удаляются первыми: CASCADE снял бы с них
+            # только внешние ключи, и миграции (CREATE TABLE IF NOT EXISTS) оставили бы старые строки
+            # без ограничений, ссылающиеся на id новых данных
             self.cursor.execute("""
+                DROP TABLE IF EXISTS row_changes_horizon CASCADE;
+                DROP TABLE IF EXISTS row_changes CASCADE;
+                DROP TABLE IF EXISTS report_runs CASCADE;
+                DROP TABLE IF EXISTS report_schedules CASCADE;
+                DROP TABLE IF EXISTS saved_queries CASCADE;
+                DROP TABLE IF EXISTS book_recommendations CASCADE;
+                DROP TABLE IF EXISTS holds CASCADE;
+                DROP TABLE IF EXISTS overdue_notifications CASCADE;
                 DROP TABLE IF EXISTS book_authors CASCADE;
                 DROP TABLE IF EXISTS authors CASCADE;
                 DROP TABLE IF EXISTS books CASCADE;
                 DROP TABLE IF EXISTS readers CASCADE;
                 DROP TABLE IF EXISTS issues CASCADE;
+                DROP TABLE IF EXISTS schema_migrations;
+                DEALLOCATE ALL;
             """)
             self.connection.commit()
+            self._prepared = {}
+            self.invalidate_catalog()
             self.logger.info("Схема БД успешно удалена")
 
             # Создание новой схемы
@@ -342,12 +767,7 @@ class DatabaseManager:
         Проверяет наличие таблицы в схеме public.
         """
         try:
-            self.cursor.execute("""
-                SELECT 1
-                FROM information_schema.tables
-                WHERE table_schema = 'public' AND table_name = %s
-                LIMIT 1
-            """, (table_name,))
+            self.cursor.execute(queries.TABLE_EXISTS, (table_name,))
             return self.cursor.fetchone() is not None
         except Exception as e:
             # На всякий случай снимем aborted
@@ -367,8 +787,7 @@ class DatabaseManager:
             if not self.table_exists("readers"):
                 self.logger.warning("Таблица readers не найдена (возможно, была переименована)")
                 return []
-            self.cursor.execute("SELECT * FROM readers ORDER BY reader_id")
-            return self.cursor.fetchall()
+            return self._read_rows(queries.SELECT_ALL["readers"])
         except psycopg2.Error as e:
             # Важно: снять состояние aborted
             if self.connection:
@@ -384,8 +803,7 @@ class DatabaseManager:
             if not self.table_exists("books"):
                 self.logger.warning("Таблица books не найдена (возможно, была переименована)")
                 return []
-            self.cursor.execute("SELECT * FROM books ORDER BY book_id")
-            return self.cursor.fetchall()
+            return self._read_rows(queries.SELECT_ALL["books"])
         except psycopg2.Error as e:
             if self.connection:
                 self.connection.rollback()
@@ -400,8 +818,7 @@ class DatabaseManager:
             if not self.table_exists("issues"):
                 self.logger.warning("Таблица issues не найдена (возможно, была переименована)")
                 return []
-            self.cursor.execute("SELECT * FROM issues ORDER BY issue_id")
-            return self.cursor.fetchall()
+            return self._read_rows(queries.SELECT_ALL["issues"])
         except psycopg2.Error as e:
             if self.connection:
                 self.connection.rollback()
@@ -416,8 +833,7 @@ class DatabaseManager:
             if not self.table_exists("book_authors"):
                 self.logger.warning("Таблица book_authors не найдена (возможно, была переименована)")
                 return []
-            self.cursor.execute("SELECT * FROM book_authors ORDER BY book_id, author_id")
-            return self.cursor.fetchall()
+            return self._read_rows(queries.SELECT_ALL["book_authors"])
         except psycopg2.Error as e:
             if self.connection:
                 self.connection.rollback()
@@ -432,8 +848,7 @@ class DatabaseManager:
             if not self.table_exists("authors"):
                 self.logger.warning("Таблица authors не найдена (возможно, была переименована)")
                 return []
-            self.cursor.execute("SELECT * FROM authors ORDER BY author_id")
-            return self.cursor.fetchall()
+            return self._read_rows(queries.SELECT_ALL["authors"])
         except psycopg2.Error as e:
             if self.connection:
                 self.connection.rollback()
@@ -443,34 +858,34 @@ class DatabaseManager:
     def add_book_author(self, book_id, author_id):
         """
         Добавление новой связи книга–автор.
+
+        Returns:
+            dict or None: Строка связи (уже существовавшая связь тоже возвращается) или None при ошибке
         """
         try:
-            self.cursor.execute("""
-                                INSERT INTO book_authors (book_id, author_id)
-                                VALUES (%s, %s) ON CONFLICT DO NOTHING
-                                """, (book_id, author_id))
+            self.cursor.execute(queries.INSERT_BOOK_AUTHOR, (book_id, author_id))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Добавлена связь: книга {book_id} — автор {author_id}")
-            return True
+            return dict(row) if row else {"book_id": book_id, "author_id": author_id}
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка добавления связи книга–автор: {str(e)}")
-            return False
+            return None
 
     def add_author(self, last_name, first_name, patronymic, birth_year, country):
         """
         Добавление нового автора в базу данных.
+
+        Returns:
+            dict or None: Добавленная строка (с author_id) или None при ошибке
         """
         try:
-            self.cursor.execute("""
-                INSERT INTO authors (last_name, first_name, patronymic, birth_year, country)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING author_id
-            """, (last_name, first_name, patronymic, birth_year, country))
-            author_id = self.cursor.fetchone()[0]
+            self.cursor.execute(queries.INSERT_AUTHOR, (last_name, first_name, patronymic, birth_year, country))
+            row = dict(self.cursor.fetchone())
             self.connection.commit()
-            self.logger.info(f"Добавлен автор с ID {author_id}")
-            return author_id
+            self.logger.info(f"Добавлен автор с ID {row['author_id']}")
+            return row
         except psycopg2.Error as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка добавления автора: {str(e)}")
@@ -488,17 +903,15 @@ class DatabaseManager:
             registration_date: Дата регистрации (строкой в формате YYYY-MM-DD)
 
         Returns:
-            int or None: ID добавленного читателя или None при ошибке
+            dict or None: Добавленная строка (с reader_id) или None при ошибке
         """
         try:
-            self.cursor.execute("""
-                                INSERT INTO readers (last_name, first_name, patronymic, ticket_number, registration_date)
-                                VALUES (%s, %s, %s, %s, %s) RETURNING reader_id
-                                """, (last_name, first_name, patronymic, ticket_number, registration_date))
-            reader_id = self.cursor.fetchone()[0]
+            self.cursor.execute(queries.INSERT_READER,
+                                (last_name, first_name, patronymic, ticket_number, registration_date))
+            row = dict(self.cursor.fetchone())
             self.connection.commit()
-            self.logger.info(f"Добавлен читатель с ID {reader_id}")
-            return reader_id
+            self.logger.info(f"Добавлен читатель с ID {row['reader_id']}")
+            return row
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка добавления читателя: {str(e)}")
@@ -516,23 +929,20 @@ class DatabaseManager:
             available_copies: Количество экземпляров
 
         Returns:
-            int or None: ID добавленной книги или None при ошибке
+            dict or None: Добавленная строка (с book_id) или None при ошибке
         """
         try:
-            self.cursor.execute("""
-                                INSERT INTO books (title, publication_year, genre, isbn, available_copies)
-                                VALUES (%s, %s, %s, %s, %s) RETURNING book_id
-                                """, (title, publication_year, genre, isbn, available_copies))
-            book_id = self.cursor.fetchone()[0]
+            self.cursor.execute(queries.INSERT_BOOK, (title, publication_year, genre, isbn, available_copies))
+            row = dict(self.cursor.fetchone())
             self.connection.commit()
-            self.logger.info(f"Добавлена книга с ID {book_id}")
-            return book_id
+            self.logger.info(f"Добавлена книга с ID {row['book_id']}")
+            return row
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка добавления книги: {str(e)}")
             return None
 
-    def add_issue(self, book_id, reader_id, issue_date, return_date):
+    def add_issue(self, book_id, reader_id, issue_date, return_date, due_date=None):
         """
         Добавление нового заказа (выдачи книги) в базу данных.
 
@@ -541,19 +951,17 @@ class DatabaseManager:
             reader_id: ID читателя
             issue_date: Дата выдачи (строкой в формате YYYY-MM-DD)
             return_date: Дата возврата (строкой в формате YYYY-MM-DD или None)
+            due_date: Срок возврата (None — через LOAN_PERIOD_DAYS дней после выдачи)
 
         Returns:
-            int or None: ID добавленного заказа или None при ошибке
+            dict or None: Добавленная строка (с issue_id) или None при ошибке
         """
         try:
-            self.cursor.execute("""
-                                INSERT INTO issues (book_id, reader_id, issue_date, return_date)
-                                VALUES (%s, %s, %s, %s) RETURNING issue_id
-                                """, (book_id, reader_id, issue_date, return_date))
-            issue_id = self.cursor.fetchone()[0]
+            self.cursor.execute(queries.INSERT_ISSUE, (book_id, reader_id, issue_date, return_date, due_date))
+            row = dict(self.cursor.fetchone())
             self.connection.commit()
-            self.logger.info(f"Добавлен заказ (выдача) с ID {issue_id}")
-            return issue_id
+            self.logger.info(f"Добавлен заказ (выдача) с ID {row['issue_id']}")
+            return row
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка добавления заказа: {str(e)}")
@@ -563,24 +971,43 @@ class DatabaseManager:
         """
         Обновление связи книга–автор.
         Меняет пару (old_book_id, old_author_id) на (new_book_id, new_author_id).
+
+        Returns:
+            tuple: (успех операции (bool), изменённая строка (dict) или сообщение об ошибке (str))
         """
         try:
-            self.cursor.execute("""
-                                UPDATE book_authors
-                                SET book_id   = %s,
-                                    author_id = %s
-                                WHERE book_id = %s
-                                  AND author_id = %s
-                                """, (new_book_id, new_author_id, old_book_id, old_author_id))
+            self.cursor.execute(queries.UPDATE_BOOK_AUTHOR, (new_book_id, new_author_id, old_book_id, old_author_id))
+            row = self.cursor.fetchone()
+            if not row:
+                self.connection.rollback()
+                self.logger.error(f"Связь {old_book_id}-{old_author_id} не найдена")
+                return False, "Связь не найдена"
             self.connection.commit()
             self.logger.info(f"Обновлена связь: {old_book_id}-{old_author_id} -> {new_book_id}-{new_author_id}")
-            return True, ""
+            return True, dict(row)
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка обновления связи книга–автор: {str(e)}")
             return False, str(e)
 
-    def update_issue(self, issue_id, book_id, reader_id, issue_date, return_date):
+    def _version_conflict(self, table, key_value, expected_version):
+        """
+        UPDATE с проверкой версии не нашёл строку: конфликт, если строка
+        существует, но её версия уже другая.
+        """
+        if expected_version is None:
+            return False
+        self.connection.rollback()
+        self.cursor.execute(queries.SELECT_VERSION[table], (key_value,))
+        row = self.cursor.fetchone()
+        self.connection.rollback()
+        if row is None:
+            return False
+        self.logger.warning(f"Конфликт версий: {table} {key_value} изменена (версия {row['version']}, "
+                            f"ожидалась {expected_version})")
+        return True
+
+    def update_issue(self, issue_id, book_id, reader_id, issue_date, return_date, expected_version=None):
         """
         Обновление данных заказа (выдачи книги).
 
@@ -590,34 +1017,32 @@ class DatabaseManager:
             reader_id: ID читателя
             issue_date: Дата выдачи (строкой в формате YYYY-MM-DD)
             return_date: Дата возврата (строкой в формате YYYY-MM-DD или None)
+            expected_version: Версия строки, которую видел пользователь; если строку
+                с тех пор изменили, обновление не выполняется (VERSION_CONFLICT_MESSAGE)
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), изменённая строка (dict) или сообщение об ошибке (str))
         """
+        query, key_params = queries.versioned_update(queries.UPDATE_ISSUE, issue_id, expected_version)
         try:
-            self.cursor.execute("""
-                                UPDATE issues
-                                SET book_id     = %s,
-                                    reader_id   = %s,
-                                    issue_date  = %s,
-                                    return_date = %s
-                                WHERE issue_id = %s RETURNING issue_id
-                                """, (book_id, reader_id, issue_date, return_date, issue_id))
-
-            updated_id = self.cursor.fetchone()
-            if not updated_id:
+            self.cursor.execute(query, (book_id, reader_id, issue_date, return_date) + key_params)
+
+            updated = self.cursor.fetchone()
+            if not updated:
+                if self._version_conflict("issues", issue_id, expected_version):
+                    return False, VERSION_CONFLICT_MESSAGE
                 self.logger.error(f"Заказ с ID {issue_id} не найден")
                 return False, "Заказ не найден"
 
             self.connection.commit()
             self.logger.info(f"Обновлен заказ с ID {issue_id}")
-            return True, ""
+            return True, dict(updated)
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка обновления заказа: {str(e)}")
             return False, str(e)
 
-    def update_reader(self, reader_id, last_name, first_name, patronymic, ticket_number, registration_date):
+    def update_reader(self, reader_id, last_name, first_name, patronymic, ticket_number, registration_date, expected_version=None):
         """
         Обновление данных читателя.
 
@@ -628,35 +1053,32 @@ class DatabaseManager:
             patronymic: Отчество
             ticket_number: Номер читательского билета
             registration_date: Дата регистрации (строкой в формате YYYY-MM-DD)
+            expected_version: Версия строки, которую видел пользователь; если строку
+                с тех пор изменили, обновление не выполняется (VERSION_CONFLICT_MESSAGE)
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), изменённая строка (dict) или сообщение об ошибке (str))
         """
+        query, key_params = queries.versioned_update(queries.UPDATE_READER, reader_id, expected_version)
         try:
-            self.cursor.execute("""
-                                UPDATE readers
-                                SET last_name         = %s,
-                                    first_name        = %s,
-                                    patronymic        = %s,
-                                    ticket_number     = %s,
-                                    registration_date = %s
-                                WHERE reader_id = %s RETURNING reader_id
-                                """, (last_name, first_name, patronymic, ticket_number, registration_date, reader_id))
-
-            updated_id = self.cursor.fetchone()
-            if not updated_id:
+            self.cursor.execute(query, (last_name, first_name, patronymic, ticket_number, registration_date) + key_params)
+
+            updated = self.cursor.fetchone()
+            if not updated:
+                if self._version_conflict("readers", reader_id, expected_version):
+                    return False, VERSION_CONFLICT_MESSAGE
                 self.logger.error(f"Читатель с ID {reader_id} не найден")
                 return False, "Читатель не найден"
 
             self.connection.commit()
             self.logger.info(f"Обновлен читатель с ID {reader_id}")
-            return True, ""
+            return True, dict(updated)
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка обновления читателя: {str(e)}")
             return False, str(e)
 
-    def update_book(self, book_id, title, publication_year, genre, isbn, available_copies):
+    def update_book(self, book_id, title, publication_year, genre, isbn, available_copies, expected_version=None):
         """
         Обновление данных книги.
 
@@ -667,29 +1089,26 @@ class DatabaseManager:
             genre: Жанр
             isbn: ISBN книги
             available_copies: Количество экземпляров
+            expected_version: Версия строки, которую видел пользователь; если строку
+                с тех пор изменили, обновление не выполняется (VERSION_CONFLICT_MESSAGE)
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), изменённая строка (dict) или сообщение об ошибке (str))
         """
+        query, key_params = queries.versioned_update(queries.UPDATE_BOOK, book_id, expected_version)
         try:
-            self.cursor.execute("""
-                                UPDATE books
-                                SET title            = %s,
-                                    publication_year = %s,
-                                    genre            = %s,
-                                    isbn             = %s,
-                                    available_copies = %s
-                                WHERE book_id = %s RETURNING book_id
-                                """, (title, publication_year, genre, isbn, available_copies, book_id))
-
-            updated_id = self.cursor.fetchone()
-            if not updated_id:
+            self.cursor.execute(query, (title, publication_year, genre, isbn, available_copies) + key_params)
+
+            updated = self.cursor.fetchone()
+            if not updated:
+                if self._version_conflict("books", book_id, expected_version):
+                    return False, VERSION_CONFLICT_MESSAGE
                 self.logger.error(f"Книга с ID {book_id} не найдена")
                 return False, "Книга не найдена"
 
             self.connection.commit()
             self.logger.info(f"Обновлена книга с ID {book_id}")
-            return True, ""
+            return True, dict(updated)
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка обновления книги: {str(e)}")
@@ -702,13 +1121,14 @@ class DatabaseManager:
             reader_id: ID читателя
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), удалённая строка (dict или None) или сообщение об ошибке (str))
         """
         try:
-            self.cursor.execute("DELETE FROM readers WHERE reader_id = %s", (reader_id,))
+            self.cursor.execute(queries.DELETE_ROW["readers"], (reader_id,))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Удален читатель с ID {reader_id}")
-            return True, ""
+            return True, dict(row) if row else None
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка удаления читателя: {str(e)}")
@@ -719,13 +1139,11 @@ class DatabaseManager:
         Удаление связи книга–автор по составному ключу.
         """
         try:
-            self.cursor.execute(
-                "DELETE FROM book_authors WHERE book_id = %s AND author_id = %s",
-                (book_id, author_id)
-            )
+            self.cursor.execute(queries.DELETE_ROW["book_authors"], (book_id, author_id))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Удалена связь книга {book_id} — автор {author_id}")
-            return True, ""
+            return True, dict(row) if row else None
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка удаления связи книга–автор: {str(e)}")
@@ -739,13 +1157,14 @@ class DatabaseManager:
             issue_id: ID заказа
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), удалённая строка (dict или None) или сообщение об ошибке (str))
         """
         try:
-            self.cursor.execute("DELETE FROM issues WHERE issue_id = %s", (issue_id,))
+            self.cursor.execute(queries.DELETE_ROW["issues"], (issue_id,))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Удален заказ с ID {issue_id}")
-            return True, ""
+            return True, dict(row) if row else None
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка удаления заказа: {str(e)}")
@@ -758,32 +1177,39 @@ class DatabaseManager:
             book_id: ID книги
 
         Returns:
-            tuple: (успех операции (bool), сообщение об ошибке (str))
+            tuple: (успех операции (bool), удалённая строка (dict или None) или сообщение об ошибке (str))
         """
         try:
-            self.cursor.execute("DELETE FROM books WHERE book_id = %s", (book_id,))
+            self.cursor.execute(queries.DELETE_ROW["books"], (book_id,))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Удалена книга с ID {book_id}")
-            return True, ""
+            return True, dict(row) if row else None
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка удаления книги: {str(e)}")
             return False, str(e)
 
-    def update_author(self, author_id, last_name, first_name, patronymic, birth_year, country):
+    def update_author(self, author_id, last_name, first_name, patronymic, birth_year, country, expected_version=None):
+        """
+        Обновление данных автора; expected_version — как в update_book.
+
+        Returns:
+            tuple: (успех операции (bool), изменённая строка (dict) или сообщение об ошибке (str))
+        """
+        query, key_params = queries.versioned_update(queries.UPDATE_AUTHOR, author_id, expected_version)
         try:
-            self.cursor.execute("""
-                                UPDATE authors
-                                SET last_name  = %s,
-                                    first_name = %s,
-                                    patronymic = %s,
-                                    birth_year = %s,
-                                    country    = %s
-                                WHERE author_id = %s
-                                """, (last_name, first_name, patronymic, birth_year, country, author_id))
+            self.cursor.execute(query, (last_name, first_name, patronymic, birth_year, country) + key_params)
+            updated = self.cursor.fetchone()
+            if not updated:
+                self.connection.rollback()
+                if self._version_conflict("authors", author_id, expected_version):
+                    return False, VERSION_CONFLICT_MESSAGE
+                self.logger.error(f"Автор с ID {author_id} не найден")
+                return False, "Автор не найден"
             self.connection.commit()
             self.logger.info(f"Обновлен автор с ID {author_id}")
-            return True, ""
+            return True, dict(updated)
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка обновления автора: {str(e)}")
@@ -791,10 +1217,11 @@ class DatabaseManager:
 
     def delete_author(self, author_id):
         try:
-            self.cursor.execute("DELETE FROM authors WHERE author_id = %s", (author_id,))
+            self.cursor.execute(queries.DELETE_ROW["authors"], (author_id,))
+            row = self.cursor.fetchone()
             self.connection.commit()
             self.logger.info(f"Удален аавтор с ID {author_id}")
-            return True, ""
+            return True, dict(row) if row else None
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Ошибка удаления автора: {str(e)}")
@@ -802,13 +1229,46 @@ class DatabaseManager:
 
     # ==== ДОБАВЛЕНО: методы для построителя запросов и служебные ====
 
-    def execute_custom_request(self, sql_query: str):
+    def execute_custom_request(self, sql_query, params=None, prepare=False, replica=False,
+                               timeout_ms=None, max_rows=None, max_bytes=None, compact=False):
         """
         Выполнить произвольный SELECT-запрос и вернуть список словарей.
         В случае ошибки делает rollback, чтобы снять состояние aborted.
+
+        Args:
+            sql_query: Текст запроса или композиция psycopg2.sql
+            params: Параметры запроса (плейсхолдеры %s)
+            prepare: Выполнить через серверный PREPARE/EXECUTE с кэшированием плана
+            replica: Разрешить выполнение на реплике (отчёты); без ограничений на реплике
+                запрос не готовится
+            timeout_ms, max_rows, max_bytes: Ограничения времени и объёма результата.
+                Если задано хотя бы одно, запрос выполняется через core.guards на отдельном
+                соединении или реплике серверным курсором (prepare учитывается, только если
+                max_rows и max_bytes не заданы), его можно прервать cancel_query(), а результат —
+                QueryResult с отметкой truncated (всегда в компактном виде).
+            compact: Вернуть core.rows.ResultSet (кортежи и общий индекс столбцов)
+                вместо списка словарей; строки по-прежнему читаются как row["column"]
         """
+        if timeout_ms is not None or max_rows is not None or max_bytes is not None:
+            return self._execute_guarded(sql_query, params, prepare, replica, timeout_ms, max_rows, max_bytes)
         try:
-            self.cursor.execute(sql_query)
+            if replica and self.replicas is not None:
+                text = query_text(sql_query, self.connection)
+                if compact:
+                    rows = self.replicas.run(lambda r: self._fetch_result(r.cursor, text, params),
+                                             self.connection.last_lsn)
+                    if rows is not None:
+                        return rows
+                else:
+                    rows = self.replicas.fetch(text, params, self.connection.last_lsn)
+                    if rows is not None:
+                        return [dict(r) for r in rows]
+            if prepare and params is not None:
+                self._execute_prepared(sql_query, params)
+            else:
+                self.cursor.execute(sql_query, params)
+            if compact:
+                return ResultSet.from_cursor(self.cursor) if self.cursor.description else ResultSet()
             # Если запрос не возвращает данных (не SELECT) — description может быть None
             if self.cursor.description:
                 rows = self.cursor.fetchall()
@@ -824,56 +1284,999 @@ class DatabaseManager:
             self.logger.error(f"Ошибка выполнения запроса: {e}")
             raise
 
-    def get_table_columns(self, table_name: str):
+    @staticmethod
+    def _fetch_result(cursor, query, params):
+        """Выполнение запроса и чтение результата в ResultSet (строки переводятся в кортежи по одной)."""
+        cursor.execute(query, params)
+        return ResultSet.from_cursor(cursor) if cursor.description else ResultSet()
+
+    def _execute_guarded(self, sql_query, params, prepare, replica, timeout_ms, max_rows, max_bytes):
         """
-        Получить список колонок таблицы (в порядке ordinal_position).
+        Выполнение произвольного запроса с ограничениями (см. core.guards).
+        Может вызываться из рабочего потока: основное соединение не используется.
+        """
+        with self._guarded_lock:
+            try:
+                rows = None
+                if replica and self._guarded_replicas is not None:
+                    rows = self._guarded_replicas.run(
+                        lambda r: self.query_guard.fetch(r.connection, sql_query, params,
+                                                         timeout_ms, max_rows, max_bytes, prepare),
+                        self.connection.last_lsn)
+                if rows is None:
+                    if self._guarded_connection is None or self._guarded_connection.closed:
+                        if self._guarded_connection is not None:
+                            self._close_connection(self._guarded_connection)
+                        self._guarded_connection = self._open_connection("library_adhoc", InstrumentedCursor)
+                    rows = self.query_guard.fetch(self._guarded_connection, sql_query, params,
+                                                  timeout_ms, max_rows, max_bytes, prepare)
+                if rows.truncated:
+                    self.logger.warning(f"Результат запроса обрезан: {rows.truncated}, строк: {len(rows)}")
+                return rows
+            except QueryCancelled:
+                self.logger.info("Запрос отменён пользователем")
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка выполнения запроса: {e}")
+                raise
+
+    def cancel_query(self):
+        """
+        Отмена запроса, выполняющегося через execute_custom_request с ограничениями
+        (вызывается из потока интерфейса).
+
+        Returns:
+            bool: Был ли выполняющийся запрос
+        """
+        if self.query_guard.cancel():
+            self.logger.info("Отправлен запрос на отмену выполняющегося запроса")
+            return True
+        return False
+
+    def _execute_prepared(self, sql_query, params):
+        """
+        Выполнение запроса через именованный подготовленный оператор.
+        Плейсхолдеры %s заменяются на $1..$n; оператор готовится один раз
+        на соединение, далее выполняется только EXECUTE с новыми параметрами.
+        """
+        name = self._prepare_statement(sql_query)
+        if params:
+            self.cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            self.cursor.execute(f"EXECUTE {name}")
+
+    def _prepare_statement(self, sql_query):
+        """PREPARE запроса (если ещё не подготовлен на этом соединении); возвращает имя оператора."""
+        if isinstance(sql_query, sql.Composable):
+            sql_query = sql_query.as_string(self.connection)
+        name = self._prepared.get(sql_query)
+        if name is None:
+            if len(self._prepared) >= PREPARED_CACHE_SIZE:
+                oldest_query = next(iter(self._prepared))
+                self.cursor.execute(f"DEALLOCATE {self._prepared.pop(oldest_query)}")
+            name = f"library_stmt_{next(_statement_ids)}"
+            self.cursor.execute(f"PREPARE {name} AS {queries.numbered(sql_query)}")
+            self._prepared[sql_query] = name
+        return name
+
+    def explain_request(self, sql_query, params=None):
+        """
+        Выполнить EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) для запроса.
+        ANALYZE действительно выполняет запрос, поэтому транзакция всегда откатывается.
+
+        Returns:
+            PlanAnalysis: Дерево плана с подсказками по индексам
         """
         try:
-            self.cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
-            return [row['column_name'] for row in self.cursor.fetchall()]
+            if isinstance(sql_query, sql.Composable):
+                sql_query = sql_query.as_string(self.connection)
+            self.cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql_query, params)
+            plan = self.cursor.fetchone()[0]
+            analysis = PlanAnalysis(plan)
+            relations = analysis.relations()
+            if relations:
+                self.cursor.execute("""
+                    SELECT relname, reltuples::bigint AS reltuples
+                    FROM pg_class
+                    WHERE relkind = 'r' AND relname = ANY(%s)
+                """, (relations,))
+                analysis = PlanAnalysis(plan, {row['relname']: row['reltuples'] for row in self.cursor.fetchall()})
+            self.connection.rollback()
+            self.logger.info(f"Получен план запроса: {analysis.execution_ms:.1f} мс")
+            return analysis
         except Exception as e:
-            self.logger.error(f"Ошибка получения списка колонок для {table_name}: {e}")
-            return []
+            try:
+                if self.connection:
+                    self.connection.rollback()
+            except Exception:
+                pass
+            self.logger.error(f"Ошибка получения плана запроса: {e}")
+            raise
+
+    def estimate_row_count(self, sql_query, params=None):
+        """
+        Оценка числа строк результата по плану (EXPLAIN без ANALYZE).
+        Запрос не выполняется: оценка строится по статистике планировщика
+        (pg_class.reltuples и гистограммы pg_statistic), COUNT(*) не нужен.
+
+        Returns:
+            int or None: Ожидаемое число строк или None при ошибке
+        """
+        try:
+            if isinstance(sql_query, sql.Composable):
+                sql_query = sql_query.as_string(self.connection)
+            self.cursor.execute("EXPLAIN (FORMAT JSON) " + sql_query, params)
+            plan = self.cursor.fetchone()[0]
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            try:
+                if self.connection:
+                    self.connection.rollback()
+            except Exception:
+                pass
+            self.logger.error(f"Ошибка оценки числа строк: {e}")
+            return None
+
+    # ==== Каталог схемы ====
+
+    def get_catalog(self):
+        """
+        Каталог схемы (таблицы, столбцы, ключи). Загружается одним обращением
+        и кэшируется до изменения структуры (invalidate_catalog).
+        """
+        if self.catalog is None:
+            try:
+                self.catalog = Catalog.fetch(self.cursor)
+                self.connection.rollback()
+            except Exception as e:
+                try:
+                    if self.connection:
+                        self.connection.rollback()
+                except Exception:
+                    pass
+                self.logger.error(f"Ошибка загрузки каталога схемы: {e}")
+                return Catalog({}, {}, [])
+        return self.catalog
+
+    def invalidate_catalog(self):
+        """
+        Сброс кэша каталога, предзагруженных страниц и подготовленных операторов
+        (после изменения структуры): план SELECT * после ALTER TABLE выполнялся бы
+        с ошибкой "cached plan must not change result type".
+        """
+        self.catalog = None
+        self._prefetched_pages = {}
+        self._sync_keys = {}
+        self.query_guard.forget_statements()
+        if self._prepared and self.connection is not None and not self.connection.closed:
+            try:
+                self.cursor.execute("DEALLOCATE ALL")
+                # DEALLOCATE не откатывается: транзакция закрывается, чтобы не держать её открытой
+                self.connection.rollback()
+            except psycopg2.Error as e:
+                self.connection.rollback()
+                self.logger.error(f"Ошибка сброса подготовленных операторов: {str(e)}")
+            self._prepared = {}
+
+    def apply_prefetch(self, catalog=None, pages=None, connection_pool=None):
+        """
+        Приём результатов фоновой предзагрузки (core.prefetch).
+
+        Args:
+            catalog: Catalog или None
+            pages: Словарь {таблица: (размер страницы, строки, снимок транзакций)}
+            connection_pool: Пул прогретых соединений; переходит во владение
+                DatabaseManager (закрывается в disconnect)
+        """
+        if catalog is not None and self.catalog is None:
+            self.catalog = catalog
+        self._prefetched_pages.update(pages or {})
+        if connection_pool is not None:
+            if self._pool is None and self.connection is not None and not self.connection.closed:
+                self._pool = connection_pool
+            else:
+                connection_pool.closeall()
+
+    def _open_connection(self, application_name, cursor_factory):
+        """
+        Отдельное соединение для рабочего потока: из пула предзагрузки, если он
+        передан, иначе новое. Настройки сеанса предзагрузки (только чтение,
+        REPEATABLE READ) сбрасываются.
+        """
+        if self._pool is not None:
+            connection = None
+            try:
+                connection = self._pool.getconn()
+                connection.rollback()
+                connection.set_session(readonly="DEFAULT", isolation_level="DEFAULT")
+                connection.cursor_factory = cursor_factory
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT set_config('application_name', %s, false)", (application_name,))
+                connection.commit()
+                return connection
+            except (psycopg2.Error, pool.PoolError) as e:
+                if connection is not None:
+                    self._close_connection(connection)
+                self.logger.warning(f"Соединение из пула недоступно, открывается новое: {str(e)}")
+        return psycopg2.connect(**self.connection_params, connect_timeout=self.connect_timeout,
+                                application_name=application_name, cursor_factory=cursor_factory)
+
+    def _close_connection(self, connection):
+        """Закрытие отдельного соединения; соединение из пула возвращается в пул закрытым."""
+        if self._pool is not None:
+            try:
+                self._pool.putconn(connection, close=True)
+                return
+            except pool.PoolError:
+                pass
+        connection.close()
+
+    def get_table_columns(self, table_name: str):
+        """
+        Получить список колонок таблицы (в порядке ordinal_position).
+        """
+        return self.get_catalog().column_names(table_name)
 
     def get_numeric_columns(self, table_name: str):
         """
         Получить список числовых колонок таблицы (для SUM/AVG/MAX/MIN).
         """
+        return self.get_catalog().numeric_columns(table_name)
+
+    def get_tables(self):
+        """
+        Возвращает список всех пользовательских таблиц (public schema).
+        """
+        return self.get_catalog().tables
+
+    def get_foreign_keys(self):
+        """
+        Внешние ключи таблиц public-схемы (для планировщика соединений).
+
+        Returns:
+            list: Словари name, table, columns, ref_table, ref_columns
+        """
+        return self.get_catalog().foreign_keys
+
+    def get_transaction_snapshot(self):
+        """Текущий снимок транзакций txid_current_snapshot() в виде текста."""
+        self.cursor.execute(SNAPSHOT_SQL)
+        return self.cursor.fetchone()["snapshot"]
+
+    def get_table_page(self, table, limit=TABLE_PAGE_SIZE, after=None, offset=0):
+        """
+        Страница строк таблицы в порядке первичного ключа.
+        Первая страница берётся из предзагрузки, если с момента её чтения
+        в базе не начиналось и не фиксировалось ни одной пишущей транзакции.
+
+        Args:
+            after: Значения первичного ключа последней строки предыдущей страницы
+            offset: Смещение для таблиц без первичного ключа
+
+        Returns:
+            list: Строки-словари
+        """
+        catalog = self.get_catalog()
+        if table not in catalog.columns:
+            raise ValueError(f"Таблица {table} не найдена")
+        prefetched = self._prefetched_pages.pop(table, None)
+        if prefetched is not None and after is None and not offset:
+            page_size, rows, snapshot = prefetched
+            if page_size == limit and snapshot == self.get_transaction_snapshot():
+                self.connection.rollback()
+                self.logger.info(f"Первая страница {table} взята из предзагрузки")
+                return rows
+        query, params = table_page_query(catalog, table, limit, after, offset)
+        rows = self.execute_custom_request(query, params, prepare=True)
+        # Чтение закончено: соединение не остаётся "idle in transaction" с блокировкой таблицы
+        self.connection.rollback()
+        return rows
+
+    # ==== Дифференциальная синхронизация ====
+
+    def get_sync_watermark(self):
+        """
+        Водяной знак для get_changes: txid самой старой незавершённой
+        транзакции (все транзакции с меньшим txid уже завершены).
+        """
+        if self.replicas is None:
+            self.cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot()) AS watermark")
+            watermark = self.cursor.fetchone()["watermark"]
+        else:
+            # Строки, читаемые после водяного знака, должны включать всё зафиксированное
+            # до него, поэтому реплика должна догнать эту позицию WAL
+            self.cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot()) AS watermark, "
+                                "pg_current_wal_insert_lsn()::text AS lsn")
+            row = self.cursor.fetchone()
+            watermark = row["watermark"]
+            self.connection.note_lsn(parse_lsn(row["lsn"]))
+        self.connection.rollback()
+        return watermark
+
+    def get_changes(self, table, since):
+        """
+        Строки таблицы, добавленные или изменённые транзакциями с txid >= since,
+        и ключи удалённых строк — по журналу row_changes (индекс по table_name, txid).
+        Выполняется на отдельном соединении, поэтому может вызываться из рабочего потока.
+
+        Returns:
+            dict or None: rows, deleted (ключи кортежами), watermark (знак для следующего
+                вызова); None — нужна полная перезагрузка (нет первичного ключа, TRUNCATE,
+                массовое изменение или журнал уже очищен дальше since)
+        """
+        with self._sync_lock:
+            connection = self._sync_connection
+            try:
+                if connection is None or connection.closed:
+                    if connection is not None:
+                        self._close_connection(connection)
+                    connection = self._sync_connection = self._open_connection("library_sync",
+                                                                               InstrumentedDictCursor)
+                with connection.cursor() as cursor:
+                    key = self._sync_key_columns(cursor, table)
+                    if not key:
+                        return None
+                    cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot()) AS watermark")
+                    watermark = cursor.fetchone()["watermark"]
+                    cursor.execute("SELECT pruned_below FROM row_changes_horizon WHERE table_name = %s", (table,))
+                    horizon = cursor.fetchone()
+                    if horizon is not None and since < horizon["pruned_below"]:
+                        return None
+                    # Ключ в журнале хранится текстом и приводится к типу столбца, чтобы
+                    # соединение шло по индексу первичного ключа
+                    condition = sql.SQL(" AND ").join(
+                        sql.SQL("t.{} = c.row_key[{}]::{}").format(sql.Identifier(column), sql.Literal(i),
+                                                                  sql.SQL(column_type))
+                        for i, (column, column_type) in enumerate(key, 1))
+                    cursor.execute(sql.SQL("""
+                        WITH c AS (
+                            SELECT DISTINCT row_key FROM row_changes WHERE table_name = %s AND txid >= %s
+                        )
+                        SELECT c.row_key AS library_row_key, t.* FROM c LEFT JOIN {} t ON {}
+                    """).format(sql.Identifier(table), condition), (table, since))
+                    rows, deleted = [], []
+                    for change in cursor.fetchall():
+                        row = dict(change)
+                        row_key = row.pop("library_row_key")
+                        if row_key is None:
+                            return None
+                        if row[key[0][0]] is None:
+                            deleted.append(tuple(self._cast_key(value, column_type)
+                                                 for value, (_, column_type) in zip(row_key, key)))
+                        else:
+                            rows.append(row)
+                return {"rows": rows, "deleted": deleted, "watermark": watermark}
+            finally:
+                if connection is not None and not connection.closed:
+                    connection.rollback()
+
+    def _sync_key_columns(self, cursor, table):
+        """Столбцы и типы первичного ключа (кэшируются до invalidate_catalog)."""
+        if table not in self._sync_keys:
+            cursor.execute("""
+                SELECT a.attname AS column_name, format_type(a.atttypid, a.atttypmod) AS column_type
+                FROM pg_index i
+                CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                WHERE i.indrelid = to_regclass(%s) AND i.indisprimary
+                ORDER BY k.ord
+            """, (sql.Identifier(table).as_string(cursor),))
+            self._sync_keys[table] = [(row["column_name"], row["column_type"]) for row in cursor.fetchall()]
+        return self._sync_keys[table]
+
+    @staticmethod
+    def _cast_key(value, column_type):
+        """Значение ключа из журнала (текст) в тип столбца для сравнения с ключами диалога."""
+        if column_type in ("integer", "bigint", "smallint"):
+            return int(value)
+        return value
+
+    def prune_change_log(self, retention_hours=CHANGE_LOG_RETENTION_HOURS):
+        """
+        Удаление записей журнала изменений старше retention_hours. Граница очистки
+        запоминается: get_changes с более старым знаком требует полной перезагрузки.
+
+        Returns:
+            int or None: Число удалённых записей или None при ошибке
+        """
         try:
             self.cursor.execute("""
-                SELECT column_name, data_type
-                FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = %s
-            """, (table_name,))
-            numeric_types = {
-                'smallint', 'integer', 'bigint',
-                'decimal', 'numeric', 'real', 'double precision'
-            }
-            result = []
-            for row in self.cursor.fetchall():
-                if row['data_type'] in numeric_types:
-                    result.append(row['column_name'])
-            return result
-        except Exception as e:
-            self.logger.error(f"Ошибка получения числовых колонок для {table_name}: {e}")
+                WITH pruned AS (
+                    DELETE FROM row_changes WHERE changed_at < now() - make_interval(hours => %s)
+                    RETURNING table_name, txid
+                ), horizon AS (
+                    INSERT INTO row_changes_horizon (table_name, pruned_below)
+                    SELECT table_name, max(txid) + 1 FROM pruned GROUP BY table_name
+                    ON CONFLICT (table_name) DO UPDATE
+                        SET pruned_below = GREATEST(row_changes_horizon.pruned_below, EXCLUDED.pruned_below)
+                )
+                SELECT count(*) AS pruned FROM pruned
+            """, (retention_hours,))
+            pruned = self.cursor.fetchone()["pruned"]
+            self.connection.commit()
+            if pruned:
+                self.logger.info(f"Журнал изменений очищен: удалено записей {pruned}")
+            return pruned
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка очистки журнала изменений: {str(e)}")
+            return None
+
+    def get_rows_changed_since(self, table, since):
+        """
+        Строки таблицы с updated_at >= since (по индексу {table}_updated_at_idx).
+        updated_at — время начала изменившей транзакции, поэтому при
+        параллельной записи since стоит брать с запасом; для точной
+        синхронизации используется get_changes.
+        """
+        if "updated_at" not in self.get_catalog().column_names(table):
+            raise ValueError(f"У таблицы {table} нет столбца updated_at")
+        rows = self.execute_custom_request(
+            sql.SQL("SELECT * FROM {} WHERE updated_at >= %s ORDER BY updated_at").format(sql.Identifier(table)),
+            (since,), prepare=True)
+        self.connection.rollback()
+        return rows
+
+    def get_table_keys(self, table):
+        """Множество значений первичного ключа (кортежами) всех строк таблицы."""
+        key = self.get_catalog().primary_keys.get(table)
+        if not key:
+            raise ValueError(f"У таблицы {table} нет первичного ключа")
+        rows = self.execute_custom_request(sql.SQL("SELECT {} FROM {}").format(
+            sql.SQL(", ").join(sql.Identifier(column) for column in key), sql.Identifier(table)))
+        self.connection.rollback()
+        return {tuple(row[column] for column in key) for row in rows}
+
+    # ==== Выдача, возврат и поиск ====
+
+    def get_row(self, table, key):
+        """
+        Строка таблицы по значению первичного ключа.
+
+        Args:
+            key: Значение ключа или кортеж значений составного ключа
+
+        Returns:
+            dict or None: Строка или None, если не найдена
+        """
+        columns = self.get_catalog().primary_keys.get(table)
+        if not columns:
+            raise ValueError(f"У таблицы {table} нет первичного ключа")
+        values = key if isinstance(key, (tuple, list)) else (key,)
+        condition = sql.SQL(" AND ").join(sql.SQL("{} = %s").format(sql.Identifier(c)) for c in columns)
+        rows = self.execute_custom_request(
+            sql.SQL("SELECT * FROM {} WHERE {}").format(sql.Identifier(table), condition),
+            tuple(values), prepare=True)
+        self.connection.rollback()
+        return rows[0] if rows else None
+
+    def get_rows(self, table, keys):
+        """
+        Строки таблицы с одностолбцовым ключом по списку значений ключа одним запросом.
+
+        Returns:
+            list: Найденные строки в порядке ключа
+        """
+        if table not in queries.SELECT_ROWS:
+            raise ValueError(f"Пакетная выборка для таблицы {table} не поддерживается")
+        rows = self.execute_custom_request(queries.SELECT_ROWS[table], (list(keys),), prepare=True)
+        self.connection.rollback()
+        return rows
+
+    def search_books(self, text, limit=50, after=None):
+        """
+        Поиск книг по подстроке названия, ISBN или фамилии автора (без учёта регистра).
+
+        Args:
+            text: Искомая подстрока
+            limit: Максимальное число строк
+            after: book_id последней строки предыдущей страницы
+
+        Returns:
+            list: Строки books в порядке book_id
+        """
+        pattern = queries.like_pattern(text)
+        rows = self.execute_custom_request(
+            queries.SEARCH_BOOKS, (after if after is not None else 0, pattern, pattern, pattern, limit), prepare=True)
+        self.connection.rollback()
+        return rows
+
+    def checkout_book(self, book_id, reader_id, issue_date=None):
+        """
+        Выдача книги читателю: в одной транзакции уменьшает available_copies
+        (только если есть свободный экземпляр) и добавляет заказ.
+
+        Returns:
+            tuple: (успех операции (bool), добавленный заказ (dict) или сообщение об ошибке (str))
+        """
+        try:
+            # Экземпляр, отложенный по брони этого читателя, уже снят с available_copies
+            self.cursor.execute(queries.CHECKOUT_FULFIL_HOLD, (book_id, reader_id))
+            if not self.cursor.fetchone():
+                self.cursor.execute(queries.CHECKOUT_TAKE_COPY, (book_id,))
+                if not self.cursor.fetchone():
+                    self.connection.rollback()
+                    exists = self.get_row("books", book_id) is not None
+                    return False, "Нет свободных экземпляров" if exists else "Книга не найдена"
+            self.cursor.execute(queries.CHECKOUT_ADD_ISSUE, (book_id, reader_id, issue_date))
+            row = dict(self.cursor.fetchone())
+            self.connection.commit()
+            self.logger.info(f"Книга {book_id} выдана читателю {reader_id}, заказ {row['issue_id']}")
+            return True, row
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка выдачи книги: {str(e)}")
+            return False, str(e)
+
+    def return_book(self, issue_id, return_date=None):
+        """
+        Возврат книги: проставляет дату возврата незакрытому заказу и отдаёт
+        экземпляр первой брони в очереди, а если очереди нет — возвращает его
+        в available_copies.
+
+        Returns:
+            tuple: (успех операции (bool), закрытый заказ (dict) или сообщение об ошибке (str))
+        """
+        try:
+            self.cursor.execute(queries.RETURN_CLOSE_ISSUE, (return_date, issue_id))
+            row = self.cursor.fetchone()
+            if not row:
+                self.connection.rollback()
+                exists = self.get_row("issues", issue_id) is not None
+                return False, "Книга по заказу уже возвращена" if exists else "Заказ не найден"
+            row = dict(row)
+            hold = self._release_copy(row["book_id"])
+            self.connection.commit()
+            self.logger.info(f"Возвращена книга {row['book_id']} по заказу {issue_id}")
+            if hold:
+                self.logger.info(f"Экземпляр книги {row['book_id']} отложен по брони {hold['hold_id']} "
+                                 f"для читателя {hold['reader_id']}")
+            return True, row
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка возврата книги: {str(e)}")
+            return False, str(e)
+
+    # ==== Бронирование ====
+
+    def _release_copy(self, book_id):
+        """
+        Освободившийся экземпляр (в текущей транзакции): первой ожидающей брони
+        или в available_copies. Возвращает бронь, получившую экземпляр, или None.
+        """
+        self.cursor.execute(queries.RELEASE_COPY, (book_id, HOLD_PICKUP_DAYS, book_id))
+        hold = self.cursor.fetchone()
+        return dict(hold) if hold else None
+
+    def place_hold(self, book_id, reader_id):
+        """
+        Постановка читателя в очередь на книгу, у которой нет свободных экземпляров.
+
+        Returns:
+            tuple: (успех операции (bool), бронь (dict) или сообщение об ошибке (str))
+        """
+        try:
+            self.cursor.execute(queries.INSERT_HOLD, (reader_id, book_id))
+            row = self.cursor.fetchone()
+            if not row:
+                self.connection.rollback()
+                if self.get_row("books", book_id) is None:
+                    return False, "Книга не найдена"
+                return False, "Есть свободные экземпляры: книгу можно выдать сразу"
+            row = dict(row)
+            self.connection.commit()
+            self.logger.info(f"Читатель {reader_id} поставлен в очередь на книгу {book_id}, бронь {row['hold_id']}")
+            return True, row
+        except psycopg2.errors.UniqueViolation:
+            self.connection.rollback()
+            return False, "Читатель уже стоит в очереди на эту книгу"
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка бронирования книги: {str(e)}")
+            return False, str(e)
+
+    def cancel_hold(self, hold_id):
+        """
+        Отмена активной брони; отложенный по ней экземпляр переходит
+        следующему в очереди или возвращается в available_copies.
+
+        Returns:
+            tuple: (успех операции (bool), отменённая бронь (dict) или сообщение об ошибке (str))
+        """
+        try:
+            self.cursor.execute(queries.CANCEL_HOLD, (hold_id,))
+            row = self.cursor.fetchone()
+            if not row:
+                self.connection.rollback()
+                return False, "Активная бронь не найдена"
+            row = dict(row)
+            if row.pop("previous_status") == "ready":
+                self._release_copy(row["book_id"])
+            self.connection.commit()
+            self.logger.info(f"Бронь {hold_id} отменена")
+            return True, row
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка отмены брони: {str(e)}")
+            return False, str(e)
+
+    def expire_holds(self, chunk_size=HOLD_EXPIRE_CHUNK_SIZE):
+        """
+        Снятие отложенных броней, которые не забрали до pickup_until, порциями
+        по chunk_size; экземпляры переходят следующим в очереди. Брони,
+        заблокированные другими сеансами, пропускаются до следующего запуска.
+
+        Returns:
+            int or None: Число снятых броней или None при ошибке
+        """
+        expired = 0
+        try:
+            while True:
+                self.cursor.execute(queries.EXPIRE_HOLDS, (chunk_size,))
+                rows = self.cursor.fetchall()
+                for row in rows:
+                    self._release_copy(row["book_id"])
+                self.connection.commit()
+                expired += len(rows)
+                if len(rows) < chunk_size:
+                    break
+            if expired:
+                self.logger.info(f"Снято просроченных броней: {expired}")
+            return expired
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка снятия просроченных броней: {str(e)}")
+            return None
+
+    def get_holds(self, book_id=None, reader_id=None):
+        """
+        Активные брони (в очереди и отложенные) с названием книги,
+        данными читателя и местом в очереди (position, у ожидающих).
+
+        Returns:
+            list: Строки броней; пустой список при ошибке
+        """
+        try:
+            self.cursor.execute(queries.SELECT_ACTIVE_HOLDS, (book_id, book_id, reader_id, reader_id))
+            rows = [dict(r) for r in self.cursor.fetchall()]
+            self.connection.rollback()
+            return rows
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка получения броней: {str(e)}")
             return []
-    def get_tables(self):
+
+    # ==== Профиль читателя ====
+
+    def get_reader_history(self, reader_id, limit=TABLE_PAGE_SIZE, before=None):
         """
-        Возвращает список всех пользовательских таблиц (public schema).
+        Страница истории выдач читателя, новые сначала.
+
+        Args:
+            limit: Число строк страницы
+            before: (issue_date, issue_id) последней строки предыдущей страницы
+
+        Returns:
+            list: Выдачи с названием, жанром и годом книги
         """
+        if before is None:
+            query, params = queries.READER_HISTORY_FIRST_PAGE, (reader_id, limit)
+        else:
+            query, params = queries.READER_HISTORY_NEXT_PAGE, (reader_id, before[0], before[1], limit)
+        rows = self.execute_custom_request(query, params, prepare=True, replica=True)
+        self.connection.rollback()
+        return rows
+
+    def get_reader_profile(self, reader_id, history_limit=20, recommendations_limit=10):
+        """
+        Профиль читателя: данные, сводка по выдачам, последние выдачи и рекомендации.
+
+        Returns:
+            dict or None: Профиль или None, если читатель не найден
+        """
+        reader = self.get_row("readers", reader_id)
+        if reader is None:
+            return None
+        stats = self.execute_custom_request(queries.READER_STATS, (reader_id,), prepare=True, replica=True)
+        self.connection.rollback()
+        return {
+            "reader": reader,
+            "stats": stats[0],
+            "history": self.get_reader_history(reader_id, history_limit),
+            "recommendations": self.get_reader_recommendations(reader_id, recommendations_limit),
+        }
+
+    def get_book_recommendations(self, book_id, limit=10):
+        """Книги, которые чаще всего брали читатели этой книги (из book_recommendations)."""
+        rows = self.execute_custom_request(queries.BOOK_RECOMMENDATIONS, (book_id, limit), prepare=True,
+                                           replica=True)
+        self.connection.rollback()
+        return rows
+
+    def get_reader_recommendations(self, reader_id, limit=10):
+        """Рекомендации читателю по книгам его истории, кроме уже взятых."""
+        rows = self.execute_custom_request(queries.READER_RECOMMENDATIONS, (reader_id, limit), prepare=True,
+                                           replica=True)
+        self.connection.rollback()
+        return rows
+
+    # ==== Просроченные выдачи ====
+
+    def get_overdue_issues(self, as_of=None, limit=TABLE_PAGE_SIZE, after=None):
+        """
+        Страница просроченных выдач (не возвращены, срок раньше as_of)
+        в порядке (due_date, issue_id) с названием книги и данными читателя.
+
+        Args:
+            as_of: Дата проверки (None — сегодня)
+            limit: Число строк страницы
+            after: (due_date, issue_id) последней строки предыдущей страницы
+
+        Returns:
+            list: Строки с полем days_overdue
+        """
+        if after is None:
+            query, params = queries.OVERDUE_FIRST_PAGE, (as_of, as_of, limit)
+        else:
+            query, params = queries.OVERDUE_NEXT_PAGE, (as_of, as_of, after[0], after[1], limit)
+        rows = self.execute_custom_request(query, params, prepare=True)
+        self.connection.rollback()
+        return rows
+
+    def count_overdue_issues(self, as_of=None):
+        """Число просроченных выдач на дату as_of (None — сегодня) либо None при ошибке."""
+        try:
+            self.cursor.execute(queries.COUNT_OVERDUE, (as_of,))
+            count = self.cursor.fetchone()["overdue"]
+            self.connection.rollback()
+            return count
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка подсчёта просроченных выдач: {str(e)}")
+            return None
+
+    def create_overdue_notifications(self, as_of=None, chunk_size=OVERDUE_CHUNK_SIZE):
+        """
+        Создание уведомлений о просрочке порциями по chunk_size выдач, каждая
+        порция — отдельная транзакция. Для выдачи с тем же сроком уведомление
+        создаётся один раз, поэтому задание можно безопасно перезапускать.
+
+        Returns:
+            int or None: Число созданных уведомлений или None при ошибке
+        """
+        created = 0
+        last_due_date, last_issue_id = "-infinity", 0
+        try:
+            while True:
+                self.cursor.execute(queries.CREATE_OVERDUE_NOTIFICATIONS,
+                                    (as_of, as_of, last_due_date, last_issue_id, chunk_size))
+                chunk = self.cursor.fetchone()
+                self.connection.commit()
+                created += chunk["created"]
+                if chunk["scanned"] < chunk_size:
+                    break
+                last_due_date, last_issue_id = chunk["last_due_date"], chunk["last_issue_id"]
+                self.logger.info(f"Уведомления о просрочке: обработана порция до выдачи {last_issue_id}, "
+                                 f"создано {created}")
+            self.logger.info(f"Создано уведомлений о просрочке: {created}")
+            return created
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка создания уведомлений о просрочке (создано до ошибки: {created}): {str(e)}")
+            return None
+
+    # ==== Библиотека сохранённых запросов ====
+
+    def _create_saved_queries_table(self):
+        """Служебная таблица сохранённых запросов и снимков их результатов."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS saved_queries (
+                query_id SERIAL PRIMARY KEY,
+                name VARCHAR(200) UNIQUE NOT NULL,
+                source VARCHAR(30) NOT NULL,
+                sql_text TEXT NOT NULL,
+                params JSONB NOT NULL DEFAULT '[]',
+                tables TEXT[] NOT NULL DEFAULT '{}',
+                keep_snapshot BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP NOT NULL DEFAULT now(),
+                snapshot JSONB,
+                snapshot_at TIMESTAMP,
+                snapshot_signature TEXT
+            );
+        """)
+
+    def save_query(self, name, query, params, source, tables, keep_snapshot=False):
+        """
+        Сохранение скомпилированного запроса (текст с плейсхолдерами и параметры).
+        Запрос с тем же именем перезаписывается, старый снимок сбрасывается.
+
+        Args:
+            query: Текст или композиция psycopg2.sql (RequestBuilder.build, build_query мастера)
+            source: Откуда запрос: "request_builder" или "join_wizard"
+            tables: Таблицы запроса — по их изменениям определяется актуальность снимка
+
+        Returns:
+            int or None: ID сохранённого запроса
+        """
+        try:
+            self._create_saved_queries_table()
+            if isinstance(query, sql.Composable):
+                query = query.as_string(self.connection)
+            self.cursor.execute("""
+                INSERT INTO saved_queries (name, source, sql_text, params, tables, keep_snapshot)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (name) DO UPDATE
+                SET source = EXCLUDED.source, sql_text = EXCLUDED.sql_text, params = EXCLUDED.params,
+                    tables = EXCLUDED.tables, keep_snapshot = EXCLUDED.keep_snapshot,
+                    snapshot = NULL, snapshot_at = NULL, snapshot_signature = NULL
+                RETURNING query_id
+            """, (name, source, query, Json(list(params or [])), list(tables), keep_snapshot))
+            query_id = self.cursor.fetchone()[0]
+            self.connection.commit()
+            self._prepare_statement(query)
+            self.logger.info(f"Сохранён запрос: {name}")
+            return query_id
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка сохранения запроса: {str(e)}")
+            return None
+
+    def get_saved_queries(self):
+        """Список сохранённых запросов без содержимого снимков."""
+        if not self.table_exists("saved_queries"):
+            return []
         try:
             self.cursor.execute("""
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-                ORDER BY table_name
+                SELECT query_id, name, source, sql_text, params, tables, keep_snapshot,
+                       created_at, snapshot_at
+                FROM saved_queries
+                ORDER BY name
             """)
-            return [row['table_name'] for row in self.cursor.fetchall()]
-        except Exception as e:
-            self.logger.error(f"Ошибка получения списка таблиц: {e}")
-            return []
\ No newline at end of file
+            return [dict(row) for row in self.cursor.fetchall()]
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка получения сохранённых запросов: {str(e)}")
+            return []
+
+    def delete_saved_query(self, query_id):
+        try:
+            self.cursor.execute("DELETE FROM saved_queries WHERE query_id = %s", (query_id,))
+            self.connection.commit()
+            return True, "Запрос удалён"
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка удаления сохранённого запроса: {str(e)}")
+            return False, str(e)
+
+    def prepare_saved_queries(self):
+        """
+        PREPARE всех сохранённых запросов на текущем соединении (вызывается при подключении).
+        Запросы, которые больше не компилируются (изменилась схема), пропускаются.
+
+        Returns:
+            int: Число подготовленных запросов
+        """
+        prepared = 0
+        try:
+            self.cursor.execute("SELECT to_regclass('public.saved_queries') IS NOT NULL AS exists")
+            if not self.cursor.fetchone()["exists"]:
+                self.connection.rollback()
+                return 0
+            self.cursor.execute("SELECT name, sql_text FROM saved_queries")
+            rows = self.cursor.fetchall()
+            self.connection.rollback()
+        except psycopg2.Error as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка чтения сохранённых запросов: {str(e)}")
+            return 0
+        for row in rows:
+            try:
+                self._prepare_statement(row["sql_text"])
+                prepared += 1
+            except psycopg2.Error as e:
+                self.connection.rollback()
+                self.logger.warning(f"Сохранённый запрос '{row['name']}' не подготовлен: {str(e)}")
+        self.connection.rollback()
+        if prepared:
+            self.logger.info(f"Подготовлено сохранённых запросов: {prepared}")
+        return prepared
+
+    def get_tables_signature(self, tables):
+        """
+        Отпечаток изменений таблиц по журналу row_changes: число записей и
+        последний change_id каждой таблицы. Число записей учитывает и транзакцию,
+        которая получила change_id раньше, а зафиксировалась позже; TRUNCATE
+        тоже оставляет запись в журнале.
+
+        Returns:
+            str or None: Отпечаток; None — у одной из таблиц нет журнала
+                (не входит в SYNCED_TABLES), и снимку доверять нельзя
+        """
+        if not tables:
+            return ""
+        if any(table not in SYNCED_TABLES for table in tables):
+            return None
+        self.cursor.execute("""
+            SELECT t.table_name, count(c.change_id) AS changes, max(c.change_id) AS last_change
+            FROM unnest(%s::text[]) AS t(table_name)
+            LEFT JOIN row_changes c ON c.table_name = t.table_name
+            GROUP BY t.table_name
+            ORDER BY t.table_name
+        """, (sorted(set(tables)),))
+        return ";".join(f"{r['table_name']}:{r['changes']}:{r['last_change']}" for r in self.cursor.fetchall())
+
+    def run_saved_query(self, query_id, refresh=False):
+        """
+        Выполнение сохранённого запроса. Если для запроса хранится снимок
+        и таблицы с момента снимка не менялись (get_tables_signature), результат
+        берётся из снимка; даты и числа NUMERIC в нём восстанавливаются, поэтому
+        строки те же, что и при новом выполнении.
+
+        Args:
+            refresh: Выполнить запрос, даже если снимок актуален
+
+        Returns:
+            tuple: (строки, время снимка или None, если запрос выполнен заново)
+        """
+        self.cursor.execute("""
+            SELECT sql_text, params, tables, keep_snapshot, snapshot, snapshot_at, snapshot_signature
+            FROM saved_queries WHERE query_id = %s
+        """, (query_id,))
+        saved = self.cursor.fetchone()
+        if saved is None:
+            self.connection.rollback()
+            raise ValueError(f"Сохранённый запрос {query_id} не найден")
+        signature = self.get_tables_signature(saved["tables"]) if saved["keep_snapshot"] else None
+        if (not refresh and saved["keep_snapshot"] and signature is not None
+                and saved["snapshot_signature"] == signature):
+            rows = load_snapshot(saved["snapshot"])
+            if rows is not None:
+                self.connection.rollback()
+                return rows, saved["snapshot_at"]
+
+        rows = self.execute_custom_request(saved["sql_text"], saved["params"], prepare=True)
+        if saved["keep_snapshot"]:
+            try:
+                self.cursor.execute("""
+                    UPDATE saved_queries
+                    SET snapshot = %s, snapshot_at = now(), snapshot_signature = %s
+                    WHERE query_id = %s
+                """, (Json(rows, dumps=dump_snapshot), signature, query_id))
+                self.connection.commit()
+            except psycopg2.Error as e:
+                self.connection.rollback()
+                self.logger.error(f"Ошибка сохранения снимка результата: {str(e)}")
+        else:
+            self.connection.rollback()
+        return rows, None
+
+    # ==== Статистика выполнения запросов ====
+
+    def get_query_stats(self, order_by="total_ms"):
+        """
+        Получить статистику выполненных запросов, сгруппированную по отпечатку.
+
+        Returns:
+            list: Словари с полями calls, total_ms, mean_ms, p95_ms, rows, histogram и т.д.
+        """
+        return self.profiler.get_stats(order_by)
+
+    def reset_query_stats(self):
+        """Очистка накопленной статистики запросов."""
+        self.profiler.reset()
+        self.logger.info("Статистика запросов сброшена")
+
+    def dump_query_stats(self, path):
+        """
+        Сохранение статистики запросов в JSON-файл.
+
+        Returns:
+            bool: Успешность сохранения
+        """
+        try:
+            self.profiler.dump(path)
+            self.logger.info(f"Статистика запросов сохранена в {path}")
+            return True
+        except OSError as e:
+            self.logger.error(f"Ошибка сохранения статистики запросов: {str(e)}")
+            return False
@@ -0,0 +1,142 @@
+"""
+Разбор результатов EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON).
+Строит дерево узлов плана с временем по каждому узлу и ищет
+последовательные сканирования больших таблиц с подсказками по индексам.
+"""
+import re
+
+# Таблица считается большой, если в ней не меньше стольких строк
+LARGE_TABLE_ROWS = 10000
+
+_FILTER_COLUMN_RE = re.compile(
+    r"\(*(?:\w+\.)?\"?(?P<column>[A-Za-z_]\w*)\"?\)?(?:::[\w ]+?)?\s*"
+    r"(?P<op>=|<>|<=|>=|<|>|~~\*|~~|!~~\*|!~~|~\*|~)\s"
+)
+_NULL_TEST_RE = re.compile(r"\(*(?:\w+\.)?\"?(?P<column>[A-Za-z_]\w*)\"?\)? IS (?:NOT )?NULL")
+
+
+class PlanNode:
+    """Узел плана выполнения запроса."""
+
+    def __init__(self, data, parent=None):
+        self.parent = parent
+        self.node_type = data.get("Node Type", "")
+        self.relation = data.get("Relation Name")
+        self.alias = data.get("Alias")
+        self.index_name = data.get("Index Name")
+        self.filter = data.get("Filter")
+        self.join_filter = data.get("Join Filter")
+        self.index_cond = data.get("Index Cond")
+        self.plan_rows = data.get("Plan Rows", 0)
+        self.actual_rows = data.get("Actual Rows", 0)
+        self.loops = data.get("Actual Loops", 1) or 1
+        self.rows_removed = data.get("Rows Removed by Filter", 0)
+        self.startup_ms = data.get("Actual Startup Time", 0.0)
+        self.total_ms = data.get("Actual Total Time", 0.0)
+        self.shared_hit = data.get("Shared Hit Blocks", 0)
+        self.shared_read = data.get("Shared Read Blocks", 0)
+        self.children = [PlanNode(child, self) for child in data.get("Plans", [])]
+
+    @property
+    def inclusive_ms(self):
+        """Полное время узла с учётом всех циклов и дочерних узлов."""
+        return self.total_ms * self.loops
+
+    @property
+    def exclusive_ms(self):
+        """Собственное время узла (без дочерних узлов)."""
+        return max(0.0, self.inclusive_ms - sum(child.inclusive_ms for child in self.children))
+
+    @property
+    def is_seq_scan(self):
+        return self.node_type in ("Seq Scan", "Parallel Seq Scan")
+
+    def title(self):
+        if self.relation:
+            name = self.relation if not self.alias or self.alias == self.relation else f"{self.relation} {self.alias}"
+            return f"{self.node_type} on {name}"
+        return self.node_type
+
+    def walk(self):
+        """Обход поддерева в глубину."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class PlanAnalysis:
+    """Результат анализа плана: дерево, общее время и подсказки по индексам."""
+
+    def __init__(self, explain_result, table_rows=None, large_table_rows=LARGE_TABLE_ROWS):
+        # EXPLAIN ... FORMAT JSON возвращает список из одного элемента
+        data = explain_result[0] if isinstance(explain_result, list) else explain_result
+        self.root = PlanNode(data["Plan"])
+        self.planning_ms = data.get("Planning Time", 0.0)
+        self.execution_ms = data.get("Execution Time", 0.0)
+        self.table_rows = table_rows or {}
+        self.large_table_rows = large_table_rows
+        self.hotspots = self.find_large_seq_scans()
+
+    def relations(self):
+        return sorted({node.relation for node in self.root.walk() if node.relation})
+
+    def table_size(self, node):
+        """Оценка числа строк таблицы: pg_class.reltuples или фактически прочитанные строки."""
+        known = self.table_rows.get(node.relation)
+        if known is not None and known >= 0:
+            return known
+        return (node.actual_rows + node.rows_removed) * node.loops
+
+    def find_large_seq_scans(self):
+        """
+        Последовательные сканирования больших таблиц.
+
+        Returns:
+            list: Кортежи (узел, размер таблицы, предложенный CREATE INDEX или None)
+        """
+        result = []
+        for node in self.root.walk():
+            if not node.is_seq_scan or not node.relation:
+                continue
+            size = self.table_size(node)
+            if size >= self.large_table_rows:
+                result.append((node, size, suggest_index(node)))
+        return result
+
+
+def filter_columns(condition):
+    """Столбцы и операторы, участвующие в условии фильтра."""
+    if not condition:
+        return []
+    found = []
+    for match in _FILTER_COLUMN_RE.finditer(condition):
+        pair = (match.group("column"), match.group("op"))
+        if pair not in found:
+            found.append(pair)
+    for match in _NULL_TEST_RE.finditer(condition):
+        pair = (match.group("column"), "IS NULL")
+        if pair not in found:
+            found.append(pair)
+    return found
+
+
+def suggest_index(node):
+    """Предложение индекса для последовательного сканирования с фильтром."""
+    columns = filter_columns(node.filter)
+    if not columns:
+        return None
+    # Подстрочный поиск (LIKE '%...%', регулярные выражения) ускоряет только триграммный GIN
+    pattern_ops = {"~~", "~~*", "!~~", "!~~*", "~", "~*"}
+    pattern_columns = [c for c, op in columns if op in pattern_ops]
+    if pattern_columns:
+        column = pattern_columns[0]
+        return (f"CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+                f"CREATE INDEX ON {node.relation} USING gin ({column} gin_trgm_ops);")
+    # Сначала столбцы с равенством, затем диапазонные
+    equality = [c for c, op in columns if op in ("=", "IS NULL")]
+    ranges = [c for c, op in columns if op not in ("=", "IS NULL")]
+    ordered = []
+    for column in equality + ranges:
+        if column not in ordered:
+            ordered.append(column)
+    return f"CREATE INDEX ON {node.relation} ({', '.join(ordered[:3])});"
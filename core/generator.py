@@ -0,0 +1,384 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+
+Создаёт согласованные по ссылкам авторов, книги, читателей, связи книга–автор
+и выдачи с неравномерной (Zipf) популярностью книг, авторов и читателей.
+Генерация детерминирована при одинаковом seed; загрузка выполняется через COPY.
+
+Пример запуска из командной строки:
+    python -m core.generator --dsn "dbname=test1 user=postgres password=..." --issues 1000000 --truncate
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+
+from core.enums import Country, Genre
+
+MALE_LAST_NAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+    "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров",
+    "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин",
+    "Захаров", "Зайцев", "Соловьёв", "Борисов", "Яковлев", "Григорьев", "Романов", "Воробьёв",
+    "Сергеев", "Кузьмин", "Фролов", "Александров", "Дмитриев", "Королёв", "Гусев", "Киселёв",
+    "Ильин", "Максимов", "Поляков", "Сорокин", "Виноградов", "Ковалёв", "Белов", "Медведев",
+    "Антонов", "Тарасов", "Жуков", "Баранов", "Филиппов", "Комаров", "Давыдов", "Беляев",
+    "Герасимов", "Богданов", "Осипов", "Сидоров", "Матвеев", "Титов", "Марков", "Миронов",
+    "Крылов", "Куликов", "Карпов", "Власов", "Мельников", "Денисов", "Гаврилов", "Тихонов",
+    "Казаков", "Афанасьев", "Данилов", "Савельев", "Тимофеев", "Фомин", "Чернов", "Абрамов",
+    "Мартынов", "Ефимов", "Федотов", "Щербаков", "Назаров", "Калинин", "Исаев", "Чернышёв",
+    "Быков", "Маслов", "Родионов", "Коновалов", "Лазарев", "Воронин", "Климов", "Филатов",
+    "Пономарёв", "Голубев", "Кудрявцев", "Прохоров", "Наумов", "Потапов", "Журавлёв", "Овчинников",
+    "Трофимов", "Леонов", "Соболев", "Ермаков", "Колесников", "Гончаров", "Емельянов", "Никифоров",
+    "Грачёв", "Котов", "Гришин", "Ефремов", "Архипов", "Громов", "Кириллов", "Малышев",
+    "Панов", "Моисеев", "Румянцев", "Акимов", "Кондратьев", "Бирюков", "Горбунов", "Анисимов",
+    "Еремин", "Тихомиров", "Галкин", "Лукьянов", "Михеев", "Скворцов", "Юдин", "Белоусов",
+    "Нестеров", "Симонов", "Прокофьев", "Харитонов", "Князев", "Цветков", "Левин", "Митрофанов",
+    "Воронов", "Аксёнов", "Софронов", "Мальцев", "Логинов", "Горшков", "Савин", "Краснов",
+    "Майоров", "Демидов", "Елисеев", "Рыбаков", "Сафонов", "Плотников", "Дёмин", "Хохлов",
+    "Островский", "Вишневский", "Ковальский", "Жуковский", "Покровский", "Успенский", "Вознесенский",
+]
+MALE_FIRST_NAMES = [
+    "Александр", "Алексей", "Андрей", "Антон", "Артём", "Борис", "Вадим", "Валентин", "Василий",
+    "Виктор", "Владимир", "Владислав", "Георгий", "Григорий", "Даниил", "Денис", "Дмитрий",
+    "Евгений", "Егор", "Иван", "Игорь", "Илья", "Кирилл", "Константин", "Лев", "Леонид",
+    "Максим", "Михаил", "Никита", "Николай", "Олег", "Павел", "Пётр", "Роман", "Семён",
+    "Сергей", "Станислав", "Степан", "Тимофей", "Фёдор", "Юрий", "Ярослав",
+]
+FEMALE_FIRST_NAMES = [
+    "Александра", "Алина", "Алла", "Анастасия", "Анна", "Валентина", "Валерия", "Вера",
+    "Виктория", "Галина", "Дарья", "Евгения", "Екатерина", "Елена", "Елизавета", "Зоя",
+    "Ирина", "Карина", "Ксения", "Лариса", "Любовь", "Людмила", "Маргарита", "Марина",
+    "Мария", "Надежда", "Наталья", "Нина", "Ольга", "Полина", "Светлана", "Софья",
+    "Татьяна", "Ульяна", "Юлия", "Яна",
+]
+PATRONYMIC_ROOTS = [
+    "Александров", "Алексеев", "Андреев", "Борисов", "Васильев", "Викторов", "Владимиров",
+    "Григорьев", "Дмитриев", "Евгеньев", "Иванов", "Игорев", "Константинов", "Максимов",
+    "Михайлов", "Николаев", "Олегов", "Павлов", "Петров", "Романов", "Сергеев", "Степанов",
+    "Фёдоров", "Юрьев",
+]
+TITLE_ADJECTIVES = [
+    "Тихий", "Последний", "Белый", "Чёрный", "Далёкий", "Забытый", "Золотой", "Новый",
+    "Старый", "Тайный", "Красный", "Северный", "Южный", "Вечный", "Одинокий", "Горький",
+    "Ясный", "Зимний", "Летний", "Шумный", "Туманный", "Звёздный", "Каменный", "Железный",
+]
+TITLE_NOUNS = [
+    "дом", "сад", "путь", "берег", "город", "лес", "остров", "мир", "ветер", "день",
+    "свет", "огонь", "век", "голос", "сон", "мост", "замок", "корабль", "след", "край",
+    "рассвет", "закат", "город у моря", "перекрёсток", "двор", "экспресс",
+]
+TITLE_SUFFIXES = [
+    "", "", "", " и другие рассказы", ": хроника", ". Книга вторая", " в полночь",
+    " над рекой", ": история одной семьи", " без названия", " на краю земли",
+]
+
+
+def zipf_cum_weights(n, skew):
+    """Накопленные веса распределения Zipf для n рангов."""
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def feminine_last_name(last_name):
+    """Женская форма русской фамилии."""
+    if last_name.endswith("ский"):
+        return last_name[:-4] + "ская"
+    if last_name.endswith(("ов", "ев", "ёв", "ин", "ын")):
+        return last_name + "а"
+    return last_name
+
+
+def isbn13(book_id):
+    """ISBN-13 с российским префиксом 978-5 и корректной контрольной цифрой."""
+    body = f"9785{book_id:08d}"
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(body))
+    check = (10 - total % 10) % 10
+    return f"{body[:3]}-{body[3]}-{body[4:]}-{check}"
+
+
+def sizes_for_issues(issues):
+    """Размеры таблиц, пропорциональные числу выдач."""
+    books = max(100, issues // 20)
+    return {
+        "authors": max(30, books // 3),
+        "books": books,
+        "readers": max(50, issues // 10),
+        "issues": issues,
+    }
+
+
+class SyntheticDataGenerator:
+    """
+    Генератор согласованного по ссылкам каталога библиотеки.
+    Каждая таблица генерируется собственным потоком случайных чисел,
+    поэтому результат зависит только от seed и размеров.
+    """
+
+    def __init__(self, authors=1000, books=5000, readers=10000, issues=100000,
+                 seed=42, skew=1.1, start_date=None, end_date=None):
+        self.authors = authors
+        self.books = books
+        self.readers = readers
+        self.issues = issues
+        self.seed = seed
+        self.skew = skew
+        self.end_date = end_date or date.today()
+        self.start_date = start_date or self.end_date - timedelta(days=5 * 365)
+        self._prepared = False
+
+    @classmethod
+    def for_issues(cls, issues, **kwargs):
+        return cls(**sizes_for_issues(issues), **kwargs)
+
+    def sizes(self):
+        return {"authors": self.authors, "books": self.books, "readers": self.readers, "issues": self.issues}
+
+    def _random(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def _prepare(self):
+        """Общие для нескольких таблиц атрибуты: ранги популярности, годы издания, даты регистрации."""
+        if self._prepared:
+            return
+        rnd = self._random("popularity")
+        self.book_by_rank = list(range(1, self.books + 1))
+        rnd.shuffle(self.book_by_rank)
+        self.book_rank = array("i", [0]) * (self.books + 1)
+        for rank, book_id in enumerate(self.book_by_rank, start=1):
+            self.book_rank[book_id] = rank
+        self.author_by_rank = list(range(1, self.authors + 1))
+        rnd.shuffle(self.author_by_rank)
+        self.reader_by_rank = list(range(1, self.readers + 1))
+        rnd.shuffle(self.reader_by_rank)
+
+        # Годы издания: большинство книг — последние десятилетия
+        rnd = self._random("publication_year")
+        last_year = self.end_date.year
+        self.publication_year = array("h", [0]) * (self.books + 1)
+        for book_id in range(1, self.books + 1):
+            age = min(int(rnd.expovariate(1 / 25.0)), last_year - 1800)
+            self.publication_year[book_id] = last_year - age
+
+        # Даты регистрации читателей (в днях от начала эпохи date.toordinal)
+        rnd = self._random("registration")
+        first_day = (self.start_date - timedelta(days=3 * 365)).toordinal()
+        last_day = (self.end_date - timedelta(days=30)).toordinal()
+        self.registration_day = array("i", [0]) * (self.readers + 1)
+        for reader_id in range(1, self.readers + 1):
+            self.registration_day[reader_id] = rnd.randint(first_day, last_day)
+        self._prepared = True
+
+    def generate_authors(self):
+        """Строки authors: (author_id, last_name, first_name, patronymic, birth_year, country)."""
+        rnd = self._random("authors")
+        countries = [c.value for c in Country]
+        country_weights = zipf_cum_weights(len(countries), 1.3)
+        first_names = MALE_FIRST_NAMES + FEMALE_FIRST_NAMES
+        combos = len(MALE_LAST_NAMES) * len(first_names) * len(PATRONYMIC_ROOTS)
+        for author_id in range(1, self.authors + 1):
+            # Взаимно однозначное перемешивание номера в комбинацию ФИО (7919 — простое)
+            index = (author_id - 1) * 7919 % combos
+            generation = (author_id - 1) // combos
+            last = MALE_LAST_NAMES[index % len(MALE_LAST_NAMES)]
+            index //= len(MALE_LAST_NAMES)
+            first = first_names[index % len(first_names)]
+            patronymic = PATRONYMIC_ROOTS[index // len(first_names)]
+            if first in FEMALE_FIRST_NAMES:
+                last = feminine_last_name(last)
+                patronymic += "на"
+            else:
+                patronymic += "ич"
+            if generation:
+                last = f"{last}-{generation + 1}"
+            birth_year = rnd.randint(1750, self.end_date.year - 20)
+            country = rnd.choices(countries, cum_weights=country_weights)[0]
+            yield author_id, last, first, patronymic, birth_year, country
+
+    def generate_books(self):
+        """Строки books: (book_id, title, publication_year, genre, isbn, available_copies)."""
+        self._prepare()
+        rnd = self._random("books")
+        genres = [g.value for g in Genre]
+        genre_weights = zipf_cum_weights(len(genres), 1.0)
+        for book_id in range(1, self.books + 1):
+            title = f"{rnd.choice(TITLE_ADJECTIVES)} {rnd.choice(TITLE_NOUNS)}{rnd.choice(TITLE_SUFFIXES)}"
+            genre = rnd.choices(genres, cum_weights=genre_weights)[0]
+            # Популярные книги закупаются в большем числе экземпляров
+            rank = self.book_rank[book_id]
+            copies = max(1, min(30, int(30 / rank ** 0.5) + rnd.randint(0, 2)))
+            yield book_id, title, self.publication_year[book_id], genre, isbn13(book_id), copies
+
+    def generate_readers(self):
+        """Строки readers: (reader_id, last_name, first_name, patronymic, ticket_number, registration_date)."""
+        self._prepare()
+        rnd = self._random("readers")
+        for reader_id in range(1, self.readers + 1):
+            last = rnd.choice(MALE_LAST_NAMES)
+            if rnd.random() < 0.55:
+                last = feminine_last_name(last)
+                first = rnd.choice(FEMALE_FIRST_NAMES)
+                patronymic = rnd.choice(PATRONYMIC_ROOTS) + "на"
+            else:
+                first = rnd.choice(MALE_FIRST_NAMES)
+                patronymic = rnd.choice(PATRONYMIC_ROOTS) + "ич"
+            registration = date.fromordinal(self.registration_day[reader_id])
+            yield reader_id, last, first, patronymic, str(100000 + reader_id), registration
+
+    def generate_book_authors(self):
+        """Строки book_authors: (book_id, author_id); у книги 1–3 автора."""
+        self._prepare()
+        rnd = self._random("book_authors")
+        weights = zipf_cum_weights(self.authors, self.skew)
+        for book_id in range(1, self.books + 1):
+            count = rnd.choices((1, 2, 3), weights=(85, 12, 3))[0]
+            chosen = set(rnd.choices(self.author_by_rank, cum_weights=weights, k=count))
+            for author_id in sorted(chosen):
+                yield book_id, author_id
+
+    def generate_issues(self, batch=10000):
+        """Строки issues: (issue_id, reader_id, book_id, issue_date, return_date)."""
+        self._prepare()
+        rnd = self._random("issues")
+        book_weights = zipf_cum_weights(self.books, self.skew)
+        reader_weights = zipf_cum_weights(self.readers, 0.8)
+        start_day = self.start_date.toordinal()
+        end_day = self.end_date.toordinal()
+        issue_id = 0
+        while issue_id < self.issues:
+            n = min(batch, self.issues - issue_id)
+            books = rnd.choices(self.book_by_rank, cum_weights=book_weights, k=n)
+            readers = rnd.choices(self.reader_by_rank, cum_weights=reader_weights, k=n)
+            for book_id, reader_id in zip(books, readers):
+                issue_id += 1
+                first_day = max(start_day, self.registration_day[reader_id],
+                                date(self.publication_year[book_id], 1, 1).toordinal())
+                issue_day = rnd.randint(min(first_day, end_day), end_day)
+                days_ago = end_day - issue_day
+                if days_ago < 30 and rnd.random() < 0.7:
+                    return_date = None
+                elif rnd.random() < 0.03:
+                    return_date = None  # Не возвращена (задолженность)
+                else:
+                    return_date = date.fromordinal(min(end_day, issue_day + rnd.randint(3, 40)))
+                yield issue_id, reader_id, book_id, date.fromordinal(issue_day), return_date
+
+
+class _CopyStream:
+    """Файлоподобный объект для COPY FROM STDIN поверх итератора строк."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.count = 0
+
+    @staticmethod
+    def _format(value):
+        if value is None:
+            return "\\N"
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+    def read(self, size=65536):
+        while len(self._buffer) < size:
+            chunk = []
+            for row in self._rows:
+                chunk.append("\t".join(self._format(v) for v in row))
+                self.count += 1
+                if len(chunk) >= 1000:
+                    break
+            if not chunk:
+                break
+            self._buffer += "\n".join(chunk) + "\n"
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    readline = read
+
+
+COPY_TARGETS = [
+    ("authors", "author_id, last_name, first_name, patronymic, birth_year, country", "generate_authors"),
+    ("books", "book_id, title, publication_year, genre, isbn, available_copies", "generate_books"),
+    ("readers", "reader_id, last_name, first_name, patronymic, ticket_number, registration_date",
+     "generate_readers"),
+    ("book_authors", "book_id, author_id", "generate_book_authors"),
+    ("issues", "issue_id, reader_id, book_id, issue_date, return_date", "generate_issues"),
+]
+
+SERIAL_COLUMNS = [("authors", "author_id"), ("books", "book_id"), ("readers", "reader_id"), ("issues", "issue_id")]
+
+
+def load(connection, generator, truncate=False, progress=None):
+    """
+    Загрузка сгенерированных данных через COPY в одной транзакции.
+
+    Args:
+        connection: Соединение psycopg2
+        generator: SyntheticDataGenerator
+        truncate: Очистить таблицы перед загрузкой (иначе таблицы должны быть пустыми)
+        progress: Необязательный callback(table, rows, seconds)
+
+    Returns:
+        dict: Число загруженных строк по таблицам
+    """
+    counts = {}
+    with connection.cursor() as cursor:
+        if truncate:
+            cursor.execute("TRUNCATE TABLE issues, book_authors, books, authors, readers RESTART IDENTITY CASCADE")
+        else:
+            for table, _, _ in COPY_TARGETS:
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+                if cursor.fetchone()[0]:
+                    raise ValueError(f"Таблица {table} не пуста; используйте truncate=True")
+        for table, columns, method in COPY_TARGETS:
+            started = time.perf_counter()
+            stream = _CopyStream(getattr(generator, method)())
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", stream)
+            counts[table] = stream.count
+            if progress:
+                progress(table, stream.count, time.perf_counter() - started)
+        for table, column in SERIAL_COLUMNS:
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                           f"COALESCE((SELECT MAX({column}) FROM {table}), 0) + 1, false)")
+    connection.commit()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE authors, books, readers, book_authors, issues")
+    connection.commit()
+    return counts
+
+
+def main(argv=None):
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных библиотеки")
+    parser.add_argument("--dsn", required=True, help="Строка подключения psycopg2")
+    parser.add_argument("--issues", type=int, default=100000, help="Число выдач")
+    parser.add_argument("--authors", type=int, help="Число авторов (по умолчанию из --issues)")
+    parser.add_argument("--books", type=int, help="Число книг (по умолчанию из --issues)")
+    parser.add_argument("--readers", type=int, help="Число читателей (по умолчанию из --issues)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="Параметр Zipf популярности книг")
+    parser.add_argument("--end-date", type=date.fromisoformat,
+                        help="Последняя дата выдач (ГГГГ-ММ-ДД); по умолчанию сегодня")
+    parser.add_argument("--truncate", action="store_true", help="Очистить таблицы перед загрузкой")
+    args = parser.parse_args(argv)
+
+    sizes = sizes_for_issues(args.issues)
+    for key in ("authors", "books", "readers"):
+        if getattr(args, key):
+            sizes[key] = getattr(args, key)
+    generator = SyntheticDataGenerator(**sizes, seed=args.seed, skew=args.skew, end_date=args.end_date)
+
+    connection = psycopg2.connect(args.dsn)
+    try:
+        counts = load(connection, generator, truncate=args.truncate,
+                      progress=lambda table, rows, seconds: print(f"{table}: {rows} строк за {seconds:.1f} с"))
+    finally:
+        connection.close()
+    print("Загружено:", ", ".join(f"{table}={rows}" for table, rows in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
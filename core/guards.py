@@ -0,0 +1,233 @@
+"""
+Ограничения для произвольных запросов (конструктор запросов, мастер JOIN).
+
+Запрос выполняется через серверный (именованный) курсор и читается
+порциями FETCH_BATCH_ROWS строк, поэтому результат никогда не загружается
+целиком. Чтение прекращается, когда:
+  - набрано max_rows строк или около max_bytes байт данных;
+  - истекло timeout_ms (каждый FETCH дополнительно ограничен statement_timeout);
+  - пользователь отменил запрос (QueryGuard.cancel -> connection.cancel()).
+Уже прочитанные строки возвращаются с отметкой truncated; если прерван
+запрос, не вернувший ни одной строки, выбрасывается QueryTimeout или
+QueryCancelled. Транзакция всегда откатывается.
+
+Запрос с параметрами при prepare=True и без ограничений объёма (max_rows и
+max_bytes равны None) выполняется через PREPARE/EXECUTE с кэшированием плана
+на соединении, как у DatabaseManager._execute_prepared. EXECUTE нельзя
+объявить курсором, и результат EXECUTE libpq загружает целиком, поэтому при
+заданных max_rows или max_bytes запрос всегда читается серверным курсором.
+"""
+import itertools
+import threading
+import time
+import weakref
+
+import psycopg2
+import psycopg2.errors
+from psycopg2 import sql
+
+from core.instrumentation import InstrumentedCursor
+from core.queries import numbered
+from core.rows import ResultSet
+
+# Ограничения по умолчанию для запросов из интерфейса
+QUERY_TIMEOUT_MS = 30000
+MAX_RESULT_ROWS = 100000
+MAX_RESULT_BYTES = 64 * 1024 * 1024
+# Сколько строк читать одним FETCH
+FETCH_BATCH_ROWS = 2000
+# Приблизительный размер значения не строкового типа (число, дата), байт
+VALUE_SIZE = 8
+# Сколько подготовленных операторов хранить на одном соединении
+PREPARED_CACHE_SIZE = 64
+
+_cursor_ids = itertools.count(1)
+_statement_ids = itertools.count(1)
+
+
+class QueryTimeout(Exception):
+    """Запрос не вернул ни одной строки за отведённое время."""
+
+
+class QueryCancelled(Exception):
+    """Запрос отменён пользователем до получения первой строки."""
+
+
+class QueryResult(ResultSet):
+    """
+    Строки результата (core.rows.ResultSet: кортежи значений и общий индекс столбцов).
+
+    Attributes:
+        truncated: None или причина, по которой чтение прекращено досрочно
+        elapsed_ms: Время выполнения и чтения, мс
+    """
+    truncated = None
+    elapsed_ms = 0.0
+
+
+def row_size(row):
+    """Приблизительный объём строки в байтах (текст — по длине, прочее — VALUE_SIZE)."""
+    return sum(len(value) if isinstance(value, (str, bytes)) else VALUE_SIZE
+               for value in row if value is not None)
+
+
+def size_text(size):
+    """Объём в байтах для сообщений."""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.0f} МБ"
+    return f"{size} байт"
+
+
+class QueryGuard:
+    """
+    Выполнение запроса с ограничениями времени и объёма и возможностью отмены.
+    Один объект обслуживает один запрос за раз; cancel() можно вызвать из другого потока.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._cancelled = False
+        # Соединение -> (поколение, {текст запроса: имя подготовленного оператора})
+        self._statements = weakref.WeakKeyDictionary()
+        # Увеличивается в forget_statements; операторы прежних поколений удаляются перед запросом
+        self._generation = 0
+
+    @property
+    def running(self):
+        return self._connection is not None
+
+    def cancel(self):
+        """
+        Отмена выполняющегося запроса: сервер прерывает его (как pg_cancel_backend).
+
+        Returns:
+            bool: Был ли запрос, который можно отменить
+        """
+        connection = self._connection
+        if connection is None:
+            return False
+        self._cancelled = True
+        try:
+            connection.cancel()
+        except psycopg2.Error:
+            pass
+        return True
+
+    def forget_statements(self):
+        """
+        Сброс подготовленных операторов (после изменения структуры): они удаляются
+        перед следующим запросом на каждом соединении. Не ждёт выполняющегося запроса.
+        """
+        self._generation += 1
+
+    def fetch(self, connection, query, params=None, timeout_ms=QUERY_TIMEOUT_MS,
+              max_rows=MAX_RESULT_ROWS, max_bytes=MAX_RESULT_BYTES, prepare=False):
+        """
+        Args:
+            connection: Соединение psycopg2 (не используемое другими потоками)
+            query: Текст SELECT-запроса или композиция psycopg2.sql
+            timeout_ms, max_rows, max_bytes: Ограничения (None — без ограничения)
+            prepare: Выполнить запрос с параметрами через PREPARE/EXECUTE с кэшированием плана;
+                учитывается, только если max_rows и max_bytes равны None
+
+        Returns:
+            QueryResult: Строки (кортежи; обращение к строке результата — как к словарю)
+        """
+        with self._lock:
+            self._cancelled = False
+            self._connection = connection
+            autocommit = connection.autocommit
+            if autocommit:
+                # Серверный курсор существует только внутри транзакции
+                connection.autocommit = False
+            started = time.perf_counter()
+            result = QueryResult()
+            cursor = None
+            try:
+                if timeout_ms:
+                    with connection.cursor() as setup:
+                        setup.execute("SELECT set_config('statement_timeout', %s, true)", (str(int(timeout_ms)),))
+                size = 0
+                try:
+                    if prepare and params is not None and max_rows is None and max_bytes is None:
+                        cursor = connection.cursor(cursor_factory=InstrumentedCursor)
+                        self._execute_prepared(cursor, query, params)
+                    else:
+                        cursor = connection.cursor(name=f"library_guarded_{next(_cursor_ids)}",
+                                                   cursor_factory=InstrumentedCursor)
+                        cursor.execute(query, params)
+                    while True:
+                        # При max_rows читается на одну строку больше: так видно, что результат обрезан
+                        batch = FETCH_BATCH_ROWS if max_rows is None else min(FETCH_BATCH_ROWS, max_rows - len(result) + 1)
+                        rows = cursor.fetchmany(batch)
+                        if not result.columns and cursor.description:
+                            # У серверного курсора описание столбцов появляется после первого FETCH
+                            result.set_columns(column.name for column in cursor.description)
+                        for row in rows:
+                            if max_rows is not None and len(result) >= max_rows:
+                                result.truncated = f"достигнут предел {max_rows} строк"
+                                break
+                            size += row_size(row)
+                            result.append(row)
+                            if max_bytes is not None and size >= max_bytes:
+                                result.truncated = f"достигнут предел объёма {size_text(max_bytes)}"
+                                break
+                        if result.truncated or len(rows) < batch:
+                            break
+                        if self._cancelled:
+                            # Отмена пришла между порциями, когда на сервере ничего не выполнялось
+                            result.truncated = "запрос отменён пользователем"
+                            break
+                        if timeout_ms and (time.perf_counter() - started) * 1000.0 >= timeout_ms:
+                            result.truncated = f"истекло время выполнения ({timeout_ms} мс)"
+                            break
+                except psycopg2.errors.QueryCanceled as e:
+                    self._interrupted(result, timeout_ms, e)
+            finally:
+                if cursor is not None:
+                    try:
+                        cursor.close()
+                    except psycopg2.Error:
+                        pass
+                self._connection = None
+                if not connection.closed:
+                    connection.rollback()
+                    connection.autocommit = autocommit
+            result.elapsed_ms = (time.perf_counter() - started) * 1000.0
+            return result
+
+    def _execute_prepared(self, cursor, query, params):
+        """EXECUTE подготовленного оператора; оператор готовится один раз на соединение."""
+        connection = cursor.connection
+        if isinstance(query, sql.Composable):
+            query = query.as_string(connection)
+        generation, statements = self._statements.get(connection, (self._generation, {}))
+        if generation != self._generation:
+            cursor.execute("DEALLOCATE ALL")
+            statements = {}
+        self._statements[connection] = (self._generation, statements)
+        name = statements.get(query)
+        if name is None:
+            if len(statements) >= PREPARED_CACHE_SIZE:
+                cursor.execute(f"DEALLOCATE {statements.pop(next(iter(statements)))}")
+            name = f"library_guarded_stmt_{next(_statement_ids)}"
+            # PREPARE не откатывается вместе с транзакцией, поэтому оператор остаётся на соединении
+            cursor.execute(f"PREPARE {name} AS {numbered(query)}")
+            statements[query] = name
+        if not params:
+            cursor.execute(f"EXECUTE {name}")
+            return
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    def _interrupted(self, result, timeout_ms, error):
+        """Запрос прерван сервером: отметка у прочитанных строк или исключение, если строк нет."""
+        if self._cancelled:
+            reason = "запрос отменён пользователем"
+            if not result:
+                raise QueryCancelled("Запрос отменён пользователем") from error
+        else:
+            reason = f"истекло время выполнения ({timeout_ms} мс)"
+            if not result:
+                raise QueryTimeout(f"Превышено время выполнения запроса ({timeout_ms} мс)") from error
+        result.truncated = reason
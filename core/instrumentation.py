@@ -0,0 +1,214 @@
+"""
+Инструментирование SQL-запросов.
+Собирает время выполнения, число строк и "отпечаток" (fingerprint) каждого
+выполненного запроса в гистограмму в памяти.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime
+
+import psycopg2.extensions
+from psycopg2 import sql
+from psycopg2.extras import DictCursor
+
+# Границы корзин гистограммы (в миллисекундах)
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fingerprint(query_text):
+    """
+    Нормализация текста запроса: литералы заменяются на '?',
+    списки IN (...) сворачиваются, пробелы схлопываются.
+    """
+    text = _COMMENT_RE.sub(" ", query_text)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (...)", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class StatementStats:
+    """Накопленная статистика по одному отпечатку запроса."""
+
+    def __init__(self, fingerprint_text):
+        self.fingerprint = fingerprint_text
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def add(self, duration_ms, rows, failed):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += duration_ms
+        self.min_ms = duration_ms if self.min_ms is None else min(self.min_ms, duration_ms)
+        self.max_ms = max(self.max_ms, duration_ms)
+        if rows and rows > 0:
+            self.rows += rows
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, p):
+        """Оценка перцентиля по корзинам гистограммы (верхняя граница корзины)."""
+        if not self.calls:
+            return 0.0
+        threshold = self.calls * p / 100.0
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                if i < len(HISTOGRAM_BUCKETS_MS):
+                    return float(min(HISTOGRAM_BUCKETS_MS[i], self.max_ms))
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "min_ms": round(self.min_ms or 0.0, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "rows": self.rows,
+            "histogram": {
+                **{f"<={bound}ms": self.buckets[i] for i, bound in enumerate(HISTOGRAM_BUCKETS_MS)},
+                f">{HISTOGRAM_BUCKETS_MS[-1]}ms": self.buckets[-1],
+            },
+        }
+
+
+class QueryProfiler:
+    """
+    Сборщик статистики запросов (Singleton).
+    Дополнительные обработчики (hooks) подключаются через add_hook и
+    вызываются после каждого запроса: hook(fingerprint, query_text, duration_ms, rows, error).
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        # Реализация паттерна Singleton
+        if cls._instance is None:
+            cls._instance = super(QueryProfiler, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        # Предотвращение повторной инициализации
+        if self._initialized:
+            return
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._hooks = []
+        self._started_at = datetime.now()
+        self._initialized = True
+
+    def add_hook(self, hook):
+        """Подключение дополнительного обработчика статистики."""
+        if hook not in self._hooks:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Отключение обработчика статистики."""
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def record(self, query_text, duration_ms, rows=None, error=None):
+        """Запись одного выполнения запроса в гистограмму."""
+        if not self.enabled:
+            return
+        key = fingerprint(query_text)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(duration_ms, rows, error is not None)
+        for hook in list(self._hooks):
+            try:
+                hook(key, query_text, duration_ms, rows, error)
+            except Exception:
+                # Ошибка в обработчике не должна ломать выполнение запроса
+                pass
+
+    def get_stats(self, order_by="total_ms"):
+        """Снимок статистики: список словарей, отсортированный по убыванию order_by."""
+        with self._lock:
+            items = [s.to_dict() for s in self._stats.values()]
+        return sorted(items, key=lambda s: s.get(order_by, 0), reverse=True)
+
+    def reset(self):
+        """Очистка накопленной статистики."""
+        with self._lock:
+            self._stats.clear()
+            self._started_at = datetime.now()
+
+    def dump(self, path):
+        """Сохранение статистики в JSON-файл."""
+        report = {
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "dumped_at": datetime.now().isoformat(timespec="seconds"),
+            "buckets_ms": list(HISTOGRAM_BUCKETS_MS),
+            "statements": self.get_stats(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+
+class InstrumentedCursorMixin:
+    """Примесь для курсоров psycopg2: замеряет каждый execute/executemany."""
+
+    def _query_text(self, query):
+        if isinstance(query, sql.Composable):
+            return query.as_string(self)
+        if isinstance(query, bytes):
+            return query.decode("utf-8", "replace")
+        return query
+
+    def _timed(self, method, query, args):
+        started = time.perf_counter()
+        error = None
+        try:
+            return method(query, args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            try:
+                QueryProfiler().record(self._query_text(query), duration_ms, self.rowcount, error)
+            except Exception:
+                pass
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, psycopg2.extensions.cursor):
+    """Обычный (кортежный) курсор с инструментированием."""
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, DictCursor):
+    """DictCursor с инструментированием."""
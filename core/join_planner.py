@@ -0,0 +1,265 @@
+"""
+Планировщик соединений по графу внешних ключей.
+
+Таблицы — вершины, внешние ключи — рёбра. Для выбранного набора таблиц
+строится дерево соединений (при необходимости с промежуточными таблицами),
+условия ON выводятся из внешних ключей. Если таблицу можно присоединить
+несколькими кратчайшими путями (через разные промежуточные таблицы, например
+issues и holds между readers и books, или по разным внешним ключам одной пары
+таблиц), план не выбирается наугад: выбрасывается AmbiguousJoinError со
+списком вариантов, а выбор передаётся в plan() через via и foreign_keys.
+Фильтры переносятся в источник таблицы (подзапрос), если это не меняет
+результат внешнего соединения, а в SELECT попадают только запрошенные столбцы.
+"""
+from collections import namedtuple
+
+from psycopg2 import sql
+
+from core.query_ast import Alias, And, Star
+
+ForeignKey = namedtuple("ForeignKey", "name table columns ref_table ref_columns")
+
+JOIN_TYPES = ("INNER JOIN", "LEFT JOIN")
+
+
+def describe_path(steps):
+    """Путь присоединения для интерфейса: таблицы и внешние ключи."""
+    tables = [steps[0].joined_to] + [step.table for step in steps]
+    return f"{' → '.join(tables)} ({', '.join(step.foreign_key.name for step in steps)})"
+
+
+class AmbiguousJoinError(ValueError):
+    """
+    Таблицу target можно присоединить несколькими равноценными путями.
+
+    Attributes:
+        target: Присоединяемая таблица
+        candidates: Варианты — списки JoinStep от уже соединённой таблицы до target
+    """
+
+    def __init__(self, target, candidates):
+        self.target = target
+        self.candidates = candidates
+        super().__init__(f"Таблицу {target} можно присоединить несколькими путями: "
+                         + "; ".join(describe_path(path) for path in candidates))
+
+    @staticmethod
+    def resolution(path):
+        """Аргументы plan(via, foreign_keys), выбирающие путь path."""
+        return [step.table for step in path[:-1]], [step.foreign_key.name for step in path]
+
+
+class JoinStep:
+    """Присоединение таблицы table к уже соединённой таблице joined_to по внешнему ключу."""
+
+    def __init__(self, table, joined_to, foreign_key):
+        self.table = table
+        self.joined_to = joined_to
+        self.foreign_key = foreign_key
+
+    def key_pairs(self):
+        """Пары ((таблица, столбец), (таблица, столбец)) для условия ON."""
+        fk = self.foreign_key
+        pairs = []
+        for column, ref_column in zip(fk.columns, fk.ref_columns):
+            if fk.table == self.table:
+                pairs.append(((self.table, column), (self.joined_to, ref_column)))
+            else:
+                pairs.append(((self.table, ref_column), (self.joined_to, column)))
+        return pairs
+
+
+class JoinPlan:
+    """Дерево соединений: корневая таблица и шаги в порядке присоединения."""
+
+    def __init__(self, root, steps, requested):
+        self.root = root
+        self.steps = steps
+        self.requested = list(requested)
+
+    @property
+    def tables(self):
+        return [self.root] + [step.table for step in self.steps]
+
+    @property
+    def bridge_tables(self):
+        """Промежуточные таблицы, добавленные только ради связи."""
+        return [table for table in self.tables if table not in self.requested]
+
+    def key_columns(self):
+        """Столбцы каждой таблицы, участвующие в условиях ON."""
+        keys = {table: [] for table in self.tables}
+        for step in self.steps:
+            for (table, column), (other, other_column) in step.key_pairs():
+                if column not in keys[table]:
+                    keys[table].append(column)
+                if other_column not in keys[other]:
+                    keys[other].append(other_column)
+        return keys
+
+    def describe(self):
+        """Краткое описание плана для интерфейса."""
+        text = " → ".join(self.tables)
+        if self.bridge_tables:
+            text += f" (через {', '.join(self.bridge_tables)})"
+        return text
+
+    def build(self, columns=None, filters=None, join_type="INNER JOIN"):
+        """
+        Сборка запроса.
+
+        Args:
+            columns: Узлы Column с указанной таблицей; пусто — все столбцы
+            filters: Словарь {таблица: [узлы условий]}
+            join_type: INNER JOIN или LEFT JOIN
+
+        Returns:
+            tuple: (sql.Composed, кортеж параметров)
+        """
+        if join_type not in JOIN_TYPES:
+            raise ValueError(f"Недопустимый тип соединения: {join_type}")
+        columns = list(columns or [])
+        filters = {table: conditions for table, conditions in (filters or {}).items() if conditions}
+        params = []
+
+        def compile_node(node):
+            part, node_params = node.compile()
+            params.extend(node_params)
+            return part
+
+        # При LEFT JOIN условие на присоединяемую таблицу в подзапросе дало бы
+        # строки с NULL вместо их отсечения, поэтому оно остаётся в WHERE
+        pushable = set(self.tables) if join_type == "INNER JOIN" else {self.root}
+        pushed = {table: conditions for table, conditions in filters.items() if table in pushable}
+        remaining = [c for table, conditions in filters.items() if table not in pushable for c in conditions]
+
+        needed = self.key_columns()
+        for column in columns:
+            if column.table in needed and column.name not in needed[column.table]:
+                needed[column.table].append(column.name)
+
+        def source(table):
+            if table not in pushed:
+                return sql.Identifier(table)
+            projection = (sql.SQL(", ").join(sql.Identifier(c) for c in needed[table])
+                          if columns and needed[table] else sql.SQL("*"))
+            return sql.SQL("(SELECT {} FROM {} WHERE {}) AS {}").format(
+                projection, sql.Identifier(table), compile_node(And(*pushed[table])), sql.Identifier(table))
+
+        # Одноимённые столбцы разных таблиц получают имя "таблица.столбец",
+        # иначе в строках-словарях результата они перезапишут друг друга
+        names = [column.name for column in columns]
+        outputs = [Alias(c, f"{c.table}.{c.name}") if c.table and names.count(c.name) > 1 else c for c in columns]
+        select_list = sql.SQL(", ").join(compile_node(c) for c in outputs) if columns else Star().compile()[0]
+        query = [sql.SQL("SELECT "), select_list, sql.SQL(" FROM "), source(self.root)]
+        for step in self.steps:
+            conditions = sql.SQL(" AND ").join(
+                sql.SQL("{} = {}").format(sql.Identifier(*left), sql.Identifier(*right))
+                for left, right in step.key_pairs())
+            query += [sql.SQL(f" {join_type} "), source(step.table), sql.SQL(" ON "), conditions]
+        if remaining:
+            query += [sql.SQL(" WHERE "), compile_node(And(*remaining))]
+        return sql.Composed(query), tuple(params)
+
+
+class JoinGraph:
+    """Неориентированный граф таблиц, связанных внешними ключами."""
+
+    def __init__(self, foreign_keys):
+        self.foreign_keys = list(foreign_keys)
+        self.adjacency = {}
+        for fk in self.foreign_keys:
+            self.adjacency.setdefault(fk.table, []).append((fk.ref_table, fk))
+            self.adjacency.setdefault(fk.ref_table, []).append((fk.table, fk))
+
+    @classmethod
+    def from_catalog(cls, rows):
+        """Граф из строк DatabaseManager.get_foreign_keys()."""
+        return cls(ForeignKey(row["name"], row["table"], list(row["columns"]),
+                              row["ref_table"], list(row["ref_columns"])) for row in rows)
+
+    def plan(self, tables, via=(), foreign_keys=()):
+        """
+        Дерево соединений для таблиц tables.
+        На каждом шаге поиском в ширину от уже соединённых таблиц находятся все
+        кратчайшие пути до ближайшей из оставшихся таблиц. Из них остаются пути,
+        у которых меньше всего промежуточных таблиц вне via; если и после этого
+        путей несколько, план неоднозначен.
+
+        Args:
+            via: Предпочтительные промежуточные таблицы
+            foreign_keys: Имена внешних ключей; если у пары таблиц несколько внешних
+                ключей и один из них указан, используются только указанные
+
+        Raises:
+            AmbiguousJoinError: Если таблицу можно присоединить несколькими путями
+            ValueError: Если таблица не связана с остальными внешними ключами
+        """
+        tables = list(dict.fromkeys(tables))
+        if not tables:
+            raise ValueError("Не выбраны таблицы")
+        via = set(via)
+        allowed = self._allowed_keys(set(foreign_keys))
+        connected = [tables[0]]
+        steps = []
+        while True:
+            remaining = [t for t in tables if t not in connected]
+            if not remaining:
+                break
+            target, candidates = self._shortest_paths(connected, remaining, allowed)
+            if target is None:
+                raise ValueError(f"Таблица {remaining[0]} не связана внешними ключами с {', '.join(connected)}")
+            if len(candidates) > 1:
+                def outside_via(path):
+                    return sum(1 for step in path[:-1] if step.table not in via)
+                best = min(outside_via(path) for path in candidates)
+                candidates = [path for path in candidates if outside_via(path) == best]
+            if len(candidates) > 1:
+                raise AmbiguousJoinError(target, candidates)
+            for step in candidates[0]:
+                steps.append(step)
+                connected.append(step.table)
+        return JoinPlan(tables[0], steps, tables)
+
+    def _allowed_keys(self, preferred):
+        """Проверка внешнего ключа с учётом предпочтений для пар с несколькими ключами."""
+        pairs = {}
+        for fk in self.foreign_keys:
+            pairs.setdefault(frozenset((fk.table, fk.ref_table)), []).append(fk.name)
+
+        def allowed(fk):
+            names = pairs[frozenset((fk.table, fk.ref_table))]
+            return fk.name in preferred or not any(name in preferred for name in names)
+        return allowed
+
+    def _shortest_paths(self, connected, remaining, allowed):
+        """
+        Все кратчайшие пути от соединённых таблиц до ближайшей оставшейся
+        (при равном расстоянии — первой в порядке выбора).
+
+        Returns:
+            tuple: (таблица или None, список путей — списков JoinStep)
+        """
+        parents = {table: [] for table in connected}
+        frontier = list(connected)
+        while frontier:
+            layer = []
+            for table in frontier:
+                for neighbour, fk in self.adjacency.get(table, []):
+                    if not allowed(fk) or (neighbour in parents and neighbour not in layer):
+                        continue
+                    if neighbour not in parents:
+                        parents[neighbour] = []
+                        layer.append(neighbour)
+                    parents[neighbour].append((table, fk))
+            reached = [table for table in remaining if table in layer]
+            if reached:
+                return reached[0], self._paths(reached[0], parents)
+            frontier = layer
+        return None, []
+
+    def _paths(self, table, parents):
+        if not parents[table]:
+            return [[]]
+        return [path + [JoinStep(table, previous, fk)]
+                for previous, fk in parents[table] for path in self._paths(previous, parents)]
@@ -1,17 +1,14 @@
 import logging
 import os
 from datetime import datetime
-from PySide6.QtCore import Signal, QObject
 
 
-class LogEmitter(QObject):
-    """Класс для отправки сигналов о новых записях лога в Qt интерфейс."""
-    new_log = Signal(str)
-
-
-class Logger(QObject):
+class Logger:
     """
-    Класс для логирования действий в приложении
+    Класс для логирования действий в приложении.
+    Не зависит от Qt: интерфейс подписывается на записи через add_listener
+    (см. ui.log_bridge.LogBridge), поэтому слой данных можно импортировать
+    в консольных скриптах и рабочих процессах без PySide6.
     """
     _instance = None
 
@@ -27,10 +24,8 @@ class Logger(QObject):
         if hasattr(self, '_initialized') and self._initialized:
             return
 
-        super().__init__()
         self.logger = logging.getLogger(__name__)
-        self.emitter = LogEmitter()
-        self._main_window_log_display = None
+        self._listeners = []
         self._initialized = True
 
         # Очистка старых обработчиков если они есть
@@ -51,39 +46,41 @@ class Logger(QObject):
         file_handler.setFormatter(formatter)
         self.logger.addHandler(file_handler)
 
-    def set_main_window_log_display(self, log_display):
-        """Связывает текстовое поле в главном окне с логгером для отображения логов."""
-        self._main_window_log_display = log_display
-        self.emitter.new_log.connect(self._update_log_display)
-        # Прокрутка вниз для показа последних логов
-        if self._main_window_log_display:
-            scrollbar = self._main_window_log_display.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
-
-    def _update_log_display(self, message):
-        """Обновляет отображение логов в интерфейсе пользователя."""
-        if self._main_window_log_display:
-            self._main_window_log_display.append(message)
-            # Прокручивание до самых новых сообщений
-            scrollbar = self._main_window_log_display.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
+    def add_listener(self, callback):
+        """
+        Подписка на записи журнала: callback(line) вызывается с готовой строкой
+        в потоке, который сделал запись.
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, level, message):
+        if not self._listeners:
+            return
+        line = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {level} - {message}"
+        for callback in list(self._listeners):
+            callback(line)
 
     def info(self, message):
         """Запись информационного сообщения в лог."""
         self.logger.info(message)
-        self.emitter.new_log.emit(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - INFO - {message}")
+        self._notify("INFO", message)
 
     def warning(self, message):
         """Запись предупреждения в лог."""
         self.logger.warning(message)
-        self.emitter.new_log.emit(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - WARNING - {message}")
+        self._notify("WARNING", message)
 
     def error(self, message):
         """Запись сообщения об ошибке в лог."""
         self.logger.error(message)
-        self.emitter.new_log.emit(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - ERROR - {message}")
+        self._notify("ERROR", message)
 
     def debug(self, message):
         """Запись отладочного сообщения в лог."""
         self.logger.debug(message)
-        self.emitter.new_log.emit(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - DEBUG - {message}")
\ No newline at end of file
+        self._notify("DEBUG", message)
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Фоновый прогрев соединений и предзагрузка данных после входа.
+
+Пока открывается главное окно, небольшой пул соединений параллельно
+загружает каталог схемы и первые страницы часто открываемых таблиц.
+Каждая страница читается в транзакции REPEATABLE READ вместе со снимком
+транзакций; DatabaseManager.get_table_page отдаёт её, только если снимок
+с тех пор не изменился. После загрузки пул передаётся DatabaseManager:
+из него берутся отдельные соединения для запросов конструктора и мастера
+JOIN и для синхронизации диалогов, поэтому они не ждут подключения.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor
+
+from core.catalog import Catalog, SNAPSHOT_SQL, table_page_query
+from core.data import TABLE_PAGE_SIZE
+from core.logger import Logger
+
+PREFETCH_TABLES = ("books", "readers", "issues", "authors")
+PREFETCH_WORKERS = 3
+
+
+class Prefetcher:
+    """
+    Предзагрузка каталога и первых страниц таблиц на отдельных соединениях.
+
+    Args:
+        db: Подключённый DatabaseManager (параметры соединения и приёмник результатов)
+        tables: Таблицы, первые страницы которых нужно загрузить
+        page_size: Размер страницы (как у get_table_page)
+        workers: Число соединений в пуле (все открываются сразу) и параллельных загрузок
+    """
+
+    def __init__(self, db, tables=PREFETCH_TABLES, page_size=None, workers=PREFETCH_WORKERS):
+        self.db = db
+        self.tables = list(tables)
+        self.page_size = page_size or TABLE_PAGE_SIZE
+        self.workers = workers
+        self.logger = Logger()
+        self.pool = None
+
+    def start(self):
+        """Запуск предзагрузки в фоновом потоке."""
+        thread = threading.Thread(target=self.run, name="library-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """
+        Открывает пул, параллельно загружает каталог и страницы
+        и передаёт их вместе с пулом в DatabaseManager.apply_prefetch.
+
+        Returns:
+            bool: Успешность загрузки каталога
+        """
+        params = dict(self.db.connection_params, connect_timeout=self.db.connect_timeout,
+                      application_name="library_prefetch")
+        try:
+            # minconn = maxconn: возвращённые в пул соединения не закрываются
+            self.pool = pool.ThreadedConnectionPool(self.workers, self.workers, **params)
+        except psycopg2.Error as e:
+            self.logger.warning(f"Предзагрузка отключена: не удалось открыть пул соединений: {str(e)}")
+            return False
+        handed_over = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="library-prefetch") as executor:
+                catalog_future = executor.submit(self._run_on_connection, Catalog.fetch)
+                # Ключ сортировки страниц нужен до загрузки каталога, поэтому
+                # потоки страниц читают первичный ключ своей таблицы сами
+                page_futures = {table: executor.submit(self._run_on_connection, self._load_page, table)
+                                for table in self.tables}
+                catalog = catalog_future.result()
+                pages = {}
+                for table, future in page_futures.items():
+                    page = future.result()
+                    if page is not None:
+                        pages[table] = page
+            self.db.apply_prefetch(catalog, pages, self.pool)
+            handed_over = True
+            self.logger.info(f"Предзагрузка завершена: каталог {'загружен' if catalog else 'не загружен'}, "
+                             f"страниц таблиц: {len(pages)}")
+            return catalog is not None
+        finally:
+            if not handed_over:
+                self.pool.closeall()
+
+    def _run_on_connection(self, task, *args):
+        """Выполнение task(cursor, *args) на соединении из пула; ошибки только логируются."""
+        connection = self.pool.getconn()
+        try:
+            connection.set_session(readonly=True, isolation_level="REPEATABLE READ")
+            with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                return task(cursor, *args)
+        except psycopg2.Error as e:
+            self.logger.warning(f"Ошибка предзагрузки: {str(e)}")
+            return None
+        finally:
+            connection.rollback()
+            self.pool.putconn(connection)
+
+    def _load_page(self, cursor, table):
+        """Первая страница таблицы и снимок транзакций, в котором она прочитана."""
+        # Первый запрос транзакции фиксирует её снимок для всех последующих
+        cursor.execute(SNAPSHOT_SQL)
+        snapshot = cursor.fetchone()["snapshot"]
+        cursor.execute("""
+            SELECT a.attname::text AS column_name, a.atttypid::regtype::text AS data_type
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relname = %s AND c.relkind = 'r'
+              AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (table,))
+        columns = [(row["column_name"], row["data_type"]) for row in cursor.fetchall()]
+        if not columns:
+            return None
+        cursor.execute("""
+            SELECT a.attname::text AS column_name
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY array_position(i.indkey::int2[], a.attnum)
+        """, (f'public."{table}"',))
+        primary_key = [row["column_name"] for row in cursor.fetchall()]
+        table_catalog = Catalog({table: columns}, {table: primary_key} if primary_key else {}, [])
+        query, params = table_page_query(table_catalog, table, self.page_size)
+        cursor.execute(query, params)
+        return self.page_size, [dict(row) for row in cursor.fetchall()], snapshot
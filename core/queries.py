@@ -0,0 +1,395 @@
+"""
+Тексты SQL-запросов слоя данных, общие для синхронного DatabaseManager
+(psycopg2) и асинхронного AsyncDatabaseManager (asyncpg).
+
+Запросы записаны с плейсхолдерами %s; для asyncpg и серверного PREPARE
+они переводятся в нумерованные $1..$n функцией numbered().
+"""
+import itertools
+import re
+from functools import lru_cache
+
+# Первичные ключи основных таблиц
+TABLE_KEYS = {
+    "readers": ("reader_id",),
+    "authors": ("author_id",),
+    "books": ("book_id",),
+    "book_authors": ("book_id", "author_id"),
+    "issues": ("issue_id",),
+}
+
+TABLE_EXISTS = """
+    SELECT 1
+    FROM information_schema.tables
+    WHERE table_schema = 'public' AND table_name = %s
+    LIMIT 1
+"""
+
+SELECT_ALL = {
+    table: f"SELECT * FROM {table} ORDER BY {', '.join(key)}"
+    for table, key in TABLE_KEYS.items()
+}
+
+SELECT_ROW = {
+    table: f"SELECT * FROM {table} WHERE {' AND '.join(f'{column} = %s' for column in key)}"
+    for table, key in TABLE_KEYS.items()
+}
+
+# Пакетная выборка строк по списку ключей (один запрос вместо N)
+SELECT_ROWS = {
+    table: f"SELECT * FROM {table} WHERE {key[0]} = ANY(%s) ORDER BY {key[0]}"
+    for table, key in TABLE_KEYS.items() if len(key) == 1
+}
+
+# Страницы таблиц в порядке ключа: первая и следующая за ключом последней строки
+SELECT_FIRST_PAGE = {
+    table: f"SELECT * FROM {table} ORDER BY {key[0]} LIMIT %s"
+    for table, key in TABLE_KEYS.items() if len(key) == 1
+}
+
+SELECT_NEXT_PAGE = {
+    table: f"SELECT * FROM {table} WHERE {key[0]} > %s ORDER BY {key[0]} LIMIT %s"
+    for table, key in TABLE_KEYS.items() if len(key) == 1
+}
+
+SELECT_VERSION = {
+    table: f"SELECT version FROM {table} WHERE {key[0]} = %s"
+    for table, key in TABLE_KEYS.items() if len(key) == 1
+}
+
+INSERT_AUTHOR = """
+    INSERT INTO authors (last_name, first_name, patronymic, birth_year, country)
+    VALUES (%s, %s, %s, %s, %s) RETURNING *
+"""
+
+INSERT_READER = """
+    INSERT INTO readers (last_name, first_name, patronymic, ticket_number, registration_date)
+    VALUES (%s, %s, %s, %s, %s) RETURNING *
+"""
+
+INSERT_BOOK = """
+    INSERT INTO books (title, publication_year, genre, isbn, available_copies)
+    VALUES (%s, %s, %s, %s, %s) RETURNING *
+"""
+
+# due_date = NULL заполняется триггером: issue_date + LOAN_PERIOD_DAYS
+INSERT_ISSUE = """
+    INSERT INTO issues (book_id, reader_id, issue_date, return_date, due_date)
+    VALUES (%s, %s, %s, %s, %s) RETURNING *
+"""
+
+INSERT_BOOK_AUTHOR = """
+    INSERT INTO book_authors (book_id, author_id)
+    VALUES (%s, %s) ON CONFLICT DO NOTHING RETURNING *
+"""
+
+# UPDATE основных таблиц заканчиваются условием по ключу:
+# versioned_update() добавляет проверку версии и RETURNING
+UPDATE_AUTHOR = """
+    UPDATE authors
+    SET last_name  = %s,
+        first_name = %s,
+        patronymic = %s,
+        birth_year = %s,
+        country    = %s
+    WHERE author_id = %s"""
+
+UPDATE_READER = """
+    UPDATE readers
+    SET last_name         = %s,
+        first_name        = %s,
+        patronymic        = %s,
+        ticket_number     = %s,
+        registration_date = %s
+    WHERE reader_id = %s"""
+
+UPDATE_BOOK = """
+    UPDATE books
+    SET title            = %s,
+        publication_year = %s,
+        genre            = %s,
+        isbn             = %s,
+        available_copies = %s
+    WHERE book_id = %s"""
+
+UPDATE_ISSUE = """
+    UPDATE issues
+    SET book_id     = %s,
+        reader_id   = %s,
+        issue_date  = %s,
+        return_date = %s
+    WHERE issue_id = %s"""
+
+UPDATE_BOOK_AUTHOR = """
+    UPDATE book_authors
+    SET book_id   = %s,
+        author_id = %s
+    WHERE book_id = %s
+      AND author_id = %s RETURNING *
+"""
+
+DELETE_ROW = {
+    table: f"DELETE FROM {table} WHERE {' AND '.join(f'{column} = %s' for column in key)} RETURNING *"
+    for table, key in TABLE_KEYS.items()
+}
+
+SEARCH_BOOKS = """
+    SELECT b.*
+    FROM books b
+    WHERE b.book_id > %s
+      AND (b.title ILIKE %s OR b.isbn ILIKE %s
+           OR EXISTS (SELECT 1
+                      FROM book_authors ba
+                      JOIN authors a ON a.author_id = ba.author_id
+                      WHERE ba.book_id = b.book_id AND a.last_name ILIKE %s))
+    ORDER BY b.book_id
+    LIMIT %s
+"""
+
+CHECKOUT_TAKE_COPY = """
+    UPDATE books
+    SET available_copies = available_copies - 1
+    WHERE book_id = %s AND available_copies > 0 RETURNING book_id
+"""
+
+CHECKOUT_ADD_ISSUE = """
+    INSERT INTO issues (book_id, reader_id, issue_date, return_date)
+    VALUES (%s, %s, COALESCE(%s, CURRENT_DATE), NULL) RETURNING *
+"""
+
+RETURN_CLOSE_ISSUE = """
+    UPDATE issues
+    SET return_date = COALESCE(%s, CURRENT_DATE)
+    WHERE issue_id = %s AND return_date IS NULL RETURNING *
+"""
+
+# Просроченные выдачи: открытые (return_date IS NULL) со сроком раньше даты
+# проверки (NULL — сегодня). Выборка и подсчёт идут по частичному индексу
+# issues_open_due_date_idx (due_date, issue_id) WHERE return_date IS NULL,
+# поэтому не зависят от числа уже закрытых выдач.
+_OVERDUE_PAGE = """
+    SELECT i.issue_id, i.book_id, i.reader_id, i.issue_date, i.due_date,
+           COALESCE(%s::date, CURRENT_DATE) - i.due_date AS days_overdue,
+           b.title, r.last_name, r.first_name, r.patronymic, r.ticket_number
+    FROM issues i
+    JOIN books b ON b.book_id = i.book_id
+    JOIN readers r ON r.reader_id = i.reader_id
+    WHERE i.return_date IS NULL
+      AND i.due_date < COALESCE(%s::date, CURRENT_DATE){after}
+    ORDER BY i.due_date, i.issue_id
+    LIMIT %s
+"""
+
+OVERDUE_FIRST_PAGE = _OVERDUE_PAGE.format(after="")
+
+# Следующая страница после (due_date, issue_id) последней строки
+OVERDUE_NEXT_PAGE = _OVERDUE_PAGE.format(after="\n      AND (i.due_date, i.issue_id) > (%s::date, %s)")
+
+COUNT_OVERDUE = """
+    SELECT count(*) AS overdue
+    FROM issues
+    WHERE return_date IS NULL AND due_date < COALESCE(%s::date, CURRENT_DATE)
+"""
+
+# Одна порция уведомлений: следующие chunk просроченных выдач после ключа
+# (due_date, issue_id); уже созданные уведомления (issue_id, due_date) пропускаются.
+# Возвращает число созданных записей, размер порции и ключ её последней выдачи.
+CREATE_OVERDUE_NOTIFICATIONS = """
+    WITH chunk AS (
+        SELECT issue_id, reader_id, book_id, due_date,
+               COALESCE(%s::date, CURRENT_DATE) - due_date AS days_overdue
+        FROM issues
+        WHERE return_date IS NULL
+          AND due_date < COALESCE(%s::date, CURRENT_DATE)
+          AND (due_date, issue_id) > (%s::date, %s)
+        ORDER BY due_date, issue_id
+        LIMIT %s
+    ), created AS (
+        INSERT INTO overdue_notifications (issue_id, reader_id, book_id, due_date, days_overdue)
+        SELECT issue_id, reader_id, book_id, due_date, days_overdue FROM chunk
+        ON CONFLICT (issue_id, due_date) DO NOTHING
+        RETURNING 1
+    ), last AS (
+        SELECT due_date, issue_id FROM chunk ORDER BY due_date DESC, issue_id DESC LIMIT 1
+    )
+    SELECT (SELECT count(*) FROM created) AS created,
+           (SELECT count(*) FROM chunk) AS scanned,
+           last.due_date::text AS last_due_date, last.issue_id AS last_issue_id
+    FROM (SELECT 1) AS one
+    LEFT JOIN last ON TRUE
+"""
+
+# ==== Очередь бронирований (holds) ====
+# Активная бронь: waiting — в очереди, ready — экземпляр отложен до pickup_until.
+# Возвращённый экземпляр достаётся первой ожидающей брони (created_at, hold_id);
+# FOR UPDATE SKIP LOCKED позволяет нескольким кафедрам одновременно обрабатывать
+# возвраты одной книги: каждая берёт следующую незаблокированную бронь, не ожидая других.
+
+# Экземпляр освободился: отложить его первой ожидающей брони, а если очереди
+# нет — вернуть в available_copies. Возвращает бронь, получившую экземпляр.
+RELEASE_COPY = """
+    WITH next_hold AS (
+        SELECT hold_id
+        FROM holds
+        WHERE book_id = %s AND status = 'waiting'
+        ORDER BY created_at, hold_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ), ready AS (
+        UPDATE holds h
+        SET status = 'ready', ready_at = now(), pickup_until = CURRENT_DATE + %s::int
+        FROM next_hold
+        WHERE h.hold_id = next_hold.hold_id
+        RETURNING h.*
+    ), put_back AS (
+        UPDATE books
+        SET available_copies = available_copies + 1
+        WHERE book_id = %s AND NOT EXISTS (SELECT 1 FROM ready)
+    )
+    SELECT * FROM ready
+"""
+
+# Бронь ставится, только если свободных экземпляров нет
+INSERT_HOLD = """
+    INSERT INTO holds (book_id, reader_id)
+    SELECT book_id, %s FROM books WHERE book_id = %s AND available_copies = 0
+    RETURNING *
+"""
+
+# Выдача по отложенной для читателя брони (экземпляр уже снят с available_copies)
+CHECKOUT_FULFIL_HOLD = """
+    UPDATE holds
+    SET status = 'fulfilled', closed_at = now()
+    WHERE book_id = %s AND reader_id = %s AND status = 'ready'
+    RETURNING hold_id
+"""
+
+# previous_status — состояние до отмены: у ready-брони нужно освободить экземпляр
+CANCEL_HOLD = """
+    WITH old AS (
+        SELECT hold_id, status
+        FROM holds
+        WHERE hold_id = %s AND status IN ('waiting', 'ready')
+        FOR UPDATE
+    )
+    UPDATE holds h
+    SET status = 'cancelled', closed_at = now()
+    FROM old
+    WHERE h.hold_id = old.hold_id
+    RETURNING h.*, old.status AS previous_status
+"""
+
+# Порция отложенных броней с истёкшим сроком получения
+EXPIRE_HOLDS = """
+    UPDATE holds
+    SET status = 'expired', closed_at = now()
+    WHERE hold_id IN (SELECT hold_id
+                      FROM holds
+                      WHERE status = 'ready' AND pickup_until < CURRENT_DATE
+                      ORDER BY hold_id
+                      LIMIT %s
+                      FOR UPDATE SKIP LOCKED)
+    RETURNING hold_id, book_id
+"""
+
+# Активные брони (фильтр по книге и/или читателю) с местом в очереди
+SELECT_ACTIVE_HOLDS = """
+    SELECT h.hold_id, h.book_id, h.reader_id, h.status, h.created_at, h.ready_at, h.pickup_until,
+           b.title, r.last_name, r.first_name, r.ticket_number,
+           CASE WHEN h.status = 'waiting' THEN
+               (SELECT count(*)
+                FROM holds w
+                WHERE w.book_id = h.book_id AND w.status = 'waiting'
+                  AND (w.created_at, w.hold_id) <= (h.created_at, h.hold_id))
+           END AS position
+    FROM holds h
+    JOIN books b ON b.book_id = h.book_id
+    JOIN readers r ON r.reader_id = h.reader_id
+    WHERE h.status IN ('waiting', 'ready')
+      AND (%s::int IS NULL OR h.book_id = %s::int)
+      AND (%s::int IS NULL OR h.reader_id = %s::int)
+    ORDER BY h.book_id, h.status = 'waiting', h.created_at, h.hold_id
+"""
+
+# ==== История читателя и рекомендации ====
+# История читается по индексу issues_reader_history_idx (reader_id, issue_date DESC, issue_id DESC):
+# страница — следующие строки после (issue_date, issue_id) последней строки предыдущей.
+_READER_HISTORY = """
+    SELECT i.issue_id, i.book_id, i.issue_date, i.due_date, i.return_date,
+           b.title, b.genre, b.publication_year
+    FROM issues i
+    JOIN books b ON b.book_id = i.book_id
+    WHERE i.reader_id = %s{before}
+    ORDER BY i.issue_date DESC, i.issue_id DESC
+    LIMIT %s
+"""
+
+READER_HISTORY_FIRST_PAGE = _READER_HISTORY.format(before="")
+
+READER_HISTORY_NEXT_PAGE = _READER_HISTORY.format(
+    before="\n      AND (i.issue_date, i.issue_id) < (%s::date, %s)")
+
+READER_STATS = """
+    SELECT count(*) AS total_issues,
+           count(*) FILTER (WHERE return_date IS NULL) AS open_issues,
+           count(*) FILTER (WHERE return_date IS NULL AND due_date < CURRENT_DATE) AS overdue_issues,
+           count(DISTINCT book_id) AS distinct_books,
+           min(issue_date) AS first_issue_date,
+           max(issue_date) AS last_issue_date
+    FROM issues
+    WHERE reader_id = %s
+"""
+
+# Все пары (читатель, книга) для подсчёта совместных выдач
+BORROWING_PAIRS = "SELECT DISTINCT reader_id, book_id FROM issues"
+
+BOOK_RECOMMENDATIONS = """
+    SELECT r.recommended_book_id AS book_id, b.title, b.genre, r.co_readers, r.score
+    FROM book_recommendations r
+    JOIN books b ON b.book_id = r.recommended_book_id
+    WHERE r.book_id = %s
+    ORDER BY r.rank
+    LIMIT %s
+"""
+
+# Рекомендации читателю: сумма оценок по всем прочитанным им книгам,
+# кроме уже взятых; because_of — сколько его книг привели к рекомендации
+READER_RECOMMENDATIONS = """
+    WITH history AS (
+        SELECT DISTINCT book_id FROM issues WHERE reader_id = %s
+    )
+    SELECT r.recommended_book_id AS book_id, b.title, b.genre,
+           sum(r.score) AS score, count(*) AS because_of
+    FROM book_recommendations r
+    JOIN history h ON h.book_id = r.book_id
+    JOIN books b ON b.book_id = r.recommended_book_id
+    WHERE r.recommended_book_id NOT IN (SELECT book_id FROM history)
+    GROUP BY r.recommended_book_id, b.title, b.genre
+    ORDER BY score DESC, book_id
+    LIMIT %s
+"""
+
+
+def versioned_update(query, key_value, expected_version):
+    """
+    Завершение UPDATE_*: при заданной версии строка обновляется, только если
+    её version не изменилась.
+
+    Returns:
+        tuple: (текст запроса, параметры ключа и версии — идут после значений полей)
+    """
+    if expected_version is None:
+        return query + " RETURNING *", (key_value,)
+    return query + " AND version = %s RETURNING *", (key_value, expected_version)
+
+
+def like_pattern(text):
+    """Шаблон ILIKE для поиска подстроки с экранированием % и _."""
+    return "%" + re.sub(r"([%_\\])", r"\\\1", text.strip()) + "%"
+
+
+@lru_cache(maxsize=256)
+def numbered(query):
+    """Замена плейсхолдеров %s на $1..$n (и %% на %)."""
+    numbers = itertools.count(1)
+    return re.sub(r"%%|%s", lambda m: "%" if m.group() == "%%" else f"${next(numbers)}", query)
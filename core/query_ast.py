@@ -0,0 +1,457 @@
+"""
+Типизированное дерево SQL-выражений для конструктора запросов.
+
+Узлы компилируются в композиции psycopg2.sql и список параметров,
+поэтому запросы, отличающиеся только значениями, имеют одинаковый текст
+и могут быть подготовлены сервером один раз (PREPARE/EXECUTE).
+"""
+import re
+
+from psycopg2 import sql
+
+AGGREGATE_FUNCTIONS = ("COUNT", "SUM", "AVG", "MAX", "MIN")
+COMPARISON_OPERATORS = ("=", "<>", "!=", "<", ">", "<=", ">=", "~", "~*", "!~", "!~*")
+ORDER_DIRECTIONS = ("ASC", "DESC")
+
+
+class Node:
+    """Базовый узел: compile() возвращает (sql.Composable, список параметров)."""
+
+    def compile(self):
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Star(Node):
+    """Все столбцы (*)."""
+
+    def compile(self):
+        return sql.SQL("*"), []
+
+
+class Column(Node):
+    """Столбец, опционально с именем таблицы."""
+
+    def __init__(self, name, table=None):
+        self.name = name
+        self.table = table
+
+    @classmethod
+    def parse(cls, text):
+        """Column из строки вида "column" или "table.column"; "*" даёт Star."""
+        text = text.strip()
+        if text == "*":
+            return Star()
+        if "." in text:
+            table, name = text.split(".", 1)
+            return cls(name.strip('"'), table.strip('"'))
+        return cls(text.strip('"'))
+
+    def compile(self):
+        if self.table:
+            return sql.Identifier(self.table, self.name), []
+        return sql.Identifier(self.name), []
+
+
+class Param(Node):
+    """Значение, передаваемое параметром запроса."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def compile(self):
+        return sql.Placeholder(), [self.value]
+
+
+class Aggregate(Node):
+    """Агрегатная функция над столбцом или *."""
+
+    def __init__(self, function, column="*"):
+        function = function.upper()
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Недопустимая агрегатная функция: {function}")
+        self.function = function
+        self.column = column if isinstance(column, Node) else Column.parse(column)
+
+    def label(self):
+        """Имя столбца результата по умолчанию: count, sum_copies и т.п."""
+        if isinstance(self.column, Star):
+            return self.function.lower()
+        return f"{self.function.lower()}_{self.column.name}"
+
+    def compile(self):
+        column, params = self.column.compile()
+        return sql.SQL("{}({})").format(sql.SQL(self.function), column), params
+
+
+class Alias(Node):
+    """Выражение списка SELECT с именем: expr AS name."""
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    def compile(self):
+        part, params = self.node.compile()
+        return sql.SQL("{} AS {}").format(part, sql.Identifier(self.name)), params
+
+
+class Grouping(Node):
+    """
+    GROUPING(c1, c2, ...) — битовая маска столбцов, свёрнутых в строке
+    промежуточного итога (ROLLUP/CUBE/GROUPING SETS); 0 — обычная строка.
+    """
+
+    def __init__(self, columns):
+        self.columns = [_column(c) for c in columns]
+
+    def compile(self):
+        return sql.SQL("GROUPING({})").format(
+            sql.SQL(", ").join(column.compile()[0] for column in self.columns)), []
+
+
+class Raw(Node):
+    """
+    Текст условия, который не удалось разобрать.
+    Символы % экранируются, чтобы не конфликтовать с параметрами.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def compile(self):
+        return sql.SQL(self.text.replace("%", "%%")), []
+
+
+def _column(value):
+    return value if isinstance(value, Node) else Column.parse(value)
+
+
+def _operand(value):
+    return value if isinstance(value, Node) else Param(value)
+
+
+class Comparison(Node):
+    """column <op> value; значение без обёртки становится параметром."""
+
+    def __init__(self, left, operator, right):
+        if operator not in COMPARISON_OPERATORS:
+            raise ValueError(f"Недопустимый оператор: {operator}")
+        self.left = _column(left)
+        self.operator = "<>" if operator == "!=" else operator
+        self.right = _operand(right)
+
+    def compile(self):
+        left, left_params = self.left.compile()
+        right, right_params = self.right.compile()
+        return (sql.SQL("{} {} {}").format(left, sql.SQL(self.operator), right),
+                left_params + right_params)
+
+
+class Like(Node):
+    """[NOT] LIKE / ILIKE с шаблоном-параметром."""
+
+    def __init__(self, column, pattern, negate=False, case_insensitive=False):
+        self.column = _column(column)
+        self.pattern = _operand(pattern)
+        self.negate = negate
+        self.case_insensitive = case_insensitive
+
+    def compile(self):
+        column, column_params = self.column.compile()
+        pattern, pattern_params = self.pattern.compile()
+        operator = ("NOT " if self.negate else "") + ("ILIKE" if self.case_insensitive else "LIKE")
+        return sql.SQL("{} {} {}").format(column, sql.SQL(operator), pattern), column_params + pattern_params
+
+
+class In(Node):
+    """
+    [NOT] IN со списком значений.
+    Компилируется в "= ANY(%s)" с одним параметром-массивом, поэтому
+    текст запроса не зависит от длины списка.
+    """
+
+    def __init__(self, column, values, negate=False):
+        self.column = _column(column)
+        self.values = list(values)
+        self.negate = negate
+
+    def compile(self):
+        column, params = self.column.compile()
+        template = "{} <> ALL({})" if self.negate else "{} = ANY({})"
+        return sql.SQL(template).format(column, sql.Placeholder()), params + [self.values]
+
+
+class Between(Node):
+    """[NOT] BETWEEN low AND high."""
+
+    def __init__(self, column, low, high, negate=False):
+        self.column = _column(column)
+        self.low = _operand(low)
+        self.high = _operand(high)
+        self.negate = negate
+
+    def compile(self):
+        column, params = self.column.compile()
+        low, low_params = self.low.compile()
+        high, high_params = self.high.compile()
+        template = "{} NOT BETWEEN {} AND {}" if self.negate else "{} BETWEEN {} AND {}"
+        return sql.SQL(template).format(column, low, high), params + low_params + high_params
+
+
+class RowComparison(Node):
+    """
+    Сравнение кортежей (c1, c2) > (%s, %s) — условие keyset-пагинации.
+    Для одного столбца вырождается в обычное сравнение.
+    """
+
+    def __init__(self, columns, operator, values):
+        if operator not in ("<", ">", "<=", ">="):
+            raise ValueError(f"Недопустимый оператор: {operator}")
+        if len(columns) != len(values) or not columns:
+            raise ValueError("Число столбцов и значений должно совпадать")
+        self.columns = [_column(c) for c in columns]
+        self.operator = operator
+        self.values = list(values)
+
+    def compile(self):
+        if len(self.columns) == 1:
+            return Comparison(self.columns[0], self.operator, self.values[0]).compile()
+        columns = sql.SQL(", ").join(column.compile()[0] for column in self.columns)
+        placeholders = sql.SQL(", ").join(sql.Placeholder() * len(self.values))
+        return (sql.SQL("({}) {} ({})").format(columns, sql.SQL(self.operator), placeholders),
+                list(self.values))
+
+
+class IsNull(Node):
+    """IS [NOT] NULL."""
+
+    def __init__(self, column, negate=False):
+        self.column = _column(column)
+        self.negate = negate
+
+    def compile(self):
+        column, params = self.column.compile()
+        return sql.SQL("{} IS NOT NULL" if self.negate else "{} IS NULL").format(column), params
+
+
+class _BoolOp(Node):
+    keyword = None
+
+    def __init__(self, *conditions):
+        self.conditions = [c for c in conditions if c is not None]
+
+    def compile(self):
+        parts, params = [], []
+        for condition in self.conditions:
+            part, part_params = condition.compile()
+            if len(self.conditions) > 1 and isinstance(condition, _BoolOp) and len(condition.conditions) > 1:
+                part = sql.SQL("({})").format(part)
+            parts.append(part)
+            params.extend(part_params)
+        return sql.SQL(f" {self.keyword} ").join(parts), params
+
+
+class And(_BoolOp):
+    keyword = "AND"
+
+
+class Or(_BoolOp):
+    keyword = "OR"
+
+
+class Not(Node):
+    def __init__(self, condition):
+        self.condition = condition
+
+    def compile(self):
+        part, params = self.condition.compile()
+        return sql.SQL("NOT ({})").format(part), params
+
+
+# --- Разбор текстовых условий (WHERE/HAVING из формы) ---
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+      | (?P<op><=|>=|<>|!=|!~\*|!~|~\*|[=<>~])
+      | (?P<punct>[(),*])
+      | (?P<ident>"[^"]+"(?:\."[^"]+")?|[^\W\d][\w]*(?:\.[^\W\d][\w]*)?)
+    )""", re.VERBOSE | re.UNICODE)
+
+_KEYWORDS = {"AND", "OR", "NOT", "IN", "LIKE", "ILIKE", "IS", "NULL", "BETWEEN", "TRUE", "FALSE"}
+
+
+class ParseError(ValueError):
+    pass
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ParseError(f"Неожиданный символ в позиции {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "ident" and value.upper() in _KEYWORDS:
+            kind, value = "kw", value.upper()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            raise ParseError(f"Ожидалось {value or kind}, получено {token[1]}")
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.expr()
+        if self.peek()[0] is not None:
+            raise ParseError(f"Лишний текст: {self.peek()[1]}")
+        return node
+
+    def expr(self):
+        nodes = [self.and_expr()]
+        while self.accept("kw", "OR"):
+            nodes.append(self.and_expr())
+        return nodes[0] if len(nodes) == 1 else Or(*nodes)
+
+    def and_expr(self):
+        nodes = [self.not_expr()]
+        while self.accept("kw", "AND"):
+            nodes.append(self.not_expr())
+        return nodes[0] if len(nodes) == 1 else And(*nodes)
+
+    def not_expr(self):
+        if self.accept("kw", "NOT"):
+            return Not(self.not_expr())
+        if self.peek() == ("punct", "("):
+            self.take()
+            node = self.expr()
+            self.take("punct", ")")
+            return node
+        return self.predicate()
+
+    def literal(self):
+        kind, value = self.take()
+        if kind == "string":
+            return value[1:-1].replace("''", "'")
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "kw" and value in ("TRUE", "FALSE"):
+            return value == "TRUE"
+        raise ParseError(f"Ожидалось значение, получено {value}")
+
+    def operand(self):
+        kind, value = self.peek()
+        if kind == "ident":
+            self.take()
+            if self.peek() == ("punct", "("):
+                self.take()
+                column = "*" if self.accept("punct", "*") else self.take("ident")[1]
+                self.take("punct", ")")
+                try:
+                    return Aggregate(value, column)
+                except ValueError as e:
+                    raise ParseError(str(e))
+            return Column.parse(value)
+        return Param(self.literal())
+
+    def predicate(self):
+        left = self.operand()
+        negate = self.accept("kw", "NOT")
+        kind, value = self.peek()
+        if kind == "op" and not negate:
+            self.take()
+            return Comparison(left, value, self.operand())
+        if kind == "kw" and value == "IN":
+            self.take()
+            self.take("punct", "(")
+            values = [self.literal()]
+            while self.accept("punct", ","):
+                values.append(self.literal())
+            self.take("punct", ")")
+            return In(left, values, negate)
+        if kind == "kw" and value in ("LIKE", "ILIKE"):
+            self.take()
+            return Like(left, self.operand(), negate, value == "ILIKE")
+        if kind == "kw" and value == "BETWEEN":
+            self.take()
+            low = self.operand()
+            self.take("kw", "AND")
+            return Between(left, low, self.operand(), negate)
+        if kind == "kw" and value == "IS" and not negate:
+            self.take()
+            is_not = self.accept("kw", "NOT")
+            self.take("kw", "NULL")
+            return IsNull(left, is_not)
+        raise ParseError(f"Неподдерживаемое условие около {value}")
+
+
+def parse_condition(text):
+    """
+    Разбор текстового условия в дерево узлов.
+    Литералы становятся параметрами; если выражение не поддерживается
+    разборщиком, возвращается Raw с исходным текстом.
+    """
+    if isinstance(text, Node):
+        return text
+    try:
+        return _Parser(text).parse()
+    except ParseError:
+        return Raw(text)
+
+
+def render(query, params=()):
+    """
+    Человекочитаемый текст запроса без подключения к БД (для журнала и диалогов).
+    Параметры подставляются в виде repr после текста.
+    """
+    def walk(node):
+        if isinstance(node, sql.Composed):
+            return "".join(walk(part) for part in node)
+        if isinstance(node, sql.Identifier):
+            return ".".join(node.strings)
+        if isinstance(node, sql.Placeholder):
+            return "%s"
+        if isinstance(node, sql.SQL):
+            return node.string.replace("%%", "%")
+        if isinstance(node, sql.Literal):
+            return repr(node.wrapped)
+        return str(node)
+
+    text = walk(query) if isinstance(query, sql.Composable) else str(query)
+    if params:
+        text += f"  -- параметры: {list(params)}"
+    return text
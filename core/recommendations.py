@@ -0,0 +1,146 @@
+"""
+Предрасчёт рекомендаций «читатели этой книги брали также».
+
+Пары (читатель, книга) из issues загружаются порциями в массивы NumPy и
+складываются в разреженную матрицу читатели × книги (SciPy CSR, значения 0/1).
+Совместные выдачи двух книг — произведение Mᵀ·M; оно считается блоками
+по BOOK_BLOCK книг, чтобы не держать в памяти всю матрицу книга × книга.
+Оценка пары — косинусная мера co / sqrt(n_a · n_b), где n — число читателей
+книги; для каждой книги сохраняются top лучших пар с co >= min_co_readers.
+
+Результат заменяет содержимое таблицы book_recommendations в одной
+транзакции (COPY), поэтому интерфейс и API до фиксации видят прежние
+рекомендации. Запуск: python scheduler.py --dsn ... recommendations
+"""
+import io
+import time
+
+import numpy as np
+import psycopg2
+from scipy import sparse
+
+from core import queries
+
+# Сколько рекомендаций хранить на книгу
+DEFAULT_TOP = 10
+# Минимум общих читателей, чтобы пара книг считалась связанной
+MIN_CO_READERS = 2
+# Сколько пар (читатель, книга) читать одним FETCH
+FETCH_ROWS = 100000
+# Сколько книг (строк Mᵀ·M) считать за один блок
+BOOK_BLOCK = 2000
+
+
+class RecommendationBuilder:
+    """
+    Пакетный расчёт рекомендаций на соединении DatabaseManager.
+
+    Args:
+        db: Подключённый DatabaseManager
+        top: Рекомендаций на книгу
+        min_co_readers: Минимум общих читателей пары
+    """
+
+    def __init__(self, db, top=DEFAULT_TOP, min_co_readers=MIN_CO_READERS):
+        self.db = db
+        self.logger = db.logger
+        self.top = top
+        self.min_co_readers = min_co_readers
+
+    def run(self):
+        """
+        Returns:
+            dict or None: Сводка (книг, пар, рекомендаций, длительность) или None при ошибке
+        """
+        started = time.perf_counter()
+        try:
+            readers, books = self.load_pairs()
+            book_ids, counts, matrix = self.borrowing_matrix(readers, books)
+            rows = self.top_pairs(book_ids, counts, matrix)
+            self.save(rows)
+        except psycopg2.Error as e:
+            self.db.connection.rollback()
+            self.logger.error(f"Ошибка расчёта рекомендаций: {str(e)}")
+            return None
+        summary = {
+            "pairs": len(readers),
+            "books": len(book_ids),
+            "recommendations": len(rows[0]),
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        }
+        self.logger.info(f"Рекомендации пересчитаны: {summary['recommendations']} для {summary['books']} книг "
+                         f"по {summary['pairs']} парам читатель–книга за {summary['duration_ms']:.0f} мс")
+        return summary
+
+    def load_pairs(self):
+        """Различные пары (reader_id, book_id) через серверный курсор порциями FETCH_ROWS."""
+        readers, books = [], []
+        with self.db.connection.cursor(name="library_borrowing_pairs") as cursor:
+            cursor.itersize = FETCH_ROWS
+            cursor.execute(queries.BORROWING_PAIRS)
+            while True:
+                chunk = cursor.fetchmany(FETCH_ROWS)
+                if not chunk:
+                    break
+                pairs = np.array(chunk, dtype=np.int64)
+                readers.append(pairs[:, 0])
+                books.append(pairs[:, 1])
+        self.db.connection.rollback()
+        if not readers:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(readers), np.concatenate(books)
+
+    @staticmethod
+    def borrowing_matrix(readers, books):
+        """
+        Returns:
+            tuple: (book_id по столбцам, число читателей каждой книги, CSR-матрица читатели × книги)
+        """
+        _, reader_index = np.unique(readers, return_inverse=True)
+        book_ids, book_index = np.unique(books, return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(readers), dtype=np.int32), (reader_index, book_index)),
+            shape=(int(reader_index.max()) + 1 if len(readers) else 0, len(book_ids)))
+        counts = np.asarray(matrix.sum(axis=0)).ravel()
+        return book_ids, counts, matrix
+
+    def top_pairs(self, book_ids, counts, matrix):
+        """
+        Лучшие пары для каждой книги.
+
+        Returns:
+            tuple: Массивы (book_id, rank, recommended_book_id, co_readers, score)
+        """
+        parts = []
+        transposed = matrix.T.tocsr()
+        for start in range(0, len(book_ids), BOOK_BLOCK):
+            block = (transposed[start:start + BOOK_BLOCK] @ matrix).tocoo()
+            rows = block.row + start
+            keep = (rows != block.col) & (block.data >= self.min_co_readers)
+            rows, cols, co = rows[keep], block.col[keep], block.data[keep]
+            if not len(rows):
+                continue
+            score = co / np.sqrt(counts[rows].astype(np.float64) * counts[cols])
+            # По книге: оценка по убыванию, при равенстве — меньший book_id
+            order = np.lexsort((cols, -score, rows))
+            rows, cols, co, score = rows[order], cols[order], co[order], score[order]
+            first = np.searchsorted(rows, rows, side="left")
+            rank = np.arange(len(rows)) - first + 1
+            keep = rank <= self.top
+            parts.append((book_ids[rows[keep]], rank[keep], book_ids[cols[keep]], co[keep], score[keep]))
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty, np.empty(0, dtype=np.float64)
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def save(self, rows):
+        """Замена содержимого book_recommendations одной транзакцией (COPY)."""
+        buffer = io.StringIO()
+        if len(rows[0]):
+            np.savetxt(buffer, np.column_stack(rows), fmt=("%d", "%d", "%d", "%d", "%.6f"), delimiter=",")
+        buffer.seek(0)
+        self.db.cursor.execute("DELETE FROM book_recommendations")
+        self.db.cursor.copy_expert(
+            "COPY book_recommendations (book_id, rank, recommended_book_id, co_readers, score) "
+            "FROM STDIN WITH (FORMAT csv)", buffer)
+        self.db.connection.commit()
@@ -0,0 +1,228 @@
+"""
+Маршрутизация чтения на реплики (горячий резерв PostgreSQL).
+
+Реплика получает запрос, только если она:
+  - находится в режиме восстановления (pg_is_in_recovery), то есть это резерв;
+  - отстаёт не больше чем на max_lag секунд (или применила всё полученное);
+  - воспроизвела WAL до позиции последней записи этого сеанса на основном
+    сервере (read-your-writes), которую запоминает LsnTrackingConnection.
+Иначе, а также при ошибке соединения или конфликте с восстановлением,
+запрос выполняется на основном сервере.
+"""
+import itertools
+import os
+import time
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2 import sql
+
+from core.instrumentation import InstrumentedCursor, InstrumentedDictCursor
+from core.logger import Logger
+
+# Переменная окружения со строками подключения к репликам через ";"
+REPLICA_DSNS_ENV = "LIBRARY_REPLICA_DSNS"
+# Допустимое отставание реплики, секунд
+REPLICA_MAX_LAG_SECONDS = 5.0
+# Сколько секунд доверять последней проверке состояния реплики
+REPLICA_STATUS_TTL = 1.0
+# Через сколько секунд повторять попытку подключения к недоступной реплике
+REPLICA_RETRY_SECONDS = 30.0
+
+REPLICA_STATUS_SQL = """
+    SELECT pg_is_in_recovery() AS standby,
+           pg_last_wal_replay_lsn()::text AS replay_lsn,
+           pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() AS idle,
+           EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8 AS lag_seconds
+"""
+
+# Ошибки соединения: реплика отключается до REPLICA_RETRY_SECONDS, чтение идёт на основной сервер
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def replica_dsns_from_env():
+    """Строки подключения к репликам из переменной LIBRARY_REPLICA_DSNS."""
+    return [dsn.strip() for dsn in os.environ.get(REPLICA_DSNS_ENV, "").split(";") if dsn.strip()]
+
+
+def parse_lsn(text):
+    """Позиция WAL 'X/Y' в виде числа (None остаётся None)."""
+    if not text:
+        return None
+    high, low = text.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+class LsnTrackingConnection(psycopg2.extensions.connection):
+    """
+    Соединение с основным сервером, которое после каждого COMMIT запоминает
+    текущую позицию WAL (last_lsn), если включено track_lsn.
+    """
+    track_lsn = False
+    last_lsn = None
+
+    def commit(self):
+        super().commit()
+        if not self.track_lsn:
+            return
+        with self.cursor(cursor_factory=InstrumentedCursor) as cursor:
+            cursor.execute("SELECT pg_current_wal_insert_lsn()::text")
+            self.note_lsn(parse_lsn(cursor.fetchone()[0]))
+        super().rollback()
+
+    def note_lsn(self, lsn):
+        if lsn is not None and (self.last_lsn is None or lsn > self.last_lsn):
+            self.last_lsn = lsn
+
+
+class Replica:
+    """Соединение с одной репликой и последнее известное её состояние."""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.connection = None
+        self.cursor = None
+        self.checked_at = 0.0
+        self.replay_lsn = None
+        self.healthy = False
+        self.retry_at = 0.0
+
+    @property
+    def name(self):
+        params = psycopg2.extensions.parse_dsn(self.dsn)
+        return f"{params.get('host', 'localhost')}:{params.get('port', 5432)}"
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except psycopg2.Error:
+                pass
+        self.connection = None
+        self.cursor = None
+        self.healthy = False
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для чтения (по кругу среди подходящих).
+
+    Args:
+        dsns: Строки подключения к репликам
+        connect_timeout: Время ожидания подключения, секунд
+        max_lag: Допустимое отставание, секунд
+    """
+
+    def __init__(self, dsns, connect_timeout, max_lag=REPLICA_MAX_LAG_SECONDS):
+        self.replicas = [Replica(dsn) for dsn in dsns]
+        self.connect_timeout = connect_timeout
+        self.max_lag = max_lag
+        self.logger = Logger()
+        self._order = itertools.count()
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+    def fetch(self, query, params=None, min_lsn=None):
+        """
+        Выполнение чтения на подходящей реплике.
+
+        Args:
+            query: Текст запроса (строка)
+            min_lsn: Позиция WAL, которую реплика должна уже воспроизвести
+
+        Returns:
+            list or None: Строки или None, если запрос нужно выполнить на основном сервере
+        """
+        def read(replica):
+            replica.cursor.execute(query, params)
+            return replica.cursor.fetchall() if replica.cursor.description else []
+        return self.run(read, min_lsn)
+
+    def run(self, function, min_lsn=None):
+        """
+        Вызов function(replica) на подходящей реплике; при ошибке соединения
+        пробуется следующая.
+
+        Returns:
+            Результат function или None, если запрос нужно выполнить на основном сервере
+        """
+        if not self.replicas:
+            return None
+        start = next(self._order)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if not self._eligible(replica, min_lsn):
+                continue
+            try:
+                return function(replica)
+            except (psycopg2.errors.ReadOnlySqlTransaction, psycopg2.errors.SerializationFailure) as e:
+                # Запрос пишет или конфликтует с восстановлением: реплика исправна
+                self.logger.warning(f"Реплика {replica.name}: {str(e).strip()}; чтение на основном сервере")
+                return None
+            except CONNECTION_ERRORS as e:
+                self.logger.warning(f"Реплика {replica.name}: {str(e).strip()}; чтение на основном сервере")
+                self._fail(replica)
+        return None
+
+    def _eligible(self, replica, min_lsn):
+        now = time.monotonic()
+        if replica.connection is None:
+            if now < replica.retry_at or not self._connect(replica):
+                return False
+        fresh = now - replica.checked_at < REPLICA_STATUS_TTL
+        caught_up = min_lsn is None or (replica.replay_lsn is not None and replica.replay_lsn >= min_lsn)
+        if fresh and caught_up:
+            return replica.healthy
+        try:
+            replica.cursor.execute(REPLICA_STATUS_SQL)
+            status = replica.cursor.fetchone()
+        except CONNECTION_ERRORS as e:
+            self.logger.warning(f"Реплика {replica.name} недоступна: {str(e).strip()}")
+            self._fail(replica)
+            return False
+        replica.checked_at = now
+        replica.replay_lsn = parse_lsn(status["replay_lsn"])
+        lag = status["lag_seconds"]
+        if not status["standby"]:
+            self.logger.warning(f"Сервер {replica.name} не является репликой и не используется для чтения")
+            replica.healthy = False
+            replica.retry_at = now + REPLICA_RETRY_SECONDS
+            replica.close()
+            return False
+        replica.healthy = status["idle"] or lag is None or lag <= self.max_lag
+        caught_up = min_lsn is None or (replica.replay_lsn is not None and replica.replay_lsn >= min_lsn)
+        return replica.healthy and caught_up
+
+    def _connect(self, replica):
+        try:
+            replica.connection = psycopg2.connect(replica.dsn, connect_timeout=self.connect_timeout,
+                                                  application_name="library_replica_reader",
+                                                  cursor_factory=InstrumentedCursor)
+            replica.connection.set_session(readonly=True, autocommit=True)
+            replica.cursor = replica.connection.cursor(cursor_factory=InstrumentedDictCursor)
+            replica.checked_at = 0.0
+            self.logger.info(f"Подключена реплика для чтения {replica.name}")
+            return True
+        except psycopg2.Error as e:
+            self.logger.warning(f"Не удалось подключиться к реплике {replica.name}: {str(e).strip()}")
+            self._fail(replica)
+            return False
+
+    def _fail(self, replica):
+        replica.close()
+        replica.retry_at = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def status(self):
+        """Состояние реплик для отображения: имя, подключена ли, позиция воспроизведения."""
+        return [{"name": r.name, "connected": r.connection is not None, "healthy": r.healthy,
+                 "replay_lsn": r.replay_lsn} for r in self.replicas]
+
+
+def query_text(query, connection):
+    """Текст запроса для реплики: композиции psycopg2.sql раскрываются через соединение основного сервера."""
+    if isinstance(query, sql.Composable):
+        return query.as_string(connection)
+    return query
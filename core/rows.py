@@ -0,0 +1,94 @@
+"""
+Компактное хранение результата запроса.
+
+Строки хранятся кортежами значений, имена столбцов — один раз на весь
+результат (columns и общий индекс имя -> позиция). Обращение к строке
+возвращает лёгкое представление Row с интерфейсом словаря (row["title"],
+row.get(), keys(), items()), поэтому код, написанный для списка словарей,
+работает без изменений, а память на каждую строку — один кортеж вместо
+словаря с собственной хеш-таблицей.
+"""
+from collections.abc import Mapping, Sequence
+
+
+class Row(Mapping):
+    """Строка результата: представление кортежа значений по общему индексу столбцов."""
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def items(self):
+        return [(name, self._values[position]) for name, position in self._index.items()]
+
+    def values(self):
+        return [self._values[position] for position in self._index.values()]
+
+    def __repr__(self):
+        return f"Row({dict(self.items())!r})"
+
+
+class ResultSet(Sequence):
+    """
+    Результат запроса: имена столбцов и список кортежей.
+
+    Attributes:
+        columns: Имена столбцов в порядке SELECT (могут повторяться, например в JOIN)
+        index: Имя столбца -> позиция (при повторе имени — последняя, как в DictRow)
+        rows: Список кортежей значений
+    """
+
+    def __init__(self, columns=(), rows=None, index=None):
+        self.columns = tuple(columns)
+        self.index = index if index is not None else {name: i for i, name in enumerate(self.columns)}
+        self.rows = rows if rows is not None else []
+
+    @classmethod
+    def from_cursor(cls, cursor, rows=None):
+        """
+        Результат по курсору psycopg2: столбцы из description, строки — rows
+        или все оставшиеся строки курсора (строки DictCursor переводятся в кортежи).
+        """
+        columns = [column.name for column in cursor.description] if cursor.description else []
+        if rows is None:
+            rows = cursor
+        return cls(columns, [tuple(row) for row in rows])
+
+    def set_columns(self, columns):
+        self.columns = tuple(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+
+    def append(self, values):
+        self.rows.append(values)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return ResultSet(self.columns, self.rows[position], self.index)
+        return Row(self.index, self.rows[position])
+
+    def __iter__(self):
+        index = self.index
+        return (Row(index, values) for values in self.rows)
+
+    def column(self, name):
+        """Значения одного столбца списком."""
+        position = self.index[name]
+        return [values[position] for values in self.rows]
+
+    def to_dicts(self):
+        """Список словарей (для JSON и кода, которому нужны настоящие dict)."""
+        return [dict(row.items()) for row in self]
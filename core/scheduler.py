@@ -0,0 +1,339 @@
+"""
+Планировщик отчётов: выполнение сохранённых запросов по расписанию (cron)
+на отдельном соединении, запись результата в файл или таблицу и журнал
+длительности запусков.
+
+Запускается без интерфейса: python scheduler.py --help
+"""
+import csv
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+# Отчёт пишется только в таблицы с этим префиксом (кроме таблиц самого планировщика),
+# поэтому результат не может заменить таблицу приложения, в том числе переименованную
+REPORT_TABLE_PREFIX = "report_"
+SCHEDULER_TABLES = ("report_schedules", "report_runs")
+# Суффикс таблицы, в которую отчёт строится до замены целевой
+REPORT_BUILD_SUFFIX = "__new"
+# Предельная длина имени в PostgreSQL (NAMEDATALEN - 1)
+MAX_IDENTIFIER_LENGTH = 63
+
+OUTPUT_KINDS = ("file", "table")
+FILE_FORMATS = ("csv", "json")
+# Как часто фоновый планировщик очищает журнал изменений row_changes, с
+CHANGE_LOG_PRUNE_SECONDS = 3600
+
+
+def check_report_table(target):
+    """
+    Проверка имени таблицы для вывода отчёта.
+
+    Raises:
+        ValueError: Имя без префикса REPORT_TABLE_PREFIX, таблица планировщика или слишком длинное имя
+    """
+    if not target.startswith(REPORT_TABLE_PREFIX) or target == REPORT_TABLE_PREFIX or target in SCHEDULER_TABLES:
+        raise ValueError(f"Таблица отчёта должна называться {REPORT_TABLE_PREFIX}<имя> "
+                         f"(кроме {', '.join(SCHEDULER_TABLES)}): {target}")
+    if len(target) + len(REPORT_BUILD_SUFFIX) > MAX_IDENTIFIER_LENGTH:
+        raise ValueError(f"Слишком длинное имя таблицы отчёта: {target}")
+
+
+class CronSchedule:
+    """
+    Расписание в формате cron из пяти полей: минута, час, день месяца, месяц, день недели.
+    Поддерживаются *, списки (1,15), диапазоны (1-5) и шаги (*/10, 8-18/2).
+    День недели: 0 или 7 — воскресенье.
+    """
+
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        parts = self.expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Ожидается 5 полей cron, получено {len(parts)}: {expression}")
+        self.values = {}
+        for part, (name, low, high) in zip(parts, self.FIELDS):
+            self.values[name] = self._parse_field(part, low, high)
+        if 7 in self.values["weekday"]:
+            self.values["weekday"] = (self.values["weekday"] - {7}) | {0}
+        # Как в cron: если ограничены и день месяца, и день недели, достаточно любого
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(text, low, high):
+        values = set()
+        for item in text.split(","):
+            match = re.fullmatch(r"(\*|\d+(?:-\d+)?)(?:/(\d+))?", item)
+            if not match:
+                raise ValueError(f"Некорректное поле cron: {text}")
+            span, step = match.group(1), int(match.group(2) or 1)
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(v) for v in span.split("-"))
+            else:
+                start = int(span)
+                end = high if match.group(2) else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Значение вне диапазона {low}-{high}: {text}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.values["day"]
+        weekday_ok = (moment.weekday() + 1) % 7 in self.values["weekday"]
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def matches(self, moment):
+        return (moment.minute in self.values["minute"] and moment.hour in self.values["hour"]
+                and moment.month in self.values["month"] and self._day_matches(moment))
+
+    def next_after(self, moment):
+        """Ближайший момент срабатывания строго после moment (с точностью до минуты)."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.values["month"] or not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.values["hour"]:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.values["minute"]:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Расписание никогда не срабатывает: {self.expression}")
+
+
+class ReportScheduler:
+    """
+    Выполнение сохранённых запросов по расписаниям из таблицы report_schedules.
+    Использует собственный DatabaseManager (отдельное соединение), поэтому
+    не мешает работе интерфейса.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.logger = db.logger
+
+    def create_tables(self):
+        """Создание служебных таблиц расписаний и журнала запусков."""
+        try:
+            self.db._create_saved_queries_table()
+            self.db.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS report_schedules (
+                    schedule_id SERIAL PRIMARY KEY,
+                    query_id INTEGER NOT NULL REFERENCES saved_queries(query_id) ON DELETE CASCADE,
+                    cron VARCHAR(100) NOT NULL,
+                    output_kind VARCHAR(10) NOT NULL CHECK (output_kind IN ('file', 'table')),
+                    output_target TEXT NOT NULL,
+                    file_format VARCHAR(10) NOT NULL DEFAULT 'csv',
+                    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+                    created_at TIMESTAMP NOT NULL DEFAULT now(),
+                    last_run_at TIMESTAMP
+                );
+            """)
+            self.db.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS report_runs (
+                    run_id SERIAL PRIMARY KEY,
+                    schedule_id INTEGER NOT NULL REFERENCES report_schedules(schedule_id) ON DELETE CASCADE,
+                    started_at TIMESTAMP NOT NULL,
+                    duration_ms NUMERIC(12, 3),
+                    rows INTEGER,
+                    status VARCHAR(10) NOT NULL,
+                    output TEXT,
+                    error TEXT
+                );
+            """)
+            self.db.connection.commit()
+            return True
+        except psycopg2.Error as e:
+            self.db.connection.rollback()
+            self.logger.error(f"Ошибка создания таблиц планировщика: {str(e)}")
+            return False
+
+    def add_schedule(self, query_name, cron, output_kind, output_target, file_format="csv"):
+        """
+        Добавление расписания для сохранённого запроса.
+
+        Returns:
+            int: ID расписания
+
+        Raises:
+            ValueError: Некорректное расписание, вывод или неизвестный запрос
+        """
+        CronSchedule(cron)
+        if output_kind not in OUTPUT_KINDS:
+            raise ValueError(f"Вывод должен быть одним из: {', '.join(OUTPUT_KINDS)}")
+        if output_kind == "file" and file_format not in FILE_FORMATS:
+            raise ValueError(f"Формат файла должен быть одним из: {', '.join(FILE_FORMATS)}")
+        if output_kind == "table":
+            check_report_table(output_target)
+        self.create_tables()
+        self.db.cursor.execute("SELECT query_id FROM saved_queries WHERE name = %s", (query_name,))
+        row = self.db.cursor.fetchone()
+        if row is None:
+            self.db.connection.rollback()
+            raise ValueError(f"Сохранённый запрос не найден: {query_name}")
+        self.db.cursor.execute("""
+            INSERT INTO report_schedules (query_id, cron, output_kind, output_target, file_format)
+            VALUES (%s, %s, %s, %s, %s) RETURNING schedule_id
+        """, (row["query_id"], cron, output_kind, output_target, file_format))
+        schedule_id = self.db.cursor.fetchone()[0]
+        self.db.connection.commit()
+        self.logger.info(f"Добавлено расписание {schedule_id} для запроса {query_name}: {cron}")
+        return schedule_id
+
+    def remove_schedule(self, schedule_id):
+        self.db.cursor.execute("DELETE FROM report_schedules WHERE schedule_id = %s", (schedule_id,))
+        removed = self.db.cursor.rowcount > 0
+        self.db.connection.commit()
+        return removed
+
+    def get_schedules(self, enabled_only=False):
+        if not self.db.table_exists("report_schedules"):
+            return []
+        self.db.cursor.execute(f"""
+            SELECT s.*, q.name AS query_name, q.sql_text, q.params
+            FROM report_schedules s
+            JOIN saved_queries q ON q.query_id = s.query_id
+            {"WHERE s.enabled" if enabled_only else ""}
+            ORDER BY s.schedule_id
+        """)
+        rows = [dict(row) for row in self.db.cursor.fetchall()]
+        self.db.connection.rollback()
+        return rows
+
+    def get_runs(self, limit=50):
+        if not self.db.table_exists("report_runs"):
+            return []
+        self.db.cursor.execute("""
+            SELECT r.*, q.name AS query_name
+            FROM report_runs r
+            JOIN report_schedules s ON s.schedule_id = r.schedule_id
+            JOIN saved_queries q ON q.query_id = s.query_id
+            ORDER BY r.run_id DESC
+            LIMIT %s
+        """, (limit,))
+        rows = [dict(row) for row in self.db.cursor.fetchall()]
+        self.db.connection.rollback()
+        return rows
+
+    def is_due(self, schedule, now):
+        since = schedule["last_run_at"] or schedule["created_at"]
+        return CronSchedule(schedule["cron"]).next_after(since) <= now
+
+    def run_pending(self, now=None):
+        """Запуск всех расписаний, время которых наступило. Возвращает число запусков."""
+        now = now or datetime.now()
+        launched = 0
+        for schedule in self.get_schedules(enabled_only=True):
+            try:
+                due = self.is_due(schedule, now)
+            except ValueError as e:
+                self.logger.error(f"Расписание {schedule['schedule_id']}: {e}")
+                continue
+            if due:
+                self.run_schedule(schedule, now)
+                launched += 1
+        return launched
+
+    def run_schedule(self, schedule, now=None):
+        """Выполнение одного расписания с записью результата и длительности."""
+        started_at = now or datetime.now()
+        started = time.perf_counter()
+        rows, output, error = None, None, None
+        try:
+            if schedule["output_kind"] == "table":
+                rows, output = self._write_table(schedule)
+            else:
+                rows, output = self._write_file(schedule, started_at)
+            status = "ok"
+        except Exception as e:
+            self.db.connection.rollback()
+            status, error = "error", str(e)
+        duration_ms = (time.perf_counter() - started) * 1000.0
+        try:
+            self.db.cursor.execute("""
+                INSERT INTO report_runs (schedule_id, started_at, duration_ms, rows, status, output, error)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (schedule["schedule_id"], started_at, round(duration_ms, 3), rows, status, output, error))
+            self.db.cursor.execute("UPDATE report_schedules SET last_run_at = %s WHERE schedule_id = %s",
+                                   (started_at, schedule["schedule_id"]))
+            self.db.connection.commit()
+        except psycopg2.Error as e:
+            self.db.connection.rollback()
+            self.logger.error(f"Ошибка записи журнала запуска: {str(e)}")
+        if error:
+            self.logger.error(f"Отчёт '{schedule['query_name']}' завершился ошибкой за {duration_ms:.0f} мс: {error}")
+        else:
+            self.logger.info(f"Отчёт '{schedule['query_name']}': {rows} строк за {duration_ms:.0f} мс -> {output}")
+        return status
+
+    def _write_table(self, schedule):
+        """
+        Результат пишется на стороне сервера (CREATE TABLE AS), строки не передаются клиенту.
+        Отчёт строится в отдельной таблице <target>__new, целевая таблица при этом
+        не блокируется; затем короткой транзакцией старая таблица удаляется, а новая
+        переименовывается, так что читатели ждут только этот последний шаг.
+        """
+        target = schedule["output_target"]
+        check_report_table(target)
+        building = sql.Identifier(target + REPORT_BUILD_SUFFIX)
+        self.db.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(building))
+        self.db.cursor.execute(sql.SQL("CREATE TABLE {} AS ").format(building)
+                               + sql.SQL(schedule["sql_text"]), schedule["params"])
+        rows = self.db.cursor.rowcount
+        self.db.connection.commit()
+        self.db.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(target)))
+        self.db.cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(building, sql.Identifier(target)))
+        self.db.connection.commit()
+        return rows, target
+
+    def _write_file(self, schedule, started_at):
+        results = self.db.execute_custom_request(schedule["sql_text"], schedule["params"], prepare=True,
+                                                 replica=True, compact=True)
+        self.db.connection.rollback()
+        os.makedirs(schedule["output_target"], exist_ok=True)
+        base_name = re.sub(r"[^\w-]+", "_", schedule["query_name"]).strip("_") or "report"
+        path = os.path.join(schedule["output_target"],
+                            f"{base_name}_{started_at.strftime('%Y%m%d_%H%M')}.{schedule['file_format']}")
+        if schedule["file_format"] == "json":
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results.to_dicts(), f, ensure_ascii=False, indent=2, default=str)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                if results.columns:
+                    writer.writerow(results.columns)
+                    writer.writerows(results.rows)
+        return len(results), path
+
+    def run_forever(self, poll_seconds=30, should_stop=lambda: False):
+        """Цикл планировщика: проверка расписаний каждые poll_seconds секунд."""
+        self.logger.info("Планировщик отчётов запущен")
+        pruned_at = None
+        while not should_stop():
+            try:
+                self.run_pending()
+                if pruned_at is None or time.monotonic() - pruned_at >= CHANGE_LOG_PRUNE_SECONDS:
+                    self.db.prune_change_log()
+                    pruned_at = time.monotonic()
+            except psycopg2.Error as e:
+                self.logger.error(f"Ошибка планировщика: {str(e)}")
+                try:
+                    self.db.connection.rollback()
+                except psycopg2.Error:
+                    if not self.db.connect():
+                        self.logger.error("Не удалось переподключиться к БД")
+            time.sleep(poll_seconds)
+        self.logger.info("Планировщик отчётов остановлен")
@@ -1,30 +1,100 @@
-"""
-Главный модуль приложения "Библиотека"
-Точка входа в программу.
-"""
-import sys
-from PySide6.QtWidgets import QApplication
-from ui.windows.MainWindow import MainWindow
-from ui.dialogs.login import LoginDialog
-from core.logger import Logger
-
-if __name__ == "__main__":
-    # Инициализация логгера
-
-    logger = Logger()
-    logger.info("Запуск приложения")
-
-    # Создание и настройка приложения Qt
-    app = QApplication(sys.argv)
-    app.setApplicationName("Библиотека")
-
-    # Показ диалога авторизации
-    login_dialog = LoginDialog()
-    if login_dialog.exec():
-        # Если авторизация успешна, открываем главное окно
-        window = MainWindow(login_dialog.controller)
-        window.show()
-        sys.exit(app.exec())
-    else:
-        # Если авторизация отменена, выходим из приложения
-        sys.exit(0)
\ No newline at end of file
+"""
+Главный модуль приложения "Библиотека"
+Точка входа в программу.
+
+Запуск с замером времени старта:
+    python main.py --startup-timing        # отчёт в консоль и журнал
+    python main.py --startup-timing=exit   # выход сразу после показа окна входа
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import sys
+
+
+class StartupTimer:
+    """Отметки времени от запуска процесса до показа окон."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.marks = []
+        self.last = _STARTED
+
+    def mark(self, name):
+        now = time.perf_counter()
+        if self.enabled:
+            self.marks.append((name, (now - self.last) * 1000.0, (now - _STARTED) * 1000.0))
+        self.last = now
+
+    def report(self, logger=None):
+        if not self.enabled:
+            return
+        for name, step_ms, total_ms in self.marks:
+            line = f"Старт: {name:<32} {step_ms:9.1f} мс  (с начала {total_ms:9.1f} мс)"
+            print(line)
+            if logger is not None:
+                logger.info(line)
+        self.marks.clear()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Библиотека")
+    parser.add_argument("--startup-timing", nargs="?", const="report", choices=["report", "exit"],
+                        help="Замер времени импорта и показа первого окна")
+    # Остальные аргументы (например, -platform) остаются для Qt
+    return parser.parse_known_args(argv[1:])
+
+
+if __name__ == "__main__":
+    args, qt_args = parse_args(sys.argv)
+    timer = StartupTimer(args.startup_timing is not None)
+
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+    timer.mark("импорт PySide6")
+    from core.logger import Logger
+    from ui.dialogs.login import LoginDialog
+    timer.mark("импорт окна входа")
+
+    # Инициализация логгера
+
+    logger = Logger()
+    logger.info("Запуск приложения")
+
+    # Создание и настройка приложения Qt
+    app = QApplication(sys.argv[:1] + qt_args)
+    app.setApplicationName("Библиотека")
+    timer.mark("создание QApplication")
+
+    # Показ диалога авторизации
+    login_dialog = LoginDialog()
+    timer.mark("создание окна входа")
+
+    def login_shown():
+        # Срабатывает на первой итерации цикла событий, когда окно уже показано
+        timer.mark("показ окна входа")
+        timer.report(logger)
+        if args.startup_timing == "exit":
+            login_dialog.reject()
+
+    QTimer.singleShot(0, login_shown)
+    if login_dialog.exec():
+        # Главное окно и его модули загружаются только после успешного входа
+        timer.last = time.perf_counter()
+        from ui.windows.MainWindow import MainWindow
+        timer.mark("импорт главного окна")
+        window = MainWindow(login_dialog.controller)
+        timer.mark("создание главного окна")
+        window.show()
+
+        def main_window_shown():
+            timer.mark("показ главного окна")
+            timer.report(logger)
+
+        QTimer.singleShot(0, main_window_shown)
+        sys.exit(app.exec())
+    else:
+        # Если авторизация отменена, выходим из приложения
+        sys.exit(0)
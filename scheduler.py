@@ -0,0 +1,131 @@
+"""
+Планировщик отчётов "Библиотека" (без графического интерфейса).
+Выполняет сохранённые запросы по расписанию на отдельном соединении.
+
+Примеры:
+    python scheduler.py --dsn "dbname=test1 user=postgres" add --query "Просроченные" --cron "0 2 * * *" --output file:reports
+    python scheduler.py --dsn "dbname=test1 user=postgres" add --query "Выдачи за месяц" --cron "30 1 1 * *" --output table:report_monthly
+    python scheduler.py --dsn "dbname=test1 user=postgres" run
+    python scheduler.py --dsn "dbname=test1 user=postgres" overdue --chunk 10000
+    python scheduler.py --dsn "dbname=test1 user=postgres" recommendations --top 10
+"""
+import argparse
+import os
+import sys
+
+import psycopg2.extensions
+
+from core.logger import Logger
+
+
+def connect(dsn, replicas=()):
+    from core.data import DatabaseManager
+    params = psycopg2.extensions.parse_dsn(dsn)
+    db = DatabaseManager()
+    db.set_replicas(list(replicas))
+    db.set_connection_params(params.get("dbname"), params.get("user"), params.get("password"),
+                             params.get("host"), params.get("port"))
+    if not db.connect():
+        raise SystemExit(f"Не удалось подключиться: {dsn}")
+    db.cursor.execute("SET application_name = 'library_scheduler'")
+    db.connection.commit()
+    return db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Планировщик отчётов по сохранённым запросам")
+    parser.add_argument("--dsn", default=os.environ.get("LIBRARY_DSN"),
+                        help="Строка подключения (или переменная окружения LIBRARY_DSN)")
+    parser.add_argument("--replica", action="append",
+                        help="Реплика для выполнения отчётов в файл (можно повторять; "
+                             "по умолчанию LIBRARY_REPLICA_DSNS через ';')")
+    parser.add_argument("--log", default="scheduler.log", help="Файл журнала планировщика")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Добавить расписание")
+    add.add_argument("--query", required=True, help="Название сохранённого запроса")
+    add.add_argument("--cron", required=True, help='Расписание cron, например "0 2 * * *"')
+    add.add_argument("--output", required=True, help="file:<каталог> или table:report_<имя>")
+    add.add_argument("--format", default="csv", choices=["csv", "json"], help="Формат файла")
+
+    commands.add_parser("list", help="Список расписаний")
+    remove = commands.add_parser("remove", help="Удалить расписание")
+    remove.add_argument("schedule_id", type=int)
+    history = commands.add_parser("history", help="Журнал запусков")
+    history.add_argument("--limit", type=int, default=20)
+
+    once = commands.add_parser("once", help="Выполнить наступившие расписания и выйти")
+    once.add_argument("--all", action="store_true", help="Выполнить все расписания независимо от времени")
+    overdue = commands.add_parser("overdue", help="Создать уведомления о просроченных выдачах")
+    overdue.add_argument("--as-of", help="Дата проверки YYYY-MM-DD (по умолчанию сегодня)")
+    overdue.add_argument("--chunk", type=int, default=None, help="Выдач в одной транзакции")
+    recommendations = commands.add_parser("recommendations",
+                                          help="Пересчитать рекомендации по совместным выдачам (NumPy/SciPy)")
+    recommendations.add_argument("--top", type=int, default=None, help="Рекомендаций на книгу")
+    recommendations.add_argument("--min-readers", type=int, default=None, help="Минимум общих читателей пары")
+    run = commands.add_parser("run", help="Работать постоянно")
+    run.add_argument("--poll", type=int, default=30, help="Интервал проверки, секунд")
+
+    args = parser.parse_args(argv)
+    if not args.dsn:
+        parser.error("укажите --dsn или LIBRARY_DSN")
+
+    Logger(args.log)
+    from core.scheduler import ReportScheduler
+    from core.replicas import replica_dsns_from_env
+    db = connect(args.dsn, args.replica or replica_dsns_from_env())
+    scheduler = ReportScheduler(db)
+    try:
+        if args.command == "add":
+            kind, _, target = args.output.partition(":")
+            try:
+                schedule_id = scheduler.add_schedule(args.query, args.cron, kind, target, args.format)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Добавлено расписание {schedule_id}")
+        elif args.command == "list":
+            for s in scheduler.get_schedules():
+                state = "вкл" if s["enabled"] else "выкл"
+                print(f"{s['schedule_id']:>4}  {s['cron']:<15} {state:<5} {s['query_name']} -> "
+                      f"{s['output_kind']}:{s['output_target']}  последний запуск: {s['last_run_at'] or '-'}")
+        elif args.command == "remove":
+            print("Удалено" if scheduler.remove_schedule(args.schedule_id) else "Расписание не найдено")
+        elif args.command == "history":
+            for r in scheduler.get_runs(args.limit):
+                print(f"{r['started_at']:%Y-%m-%d %H:%M}  {r['status']:<5} {r['duration_ms']:>10} мс  "
+                      f"{r['rows'] if r['rows'] is not None else '-':>8} строк  {r['query_name']}  "
+                      f"{r['output'] or r['error'] or ''}")
+        elif args.command == "once":
+            if args.all:
+                for schedule in scheduler.get_schedules(enabled_only=True):
+                    scheduler.run_schedule(schedule)
+            else:
+                print(f"Запущено отчётов: {scheduler.run_pending()}")
+            db.prune_change_log()
+        elif args.command == "overdue":
+            from core.data import OVERDUE_CHUNK_SIZE
+            created = db.create_overdue_notifications(args.as_of, args.chunk or OVERDUE_CHUNK_SIZE)
+            if created is None:
+                return 1
+            print(f"Просроченных выдач: {db.count_overdue_issues(args.as_of)}, создано уведомлений: {created}")
+        elif args.command == "recommendations":
+            from core.recommendations import RecommendationBuilder, DEFAULT_TOP, MIN_CO_READERS
+            builder = RecommendationBuilder(db, args.top or DEFAULT_TOP, args.min_readers or MIN_CO_READERS)
+            summary = builder.run()
+            if summary is None:
+                return 1
+            print(f"Рекомендаций: {summary['recommendations']} для {summary['books']} книг "
+                  f"({summary['pairs']} пар читатель–книга) за {summary['duration_ms']:.0f} мс")
+        elif args.command == "run":
+            scheduler.create_tables()
+            try:
+                scheduler.run_forever(args.poll)
+            except KeyboardInterrupt:
+                pass
+    finally:
+        db.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,25 +6,30 @@ from PySide6.QtCore import Qt, Signal, QTimer, QDate
 from PySide6.QtGui import QFont, QIntValidator
 
 from core.enums import Country
-from core.additional_classes import NumericTableItem
+from ui.widgets import NumericTableItem
 from ui.styles import get_form_label_style
+from ui.dialogs.differential import DifferentialTableMixin
 
-class AuthorsDialog(QDialog):
+class AuthorsDialog(QDialog, DifferentialTableMixin):
     """
     Диалог для просмотра авторов.
     Отображает список всех свторов с возможностью добавления и удаления.
     """
+    sync_table = "authors"
+    key_columns = ("author_id",)
+
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
         self.parent_window = parent
         self.setWindowTitle("Авторы")
         self.setMinimumSize(800, 500)
+        self.init_differential()
         self.setup_ui()
 
     def edit_author(self, row, column):
         author_id = int(self.author_table.item(row, 0).text())
-        author = next((p for p in self.authors if p['author_id'] == author_id), None)
+        author = self.rows_by_key.get((author_id,))
         if not author:
             return
         dialog = EditAuthorDialog(self.controller, author, self)
@@ -35,26 +40,27 @@ class AuthorsDialog(QDialog):
             new_birth_year = int(dialog.birth_year_edit.text().strip())
             new_country = dialog.country_combo.currentText().strip()
 
-            success, msg = self.controller.update_author(
+            success, result = self.controller.update_author(
                 author_id,
                 new_last_name,
                 new_first_name,
                 new_patronymic,
                 new_birth_year,
-                new_country
+                new_country,
+                expected_version=author.get("version")
             )
             if success:
-                self.update_authors_table()
+                self.apply_row(result)
                 QMessageBox.information(self, "Успех", "Автор успешно обновлен.")
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить автора: {msg}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить автора: {self.update_error(result)}")
     def setup_ui(self):
         layout = QVBoxLayout(self)
         title_label = QLabel("<h2>Авторы</h2>")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
-        self.authors = self.controller.get_authors()
-        if not self.authors:
+        authors = self.load_rows()
+        if not authors:
             empty_label = QLabel("Авторов нет.")
             empty_label.setAlignment(Qt.AlignCenter)
             layout.addWidget(empty_label)
@@ -65,7 +71,7 @@ class AuthorsDialog(QDialog):
                 ["ID", "Фамилия", "Имя", "Отчество", "Год рождения", "Страна"])
             self.author_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
             self.author_table.setEditTriggers(QTableWidget.NoEditTriggers)
-            self.update_authors_table()
+            self.show_rows(authors)
             self.author_table.setSortingEnabled(True)
             self.author_table.cellDoubleClicked.connect(self.edit_author)
             layout.addWidget(self.author_table)
@@ -81,22 +87,25 @@ class AuthorsDialog(QDialog):
         buttons_layout.addWidget(close_btn)
         layout.addLayout(buttons_layout)
 
-    def update_authors_table(self):
-        self.authors = self.controller.get_authors()
-        self.author_table.setRowCount(len(self.authors))
-        for i, auth in enumerate(self.authors):
-            id_item = NumericTableItem(str(auth['author_id']), auth['author_id'])
-            last_name_item = QTableWidgetItem(auth['last_name'])
-            first_name_item = QTableWidgetItem(auth['first_name'])
-            patronymic_item = QTableWidgetItem(auth['patronymic'])
-            year_item = NumericTableItem(str(auth['birth_year']), auth['birth_year'])
-            country_item = QTableWidgetItem(auth['country'])
-            self.author_table.setItem(i, 0, id_item)
-            self.author_table.setItem(i, 1, last_name_item)
-            self.author_table.setItem(i, 2, first_name_item)
-            self.author_table.setItem(i, 3, patronymic_item)
-            self.author_table.setItem(i, 4, year_item)
-            self.author_table.setItem(i, 5, country_item)
+    def get_table_widget(self):
+        return getattr(self, "author_table", None)
+
+    def fetch_rows(self):
+        return self.controller.get_authors()
+
+    def fill_row(self, i, auth):
+        id_item = NumericTableItem(str(auth['author_id']), auth['author_id'])
+        last_name_item = QTableWidgetItem(auth['last_name'])
+        first_name_item = QTableWidgetItem(auth['first_name'])
+        patronymic_item = QTableWidgetItem(auth['patronymic'])
+        year_item = NumericTableItem(str(auth['birth_year']), auth['birth_year'])
+        country_item = QTableWidgetItem(auth['country'])
+        self.author_table.setItem(i, 0, id_item)
+        self.author_table.setItem(i, 1, last_name_item)
+        self.author_table.setItem(i, 2, first_name_item)
+        self.author_table.setItem(i, 3, patronymic_item)
+        self.author_table.setItem(i, 4, year_item)
+        self.author_table.setItem(i, 5, country_item)
 
     def add_author(self):
         dialog = AddAuthorDialog(self.controller, self)
@@ -106,15 +115,15 @@ class AuthorsDialog(QDialog):
             patronymic = dialog.patronymic_edit.text().strip()
             birth_year = dialog.birth_year_spin.value()
             country = dialog.country_combo.currentText().strip()
-            success = self.controller.add_author(
+            author = self.controller.add_author(
                 last_name,
                 first_name,
                 patronymic,
                 birth_year,
                 country
             )
-            if success:
-                self.update_authors_table()
+            if author:
+                self.apply_row(author)
                 QMessageBox.information(self, "Успех", "Автор успешно добавлен")
             else:
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить автора")
@@ -135,7 +144,7 @@ class AuthorsDialog(QDialog):
         if confirm == QMessageBox.Yes:
             success, msg = self.controller.delete_author(author_id)
             if success:
-                self.update_authors_table()
+                self.remove_row((author_id,))
                 QMessageBox.information(self, "Успех", "Автор успешно удален")
             else:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось удалить автора: {msg}")
@@ -4,18 +4,22 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, Q
                               QFormLayout, QTabWidget, QScrollArea, QFrame, QHeaderView, QTextEdit)
 from PySide6.QtCore import Qt, Signal, QTimer, QDate
 from PySide6.QtGui import QFont, QIntValidator
-from core.additional_classes import NumericTableItem
+from ui.widgets import NumericTableItem
 from ui.styles import get_form_label_style
+from ui.dialogs.differential import DifferentialTableMixin
 
-class BookAuthorsDialog(QDialog):
+class BookAuthorsDialog(QDialog, DifferentialTableMixin):
     """
     Диалог управления связями автор–книга.
     Позволяет просматривать, добавлять, редактировать и удалять связи.
     """
+    sync_table = "book_authors"
+    key_columns = ("book_id", "author_id")
+
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
-        self.all_links = controller.get_book_authors()  # список связей
+        self.init_differential()
 
         self.setWindowTitle("Связи автор–книга")
         self.setMinimumSize(800, 600)
@@ -39,7 +43,7 @@ class BookAuthorsDialog(QDialog):
         self.links_table.setEditTriggers(QTableWidget.NoEditTriggers)
 
         # Заполнение таблицы данными
-        self.update_links_table()
+        self.reload_rows()
 
         # Включение сортировки и обработки двойного клика
         self.links_table.setSortingEnabled(True)
@@ -64,22 +68,20 @@ class BookAuthorsDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
-    def update_links_table(self):
-        """Обновление содержимого таблицы связей"""
-        self.all_links = self.controller.get_book_authors()
-        self.links_table.setRowCount(len(self.all_links))
-        self.links_table.setSortingEnabled(False)
-
-        for i, link in enumerate(self.all_links):
+    def get_table_widget(self):
+        return self.links_table
 
-            book_id_item = NumericTableItem(str(link['book_id']), link['book_id'])
-            author_id_item = NumericTableItem(str(link['author_id']), link['author_id'])
-            id_item = QTableWidgetItem(f"{link['book_id']}-{link['author_id']}")
-            self.links_table.setItem(i, 0, id_item)
-            self.links_table.setItem(i, 1, book_id_item)
-            self.links_table.setItem(i, 2, author_id_item)
+    def fetch_rows(self):
+        return self.controller.get_book_authors()
 
-        self.links_table.setSortingEnabled(True)
+    def fill_row(self, i, link):
+        """Заполнение строки таблицы связей"""
+        book_id_item = NumericTableItem(str(link['book_id']), link['book_id'])
+        author_id_item = NumericTableItem(str(link['author_id']), link['author_id'])
+        id_item = QTableWidgetItem(f"{link['book_id']}-{link['author_id']}")
+        self.links_table.setItem(i, 0, id_item)
+        self.links_table.setItem(i, 1, book_id_item)
+        self.links_table.setItem(i, 2, author_id_item)
 
     def add_link(self):
         """Открытие диалога добавления новой связи"""
@@ -87,10 +89,10 @@ class BookAuthorsDialog(QDialog):
         if dialog.exec():
             book_id = int(dialog.book_id_combo.currentData())
             author_id = int(dialog.author_id_combo.currentData())
-            link_id = self.controller.add_book_author(book_id, author_id)
+            link = self.controller.add_book_author(book_id, author_id)
 
-            if link_id:
-                self.update_links_table()
+            if link:
+                self.apply_row(link)
                 QMessageBox.information(self, "Успех", "Связь успешно добавлена")
             else:
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить связь")
@@ -103,10 +105,7 @@ class BookAuthorsDialog(QDialog):
         author_id = int(author_id_str)
 
         # Ищем нужную связь
-        link = next(
-            (a for a in self.all_links if a['book_id'] == book_id and a['author_id'] == author_id),
-            None
-        )
+        link = self.rows_by_key.get((book_id, author_id))
 
         if not link:
             return
@@ -116,12 +115,12 @@ class BookAuthorsDialog(QDialog):
             new_book_id = int(dialog.book_id_combo.currentData())
             new_author_id = int(dialog.author_id_combo.currentData())
 
-            success, message = self.controller.update_book_author(book_id, author_id, new_book_id, new_author_id)
+            success, result = self.controller.update_book_author(book_id, author_id, new_book_id, new_author_id)
             if success:
-                self.update_links_table()
+                self.apply_row(result, old_key=(book_id, author_id))
                 QMessageBox.information(self, "Успех", "Связь успешно обновлена")
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить связь: {message}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить связь: {result}")
 
     def delete_link(self):
         """Удаление выбранной связи"""
@@ -146,7 +145,7 @@ class BookAuthorsDialog(QDialog):
         if confirm == QMessageBox.Yes:
             success, message = self.controller.delete_book_author(book_id, author_id)
             if success:
-                self.update_links_table()
+                self.remove_row((book_id, author_id))
                 QMessageBox.information(self, "Успех", "Связь успешно удалена")
             else:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось удалить связь: {message}")
@@ -6,26 +6,31 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, Q
 from PySide6.QtCore import Qt, Signal, QTimer, QDate
 from PySide6.QtGui import QFont, QIntValidator
 
-from core.additional_classes import NumericTableItem
+from ui.widgets import NumericTableItem
 from ui.styles import get_form_label_style
+from ui.dialogs.differential import DifferentialTableMixin
 from core.enums import Genre
 
-class BooksDialog(QDialog):
+class BooksDialog(QDialog, DifferentialTableMixin):
     """
     Диалог для просмотра книг.
     Отображает список всех книг с возможностью добавления, редактирования и удаления.
     """
+    sync_table = "books"
+    key_columns = ("book_id",)
+
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
         self.parent_window = parent
         self.setWindowTitle("Книги")
         self.setMinimumSize(900, 500)
+        self.init_differential()
         self.setup_ui()
 
     def edit_book(self, row, column):
         book_id = int(self.books_table.item(row, 0).text())
-        book = next((b for b in self.books if b['book_id'] == book_id), None)
+        book = self.rows_by_key.get((book_id,))
         if not book:
             return
         dialog = EditBookDialog(self.controller, book, self)
@@ -36,27 +41,28 @@ class BooksDialog(QDialog):
             new_isbn = dialog.isbn_edit.text().strip()
             new_copies = int(dialog.copies_spin.value())
 
-            success, msg = self.controller.update_book(
+            success, result = self.controller.update_book(
                 book_id,
                 new_title,
                 new_year,
                 new_genre,
                 new_isbn,
-                new_copies
+                new_copies,
+                expected_version=book.get("version")
             )
             if success:
-                self.update_books_table()
+                self.apply_row(result)
                 QMessageBox.information(self, "Успех", "Книга успешно обновлена.")
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить книгу: {msg}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить книгу: {self.update_error(result)}")
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
         title_label = QLabel("<h2>Книги</h2>")
         title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(title_label)
-        self.books = self.controller.get_books()
-        if not self.books:
+        books = self.load_rows()
+        if not books:
             empty_label = QLabel("Книг нет.")
             empty_label.setAlignment(Qt.AlignCenter)
             layout.addWidget(empty_label)
@@ -67,7 +73,7 @@ class BooksDialog(QDialog):
                 ["ID", "Название", "Год издания", "Жанр", "ISBN", "Экземпляров"])
             self.books_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
             self.books_table.setEditTriggers(QTableWidget.NoEditTriggers)
-            self.update_books_table()
+            self.show_rows(books)
             self.books_table.setSortingEnabled(True)
             self.books_table.cellDoubleClicked.connect(self.edit_book)
             layout.addWidget(self.books_table)
@@ -83,22 +89,25 @@ class BooksDialog(QDialog):
         buttons_layout.addWidget(close_btn)
         layout.addLayout(buttons_layout)
 
-    def update_books_table(self):
-        self.books = self.controller.get_books()
-        self.books_table.setRowCount(len(self.books))
-        for i, book in enumerate(self.books):
-            id_item = NumericTableItem(str(book['book_id']), book['book_id'])
-            title_item = QTableWidgetItem(book['title'])
-            year_item = QTableWidgetItem(str(book['publication_year']) if book['publication_year'] is not None else "")
-            genre_item = QTableWidgetItem(book['genre'] if book['genre'] else "")
-            isbn_item = QTableWidgetItem(book['isbn'] if book['isbn'] else "")
-            copies_item = QTableWidgetItem(str(book['available_copies']) if book['available_copies'] is not None else "0")
-            self.books_table.setItem(i, 0, id_item)
-            self.books_table.setItem(i, 1, title_item)
-            self.books_table.setItem(i, 2, year_item)
-            self.books_table.setItem(i, 3, genre_item)
-            self.books_table.setItem(i, 4, isbn_item)
-            self.books_table.setItem(i, 5, copies_item)
+    def get_table_widget(self):
+        return getattr(self, "books_table", None)
+
+    def fetch_rows(self):
+        return self.controller.get_books()
+
+    def fill_row(self, i, book):
+        id_item = NumericTableItem(str(book['book_id']), book['book_id'])
+        title_item = QTableWidgetItem(book['title'])
+        year_item = QTableWidgetItem(str(book['publication_year']) if book['publication_year'] is not None else "")
+        genre_item = QTableWidgetItem(book['genre'] if book['genre'] else "")
+        isbn_item = QTableWidgetItem(book['isbn'] if book['isbn'] else "")
+        copies_item = QTableWidgetItem(str(book['available_copies']) if book['available_copies'] is not None else "0")
+        self.books_table.setItem(i, 0, id_item)
+        self.books_table.setItem(i, 1, title_item)
+        self.books_table.setItem(i, 2, year_item)
+        self.books_table.setItem(i, 3, genre_item)
+        self.books_table.setItem(i, 4, isbn_item)
+        self.books_table.setItem(i, 5, copies_item)
 
     def add_book(self):
         dialog = AddBookDialog(self.controller, self)
@@ -108,15 +117,15 @@ class BooksDialog(QDialog):
             genre = dialog.genre_combo.currentText()
             isbn = dialog.isbn_edit.text().strip()
             copies = int(dialog.copies_spin.value())
-            success = self.controller.add_book(
+            book = self.controller.add_book(
                 title,
                 year,
                 genre,
                 isbn,
                 copies
             )
-            if success:
-                self.update_books_table()
+            if book:
+                self.apply_row(book)
                 QMessageBox.information(self, "Успех", "Книга успешно добавлена")
             else:
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить книгу")
@@ -137,7 +146,7 @@ class BooksDialog(QDialog):
         if confirm == QMessageBox.Yes:
             success, msg = self.controller.delete_book(book_id)
             if success:
-                self.update_books_table()
+                self.remove_row((book_id,))
                 QMessageBox.information(self, "Успех", "Книга успешно удалена")
             else:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось удалить книгу: {msg}")
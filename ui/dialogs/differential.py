@@ -0,0 +1,178 @@
+from PySide6.QtCore import Qt, QTimer, QThread, Signal
+
+from core.data import VERSION_CONFLICT_MESSAGE
+
+# Период фоновой синхронизации с базой, мс
+SYNC_INTERVAL_MS = 5000
+
+
+class SyncWorker(QThread):
+    """Чтение изменений таблицы (DatabaseManager.get_changes) вне потока интерфейса."""
+    succeeded = Signal(object, object)  # (since, результат get_changes)
+    failed = Signal(str)
+
+    def __init__(self, controller, table, since, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.table = table
+        self.since = since
+
+    def run(self):
+        try:
+            changes = self.controller.get_changes(self.table, self.since)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.succeeded.emit(self.since, changes)
+
+
+class DifferentialTableMixin:
+    """
+    Миксин для диалогов сущностей: после добавления, изменения и удаления
+    обновляется только затронутая строка таблицы, а изменения других
+    пользователей подтягиваются периодической синхронизацией по журналу
+    изменений (DatabaseManager.get_changes) вместо полной перезагрузки.
+    Изменения читаются в рабочем потоке на отдельном соединении.
+
+    Класс диалога задаёт:
+        sync_table: имя таблицы БД
+        key_columns: столбцы первичного ключа
+        fetch_rows(): полный список строк
+        fill_row(index, row): заполнение строки QTableWidget
+        get_table_widget(): QTableWidget или None, если таблица не создана
+    """
+    sync_table = None
+    key_columns = ()
+
+    def init_differential(self):
+        self.rows_by_key = {}
+        self.watermark = None
+        self.sync_worker = None
+        self.finished.connect(self.stop_sync)
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(SYNC_INTERVAL_MS)
+        self.sync_timer.timeout.connect(self.sync_changes)
+        self.sync_timer.start()
+
+    def row_key(self, row):
+        return tuple(row[column] for column in self.key_columns)
+
+    def load_rows(self):
+        """Полная загрузка строк; водяной знак берётся до чтения, чтобы не пропустить параллельные изменения."""
+        self.watermark = self.controller.get_sync_watermark()
+        rows = self.fetch_rows()
+        self.rows_by_key = {self.row_key(row): row for row in rows}
+        return rows
+
+    def show_rows(self, rows):
+        table = self.get_table_widget()
+        if table is None:
+            return
+        sorting = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            self._fill_keyed_row(i, row)
+        table.setSortingEnabled(sorting)
+
+    def reload_rows(self):
+        self.show_rows(self.load_rows())
+
+    def _fill_keyed_row(self, index, row):
+        self.fill_row(index, row)
+        # Ключ хранится в первой ячейке: после сортировки номер строки не совпадает с порядком загрузки
+        self.get_table_widget().item(index, 0).setData(Qt.UserRole, self.row_key(row))
+
+    def find_row(self, key):
+        table = self.get_table_widget()
+        for i in range(table.rowCount()):
+            item = table.item(i, 0)
+            if item is not None and item.data(Qt.UserRole) == key:
+                return i
+        return -1
+
+    def apply_row(self, row, old_key=None):
+        """Вставка или замена строки; old_key — прежний ключ, если он изменился."""
+        table = self.get_table_widget()
+        if table is None:
+            self.reload_rows()
+            return
+        key = self.row_key(row)
+        if old_key is not None and old_key != key:
+            self.remove_row(old_key)
+        self.rows_by_key[key] = row
+        sorting = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        index = self.find_row(key)
+        if index < 0:
+            index = table.rowCount()
+            table.insertRow(index)
+        self._fill_keyed_row(index, row)
+        table.setSortingEnabled(sorting)
+
+    def remove_row(self, key):
+        self.rows_by_key.pop(key, None)
+        table = self.get_table_widget()
+        if table is None:
+            return
+        index = self.find_row(key)
+        if index >= 0:
+            table.removeRow(index)
+
+    def update_error(self, result):
+        """
+        Текст ошибки обновления. При конфликте версий таблица сначала
+        синхронизируется, чтобы пользователь увидел актуальные данные.
+        """
+        if result == VERSION_CONFLICT_MESSAGE:
+            self.sync_now()
+            return f"{result}. Данные в таблице обновлены, повторите изменение."
+        return result
+
+    def sync_changes(self):
+        """Запуск фоновой синхронизации (по таймеру); пока идёт предыдущая, новая не начинается."""
+        if self.watermark is None or not self.isVisible() or self.sync_worker is not None:
+            return
+        self.sync_worker = SyncWorker(self.controller, self.sync_table, self.watermark, self)
+        self.sync_worker.succeeded.connect(self.apply_changes)
+        self.sync_worker.failed.connect(self.on_sync_failed)
+        self.sync_worker.finished.connect(self.on_sync_finished)
+        self.sync_worker.start()
+
+    def sync_now(self):
+        """Синхронная синхронизация (после конфликта версий)."""
+        if self.watermark is None:
+            return
+        self.stop_sync()
+        try:
+            self.apply_changes(self.watermark, self.controller.get_changes(self.sync_table, self.watermark))
+        except Exception as e:
+            self.on_sync_failed(str(e))
+
+    def apply_changes(self, since, changes):
+        """Подтягивание изменённых строк и удаление исчезнувших."""
+        if since != self.watermark:
+            # Таблица перезагружена, пока шло чтение изменений
+            return
+        if changes is None:
+            self.reload_rows()
+            return
+        for row in changes["rows"]:
+            self.apply_row(row)
+        for key in changes["deleted"]:
+            self.remove_row(key)
+        self.watermark = changes["watermark"]
+
+    def on_sync_failed(self, message):
+        self.controller.logger.error(f"Ошибка синхронизации таблицы {self.sync_table}: {message}")
+
+    def on_sync_finished(self):
+        # Сигнал мог прийти от потока, который уже дождались в sync_now
+        if self.sender() is self.sync_worker:
+            self.sync_worker = None
+
+    def stop_sync(self):
+        """Ожидание фоновой синхронизации (при закрытии диалога)."""
+        if self.sync_worker is not None:
+            self.sync_worker.wait()
+            self.sync_worker = None
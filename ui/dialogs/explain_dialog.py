@@ -0,0 +1,92 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTreeWidget,
+                               QTreeWidgetItem, QHeaderView, QTextEdit)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QBrush
+
+
+class ExplainDialog(QDialog):
+    """
+    Диалог отображения плана выполнения запроса (EXPLAIN ANALYZE).
+    Показывает дерево узлов со временем выполнения и подсвечивает
+    последовательные сканирования больших таблиц.
+    """
+
+    COLUMNS = ["Узел", "Время, мс", "Собств. время, мс", "Строк (факт/план)", "Циклов",
+               "Буферы (hit/read)", "Условие"]
+
+    def __init__(self, analysis, query_text="", parent=None):
+        super().__init__(parent)
+        self.analysis = analysis
+        self.query_text = query_text
+        self.setWindowTitle("План выполнения запроса")
+        self.setMinimumSize(1100, 700)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        if self.query_text:
+            query_label = QLabel(self.query_text)
+            query_label.setWordWrap(True)
+            query_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            layout.addWidget(query_label)
+
+        summary = QLabel(f"Планирование: {self.analysis.planning_ms:.2f} мс, "
+                         f"выполнение: {self.analysis.execution_ms:.2f} мс")
+        layout.addWidget(summary)
+
+        self.plan_tree = QTreeWidget()
+        self.plan_tree.setColumnCount(len(self.COLUMNS))
+        self.plan_tree.setHeaderLabels(self.COLUMNS)
+        self.plan_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.plan_tree)
+
+        hot_nodes = {id(node) for node, _, _ in self.analysis.hotspots}
+        self.add_node(self.plan_tree.invisibleRootItem(), self.analysis.root, hot_nodes)
+        self.plan_tree.expandAll()
+
+        layout.addWidget(QLabel("Рекомендации:"))
+        self.suggestions_text = QTextEdit()
+        self.suggestions_text.setReadOnly(True)
+        self.suggestions_text.setMaximumHeight(160)
+        self.suggestions_text.setPlainText(self.build_suggestions())
+        layout.addWidget(self.suggestions_text)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+        layout.addLayout(buttons_layout)
+
+    def add_node(self, parent_item, node, hot_nodes):
+        """Рекурсивное добавление узла плана в дерево."""
+        condition = node.index_cond or node.filter or node.join_filter or ""
+        item = QTreeWidgetItem(parent_item, [
+            node.title(),
+            f"{node.inclusive_ms:.3f}",
+            f"{node.exclusive_ms:.3f}",
+            f"{node.actual_rows}/{node.plan_rows}",
+            str(node.loops),
+            f"{node.shared_hit}/{node.shared_read}",
+            condition,
+        ])
+        item.setToolTip(6, condition)
+        if id(node) in hot_nodes:
+            for column in range(len(self.COLUMNS)):
+                item.setBackground(column, QBrush(QColor("#ffd6d6")))
+        for child in node.children:
+            self.add_node(item, child, hot_nodes)
+
+    def build_suggestions(self):
+        if not self.analysis.hotspots:
+            return "Последовательных сканирований больших таблиц не обнаружено."
+        lines = []
+        for node, size, suggestion in self.analysis.hotspots:
+            lines.append(f"Seq Scan по таблице {node.relation} (~{int(size)} строк, "
+                         f"отброшено фильтром: {node.rows_removed * node.loops}).")
+            if suggestion:
+                lines.append(f"    Предлагаемый индекс: {suggestion}")
+            else:
+                lines.append("    Фильтра нет — читается вся таблица; рассмотрите условие WHERE или LIMIT.")
+        return "\n".join(lines)
@@ -0,0 +1,194 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton, QLabel,
+                               QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox)
+from PySide6.QtCore import Qt
+
+from ui.widgets import NumericTableItem
+from ui.styles import get_form_label_style
+
+HOLD_STATUSES = {"waiting": "В очереди", "ready": "Ожидает выдачи"}
+
+
+class HoldsDialog(QDialog):
+    """
+    Очередь бронирований: активные брони, постановка в очередь, выдача
+    отложенного экземпляра, отмена и снятие броней с истёкшим сроком получения.
+    """
+
+    COLUMNS = ["ID брони", "Книга", "Читатель", "Билет", "Статус", "Место в очереди", "Поставлена", "Ждёт до"]
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.holds = []
+        self.setWindowTitle("Бронирование книг")
+        self.setMinimumSize(1000, 600)
+        self.setup_ui()
+        self.refresh_holds()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        title_label = QLabel("<h2>Очередь бронирований</h2>")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+
+        self.holds_table = QTableWidget()
+        self.holds_table.setColumnCount(len(self.COLUMNS))
+        self.holds_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.holds_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.holds_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.holds_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.holds_table.setSelectionBehavior(QTableWidget.SelectRows)
+        layout.addWidget(self.holds_table)
+
+        buttons_layout = QHBoxLayout()
+        place_btn = QPushButton("Поставить в очередь")
+        place_btn.clicked.connect(self.place_hold)
+        buttons_layout.addWidget(place_btn)
+
+        checkout_btn = QPushButton("Выдать по брони")
+        checkout_btn.clicked.connect(self.checkout_hold)
+        buttons_layout.addWidget(checkout_btn)
+
+        cancel_btn = QPushButton("Отменить бронь")
+        cancel_btn.clicked.connect(self.cancel_hold)
+        buttons_layout.addWidget(cancel_btn)
+
+        expire_btn = QPushButton("Снять просроченные")
+        expire_btn.clicked.connect(self.expire_holds)
+        buttons_layout.addWidget(expire_btn)
+
+        refresh_btn = QPushButton("Обновить")
+        refresh_btn.clicked.connect(self.refresh_holds)
+        buttons_layout.addWidget(refresh_btn)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+        layout.addLayout(buttons_layout)
+
+    def refresh_holds(self):
+        """Перечитать активные брони."""
+        self.holds = self.controller.get_holds()
+        self.holds_table.setSortingEnabled(False)
+        self.holds_table.setRowCount(len(self.holds))
+        for i, hold in enumerate(self.holds):
+            reader = f"{hold['last_name']} {hold['first_name']}"
+            position = hold["position"]
+            values = [
+                NumericTableItem(str(hold["hold_id"]), hold["hold_id"]),
+                QTableWidgetItem(f"{hold['book_id']} — {hold['title']}"),
+                QTableWidgetItem(reader),
+                QTableWidgetItem(hold["ticket_number"]),
+                QTableWidgetItem(HOLD_STATUSES.get(hold["status"], hold["status"])),
+                NumericTableItem(str(position) if position is not None else "", position or 0),
+                QTableWidgetItem(hold["created_at"].strftime("%Y-%m-%d %H:%M")),
+                QTableWidgetItem(hold["pickup_until"].strftime("%Y-%m-%d") if hold["pickup_until"] else ""),
+            ]
+            for j, item in enumerate(values):
+                # Строка хранит исходный индекс брони, чтобы выбор работал и после сортировки
+                item.setData(Qt.UserRole, i)
+                self.holds_table.setItem(i, j, item)
+        self.holds_table.setSortingEnabled(True)
+
+    def selected_hold(self):
+        row = self.holds_table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "Ошибка", "Выберите бронь")
+            return None
+        return self.holds[self.holds_table.item(row, 0).data(Qt.UserRole)]
+
+    def place_hold(self):
+        dialog = PlaceHoldDialog(self.controller, self)
+        if not dialog.exec():
+            return
+        success, result = self.controller.place_hold(dialog.book_combo.currentData(),
+                                                     dialog.reader_combo.currentData())
+        if not success:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось поставить в очередь: {result}")
+            return
+        self.refresh_holds()
+
+    def checkout_hold(self):
+        hold = self.selected_hold()
+        if hold is None:
+            return
+        if hold["status"] != "ready":
+            QMessageBox.warning(self, "Ошибка", "Экземпляр для этой брони ещё не отложен")
+            return
+        success, result = self.controller.checkout_book(hold["book_id"], hold["reader_id"])
+        if not success:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось выдать книгу: {result}")
+            return
+        QMessageBox.information(self, "Успех", f"Книга выдана, заказ {result['issue_id']}")
+        self.refresh_holds()
+
+    def cancel_hold(self):
+        hold = self.selected_hold()
+        if hold is None:
+            return
+        reply = QMessageBox.question(self, "Подтверждение", f"Отменить бронь {hold['hold_id']}?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        success, result = self.controller.cancel_hold(hold["hold_id"])
+        if not success:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось отменить бронь: {result}")
+        self.refresh_holds()
+
+    def expire_holds(self):
+        expired = self.controller.expire_holds()
+        if expired is None:
+            QMessageBox.warning(self, "Ошибка", "Не удалось снять просроченные брони (подробности в журнале)")
+            return
+        QMessageBox.information(self, "Готово", f"Снято просроченных броней: {expired}")
+        self.refresh_holds()
+
+
+class PlaceHoldDialog(QDialog):
+    """Выбор книги без свободных экземпляров и читателя для постановки в очередь."""
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.setWindowTitle("Поставить в очередь")
+        self.setMinimumWidth(400)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QFormLayout(self)
+        label_style = get_form_label_style()
+
+        book_label = QLabel("Книга (нет свободных экземпляров):")
+        book_label.setStyleSheet(label_style)
+        self.book_combo = QComboBox()
+        for book in self.controller.get_books():
+            if not book["available_copies"]:
+                self.book_combo.addItem(f"{book['book_id']} — {book['title']}", book["book_id"])
+        layout.addRow(book_label, self.book_combo)
+
+        reader_label = QLabel("Читатель:")
+        reader_label.setStyleSheet(label_style)
+        self.reader_combo = QComboBox()
+        for reader in self.controller.get_readers():
+            self.reader_combo.addItem(f"{reader['reader_id']} — {reader['last_name']} {reader['first_name']}",
+                                      reader["reader_id"])
+        layout.addRow(reader_label, self.reader_combo)
+
+        buttons_layout = QHBoxLayout()
+        cancel_btn = QPushButton("Отмена")
+        cancel_btn.clicked.connect(self.reject)
+        buttons_layout.addWidget(cancel_btn)
+        save_btn = QPushButton("Поставить")
+        save_btn.clicked.connect(self.validate_and_accept)
+        buttons_layout.addWidget(save_btn)
+        layout.addRow("", buttons_layout)
+
+    def validate_and_accept(self):
+        if self.book_combo.currentData() is None:
+            QMessageBox.warning(self, "Ошибка", "Нет книг без свободных экземпляров")
+            return
+        if self.reader_combo.currentData() is None:
+            QMessageBox.warning(self, "Ошибка", "Выберите читателя")
+            return
+        self.accept()
@@ -3,19 +3,24 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, Q
                               QSpinBox, QTableWidget, QTableWidgetItem, QLineEdit, QDateEdit,
                               QFormLayout, QTabWidget, QScrollArea, QFrame, QHeaderView, QTextEdit)
 from PySide6.QtCore import Qt, Signal, QTimer, QDate
-from PySide6.QtGui import QFont, QIntValidator
-from core.additional_classes import NumericTableItem
+from PySide6.QtGui import QFont, QIntValidator, QColor
+from datetime import date
+from ui.widgets import NumericTableItem
 from ui.styles import get_form_label_style
+from ui.dialogs.differential import DifferentialTableMixin
 
-class IssuesDialog(QDialog):
+class IssuesDialog(QDialog, DifferentialTableMixin):
     """
     Диалог управления заказами (выдачами книг).
     Позволяет просматривать, добавлять, редактировать и удалять заказы.
     """
+    sync_table = "issues"
+    key_columns = ("issue_id",)
+
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
-        self.all_issues = controller.get_issues()
+        self.init_differential()
 
         self.setWindowTitle("Заказы (выдачи книг)")
         self.setMinimumSize(800, 600)
@@ -32,14 +37,14 @@ class IssuesDialog(QDialog):
 
         # Таблица заказов
         self.issues_table = QTableWidget()
-        self.issues_table.setColumnCount(5)
+        self.issues_table.setColumnCount(6)
         self.issues_table.setHorizontalHeaderLabels(
-            ["ID заказа", "ID книги", "ID читателя", "Дата выдачи", "Дата возврата"])
+            ["ID заказа", "ID книги", "ID читателя", "Дата выдачи", "Дата возврата", "Срок возврата"])
         self.issues_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.issues_table.setEditTriggers(QTableWidget.NoEditTriggers)
 
         # Заполнение таблицы данными
-        self.update_issues_table()
+        self.reload_rows()
 
         # Включение сортировки и обработки двойного клика
         self.issues_table.setSortingEnabled(True)
@@ -64,26 +69,32 @@ class IssuesDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
-    def update_issues_table(self):
-        """Обновление содержимого таблицы заказов"""
-        self.all_issues = self.controller.get_issues()
-        self.issues_table.setRowCount(len(self.all_issues))
-        self.issues_table.setSortingEnabled(False)
-
-        for i, issue in enumerate(self.all_issues):
-            id_issue_item = NumericTableItem(str(issue['issue_id']), issue['issue_id'])
-            book_id_item = NumericTableItem(str(issue['book_id']), issue['book_id'])
-            reader_id_item = NumericTableItem(str(issue['reader_id']), issue['reader_id'])
-            issue_date_item = QTableWidgetItem(issue['issue_date'].strftime('%Y-%m-%d') if issue['issue_date'] else "")
-            return_date_item = QTableWidgetItem(issue['return_date'].strftime('%Y-%m-%d') if issue['return_date'] else "")
-
-            self.issues_table.setItem(i, 0, id_issue_item)
-            self.issues_table.setItem(i, 1, book_id_item)
-            self.issues_table.setItem(i, 2, reader_id_item)
-            self.issues_table.setItem(i, 3, issue_date_item)
-            self.issues_table.setItem(i, 4, return_date_item)
-
-        self.issues_table.setSortingEnabled(True)
+    def get_table_widget(self):
+        return self.issues_table
+
+    def fetch_rows(self):
+        return self.controller.get_issues()
+
+    def fill_row(self, i, issue):
+        """Заполнение строки таблицы заказов"""
+        id_issue_item = NumericTableItem(str(issue['issue_id']), issue['issue_id'])
+        book_id_item = NumericTableItem(str(issue['book_id']), issue['book_id'])
+        reader_id_item = NumericTableItem(str(issue['reader_id']), issue['reader_id'])
+        issue_date_item = QTableWidgetItem(issue['issue_date'].strftime('%Y-%m-%d') if issue['issue_date'] else "")
+        return_date_item = QTableWidgetItem(issue['return_date'].strftime('%Y-%m-%d') if issue['return_date'] else "")
+
+        self.issues_table.setItem(i, 0, id_issue_item)
+        self.issues_table.setItem(i, 1, book_id_item)
+        self.issues_table.setItem(i, 2, reader_id_item)
+        self.issues_table.setItem(i, 3, issue_date_item)
+        self.issues_table.setItem(i, 4, return_date_item)
+
+        # Срок возврата; у просроченных невозвращённых выдач выделяется красным
+        due_date = issue.get('due_date')
+        due_date_item = QTableWidgetItem(due_date.strftime('%Y-%m-%d') if due_date else "")
+        if due_date and not issue['return_date'] and due_date < date.today():
+            due_date_item.setForeground(QColor("red"))
+        self.issues_table.setItem(i, 5, due_date_item)
 
     def add_issue(self):
         """Открытие диалога добавления нового заказа"""
@@ -93,12 +104,12 @@ class IssuesDialog(QDialog):
             reader_id = int(dialog.reader_id_combo.currentData())
             issue_date = dialog.issue_date_edit.text().strip()
             return_date = dialog.return_date_edit.text().strip() or None
-            issue_id = self.controller.add_issue(
+            issue = self.controller.add_issue(
                 book_id, reader_id, issue_date, return_date
             )
 
-            if issue_id:
-                self.update_issues_table()
+            if issue:
+                self.apply_row(issue)
                 QMessageBox.information(self, "Успех", "Заказ успешно добавлен")
             else:
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить заказ")
@@ -106,7 +117,7 @@ class IssuesDialog(QDialog):
     def edit_issue(self, row, column):
         """Открытие диалога редактирования заказа"""
         issue_id = int(self.issues_table.item(row, 0).text())
-        issue = next((a for a in self.all_issues if a['issue_id'] == issue_id), None)
+        issue = self.rows_by_key.get((issue_id,))
 
         if not issue:
             return
@@ -118,14 +129,15 @@ class IssuesDialog(QDialog):
             issue_date = dialog.issue_date_edit.text().strip()
             return_date = dialog.return_date_edit.text().strip() or None
 
-            success, message = self.controller.update_issue(
-                issue_id, book_id, reader_id, issue_date, return_date
+            success, result = self.controller.update_issue(
+                issue_id, book_id, reader_id, issue_date, return_date,
+                expected_version=issue.get("version")
             )
             if success:
-                self.update_issues_table()
+                self.apply_row(result)
                 QMessageBox.information(self, "Успех", "Заказ успешно обновлен")
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить заказ: {message}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить заказ: {self.update_error(result)}")
 
     def delete_issue(self):
         """Удаление выбранного заказа"""
@@ -147,7 +159,7 @@ class IssuesDialog(QDialog):
         if confirm == QMessageBox.Yes:
             success, message = self.controller.delete_issue(issue_id)
             if success:
-                self.update_issues_table()
+                self.remove_row((issue_id,))
                 QMessageBox.information(self, "Успех", "Заказ успешно удален")
             else:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось удалить заказ: {message}")
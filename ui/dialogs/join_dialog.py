@@ -1,8 +1,16 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox,
-                               QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-                               QGroupBox, QRadioButton, QCheckBox, QLineEdit)
+                               QTableView, QHeaderView, QMessageBox,
+                               QGroupBox, QRadioButton, QCheckBox, QLineEdit, QTabWidget, QWidget,
+                               QListWidget, QListWidgetItem)
 from PySide6.QtCore import Qt
+from psycopg2 import sql
+from core.query_ast import Column, Star, Comparison, Like, In, IsNull, render
+from core.join_planner import JoinGraph, AmbiguousJoinError, JOIN_TYPES, describe_path
 from ui.styles import get_button_style, get_combobox_style, get_table_style, get_input_fields_style
+from ui.dialogs.explain_dialog import ExplainDialog
+from ui.dialogs.saved_queries import save_query_interactive
+from ui.query_worker import QueryWorker
+from ui.widgets import ResultTableModel
 import re
 
 
@@ -18,6 +26,7 @@ class JoinWizardDialog(QDialog):
         self.setWindowTitle("Мастер соединений (JOIN)")
         self.setMinimumSize(1200, 800)
 
+        self.query_worker = None
         # Больше не храним жестко столбцы — всё тянем из БД динамически
         self.setup_ui()
         self.selected_columns = []  # Хранит выбранные столбцы для запроса
@@ -26,6 +35,11 @@ class JoinWizardDialog(QDialog):
         """Настройка пользовательского интерфейса."""
         main_layout = QVBoxLayout(self)
 
+        # Вкладка "Две таблицы" — ручной выбор ключей; "Несколько таблиц" — по внешним ключам
+        self.tabs = QTabWidget()
+        pair_page = QWidget()
+        pair_layout = QVBoxLayout(pair_page)
+
         # Верхняя часть: выбор таблиц и настройка JOIN
         top_layout = QHBoxLayout()
 
@@ -80,7 +94,7 @@ class JoinWizardDialog(QDialog):
 
         top_layout.addWidget(right_table_group)
 
-        main_layout.addLayout(top_layout)
+        pair_layout.addLayout(top_layout)
 
         # Выбор полей для отображения
         columns_group = QGroupBox("Выбор столбцов для отображения")
@@ -96,7 +110,7 @@ class JoinWizardDialog(QDialog):
         self.right_columns_layout = QVBoxLayout(self.right_columns_group)
         columns_layout.addWidget(self.right_columns_group)
 
-        main_layout.addWidget(columns_group)
+        pair_layout.addWidget(columns_group)
 
         # Условия фильтрации (WHERE)
         filter_group = QGroupBox("Условия фильтрации (необязательно)")
@@ -119,13 +133,19 @@ class JoinWizardDialog(QDialog):
         filter_layout.addWidget(QLabel("Значение:"))
         filter_layout.addWidget(self.filter_value_edit)
 
-        main_layout.addWidget(filter_group)
+        pair_layout.addWidget(filter_group)
+
+        self.tabs.addTab(pair_page, "Две таблицы")
+        self.tabs.addTab(self.create_multi_page(), "Несколько таблиц")
+        main_layout.addWidget(self.tabs)
 
         # Результат запроса
         result_label = QLabel("Результат запроса:")
         main_layout.addWidget(result_label)
 
-        self.result_table = QTableWidget()
+        self.result_model = ResultTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         self.result_table.setStyleSheet(get_table_style())
         self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         main_layout.addWidget(self.result_table)
@@ -138,6 +158,22 @@ class JoinWizardDialog(QDialog):
         self.execute_btn.setStyleSheet(get_button_style())
         buttons_layout.addWidget(self.execute_btn)
 
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_query)
+        self.cancel_btn.setStyleSheet(get_button_style())
+        buttons_layout.addWidget(self.cancel_btn)
+
+        self.explain_btn = QPushButton("Explain")
+        self.explain_btn.clicked.connect(self.explain_query)
+        self.explain_btn.setStyleSheet(get_button_style())
+        buttons_layout.addWidget(self.explain_btn)
+
+        self.save_btn = QPushButton("Сохранить запрос")
+        self.save_btn.clicked.connect(self.save_query)
+        self.save_btn.setStyleSheet(get_button_style())
+        buttons_layout.addWidget(self.save_btn)
+
         self.close_btn = QPushButton("Закрыть")
         self.close_btn.clicked.connect(self.accept)
         self.close_btn.setStyleSheet(get_button_style())
@@ -161,6 +197,11 @@ class JoinWizardDialog(QDialog):
             self.update_left_columns(self.left_table_combo.currentText())
             self.update_right_columns(self.right_table_combo.currentText())
 
+        self.join_graph = JoinGraph.from_catalog(self.controller.get_foreign_keys() or [])
+        self.join_via, self.join_foreign_keys = [], []
+        self.fill_checkable_list(self.multi_tables_list, tables, set(self.checked_items(self.multi_tables_list)))
+        self.update_multi_plan()
+
     def update_left_columns(self, table_name):
         """Обновление списка столбцов левой таблицы."""
         self.left_column_combo.clear()
@@ -237,51 +278,207 @@ class JoinWizardDialog(QDialog):
         return "INNER JOIN"  # По умолчанию
 
     def build_query(self):
-        """Построение SQL запроса на основе выбранных параметров."""
+        """
+        Построение SQL запроса на основе выбранных параметров.
+
+        Returns:
+            tuple: (sql.Composed, параметры) — значение фильтра передаётся параметром
+        """
+        if self.tabs.currentIndex() == 1:
+            return self.build_multi_query()
+
         left_table = self.left_table_combo.currentText()
         right_table = self.right_table_combo.currentText()
         left_column = self.left_column_combo.currentText()
         right_column = self.right_column_combo.currentText()
         join_type = self.get_join_type()
 
-        selected_columns = self.get_selected_columns()
-        if not selected_columns:
-            selected_columns = ["*"]
+        selected_columns = [Column.parse(c) for c in self.get_selected_columns()] or [Star()]
 
-        query = (
-            f"SELECT {', '.join(selected_columns)} "
-            f"FROM {left_table} {join_type} {right_table} "
-            f"ON {left_table}.{left_column} = {right_table}.{right_column}"
+        query = sql.SQL("SELECT {columns} FROM {left} {join} {right} ON {left_key} = {right_key}").format(
+            columns=sql.SQL(", ").join(column.compile()[0] for column in selected_columns),
+            left=sql.Identifier(left_table),
+            join=sql.SQL(join_type),
+            right=sql.Identifier(right_table),
+            left_key=sql.Identifier(left_table, left_column),
+            right_key=sql.Identifier(right_table, right_column),
         )
 
-        filter_column = self.filter_column_combo.currentText()
-        filter_operator = self.filter_operator_combo.currentText()
-        filter_value = self.filter_value_edit.text().strip()
-
-        def is_numeric(val: str) -> bool:
-            return bool(re.fullmatch(r"-?\d+(\.\d+)?", val))
+        condition = self.build_condition(self.filter_column_combo.currentText(),
+                                         self.filter_operator_combo.currentText(),
+                                         self.filter_value_edit.text().strip())
+        if condition is None:
+            return query, ()
+        where, params = condition.compile()
+        return query + sql.SQL(" WHERE ") + where, tuple(params)
+
+    @staticmethod
+    def build_condition(filter_column, filter_operator, filter_value):
+        """Условие фильтра из полей формы; значение становится параметром запроса."""
+        def to_value(val: str):
+            if re.fullmatch(r"-?\d+", val):
+                return int(val)
+            if re.fullmatch(r"-?\d+\.\d+", val):
+                return float(val)
+            return val
+
+        if filter_column and filter_operator in ("IS NULL", "IS NOT NULL"):
+            return IsNull(filter_column, negate=filter_operator == "IS NOT NULL")
+        if not filter_column or not filter_value:
+            return None
+        if filter_operator in ("LIKE", "NOT LIKE"):
+            return Like(filter_column, f"%{filter_value}%", negate=filter_operator == "NOT LIKE")
+        if filter_operator in ("IN", "NOT IN"):
+            values = [to_value(item.strip()) for item in filter_value.split(",") if item.strip()]
+            return In(filter_column, values, negate=filter_operator == "NOT IN")
+        return Comparison(filter_column, filter_operator, to_value(filter_value))
+
+    # ---- Несколько таблиц: соединения по внешним ключам ----
+
+    def create_multi_page(self):
+        """Вкладка выбора N таблиц; условия соединения выводятся из внешних ключей."""
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        self.join_graph = JoinGraph([])
+        self.join_plan = None
+        # Пути, выбранные пользователем при неоднозначном соединении (аргументы JoinGraph.plan)
+        self.join_via, self.join_foreign_keys = [], []
+        self.path_candidates = []
 
-        if filter_column and filter_operator not in ["IS NULL", "IS NOT NULL"]:
-            if not filter_value:
-                return query
-
-            query += f" WHERE {filter_column} {filter_operator} "
-
-            if filter_operator in ("LIKE", "NOT LIKE"):
-                query += f"'%{filter_value}%'"
-            elif filter_operator in ("IN", "NOT IN"):
-                values = [item.strip() for item in filter_value.split(",") if item.strip()]
-                normalized = [v if is_numeric(v) else f"'{v}'" for v in values]
-                query += f"({', '.join(normalized)})"
-            else:
-                if is_numeric(filter_value):
-                    query += filter_value
-                else:
-                    query += f"'{filter_value}'"
-        elif filter_column and filter_operator in ("IS NULL", "IS NOT NULL"):
-            query += f" WHERE {filter_column} {filter_operator}"
+        top_layout = QHBoxLayout()
+        tables_group = QGroupBox("Таблицы")
+        tables_layout = QVBoxLayout(tables_group)
+        self.multi_tables_list = QListWidget()
+        self.multi_tables_list.itemChanged.connect(self.update_multi_plan)
+        tables_layout.addWidget(self.multi_tables_list)
+        top_layout.addWidget(tables_group)
+
+        columns_group = QGroupBox("Столбцы для отображения (не выбраны — все)")
+        columns_layout = QVBoxLayout(columns_group)
+        self.multi_columns_list = QListWidget()
+        columns_layout.addWidget(self.multi_columns_list)
+        top_layout.addWidget(columns_group)
+        layout.addLayout(top_layout)
+
+        plan_layout = QHBoxLayout()
+        self.multi_join_combo = QComboBox()
+        self.multi_join_combo.addItems(JOIN_TYPES)
+        self.multi_join_combo.setStyleSheet(get_combobox_style())
+        plan_layout.addWidget(QLabel("Тип соединения:"))
+        plan_layout.addWidget(self.multi_join_combo)
+        self.multi_plan_label = QLabel("Выберите таблицы")
+        self.multi_plan_label.setWordWrap(True)
+        plan_layout.addWidget(self.multi_plan_label, 1)
+        layout.addLayout(plan_layout)
+        self.multi_path_combo = QComboBox()
+        self.multi_path_combo.setStyleSheet(get_combobox_style())
+        self.multi_path_combo.activated.connect(self.choose_join_path)
+        self.multi_path_combo.setVisible(False)
+        layout.addWidget(self.multi_path_combo)
 
-        return query
+        filter_group = QGroupBox("Условия фильтрации (необязательно)")
+        filter_layout = QHBoxLayout(filter_group)
+        self.multi_filter_column_combo = QComboBox()
+        self.multi_filter_column_combo.setStyleSheet(get_combobox_style())
+        filter_layout.addWidget(QLabel("Поле:"))
+        filter_layout.addWidget(self.multi_filter_column_combo)
+        self.multi_filter_operator_combo = QComboBox()
+        self.multi_filter_operator_combo.addItems(
+            [self.filter_operator_combo.itemText(i) for i in range(self.filter_operator_combo.count())])
+        self.multi_filter_operator_combo.setStyleSheet(get_combobox_style())
+        filter_layout.addWidget(QLabel("Оператор:"))
+        filter_layout.addWidget(self.multi_filter_operator_combo)
+        self.multi_filter_value_edit = QLineEdit()
+        self.multi_filter_value_edit.setStyleSheet(get_input_fields_style())
+        filter_layout.addWidget(QLabel("Значение:"))
+        filter_layout.addWidget(self.multi_filter_value_edit)
+        layout.addWidget(filter_group)
+        return page
+
+    def checked_items(self, list_widget):
+        return [list_widget.item(i).text() for i in range(list_widget.count())
+                if list_widget.item(i).checkState() == Qt.Checked]
+
+    def fill_checkable_list(self, list_widget, texts, checked):
+        list_widget.blockSignals(True)
+        list_widget.clear()
+        for text in texts:
+            item = QListWidgetItem(text)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if text in checked else Qt.Unchecked)
+            list_widget.addItem(item)
+        list_widget.blockSignals(False)
+
+    def update_multi_plan(self):
+        """Пересчёт дерева соединений и списков столбцов после выбора таблиц."""
+        tables = self.checked_items(self.multi_tables_list)
+        self.join_plan = None
+        self.path_candidates = []
+        self.multi_path_combo.setVisible(False)
+        if not tables:
+            self.multi_plan_label.setText("Выберите таблицы")
+        else:
+            try:
+                self.join_plan = self.plan_multi(tables)
+                self.multi_plan_label.setText(f"План: {self.join_plan.describe()}")
+            except AmbiguousJoinError as e:
+                self.show_path_candidates(e)
+            except ValueError as e:
+                self.multi_plan_label.setText(str(e))
+
+        columns = []
+        for table in (self.join_plan.tables if self.join_plan else tables):
+            columns.extend(f"{table}.{column}" for column in self.controller.get_table_columns(table) or [])
+        self.fill_checkable_list(self.multi_columns_list, columns, set(self.checked_items(self.multi_columns_list)))
+        current_filter = self.multi_filter_column_combo.currentText()
+        self.multi_filter_column_combo.clear()
+        self.multi_filter_column_combo.addItems(columns)
+        if current_filter in columns:
+            self.multi_filter_column_combo.setCurrentText(current_filter)
+
+    def plan_multi(self, tables):
+        return self.join_graph.plan(tables, self.join_via, self.join_foreign_keys)
+
+    def show_path_candidates(self, error):
+        """Неоднозначное соединение: пользователь выбирает путь из вариантов."""
+        self.path_candidates = error.candidates
+        self.multi_plan_label.setText(f"Таблицу {error.target} можно присоединить несколькими путями — выберите путь:")
+        self.multi_path_combo.clear()
+        self.multi_path_combo.addItem("— путь соединения —")
+        for path in error.candidates:
+            self.multi_path_combo.addItem(describe_path(path))
+        self.multi_path_combo.setVisible(True)
+
+    def choose_join_path(self, index):
+        if index <= 0 or index > len(self.path_candidates):
+            return
+        via, foreign_keys = AmbiguousJoinError.resolution(self.path_candidates[index - 1])
+        self.join_via.extend(via)
+        self.join_foreign_keys.extend(foreign_keys)
+        self.update_multi_plan()
+
+    def build_multi_query(self):
+        """
+        Запрос по дереву соединений: в SELECT только отмеченные столбцы,
+        фильтр переносится в источник своей таблицы.
+
+        Raises:
+            ValueError: Если таблицы не выбраны, не связаны внешними ключами
+                или путь соединения неоднозначен и не выбран
+        """
+        tables = self.checked_items(self.multi_tables_list)
+        if not tables:
+            raise ValueError("Не выбраны таблицы")
+        plan = self.plan_multi(tables)
+        columns = [Column.parse(text) for text in self.checked_items(self.multi_columns_list)]
+        filters = {}
+        filter_column = self.multi_filter_column_combo.currentText()
+        condition = self.build_condition(filter_column,
+                                         self.multi_filter_operator_combo.currentText(),
+                                         self.multi_filter_value_edit.text().strip())
+        if condition is not None:
+            filters[Column.parse(filter_column).table] = [condition]
+        return plan.build(columns, filters, self.multi_join_combo.currentText())
 
     def clear_layout(self, layout):
         """Очищает все виджеты из layout."""
@@ -294,37 +491,80 @@ class JoinWizardDialog(QDialog):
                 widget.deleteLater()
 
     def execute_query(self):
-        """Выполнение запроса и отображение результатов."""
-        query = self.build_query()
-
+        """Запуск запроса в рабочем потоке (с ограничениями времени и объёма)."""
+        if self.query_worker is not None:
+            return
         try:
-            results = self.controller.execute_custom_request(query)
+            query, params = self.build_query()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
+            return
+        self.query_worker = QueryWorker(self.controller, query, params, self)
+        self.query_worker.succeeded.connect(self.show_results)
+        self.query_worker.failed.connect(self.on_query_failed)
+        self.query_worker.finished.connect(self.on_worker_finished)
+        self.set_running(True)
+        self.query_worker.start()
+
+    def cancel_query(self):
+        if self.query_worker is not None:
+            self.cancel_btn.setEnabled(False)
+            self.query_worker.cancel()
+
+    def set_running(self, running):
+        for button in (self.execute_btn, self.explain_btn, self.save_btn):
+            button.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+
+    def on_worker_finished(self):
+        self.query_worker = None
+        self.set_running(False)
+
+    def on_query_failed(self, message):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{message}")
+
+    def show_results(self, results):
+        """Отображение результатов запроса."""
+        self.result_table.setSortingEnabled(False)
+        self.result_model.set_result(results)
+
+        if results:
+            self.result_table.setSortingEnabled(True)
+            if results.truncated:
+                QMessageBox.warning(self, "Результат обрезан",
+                                    f"Показаны первые {len(results)} записей: {results.truncated}.\n"
+                                    "Уточните условия запроса.")
+            else:
+                QMessageBox.information(self, "Успех", f"Запрос успешно выполнен. Найдено записей: {len(results)}")
+        else:
+            QMessageBox.information(self, "Результат", "Запрос выполнен, но не найдено подходящих записей.")
 
-            self.result_table.clear()
+    def done(self, result):
+        if self.query_worker is not None:
+            self.query_worker.stop()
+        super().done(result)
 
-            if results:
-                column_names = list(results[0].keys())
-                self.result_table.setColumnCount(len(column_names))
-                self.result_table.setHorizontalHeaderLabels(column_names)
+    def explain_query(self):
+        """Отображение плана выполнения запроса (EXPLAIN ANALYZE)."""
+        try:
+            query, params = self.build_query()
+            analysis = self.controller.explain_request(query, params)
+            ExplainDialog(analysis, render(query, params), self).exec()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось получить план запроса:\n{str(e)}")
 
-                self.result_table.setRowCount(len(results))
-                for i, row in enumerate(results):
-                    for j, col in enumerate(column_names):
-                        val = row.get(col)
-                        item = QTableWidgetItem("" if val is None else str(val))
-                        self.result_table.setItem(i, j, item)
+    def query_tables(self):
+        """Таблицы текущего запроса (для отслеживания изменений снимка результата)."""
+        if self.tabs.currentIndex() == 1:
+            return self.plan_multi(self.checked_items(self.multi_tables_list)).tables
+        return list(dict.fromkeys([self.left_table_combo.currentText(), self.right_table_combo.currentText()]))
 
-                self.result_table.setSortingEnabled(True)
-                QMessageBox.information(self, "Успех", f"Запрос успешно выполнен. Найдено записей: {len(results)}")
-            else:
-                self.result_table.setRowCount(0)
-                self.result_table.setColumnCount(0)
-                QMessageBox.information(self, "Результат", "Запрос выполнен, но не найдено подходящих записей.")
+    def save_query(self):
+        """Сохранение запроса в библиотеку."""
+        try:
+            query, params = self.build_query()
+            tables = self.query_tables()
         except Exception as e:
-            # Снимаем состояние aborted на всякий случай
-            try:
-                if hasattr(self.controller, "connection") and self.controller.connection:
-                    self.controller.connection.rollback()
-            except Exception:
-                pass
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Ошибка", f"Не удалось построить запрос:\n{str(e)}")
+            return
+        save_query_interactive(self, self.controller, query, params, "join_wizard", tables)
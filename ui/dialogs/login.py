@@ -2,12 +2,14 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, Q
                               QHBoxLayout, QWidget, QDialog, QMessageBox, QComboBox,
                               QSpinBox, QTableWidget, QTableWidgetItem, QLineEdit, QDateEdit,
                               QFormLayout, QTabWidget, QScrollArea, QFrame, QHeaderView, QTextEdit)
-from PySide6.QtCore import Qt, QTimer, QDate
+from PySide6.QtCore import Qt, QTimer, QDate, QThread, Signal
 from PySide6.QtGui import QFont, QIntValidator
 
 from core.data import DatabaseManager
+from core.replicas import replica_dsns_from_env
 from core.additional_classes import TextValidator
 from core.logger import Logger
+from core.prefetch import Prefetcher
 from ui.styles import get_message_box_style, get_form_label_style, get_combobox_style, get_button_style
 
 
@@ -45,6 +47,28 @@ class ValidatedLoginLineEdit(QLineEdit):
         self.setText(old_text)
         self.setCursorPosition(cursor_pos)
 
+class ConnectWorker(QThread):
+    """
+    Подключение к БД и проверка наличия схемы вне потока интерфейса.
+    Время ожидания ограничено DatabaseManager.connect_timeout.
+    """
+    connected = Signal(bool, bool)  # подключено, схема существует
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+
+    def run(self):
+        if not self.controller.connect():
+            self.connected.emit(False, False)
+            return
+        table_exists = self.controller.table_exists("books")
+        if table_exists:
+            # Существующая схема могла быть создана предыдущей версией приложения
+            self.controller.apply_migrations()
+        self.connected.emit(True, table_exists)
+
+
 class LoginDialog(QDialog):
     """
     Диалог авторизации и подключения к базе данных.
@@ -53,7 +77,10 @@ class LoginDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.controller = DatabaseManager()
+        # Отчёты и списки таблиц читаются с реплик, если они заданы в LIBRARY_REPLICA_DSNS
+        self.controller.set_replicas(replica_dsns_from_env())
         self.logger = Logger()
+        self.connect_worker = None
 
         # Единый стиль для всех диалоговых окон сообщений
         self.message_box_style = get_message_box_style()
@@ -123,6 +150,11 @@ class LoginDialog(QDialog):
 
         layout.addLayout(form_layout)
 
+        self.status_label = QLabel()
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.status_label.setStyleSheet(form_label_style)
+        layout.addWidget(self.status_label)
+
         # Кнопки действий
         buttons_layout = QHBoxLayout()
 
@@ -170,14 +202,29 @@ class LoginDialog(QDialog):
         # Установка параметров подключения
         self.controller.set_connection_params(dbname, user, password, host, port)
 
-        # Попытка подключения
-        if self.controller.connect():
+        # Подключение выполняется в фоне, окно остаётся отзывчивым
+        self.set_busy(True)
+        self.connect_worker = ConnectWorker(self.controller, self)
+        self.connect_worker.connected.connect(self.on_connected)
+        self.connect_worker.start()
+
+    def set_busy(self, busy):
+        """Блокировка кнопок на время подключения."""
+        for button in (self.connect_btn, self.create_db_btn):
+            button.setEnabled(not busy)
+        self.status_label.setText("Подключение..." if busy else "")
+
+    def reject(self):
+        # Поток подключения завершится не позже таймаута соединения
+        if self.connect_worker is not None and self.connect_worker.isRunning():
+            self.connect_worker.wait()
+        super().reject()
+
+    def on_connected(self, connected, table_exists):
+        """Продолжение входа после фонового подключения."""
+        self.set_busy(False)
+        if connected:
             try:
-                # Проверка существования структуры базы данных
-                self.controller.cursor.execute(
-                    "SELECT 1 FROM information_schema.tables WHERE table_name = 'books'")
-                table_exists = self.controller.cursor.fetchone() is not None
-
                 # Если структура не существует, предлагаем создать
                 if not table_exists:
                     reply_box = QMessageBox(self)
@@ -204,6 +251,10 @@ class LoginDialog(QDialog):
                         err_box.exec()
                         return
 
+                # Каталог схемы и первые страницы таблиц загружаются в фоне,
+                # пока пользователь закрывает сообщение и открывается главное окно
+                Prefetcher(self.controller).start()
+
                 # Подключение успешно
                 success_box = QMessageBox(self)
                 success_box.setWindowTitle("Успех")
@@ -0,0 +1,112 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QMessageBox, QFileDialog)
+from PySide6.QtCore import Qt
+
+from ui.widgets import NumericTableItem
+
+
+class PerformanceDialog(QDialog):
+    """
+    Диалог статистики выполнения SQL-запросов.
+    Показывает гистограмму времени по отпечаткам запросов, позволяет сбросить
+    статистику и сохранить её в файл.
+    """
+
+    COLUMNS = [
+        ("fingerprint", "Запрос"),
+        ("calls", "Вызовов"),
+        ("errors", "Ошибок"),
+        ("total_ms", "Всего, мс"),
+        ("mean_ms", "Среднее, мс"),
+        ("p95_ms", "p95, мс"),
+        ("max_ms", "Макс., мс"),
+        ("rows", "Строк"),
+    ]
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.setWindowTitle("Производительность запросов")
+        self.setMinimumSize(1100, 600)
+        self.setup_ui()
+        self.refresh_stats()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        title_label = QLabel("<h2>Статистика запросов</h2>")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+
+        self.stats_table = QTableWidget()
+        self.stats_table.setColumnCount(len(self.COLUMNS))
+        self.stats_table.setHorizontalHeaderLabels([title for _, title in self.COLUMNS])
+        self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.stats_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stats_table.cellDoubleClicked.connect(self.show_histogram)
+        layout.addWidget(self.stats_table)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        buttons_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Обновить")
+        refresh_btn.clicked.connect(self.refresh_stats)
+        buttons_layout.addWidget(refresh_btn)
+
+        reset_btn = QPushButton("Сбросить")
+        reset_btn.clicked.connect(self.reset_stats)
+        buttons_layout.addWidget(reset_btn)
+
+        dump_btn = QPushButton("Сохранить в файл")
+        dump_btn.clicked.connect(self.dump_stats)
+        buttons_layout.addWidget(dump_btn)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+        layout.addLayout(buttons_layout)
+
+    def refresh_stats(self):
+        """Перечитать статистику из контроллера."""
+        self.stats = self.controller.get_query_stats()
+        self.stats_table.setSortingEnabled(False)
+        self.stats_table.setRowCount(len(self.stats))
+        for i, stat in enumerate(self.stats):
+            for j, (key, _) in enumerate(self.COLUMNS):
+                value = stat[key]
+                if key == "fingerprint":
+                    item = QTableWidgetItem(value)
+                    item.setToolTip(value)
+                else:
+                    item = NumericTableItem(str(value), value)
+                self.stats_table.setItem(i, j, item)
+        self.stats_table.setSortingEnabled(True)
+
+        total_calls = sum(s["calls"] for s in self.stats)
+        total_ms = sum(s["total_ms"] for s in self.stats)
+        self.summary_label.setText(
+            f"Уникальных запросов: {len(self.stats)}, вызовов: {total_calls}, суммарное время: {total_ms:.1f} мс")
+
+    def show_histogram(self, row, column):
+        """Показать гистограмму времени выполнения выбранного запроса."""
+        fingerprint = self.stats_table.item(row, 0).text()
+        stat = next((s for s in self.stats if s["fingerprint"] == fingerprint), None)
+        if not stat:
+            return
+        lines = [f"{bucket}: {count}" for bucket, count in stat["histogram"].items()]
+        QMessageBox.information(self, "Гистограмма", f"{fingerprint}\n\n" + "\n".join(lines))
+
+    def reset_stats(self):
+        self.controller.reset_query_stats()
+        self.refresh_stats()
+
+    def dump_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить статистику", "query_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        if self.controller.dump_query_stats(path):
+            QMessageBox.information(self, "Успех", f"Статистика сохранена в {path}")
+        else:
+            QMessageBox.warning(self, "Ошибка", "Не удалось сохранить статистику. Подробности в логах.")
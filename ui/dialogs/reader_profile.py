@@ -0,0 +1,133 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QGroupBox)
+from PySide6.QtCore import Qt
+
+from ui.widgets import NumericTableItem
+
+HISTORY_PAGE_SIZE = 50
+
+
+def _date_text(value):
+    return value.strftime("%Y-%m-%d") if value else ""
+
+
+class ReaderProfileDialog(QDialog):
+    """
+    Профиль читателя: сводка по выдачам, история (постранично, новые сначала)
+    и рекомендации по совместным выдачам.
+    """
+
+    HISTORY_COLUMNS = ["ID заказа", "Книга", "Жанр", "Дата выдачи", "Срок возврата", "Дата возврата"]
+    RECOMMENDATION_COLUMNS = ["ID книги", "Книга", "Жанр", "Оценка", "По книгам читателя"]
+
+    def __init__(self, controller, reader_id, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.reader_id = reader_id
+        self.last_row = None
+        self.setWindowTitle("Профиль читателя")
+        self.setMinimumSize(1000, 700)
+        self.setup_ui()
+        self.load_profile()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.title_label = QLabel()
+        self.title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.title_label)
+        self.stats_label = QLabel()
+        layout.addWidget(self.stats_label)
+
+        history_group = QGroupBox("История выдач")
+        history_layout = QVBoxLayout(history_group)
+        self.history_table = self._create_table(self.HISTORY_COLUMNS)
+        history_layout.addWidget(self.history_table)
+        paging_layout = QHBoxLayout()
+        self.rows_label = QLabel()
+        self.load_more_btn = QPushButton("Загрузить ещё")
+        self.load_more_btn.clicked.connect(self.load_history_page)
+        paging_layout.addWidget(self.rows_label)
+        paging_layout.addStretch()
+        paging_layout.addWidget(self.load_more_btn)
+        history_layout.addLayout(paging_layout)
+        layout.addWidget(history_group, 2)
+
+        recommendations_group = QGroupBox("Рекомендации (читатели тех же книг брали также)")
+        recommendations_layout = QVBoxLayout(recommendations_group)
+        self.recommendations_table = self._create_table(self.RECOMMENDATION_COLUMNS)
+        recommendations_layout.addWidget(self.recommendations_table)
+        layout.addWidget(recommendations_group, 1)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn, alignment=Qt.AlignRight)
+
+    @staticmethod
+    def _create_table(columns):
+        table = QTableWidget()
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        return table
+
+    def load_profile(self):
+        profile = self.controller.get_reader_profile(self.reader_id, HISTORY_PAGE_SIZE + 1)
+        if profile is None:
+            self.title_label.setText("<h2>Читатель не найден</h2>")
+            self.load_more_btn.setEnabled(False)
+            return
+        reader, stats = profile["reader"], profile["stats"]
+        self.title_label.setText(f"<h2>{reader['last_name']} {reader['first_name']} {reader['patronymic'] or ''}"
+                                 f" — билет {reader['ticket_number']}</h2>")
+        self.stats_label.setText(
+            f"Всего выдач: {stats['total_issues']}, разных книг: {stats['distinct_books']}, "
+            f"на руках: {stats['open_issues']}, просрочено: {stats['overdue_issues']}, "
+            f"первая выдача: {_date_text(stats['first_issue_date']) or '-'}, "
+            f"последняя: {_date_text(stats['last_issue_date']) or '-'}")
+        self.show_history(profile["history"])
+        self.show_recommendations(profile["recommendations"])
+
+    def load_history_page(self):
+        """Следующая страница истории после (issue_date, issue_id) последней строки."""
+        if self.last_row is None:
+            return
+        before = (self.last_row["issue_date"], self.last_row["issue_id"])
+        self.show_history(self.controller.get_reader_history(self.reader_id, HISTORY_PAGE_SIZE + 1, before))
+
+    def show_history(self, rows):
+        # Лишняя строка сверх страницы только показывает, что история продолжается
+        has_more = len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+        start = self.history_table.rowCount()
+        self.history_table.setRowCount(start + len(rows))
+        for i, row in enumerate(rows, start):
+            items = [
+                NumericTableItem(str(row["issue_id"]), row["issue_id"]),
+                QTableWidgetItem(f"{row['book_id']} — {row['title']}"),
+                QTableWidgetItem(row["genre"] or ""),
+                QTableWidgetItem(_date_text(row["issue_date"])),
+                QTableWidgetItem(_date_text(row["due_date"])),
+                QTableWidgetItem(_date_text(row["return_date"])),
+            ]
+            for j, item in enumerate(items):
+                self.history_table.setItem(i, j, item)
+        if rows:
+            self.last_row = rows[-1]
+        self.load_more_btn.setEnabled(has_more)
+        self.rows_label.setText(f"Загружено выдач: {self.history_table.rowCount()}")
+
+    def show_recommendations(self, rows):
+        self.recommendations_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            items = [
+                NumericTableItem(str(row["book_id"]), row["book_id"]),
+                QTableWidgetItem(row["title"]),
+                QTableWidgetItem(row["genre"] or ""),
+                NumericTableItem(f"{row['score']:.3f}", row["score"]),
+                NumericTableItem(str(row["because_of"]), row["because_of"]),
+            ]
+            for j, item in enumerate(items):
+                self.recommendations_table.setItem(i, j, item)
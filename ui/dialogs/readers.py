@@ -5,17 +5,21 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, Q
 from PySide6.QtCore import Qt, Signal, QTimer, QDate
 from PySide6.QtGui import QFont, QIntValidator
 from ui.styles import get_form_label_style
-from core.additional_classes import NumericTableItem, ValidatedLineEdit
+from ui.widgets import NumericTableItem, ValidatedLineEdit
+from ui.dialogs.differential import DifferentialTableMixin
 
-class ReadersDialog(QDialog):
+class ReadersDialog(QDialog, DifferentialTableMixin):
     """
     Диалог управления читателями.
     Позволяет просматривать, добавлять, редактировать и удалять читателей
     """
+    sync_table = "readers"
+    key_columns = ("reader_id",)
+
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
-        self.all_readers = controller.get_readers()
+        self.init_differential()
 
         self.setWindowTitle("Читатели")
         self.setMinimumSize(800, 600)
@@ -42,7 +46,7 @@ class ReadersDialog(QDialog):
         self.readers_table.setEditTriggers(QTableWidget.NoEditTriggers)
 
         # Заполнение таблицы данными
-        self.update_readers_table()
+        self.reload_rows()
 
         # Включение сортировки и обработки двойного клика
         self.readers_table.setSortingEnabled(True)
@@ -61,42 +65,37 @@ class ReadersDialog(QDialog):
         delete_reader_btn.clicked.connect(self.delete_reader)
         buttons_layout.addWidget(delete_reader_btn)
 
+        profile_btn = QPushButton("Профиль читателя")
+        profile_btn.clicked.connect(self.show_profile)
+        buttons_layout.addWidget(profile_btn)
+
         close_btn = QPushButton("Закрыть")
         close_btn.clicked.connect(self.accept)
         buttons_layout.addWidget(close_btn)
 
         layout.addLayout(buttons_layout)
 
-    def update_readers_table(self):
-        """Обновление содержимого таблицы читателей"""
-        # Получение актуального списка читателей
-        self.all_readers = self.controller.get_readers()
-        self.readers_table.setRowCount(len(self.all_readers))
-
-        # Временно отключаем сортировку для заполнения таблицы
-        self.readers_table.setSortingEnabled(False)
+    def get_table_widget(self):
+        return self.readers_table
 
+    def fetch_rows(self):
+        return self.controller.get_readers()
 
+    def fill_row(self, i, reader):
+        """Заполнение строки таблицы читателей"""
+        id_reader_item = NumericTableItem(str(reader['reader_id']), reader['reader_id'])
+        last_name_item = QTableWidgetItem(reader['last_name'])
+        first_name_item = QTableWidgetItem(reader['first_name'])
+        patronymic_item = QTableWidgetItem(reader['patronymic'])
+        ticket_number_item = NumericTableItem(str(reader['ticket_number']), reader['ticket_number'])
+        registration_date_item = NumericTableItem(reader['registration_date'].strftime('%Y-%m-%d'), reader['registration_date'])
 
-        # Заполнение таблицы данными
-        for i, reader in enumerate(self.all_readers):
-            id_reader_item = NumericTableItem(str(reader['reader_id']), reader['reader_id'])
-            last_name_item = QTableWidgetItem(reader['last_name'])
-            first_name_item = QTableWidgetItem(reader['first_name'])
-            patronymic_item = QTableWidgetItem(reader['patronymic'])
-            ticket_number_item = NumericTableItem(str(reader['ticket_number']), reader['ticket_number'])
-            registration_date_item = NumericTableItem(reader['registration_date'].strftime('%Y-%m-%d'), reader['registration_date'])
-
-
-            self.readers_table.setItem(i, 0, id_reader_item)
-            self.readers_table.setItem(i, 1, last_name_item)
-            self.readers_table.setItem(i, 2, first_name_item)
-            self.readers_table.setItem(i, 3, patronymic_item)
-            self.readers_table.setItem(i, 4, ticket_number_item)
-            self.readers_table.setItem(i, 5, registration_date_item)
-
-        # Включаем сортировку обратно
-        self.readers_table.setSortingEnabled(True)
+        self.readers_table.setItem(i, 0, id_reader_item)
+        self.readers_table.setItem(i, 1, last_name_item)
+        self.readers_table.setItem(i, 2, first_name_item)
+        self.readers_table.setItem(i, 3, patronymic_item)
+        self.readers_table.setItem(i, 4, ticket_number_item)
+        self.readers_table.setItem(i, 5, registration_date_item)
 
     def add_reader(self):
         """Открытие диалога добавления нового читателя"""
@@ -110,12 +109,12 @@ class ReadersDialog(QDialog):
             registration_date = dialog.registration_date_edit.text().strip()
 
             # Добавление читателя в БД
-            reader_id = self.controller.add_reader(
+            reader = self.controller.add_reader(
                 last_name, first_name, patronymic, ticket_number, registration_date
             )
 
-            if reader_id:
-                self.update_readers_table()
+            if reader:
+                self.apply_row(reader)
                 QMessageBox.information(self, "Успех", "Читатель успешно добавлен")
             else:
                 QMessageBox.warning(self, "Ошибка", "Не удалось добавить читателя")
@@ -124,7 +123,7 @@ class ReadersDialog(QDialog):
         """Открытие диалога редактирования читателя"""
         # Получение ID читателя из таблицы
         reader_id = int(self.readers_table.item(row, 0).text())
-        reader = next((a for a in self.all_readers if a['reader_id'] == reader_id), None)
+        reader = self.rows_by_key.get((reader_id,))
 
         if not reader:
             return
@@ -140,15 +139,26 @@ class ReadersDialog(QDialog):
             registration_date = dialog.registration_date_edit.text().strip()
 
             # Обновление читателя в БД
-            success, message = self.controller.update_reader(
-                reader_id, last_name, first_name, patronymic, ticket_number, registration_date
+            success, result = self.controller.update_reader(
+                reader_id, last_name, first_name, patronymic, ticket_number, registration_date,
+                expected_version=reader.get("version")
             )
             if success:
-                # Обновление таблицы при успешном обновлении
-                self.update_readers_table()
+                # Обновление только изменённой строки
+                self.apply_row(result)
                 QMessageBox.information(self, "Успех", "Читатель успешно обновлен")
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить читателя: {message}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось обновить читателя: {self.update_error(result)}")
+
+    def show_profile(self):
+        """Открытие профиля выбранного читателя (история выдач и рекомендации)"""
+        selected_rows = self.readers_table.selectedItems()
+        if not selected_rows:
+            QMessageBox.warning(self, "Ошибка", "Выберите читателя")
+            return
+        reader_id = int(self.readers_table.item(selected_rows[0].row(), 0).text())
+        from ui.dialogs.reader_profile import ReaderProfileDialog
+        ReaderProfileDialog(self.controller, reader_id, self).exec()
 
     def delete_reader(self):
         """Удаление выбранного читателя"""
@@ -175,8 +185,8 @@ class ReadersDialog(QDialog):
             success, message = self.controller.delete_reader(reader_id)
 
             if success:
-                # Обновление таблицы при успешном удалении
-                self.update_readers_table()
+                # Удаление строки из таблицы
+                self.remove_row((reader_id,))
                 QMessageBox.information(self, "Успех", "Читатель успешно удален")
             else:
                 QMessageBox.warning(self, "Ошибка", f"Не удалось удалить читателя: {message}")
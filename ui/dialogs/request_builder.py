@@ -1,8 +1,44 @@
 from PySide6.QtWidgets import (QDialog,QMessageBox,QScrollArea, QVBoxLayout, QHBoxLayout, QGroupBox, QCheckBox, 
-                              QLineEdit, QComboBox, QPushButton, QTableWidget, QTableWidgetItem,
-                              QLabel, QFormLayout)
+                              QLineEdit, QComboBox, QPushButton, QTableView,
+                              QLabel, QFormLayout, QSpinBox, QListWidget, QListWidgetItem)
+from PySide6.QtGui import QFont
 from PySide6.QtCore import Qt
 from core.additional_classes import RequestBuilder
+from core.query_ast import render
+from ui.dialogs.explain_dialog import ExplainDialog
+from ui.dialogs.saved_queries import save_query_interactive
+from ui.query_worker import QueryWorker
+from ui.widgets import ResultTableModel
+
+
+class RequestResultModel(ResultTableModel):
+    """Результаты конструктора: строки промежуточных итогов (ROLLUP/CUBE) жирным, пустые группы — «Итого»."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.group_positions = set()
+        self.grouping_position = None
+        self.bold = QFont()
+        self.bold.setBold(True)
+
+    def set_group_columns(self, group_columns):
+        self.group_positions = {i for i, name in enumerate(self.columns) if name in group_columns}
+        self.grouping_position = (self.columns.index(RequestBuilder.GROUPING_COLUMN)
+                                  if RequestBuilder.GROUPING_COLUMN in self.columns else None)
+
+    def is_subtotal(self, values):
+        return self.grouping_position is not None and bool(values[self.grouping_position])
+
+    def display_text(self, values, column):
+        if values[column] is None and column in self.group_positions and self.is_subtotal(values):
+            return "Итого"
+        return super().display_text(values, column)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.FontRole and index.isValid() and self.is_subtotal(self.rows[index.row()]):
+            return self.bold
+        return super().data(index, role)
+
 
 class RequestBuilderDialog(QDialog):
     """
@@ -14,6 +50,12 @@ class RequestBuilderDialog(QDialog):
         self.controller = controller
         self.request_builder = RequestBuilder()
         self.isMaximized=False
+        self.loaded_rows = 0
+        self.last_row = None
+        self.keyset_paging = True
+        self.total_estimate = None
+        self.query_worker = None
+        self.append_results = False
         self.setup_ui()
         
     def setup_ui(self):
@@ -59,18 +101,44 @@ class RequestBuilderDialog(QDialog):
         order_layout.addWidget(self.order_column)
         order_layout.addWidget(QLabel("Направление:"))
         order_layout.addWidget(self.order_direction)
+        self.page_size = QSpinBox()
+        self.page_size.setRange(0, 100000)
+        self.page_size.setSingleStep(100)
+        self.page_size.setValue(500)
+        self.page_size.setSpecialValueText("без ограничения")
+        order_layout.addWidget(QLabel("Строк на странице:"))
+        order_layout.addWidget(self.page_size)
         layout.addWidget(order_group)
         
         # Группировка и агрегатные функции
         group_group = QGroupBox("Группировка и агрегатные функции")
         group_layout = QFormLayout(group_group)
-        self.group_column = QComboBox()
-        self.group_column.addItem("")
+        self.group_columns = QListWidget()
+        self.group_columns.setMaximumHeight(90)
+        self.grouping_mode = QComboBox()
+        self.grouping_mode.addItems([""] + list(RequestBuilder.GROUPING_MODES))
+        
+        aggregate_layout = QHBoxLayout()
         self.aggregate_function = QComboBox()
         self.aggregate_function.addItems(["", "COUNT", "SUM", "AVG", "MAX", "MIN"])
+        self.aggregate_function.currentTextChanged.connect(self.update_aggregate_columns)
+        self.aggregate_column = QComboBox()
+        add_aggregate_btn = QPushButton("Добавить")
+        add_aggregate_btn.clicked.connect(self.add_aggregate)
+        remove_aggregate_btn = QPushButton("Удалить")
+        remove_aggregate_btn.clicked.connect(self.remove_aggregate)
+        aggregate_layout.addWidget(self.aggregate_function)
+        aggregate_layout.addWidget(self.aggregate_column)
+        aggregate_layout.addWidget(add_aggregate_btn)
+        aggregate_layout.addWidget(remove_aggregate_btn)
+        self.aggregates_list = QListWidget()
+        self.aggregates_list.setMaximumHeight(70)
+        
         self.having_condition = QLineEdit()
-        group_layout.addRow("Группировать по:", self.group_column)
-        group_layout.addRow("Агрегатная функция:", self.aggregate_function)
+        group_layout.addRow("Группировать по:", self.group_columns)
+        group_layout.addRow("Итоги:", self.grouping_mode)
+        group_layout.addRow("Агрегатная функция:", aggregate_layout)
+        group_layout.addRow("Агрегаты:", self.aggregates_list)
         group_layout.addRow("Условие HAVING:", self.having_condition)
         layout.addWidget(group_group)
         
@@ -78,17 +146,39 @@ class RequestBuilderDialog(QDialog):
         buttons_layout = QHBoxLayout()
         self.execute_btn = QPushButton("Выполнить запрос")
         self.execute_btn.clicked.connect(self.execute_request)
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_request)
+        self.explain_btn = QPushButton("Explain")
+        self.explain_btn.clicked.connect(self.explain_request)
+        self.save_btn = QPushButton("Сохранить запрос")
+        self.save_btn.clicked.connect(self.save_request)
         self.clear_btn = QPushButton("Очистить")
         self.clear_btn.clicked.connect(self.clear_form)
         buttons_layout.addWidget(self.execute_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+        buttons_layout.addWidget(self.explain_btn)
+        buttons_layout.addWidget(self.save_btn)
         buttons_layout.addWidget(self.clear_btn)
         buttons_layout.addStretch()
         layout.addLayout(buttons_layout)
         
         # Результаты
-        self.results_table = QTableWidget()
+        self.results_model = RequestResultModel(self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
         layout.addWidget(self.results_table)
         
+        paging_layout = QHBoxLayout()
+        self.rows_label = QLabel("")
+        self.load_more_btn = QPushButton("Загрузить ещё")
+        self.load_more_btn.setEnabled(False)
+        self.load_more_btn.clicked.connect(self.load_more)
+        paging_layout.addWidget(self.rows_label)
+        paging_layout.addStretch()
+        paging_layout.addWidget(self.load_more_btn)
+        layout.addLayout(paging_layout)
+        
         # Инициализация
         self.on_table_changed(self.table_combo.currentText())
     
@@ -108,105 +198,302 @@ class RequestBuilderDialog(QDialog):
             self.columns_layout.addWidget(checkbox)
         
         current_order = self.order_column.currentText()
-        current_group = self.group_column.currentText()
+        current_groups = set(self.checked_group_columns())
         self.order_column.clear()
-        self.group_column.clear()
+        self.group_columns.clear()
         self.order_column.addItem("")
-        self.group_column.addItem("")
         
         # Добавляем столбцы
         self.order_column.addItems(columns)
-        self.group_column.addItems(columns)
+        for column in columns:
+            item = QListWidgetItem(column)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if column in current_groups else Qt.Unchecked)
+            self.group_columns.addItem(item)
         
         # Восстанавливаем предыдущие значения, если они есть в новой таблице
         if current_order in columns:
             self.order_column.setCurrentText(current_order)
-        if current_group in columns:
-            self.group_column.setCurrentText(current_group)
+        
+        # Агрегаты относятся к столбцам прежней таблицы
+        self.aggregates_list.clear()
+        self.update_aggregate_columns(self.aggregate_function.currentText())
     
-    def execute_request(self):
-        """Построение и выполнение SQL-запроса"""
-        try:
-            # Сбор выбранных столбцов
-            selected_columns = []
-            for i in range(self.columns_layout.count()):
-                checkbox = self.columns_layout.itemAt(i).widget()
-                if checkbox and checkbox.isChecked():
-                    selected_columns.append(checkbox.text())
-            
-            if not selected_columns:
-                selected_columns = ["*"]
-            
-            # Построение запроса
-            self.request_builder.reset()
-            
-            group_column = self.group_column.currentText()
-            
-            # Обработка группировки
-            if group_column:
-                # Если есть группировка, добавляем агрегатную функцию если не указана
-                if not self.aggregate_function.currentText():
-                    self.request_builder.aggregate("COUNT", "*")
-                
-                # Для GROUP BY оставляем только столбец группировки
-                final_columns = [group_column]
-                self.request_builder.select(final_columns)
-                
-                self.request_builder.group_by(group_column)
-                
-                # Если выбрана агрегатная функция
-                if self.aggregate_function.currentText():
-                    if self.aggregate_function.currentText() == "COUNT":
-                        aggregate_column = "*"
-                    else:
-                        numeric_columns = self.get_numeric_columns(self.table_combo.currentText())
-                        if numeric_columns:
-                            aggregate_column = numeric_columns[0]
-                        else:
-                            QMessageBox.warning(self, "Предупреждение", 
-                                            f"Для функции {self.aggregate_function.currentText()} нужен числовой столбец.")
-                            return
-                    
-                    self.request_builder.aggregate(
-                        self.aggregate_function.currentText(),
-                        aggregate_column
-                    )
-                
-                if self.having_condition.text():
-                    self.request_builder.having(self.having_condition.text())
-                    
-            else:
-                # Без группировки используем все выбранные столбцы
-                if selected_columns:
-                    self.request_builder.select(selected_columns)
-            
-            self.request_builder.from_table(self.table_combo.currentText())
-            
-            if self.where_condition.text():
-                self.request_builder.where(self.where_condition.text())
-            
-            # ORDER BY только если выбран столбец
-            order_column = self.order_column.currentText()
-            if order_column:
-                # Проверяем конфликт GROUP BY и ORDER BY
-                if group_column and order_column != group_column:
-                    QMessageBox.information(self, "Информация", 
-                                        f"Сортировка изменена с '{order_column}' на '{group_column}' из-за группировки")
-                    self.request_builder.order_by(group_column, self.order_direction.currentText())
-                else:
-                    self.request_builder.order_by(order_column, self.order_direction.currentText())
-            
-            # Выполнение запроса
-            sql = self.request_builder.build()
-            self.controller.logger.info(f"Выполняется запрос: {sql}")
-            results = self.controller.execute_custom_request(sql)
+    def checked_group_columns(self):
+        """Отмеченные столбцы группировки в порядке списка"""
+        return [self.group_columns.item(i).text() for i in range(self.group_columns.count())
+                if self.group_columns.item(i).checkState() == Qt.Checked]
+    
+    def update_aggregate_columns(self, function):
+        """Столбцы для агрегатной функции: * и все столбцы для COUNT, числовые для остальных"""
+        self.aggregate_column.clear()
+        if not function:
+            return
+        if function == "COUNT":
+            self.aggregate_column.addItem("*")
+            self.aggregate_column.addItems(self.controller.get_table_columns(self.table_combo.currentText()) or [])
+        else:
+            self.aggregate_column.addItems(self.get_numeric_columns(self.table_combo.currentText()) or [])
+    
+    def add_aggregate(self):
+        """Добавление агрегата в список (несколько агрегатов считаются за один проход)"""
+        function = self.aggregate_function.currentText()
+        column = self.aggregate_column.currentText()
+        if not function:
+            return
+        if not column:
+            QMessageBox.warning(self, "Предупреждение", f"Для функции {function} нужен числовой столбец.")
+            return
+        item = QListWidgetItem(f"{function}({column})")
+        item.setData(Qt.UserRole, (function, column))
+        self.aggregates_list.addItem(item)
+    
+    def remove_aggregate(self):
+        for item in self.aggregates_list.selectedItems():
+            self.aggregates_list.takeItem(self.aggregates_list.row(item))
+    
+    def selected_aggregates(self):
+        """
+        Агрегаты из списка; если список пуст — функция и столбец из полей выбора.
+
+        Returns:
+            list or None: Пары (функция, столбец) или None, если столбец не выбран
+        """
+        aggregates = [self.aggregates_list.item(i).data(Qt.UserRole) for i in range(self.aggregates_list.count())]
+        function = self.aggregate_function.currentText()
+        if not aggregates and function:
+            column = self.aggregate_column.currentText()
+            if not column:
+                QMessageBox.warning(self, "Предупреждение", f"Для функции {function} нужен числовой столбец.")
+                return None
+            aggregates = [(function, column)]
+        return aggregates
+    
+    def build_request(self):
+        """
+        Построение SQL-запроса по состоянию формы.
+
+        Returns:
+            tuple or None: (запрос, параметры) или None, если форма заполнена некорректно
+        """
+        # Сбор выбранных столбцов
+        selected_columns = []
+        for i in range(self.columns_layout.count()):
+            checkbox = self.columns_layout.itemAt(i).widget()
+            if checkbox and checkbox.isChecked():
+                selected_columns.append(checkbox.text())
+        
+        if not selected_columns:
+            selected_columns = ["*"]
+        
+        # Построение запроса
+        self.request_builder.reset()
+        self.keyset_paging = True
+        
+        group_columns = self.checked_group_columns()
+        aggregates = self.selected_aggregates()
+        if aggregates is None:
+            return None
+        
+        # Обработка группировки
+        if group_columns:
+            # Для GROUP BY выводим только столбцы группировки и агрегаты
+            # (без агрегатов RequestBuilder добавит COUNT(*))
+            self.request_builder.select(group_columns)
+            for column in group_columns:
+                self.request_builder.group_by(column)
             
-            # Отображение результатов
-            self.display_results(results)
+            mode = self.grouping_mode.currentText()
+            if mode == "ROLLUP":
+                self.request_builder.rollup()
+            elif mode == "CUBE":
+                self.request_builder.cube()
+            elif mode == "GROUPING SETS":
+                # Итог по каждому столбцу отдельно и общий итог
+                self.request_builder.grouping_sets([[column] for column in group_columns] + [[]])
+        elif aggregates:
+            # Агрегаты без группировки — одна итоговая строка по всей таблице
+            self.request_builder.select([])
+        else:
+            # Без группировки используем все выбранные столбцы
+            self.request_builder.select(selected_columns)
+        
+        for function, column in aggregates:
+            self.request_builder.aggregate(function, column)
+        
+        if group_columns and self.having_condition.text():
+            self.request_builder.having(self.having_condition.text())
+        
+        self.request_builder.from_table(self.table_combo.currentText())
         
+        if self.where_condition.text():
+            self.request_builder.where(self.where_condition.text())
+        
+        # ORDER BY только если выбран столбец
+        order_column = self.order_column.currentText()
+        direction = self.order_direction.currentText()
+        if aggregates and not group_columns:
+            return self.request_builder.build()
+        if order_column:
+            # Проверяем конфликт GROUP BY и ORDER BY
+            if group_columns and order_column not in group_columns:
+                QMessageBox.information(self, "Информация", 
+                                    f"Сортировка изменена с '{order_column}' на '{group_columns[0]}' из-за группировки")
+                order_column = group_columns[0]
+            self.request_builder.order_by(order_column, direction)
+        
+        page_size = self.page_size.value()
+        if group_columns:
+            # Однозначный порядок групп: остальные столбцы группировки
+            for column in group_columns:
+                if column != order_column:
+                    self.request_builder.order_by(column, direction)
+        elif page_size:
+            # Для постраничной выборки порядок должен быть однозначным:
+            # добавляем все столбцы первичного ключа; без ключа — OFFSET
+            key = self.controller.get_catalog().primary_keys.get(self.table_combo.currentText(), [])
+            for column in key:
+                if column != order_column:
+                    self.request_builder.order_by(column, direction)
+            self.request_builder.not_null(key)
+            self.keyset_paging = bool(key)
+        if page_size:
+            # Одна лишняя строка показывает, есть ли следующая страница
+            self.request_builder.limit(page_size + 1)
+        
+        return self.request_builder.build()
+
+    def execute_request(self):
+        """Построение SQL-запроса и запуск его выполнения в рабочем потоке"""
+        try:
+            request = self.build_request()
+            if request is None:
+                return
+            query, params = request
+            self.controller.logger.info(f"Выполняется запрос: {render(query, params)}")
+            self.start_query(query, params, append=False)
         except Exception as e:
             self.controller.logger.error(f"Ошибка выполнения запроса: {str(e)}")
             QMessageBox.warning(self, "Ошибка", f"Не удалось выполнить запрос:\n{str(e)}")
+
+    def load_more(self):
+        """Загрузка следующей страницы (keyset по столбцам ORDER BY, иначе OFFSET)"""
+        if self.last_row is None:
+            return
+        try:
+            keys = self.request_builder.order_columns()
+            if (self.keyset_paging and self.request_builder.supports_keyset()
+                    and all(key in self.last_row for key in keys)):
+                # NULL в ключе учитывается keyset-условием RequestBuilder
+                self.request_builder.after([self.last_row[key] for key in keys]).offset(None)
+            else:
+                # Нет первичного ключа, столбец сортировки не выбран для вывода или есть строки итогов
+                self.request_builder.after(None).offset(self.loaded_rows)
+            query, params = self.request_builder.build()
+            self.start_query(query, params, append=True)
+        except Exception as e:
+            self.controller.logger.error(f"Ошибка загрузки страницы: {str(e)}")
+            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить данные:\n{str(e)}")
+
+    def start_query(self, query, params, append):
+        """Выполнение запроса с ограничениями времени и объёма; до завершения доступна только отмена"""
+        if self.query_worker is not None:
+            return
+        self.append_results = append
+        self.query_worker = QueryWorker(self.controller, query, params, self)
+        self.query_worker.succeeded.connect(self.on_query_finished)
+        self.query_worker.failed.connect(self.on_query_failed)
+        self.query_worker.finished.connect(self.on_worker_finished)
+        self.set_running(True)
+        self.query_worker.start()
+
+    def cancel_request(self):
+        if self.query_worker is not None:
+            self.cancel_btn.setEnabled(False)
+            self.query_worker.cancel()
+
+    def set_running(self, running):
+        for button in (self.execute_btn, self.explain_btn, self.save_btn, self.clear_btn):
+            button.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        if running:
+            self.load_more_btn.setEnabled(False)
+            self.rows_label.setText("Выполняется запрос...")
+
+    def on_query_finished(self, results):
+        append = self.append_results
+        if not append:
+            self.loaded_rows = 0
+        self.show_page(results, append=append)
+        self.update_rows_label(self.estimate_total() if not append else self.total_estimate)
+        if results.truncated:
+            # Обрезанный результат не продолжается следующей страницей
+            self.load_more_btn.setEnabled(False)
+            self.rows_label.setText(f"Загружено строк: {self.loaded_rows} (результат обрезан: {results.truncated})")
+
+    def on_query_failed(self, message):
+        self.controller.logger.error(f"Ошибка выполнения запроса: {message}")
+        self.update_rows_label(self.total_estimate)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось выполнить запрос:\n{message}")
+
+    def on_worker_finished(self):
+        self.query_worker = None
+        self.set_running(False)
+
+    def done(self, result):
+        if self.query_worker is not None:
+            self.query_worker.stop()
+        super().done(result)
+
+    def show_page(self, results, append):
+        """Отображение страницы результатов; лишняя строка сверх лимита только отмечает продолжение"""
+        page_size = self.page_size.value()
+        has_more = bool(page_size) and len(results) > page_size
+        if has_more:
+            results = results[:page_size]
+        self.display_results(results, append=append)
+        self.loaded_rows += len(results)
+        if results:
+            self.last_row = results[-1]
+        elif not append:
+            self.last_row = None
+        self.load_more_btn.setEnabled(has_more)
+
+    def estimate_total(self):
+        """Оценка общего числа строк по плану запроса (без COUNT(*))"""
+        self.total_estimate = None
+        if not self.load_more_btn.isEnabled():
+            self.total_estimate = self.loaded_rows
+        else:
+            self.total_estimate = self.controller.estimate_row_count(*self.request_builder.build(paging=False))
+        return self.total_estimate
+
+    def update_rows_label(self, total):
+        if total is None or not self.load_more_btn.isEnabled():
+            self.rows_label.setText(f"Загружено строк: {self.loaded_rows}")
+        else:
+            self.rows_label.setText(f"Загружено строк: {self.loaded_rows} из ~{max(total, self.loaded_rows)}")
+
+    def explain_request(self):
+        """Построение запроса и отображение его плана (EXPLAIN ANALYZE)"""
+        try:
+            request = self.build_request()
+            if request is None:
+                return
+            query, params = request
+            analysis = self.controller.explain_request(query, params)
+            ExplainDialog(analysis, render(query, params), self).exec()
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось получить план запроса:\n{str(e)}")
+
+    def save_request(self):
+        """Сохранение запроса в библиотеку (без постраничного ограничения)"""
+        if self.build_request() is None:
+            return
+        query, params = self.request_builder.build(paging=False)
+        save_query_interactive(self, self.controller, query, params, "request_builder",
+                               [self.table_combo.currentText()])
+
     def get_numeric_columns(self, table_name):
         """Получение списка числовых столбцов таблицы через контроллер"""
         try:
@@ -215,30 +502,21 @@ class RequestBuilderDialog(QDialog):
             self.controller.logger.error(f"Ошибка получения числовых столбцов: {str(e)}")
             return []
             
-    def display_results(self, results):
-        """Отображение результатов в таблице"""
-        if not results:
-            self.results_table.setRowCount(0)
-            self.results_table.setColumnCount(0)
+    def display_results(self, results, append=False):
+        """Отображение результатов (ResultSet) в таблице (append — дописать строки к уже показанным)"""
+        if append:
+            self.results_model.append_result(results)
             return
-            
-        self.results_table.setRowCount(len(results))
-        
-        if results:
-            # Получаем ключи из первого элемента как заголовки
-            columns = list(results[0].keys())
-            self.results_table.setColumnCount(len(columns))
-            self.results_table.setHorizontalHeaderLabels(columns)
-        
-        # Данные
-        for row_idx, row_data in enumerate(results):
-            for col_idx, (key, value) in enumerate(row_data.items()):
-                self.results_table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
+        self.results_model.set_result(results)
+        self.results_model.set_group_columns(set(self.checked_group_columns()))
     
     def clear_form(self):
         """Очистка формы"""
         self.where_condition.clear()
         self.having_condition.clear()
         self.aggregate_function.setCurrentIndex(0)
+        self.aggregates_list.clear()
+        self.grouping_mode.setCurrentIndex(0)
         self.order_column.setCurrentIndex(0)
-        self.group_column.setCurrentIndex(0)
+        for i in range(self.group_columns.count()):
+            self.group_columns.item(i).setCheckState(Qt.Unchecked)
@@ -0,0 +1,163 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QMessageBox, QInputDialog, QSplitter)
+from PySide6.QtCore import Qt
+
+
+SOURCE_TITLES = {
+    "request_builder": "SELECT",
+    "join_wizard": "JOIN",
+}
+
+
+def save_query_interactive(parent, controller, query, params, source, tables):
+    """
+    Сохранение запроса построителя в библиотеку: спрашивает имя
+    и нужно ли хранить снимок результата.
+
+    Returns:
+        bool: Сохранён ли запрос
+    """
+    name, ok = QInputDialog.getText(parent, "Сохранить запрос", "Название запроса:")
+    name = name.strip()
+    if not ok or not name:
+        return False
+    reply = QMessageBox.question(
+        parent, "Снимок результата",
+        "Хранить снимок результата?\nПовторное открытие будет мгновенным, пока данные таблиц не изменятся.",
+        QMessageBox.Yes | QMessageBox.No)
+    query_id = controller.save_query(name, query, params, source, tables, keep_snapshot=reply == QMessageBox.Yes)
+    if query_id is None:
+        QMessageBox.warning(parent, "Ошибка", "Не удалось сохранить запрос")
+        return False
+    QMessageBox.information(parent, "Успех", f"Запрос \"{name}\" сохранён")
+    return True
+
+
+class SavedQueriesDialog(QDialog):
+    """
+    Библиотека сохранённых запросов.
+    Открывает запрос из снимка, если данные не менялись, иначе выполняет его заново.
+    """
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.queries = []
+        self.setWindowTitle("Сохранённые запросы")
+        self.setMinimumSize(1100, 700)
+        self.setup_ui()
+        self.load_queries()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        title_label = QLabel("<h2>Сохранённые запросы</h2>")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.queries_table = QTableWidget()
+        self.queries_table.setColumnCount(5)
+        self.queries_table.setHorizontalHeaderLabels(["Название", "Источник", "Таблицы", "Снимок", "Создан"])
+        self.queries_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.queries_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.queries_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.queries_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.queries_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.queries_table.cellDoubleClicked.connect(lambda *_: self.open_query())
+        splitter.addWidget(self.queries_table)
+
+        self.results_table = QTableWidget()
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        splitter.addWidget(self.results_table)
+        layout.addWidget(splitter)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        buttons_layout = QHBoxLayout()
+        open_btn = QPushButton("Открыть")
+        open_btn.clicked.connect(self.open_query)
+        buttons_layout.addWidget(open_btn)
+
+        refresh_btn = QPushButton("Выполнить заново")
+        refresh_btn.clicked.connect(lambda: self.open_query(refresh=True))
+        buttons_layout.addWidget(refresh_btn)
+
+        delete_btn = QPushButton("Удалить")
+        delete_btn.clicked.connect(self.delete_query)
+        buttons_layout.addWidget(delete_btn)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+        layout.addLayout(buttons_layout)
+
+    def load_queries(self):
+        self.queries = self.controller.get_saved_queries()
+        self.queries_table.setRowCount(len(self.queries))
+        for i, saved in enumerate(self.queries):
+            name_item = QTableWidgetItem(saved["name"])
+            name_item.setToolTip(saved["sql_text"])
+            snapshot = "нет"
+            if saved["keep_snapshot"]:
+                snapshot = saved["snapshot_at"].strftime("%d.%m.%Y %H:%M") if saved["snapshot_at"] else "ещё не снят"
+            self.queries_table.setItem(i, 0, name_item)
+            self.queries_table.setItem(i, 1, QTableWidgetItem(SOURCE_TITLES.get(saved["source"], saved["source"])))
+            self.queries_table.setItem(i, 2, QTableWidgetItem(", ".join(saved["tables"])))
+            self.queries_table.setItem(i, 3, QTableWidgetItem(snapshot))
+            self.queries_table.setItem(i, 4, QTableWidgetItem(saved["created_at"].strftime("%d.%m.%Y %H:%M")))
+
+    def selected_query(self):
+        row = self.queries_table.currentRow()
+        if row < 0 or row >= len(self.queries):
+            QMessageBox.warning(self, "Ошибка", "Выберите запрос")
+            return None
+        return self.queries[row]
+
+    def open_query(self, refresh=False):
+        saved = self.selected_query()
+        if saved is None:
+            return
+        try:
+            rows, snapshot_at = self.controller.run_saved_query(saved["query_id"], refresh=refresh)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить запрос:\n{str(e)}")
+            return
+        self.display_results(rows)
+        if snapshot_at is not None:
+            self.status_label.setText(
+                f"Снимок от {snapshot_at.strftime('%d.%m.%Y %H:%M:%S')} (данные не менялись), строк: {len(rows)}")
+        else:
+            self.status_label.setText(f"Запрос выполнен, строк: {len(rows)}")
+            if saved["keep_snapshot"]:
+                self.load_queries()
+
+    def display_results(self, rows):
+        self.results_table.clear()
+        if not rows:
+            self.results_table.setRowCount(0)
+            self.results_table.setColumnCount(0)
+            return
+        columns = list(rows[0].keys())
+        self.results_table.setColumnCount(len(columns))
+        self.results_table.setHorizontalHeaderLabels(columns)
+        self.results_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(columns):
+                value = row.get(column)
+                self.results_table.setItem(i, j, QTableWidgetItem("" if value is None else str(value)))
+
+    def delete_query(self):
+        saved = self.selected_query()
+        if saved is None:
+            return
+        reply = QMessageBox.question(self, "Подтверждение", f"Удалить запрос \"{saved['name']}\"?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        success, msg = self.controller.delete_saved_query(saved["query_id"])
+        if success:
+            self.load_queries()
+        else:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось удалить запрос: {msg}")
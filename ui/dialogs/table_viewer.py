@@ -1,9 +1,13 @@
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
 
+from core.data import TABLE_PAGE_SIZE
+
 class TableViewerDialog(QDialog):
     def __init__(self, controller, parent=None):
         super().__init__(parent)
         self.controller = controller
+        self.loaded_rows = 0
+        self.last_row = None
         self.setWindowTitle("Обозреватель таблиц (динамич.)")
         self.setMinimumSize(900, 600)
         self.setup_ui()
@@ -18,7 +22,7 @@ class TableViewerDialog(QDialog):
         top.addWidget(self.table_combo)
 
         refresh_btn = QPushButton("Обновить")
-        refresh_btn.clicked.connect(self.refresh_table)
+        refresh_btn.clicked.connect(self.reload_tables)
         top.addWidget(refresh_btn)
 
         close_btn = QPushButton("Закрыть")
@@ -31,42 +35,60 @@ class TableViewerDialog(QDialog):
         self.table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.table_widget)
 
+        paging_layout = QHBoxLayout()
+        self.rows_label = QLabel("")
+        self.load_more_btn = QPushButton("Загрузить ещё")
+        self.load_more_btn.setEnabled(False)
+        self.load_more_btn.clicked.connect(self.load_more)
+        paging_layout.addWidget(self.rows_label)
+        paging_layout.addStretch()
+        paging_layout.addWidget(self.load_more_btn)
+        layout.addLayout(paging_layout)
+
         self.table_combo.currentTextChanged.connect(self.refresh_table)
 
     def load_tables(self):
         tables = self.controller.get_tables() or []
         self.table_combo.clear()
+        # Смена текущей таблицы при заполнении сама вызывает refresh_table
         self.table_combo.addItems(tables)
-        if tables:
-            self.refresh_table()
+
+    def reload_tables(self):
+        """Перечитать каталог (структура могла измениться) и текущую таблицу."""
+        current = self.table_combo.currentText()
+        self.controller.invalidate_catalog()
+        self.table_combo.blockSignals(True)
+        self.load_tables()
+        self.table_combo.blockSignals(False)
+        if current in self.controller.get_tables():
+            self.table_combo.setCurrentText(current)
+        self.refresh_table()
 
     def refresh_table(self):
         table = self.table_combo.currentText()
         if not table:
             return
+        self.loaded_rows = 0
+        self.last_row = None
+        self.table_widget.clear()
+        self.table_widget.setRowCount(0)
+        columns = self.controller.get_table_columns(table) or []
+        self.table_widget.setColumnCount(len(columns))
+        self.table_widget.setHorizontalHeaderLabels(columns)
+        self.load_page()
 
+    def load_more(self):
+        self.load_page()
+
+    def load_page(self):
+        """Следующая страница в порядке первичного ключа (первая может прийти из предзагрузки)."""
+        table = self.table_combo.currentText()
+        page_size = TABLE_PAGE_SIZE
+        after = None
+        if self.last_row is not None:
+            after = [self.last_row.get(column) for column in self.controller.get_catalog().page_key(table)]
         try:
-            query = f"SELECT * FROM {table} ORDER BY 1"
-            rows = self.controller.execute_custom_request(query)
-
-            self.table_widget.clear()
-
-            if not rows:
-                columns = self.controller.get_table_columns(table) or []
-                self.table_widget.setRowCount(0)
-                self.table_widget.setColumnCount(len(columns))
-                self.table_widget.setHorizontalHeaderLabels(columns)
-                return
-
-            columns = list(rows[0].keys())
-            self.table_widget.setColumnCount(len(columns))
-            self.table_widget.setHorizontalHeaderLabels(columns)
-
-            self.table_widget.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                for j, col in enumerate(columns):
-                    val = row.get(col)
-                    self.table_widget.setItem(i, j, QTableWidgetItem("" if val is None else str(val)))
+            rows = self.controller.get_table_page(table, page_size, after=after, offset=self.loaded_rows)
         except Exception as e:
             # Доп. страховка: на случай, если вызвали не через execute_custom_request
             try:
@@ -74,4 +96,18 @@ class TableViewerDialog(QDialog):
                     self.controller.connection.rollback()
             except Exception:
                 pass
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить таблицу:\n{e}")
\ No newline at end of file
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить таблицу:\n{e}")
+            return
+
+        columns = [self.table_widget.horizontalHeaderItem(j).text() for j in range(self.table_widget.columnCount())]
+        start = self.table_widget.rowCount()
+        self.table_widget.setRowCount(start + len(rows))
+        for i, row in enumerate(rows, start):
+            for j, col in enumerate(columns):
+                val = row.get(col)
+                self.table_widget.setItem(i, j, QTableWidgetItem("" if val is None else str(val)))
+        self.loaded_rows += len(rows)
+        if rows:
+            self.last_row = rows[-1]
+        self.load_more_btn.setEnabled(len(rows) == page_size)
+        self.rows_label.setText(f"Загружено строк: {self.loaded_rows}")
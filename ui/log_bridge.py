@@ -0,0 +1,29 @@
+from PySide6.QtCore import QObject, Signal
+
+
+class LogBridge(QObject):
+    """
+    Передача записей core.logger.Logger в текстовое поле журнала.
+    Записи из рабочих потоков доставляются сигналом в поток интерфейса.
+    """
+    new_log = Signal(str)
+
+    def __init__(self, logger, log_display, parent=None):
+        super().__init__(parent)
+        self.logger = logger
+        self.log_display = log_display
+        self.new_log.connect(self._append)
+        logger.add_listener(self.new_log.emit)
+        self._scroll_to_end()
+
+    def detach(self):
+        self.logger.remove_listener(self.new_log.emit)
+
+    def _append(self, line):
+        self.log_display.append(line)
+        # Прокручивание до самых новых сообщений
+        self._scroll_to_end()
+
+    def _scroll_to_end(self):
+        scrollbar = self.log_display.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
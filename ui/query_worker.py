@@ -0,0 +1,43 @@
+from PySide6.QtCore import QThread, Signal
+
+from core.guards import QUERY_TIMEOUT_MS, MAX_RESULT_ROWS, MAX_RESULT_BYTES
+
+
+class QueryWorker(QThread):
+    """
+    Выполнение произвольного запроса вне потока интерфейса с ограничениями
+    core.guards; cancel() прерывает запрос на сервере.
+    """
+    succeeded = Signal(object)  # QueryResult
+    failed = Signal(str)
+
+    def __init__(self, controller, query, params=None, parent=None, replica=True,
+                 timeout_ms=QUERY_TIMEOUT_MS, max_rows=MAX_RESULT_ROWS, max_bytes=MAX_RESULT_BYTES):
+        super().__init__(parent)
+        self.controller = controller
+        self.query = query
+        self.params = params
+        self.replica = replica
+        self.timeout_ms = timeout_ms
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def run(self):
+        try:
+            results = self.controller.execute_custom_request(self.query, self.params, replica=self.replica,
+                                                             timeout_ms=self.timeout_ms, max_rows=self.max_rows,
+                                                             max_bytes=self.max_bytes)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.succeeded.emit(results)
+
+    def cancel(self):
+        self.controller.cancel_query()
+
+    def stop(self):
+        """Отмена и ожидание завершения (при закрытии диалога)."""
+        # Повтор отмены: запрос мог ещё не начаться на сервере при первой попытке
+        while self.isRunning():
+            self.cancel()
+            self.wait(100)
@@ -1,7 +1,11 @@
 """
 Модуль централизованного управления стилями для приложения "Библиотека".
 Содержит все стили CSS для компонентов интерфейса в светлой и темной темах.
+
+Стили собираются из шаблонов один раз на тему и кэшируются: диалоги
+запрашивают их при каждом создании.
 """
+from functools import lru_cache
 
 # Основные цвета для светлой темы
 LIGHT_THEME_COLORS = {
@@ -36,6 +40,7 @@ DARK_THEME_COLORS = {
 
 # ОБЩИЕ КОМПОНЕНТЫ СТИЛЕЙ
 
+@lru_cache(maxsize=None)
 def get_button_style(theme="light"):
     """
     Возвращает стиль для кнопок в зависимости от выбранной темы.
@@ -81,6 +86,7 @@ def get_button_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_table_style(theme="light"):
     """
     Возвращает стиль для таблиц в зависимости от выбранной темы.
@@ -129,6 +135,7 @@ def get_table_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_tab_style(theme="light"):
     """
     Возвращает стиль для вкладок в зависимости от выбранной темы.
@@ -180,6 +187,7 @@ def get_tab_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_combobox_style(theme="light"):
     """
     Возвращает стиль для выпадающих списков в зависимости от выбранной темы.
@@ -261,6 +269,7 @@ def get_combobox_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_input_fields_style(theme="light"):
     """
     Возвращает стиль для полей ввода (QLineEdit, QTextEdit, QSpinBox) в зависимости от выбранной темы.
@@ -374,6 +383,7 @@ def get_input_fields_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_message_box_style(theme="light"):
     """
     Возвращает стиль для диалоговых окон сообщений в зависимости от выбранной темы.
@@ -430,6 +440,7 @@ def get_message_box_style(theme="light"):
             }}
         """
 
+@lru_cache(maxsize=None)
 def get_log_display_style(theme="light"):
     """
     Возвращает стиль для отображения логов в зависимости от выбранной темы.
@@ -453,6 +464,7 @@ def get_log_display_style(theme="light"):
 
 # ПОЛНЫЕ НАБОРЫ СТИЛЕЙ ДЛЯ ПРИЛОЖЕНИЯ
 
+@lru_cache(maxsize=None)
 def get_light_theme_style():
     """
     Возвращает полный набор стилей для светлой темы приложения.
@@ -474,6 +486,7 @@ def get_light_theme_style():
         {get_input_fields_style("light")}
     """
 
+@lru_cache(maxsize=None)
 def get_dark_theme_style():
     """
     Возвращает полный набор стилей для темной темы приложения.
@@ -498,6 +511,7 @@ def get_dark_theme_style():
 
 # СПЕЦИАЛЬНЫЕ СТИЛИ ДЛЯ КОМПОНЕНТОВ
 
+@lru_cache(maxsize=None)
 def get_title_style(theme="light"):
     """
     Возвращает стиль для заголовка приложения.
@@ -513,6 +527,7 @@ def get_title_style(theme="light"):
     else:
         return f"color: {LIGHT_THEME_COLORS['primary']}; margin: 10px;"
 
+@lru_cache(maxsize=None)
 def get_form_label_style(theme="light"):
     """
     Возвращает стиль для меток в формах.
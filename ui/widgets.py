@@ -0,0 +1,112 @@
+from PySide6.QtWidgets import QTableWidgetItem, QLineEdit
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from core.additional_classes import TextValidator
+
+
+class NumericTableItem(QTableWidgetItem):
+    """
+    Элемент таблицы для числовых значений с правильной сортировкой.
+    """
+
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.value = value
+
+    def __lt__(self, other):
+        """Сравнение по числовому значению, а не по тексту."""
+        if hasattr(other, 'value'):
+            return self.value < other.value
+        return super().__lt__(other)
+
+class ValidatedLineEdit(QLineEdit):
+    """
+    Поле ввода с валидацией текста.
+    Разрешает только определенные символы, заданные в контроллере.
+    """
+
+    def __init__(self, controller, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def keyPressEvent(self, event):
+        """Обработка нажатия клавиш с валидацией."""
+        # Сохраняем текущий текст и позицию курсора
+        old_text = self.text()
+        cursor_pos = self.cursorPosition()
+
+        # Вызываем стандартную обработку нажатия клавиш
+        super().keyPressEvent(event)
+
+        # Проверяем валидность нового текста
+        new_text = self.text()
+
+        # Если текст пустой, разрешаем его
+        if not new_text or TextValidator.is_valid_text_input(new_text):
+            return
+
+        # Если текст не валиден, восстанавливаем старый текст
+        self.setText(old_text)
+        self.setCursorPosition(cursor_pos)
+
+
+class ResultTableModel(QAbstractTableModel):
+    """
+    Модель для QTableView поверх core.rows.ResultSet.
+
+    Значения не копируются в элементы таблицы: текст ячейки строится при
+    отрисовке, поэтому в памяти остаются только кортежи результата.
+    Сортировка по столбцу — по значениям (NULL в конце).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = ()
+        self.rows = []
+
+    def set_result(self, result):
+        """Замена результата (result — ResultSet или None)."""
+        self.beginResetModel()
+        self.columns = result.columns if result is not None else ()
+        self.rows = list(result.rows) if result is not None else []
+        self.endResetModel()
+
+    def append_result(self, result):
+        """Дописать строки результата с теми же столбцами."""
+        if not result:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(result) - 1)
+        self.rows.extend(result.rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def display_text(self, values, column):
+        value = values[column]
+        return "" if value is None else str(value)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.display_text(self.rows[index.row()], index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not 0 <= column < len(self.columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        present = [values for values in self.rows if values[column] is not None]
+        missing = [values for values in self.rows if values[column] is None]
+        present.sort(key=lambda values: values[column], reverse=order == Qt.DescendingOrder)
+        self.rows = present + missing
+        self.layoutChanged.emit()
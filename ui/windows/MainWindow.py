@@ -1,23 +1,28 @@
+import importlib
+import os
+
 from PySide6.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout,
                               QHBoxLayout, QWidget, QDialog, QMessageBox, QComboBox,
                               QSpinBox, QTableWidget, QTableWidgetItem, QLineEdit, QDateEdit,
                               QFormLayout, QMenu, QTabWidget, QScrollArea, QFrame, QHeaderView, QTextEdit,)
 from PySide6.QtCore import Qt, QTimer, QDate
 from PySide6.QtGui import QFont, QIntValidator,QAction
-from ui.dialogs.bookauthors import BookAuthorsDialog
-from ui.dialogs.authors import AuthorsDialog
-from ui.dialogs.readers import ReadersDialog
-from ui.dialogs.books import BooksDialog
-from ui.dialogs.issues import IssuesDialog
 from core.logger import Logger
+from ui.log_bridge import LogBridge
 from ui.styles import (get_light_theme_style, get_dark_theme_style, get_log_display_style, get_title_style)
 from core.enums import TableType
 
-from ui.dialogs.searchable_authors import SearchableAuthorsDialog
-from ui.dialogs.searchable_books import SearchableBooksDialog
-from ui.dialogs.searchable_readers import SearchableReadersDialog
-from ui.dialogs.searchable_issues import SearchableIssuesDialog
-from ui.dialogs.searchable_bookauthors import SearchableBookAuthorsDialog
+# Сколько последних байт журнала показывать при запуске
+LOG_TAIL_BYTES = 256 * 1024
+
+# Модули диалогов импортируются при первом открытии, чтобы не замедлять запуск
+SEARCHABLE_DIALOGS = {
+    TableType.AUTHORS: ("ui.dialogs.searchable_authors", "SearchableAuthorsDialog"),
+    TableType.BOOKS: ("ui.dialogs.searchable_books", "SearchableBooksDialog"),
+    TableType.READERS: ("ui.dialogs.searchable_readers", "SearchableReadersDialog"),
+    TableType.ISSUES: ("ui.dialogs.searchable_issues", "SearchableIssuesDialog"),
+    TableType.BOOK_AUTHORS: ("ui.dialogs.searchable_bookauthors", "SearchableBookAuthorsDialog"),
+}
 
 class MainWindow(QMainWindow):
     """
@@ -75,8 +80,8 @@ class MainWindow(QMainWindow):
         self.data_tabs.addTab(log_tab, "Логи")
         self.data_tabs.setCurrentIndex(0)
 
-        # Регистрация дисплея логов в логгере
-        self.logger.set_main_window_log_display(self.log_display)
+        # Записи логгера передаются в дисплей логов через сигнал Qt
+        self.log_bridge = LogBridge(self.logger, self.log_display, self)
 
         # Кнопки управления внизу
         bottom_btn_layout = QHBoxLayout()
@@ -99,6 +104,10 @@ class MainWindow(QMainWindow):
         self.alter_table_btn.clicked.connect(self.open_alter_table_dialog)
         bottom_btn_layout.addWidget(self.alter_table_btn)
 
+        self.performance_btn = QPushButton("Производительность")
+        self.performance_btn.clicked.connect(self.show_performance)
+        bottom_btn_layout.addWidget(self.performance_btn)
+
         # Кнопка отключения от БД
         self.disconnect_btn = QPushButton("Отключиться от БД")
         self.disconnect_btn.setFixedWidth(160)
@@ -117,6 +126,8 @@ class MainWindow(QMainWindow):
             db_connection = self.controller.cursor.connection
             dialog = AlterTableDialog(db_connection, self)
             dialog.exec()
+            # Структура могла измениться — каталог перечитается при следующем обращении
+            self.controller.invalidate_catalog()
         else:
             from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "Ошибка",
@@ -199,6 +210,14 @@ class MainWindow(QMainWindow):
         self.request_builder_btn.clicked.connect(self.show_request_builder)
         buttons_layout.addWidget(self.request_builder_btn)
 
+        self.saved_queries_btn = QPushButton("Сохранённые запросы")
+        self.saved_queries_btn.clicked.connect(self.show_saved_queries)
+        buttons_layout.addWidget(self.saved_queries_btn)
+
+        self.holds_btn = QPushButton("Бронирование")
+        self.holds_btn.clicked.connect(self.show_holds)
+        buttons_layout.addWidget(self.holds_btn)
+
         main_layout.addLayout(buttons_layout)
 
     def show_table_viewer(self):
@@ -207,11 +226,17 @@ class MainWindow(QMainWindow):
         dialog = TableViewerDialog(self.controller, self)
         dialog.exec()
     def load_logs(self):
-        """Загрузка содержимого лог-файла в окно логов."""
+        """Загрузка последних записей лог-файла в окно логов."""
         try:
-            with open("app.log", "r", encoding="utf-8") as f:
-                log_content = f.read()
-                self.log_display.setText(log_content)
+            with open("app.log", "rb") as f:
+                # Журнал растёт без ограничений, при запуске читается только его конец
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - LOG_TAIL_BYTES))
+                log_content = f.read().decode("utf-8", errors="ignore")
+                if size > LOG_TAIL_BYTES:
+                    log_content = log_content.split("\n", 1)[-1]
+                self.log_display.setPlainText(log_content)
 
             # Прокрутка к последней записи
             QTimer.singleShot(100, lambda: self.log_display.verticalScrollBar().setValue(
@@ -279,45 +304,41 @@ class MainWindow(QMainWindow):
 
     def show_authors(self):
         """Открытие диалога просмотра таблицы авторов"""
+        from ..dialogs.authors import AuthorsDialog
         dialog = AuthorsDialog(self.controller, self)
         dialog.exec()
 
     def show_readers(self):
         """Открытие диалога просмотра таблицы читателей."""
+        from ..dialogs.readers import ReadersDialog
         dialog = ReadersDialog(self.controller, self)
         dialog.exec()
 
     def show_books(self):
         """Открытие диалога просмотра таблицы книг"""
+        from ..dialogs.books import BooksDialog
         dialog = BooksDialog(self.controller, self)
         dialog.exec()
 
     def show_issues(self):
         """Открытие диалога просмотра таблицы заказов"""
+        from ..dialogs.issues import IssuesDialog
         dialog = IssuesDialog(self.controller, self)
         dialog.exec()
 
     def show_books_authors(self):
         """Открытие диалога просмотра таблицы связи книг и авторов"""
-        pass
+        from ..dialogs.bookauthors import BookAuthorsDialog
         dialog = BookAuthorsDialog(self.controller, self)
         dialog.exec()
 
     def show_table(self, table_type):
         """Открывает диалог с выбранной таблицей."""
-        if table_type == TableType.AUTHORS:
-            dialog = SearchableAuthorsDialog(self.controller, self)
-        elif table_type == TableType.BOOKS:
-            dialog = SearchableBooksDialog(self.controller, self)
-        elif table_type == TableType.READERS:
-            dialog = SearchableReadersDialog(self.controller, self)
-        elif table_type == TableType.ISSUES:
-            dialog = SearchableIssuesDialog(self.controller, self)
-        elif table_type == TableType.BOOK_AUTHORS:
-            dialog = SearchableBookAuthorsDialog(self.controller, self)
-        else:
+        if table_type not in SEARCHABLE_DIALOGS:
             return
-
+        module_name, class_name = SEARCHABLE_DIALOGS[table_type]
+        dialog_class = getattr(importlib.import_module(module_name), class_name)
+        dialog = dialog_class(self.controller, self)
         dialog.exec()
 
     def show_join_wizard(self):
@@ -332,6 +353,24 @@ class MainWindow(QMainWindow):
         dialog = RequestBuilderDialog(self.controller, self)
         dialog.exec()
 
+    def show_saved_queries(self):
+        """Открытие библиотеки сохранённых запросов"""
+        from ..dialogs.saved_queries import SavedQueriesDialog
+        dialog = SavedQueriesDialog(self.controller, self)
+        dialog.exec()
+
+    def show_holds(self):
+        """Открытие очереди бронирований"""
+        from ..dialogs.holds import HoldsDialog
+        dialog = HoldsDialog(self.controller, self)
+        dialog.exec()
+
+    def show_performance(self):
+        """Открытие диалога статистики выполнения запросов"""
+        from ..dialogs.performance import PerformanceDialog
+        dialog = PerformanceDialog(self.controller, self)
+        dialog.exec()
+
     def disconnect_from_db(self):
         """Отключение от базы данных и выход из программы."""
         # Запрос подтверждения